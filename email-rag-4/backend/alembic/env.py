@@ -17,8 +17,10 @@ from app.config import settings
 from app.db.base import Base
 from app.db.models import (  # noqa: F401 - Import all models to register them
     Attachment,
+    AttachmentContent,
     AuditLog,
     Email,
+    EmailContent,
     Evidence,
     ProcessingTask,
     User,
@@ -0,0 +1,47 @@
+"""Add attachment extraction cache table
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-01-13 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ===========================================
+    # Attachment Extraction Cache Table
+    # ===========================================
+    op.create_table(
+        "attachment_extractions",
+        sa.Column("sha256_hash", sa.String(64), nullable=False),
+        sa.Column("extractor_version", sa.Integer(), nullable=False),
+        sa.Column("extracted_text", sa.Text(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("sha256_hash", "extractor_version"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("attachment_extractions")
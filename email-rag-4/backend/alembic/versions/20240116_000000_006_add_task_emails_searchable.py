@@ -0,0 +1,34 @@
+"""Add searchable email count to processing tasks
+
+Revision ID: 006
+Revises: 005
+Create Date: 2024-01-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "processing_tasks",
+        sa.Column("emails_searchable", sa.Integer(), nullable=False, server_default="0"),
+    )
+    # Tasks that already finished embedding are fully searchable
+    op.execute(
+        "UPDATE processing_tasks SET emails_searchable = ("
+        "SELECT count(*) FROM emails "
+        "WHERE emails.pst_file_id = processing_tasks.id AND emails.is_embedded)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("processing_tasks", "emails_searchable")
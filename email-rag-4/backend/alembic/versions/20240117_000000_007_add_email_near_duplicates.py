@@ -0,0 +1,54 @@
+"""Add near-duplicate signatures and grouping to emails
+
+Revision ID: 007
+Revises: 006
+Create Date: 2024-01-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("emails", sa.Column("minhash_signature", sa.LargeBinary(), nullable=True))
+    op.add_column(
+        "emails",
+        sa.Column("lsh_bands", postgresql.ARRAY(sa.BigInteger()), nullable=True),
+    )
+    op.add_column(
+        "emails",
+        sa.Column("duplicate_of", postgresql.UUID(as_uuid=False), nullable=True),
+    )
+    op.create_foreign_key(
+        "fk_emails_duplicate_of_emails",
+        "emails",
+        "emails",
+        ["duplicate_of"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+    op.create_index("ix_emails_duplicate_of", "emails", ["duplicate_of"])
+    op.create_index(
+        "ix_emails_lsh_bands",
+        "emails",
+        ["lsh_bands"],
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_emails_lsh_bands", table_name="emails")
+    op.drop_index("ix_emails_duplicate_of", table_name="emails")
+    op.drop_constraint("fk_emails_duplicate_of_emails", "emails", type_="foreignkey")
+    op.drop_column("emails", "duplicate_of")
+    op.drop_column("emails", "lsh_bands")
+    op.drop_column("emails", "minhash_signature")
@@ -0,0 +1,25 @@
+"""Add segmented new body text to emails
+
+Revision ID: 008
+Revises: 007
+Create Date: 2024-01-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("emails", sa.Column("body_new_text", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("emails", "body_new_text")
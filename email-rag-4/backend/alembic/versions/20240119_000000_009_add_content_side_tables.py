@@ -0,0 +1,210 @@
+"""Move email HTML, headers and attachment text to compressed side tables
+
+Revision ID: 009
+Revises: 008
+Create Date: 2024-01-19 00:00:00.000000
+
+Existing values are compressed and copied in batches, then the inline
+columns are dropped; cached extraction texts in ``attachment_extractions``
+are compressed in place the same way. Dropping a column doesn't return
+its space to the table; run ``VACUUM FULL emails, attachments,
+attachment_extractions`` (or pg_repack) afterwards to shrink the heaps.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+from app.utils.content_codec import compress_text, decompress_text
+
+# revision identifiers, used by Alembic.
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def _batches(select_sql: str):
+    """Yield rows in primary-key order, BATCH_SIZE at a time (keyset pagination)."""
+    bind = op.get_bind()
+    last_id = None
+    while True:
+        rows = bind.execute(
+            sa.text(select_sql),
+            {"last_id": last_id or "00000000-0000-0000-0000-000000000000", "limit": BATCH_SIZE},
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def _extraction_batches(select_sql: str):
+    """Yield attachment_extractions rows in (sha256_hash, extractor_version) key order."""
+    bind = op.get_bind()
+    last_key = ("", -1)
+    while True:
+        rows = bind.execute(
+            sa.text(select_sql),
+            {"last_hash": last_key[0], "last_version": last_key[1], "limit": BATCH_SIZE},
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_key = (rows[-1][0], rows[-1][1])
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    # ===========================================
+    # Content Side Tables
+    # ===========================================
+    op.create_table(
+        "email_contents",
+        sa.Column("email_id", postgresql.UUID(as_uuid=False), nullable=False),
+        sa.Column("body_html_data", sa.LargeBinary(), nullable=True),
+        sa.Column("headers_data", sa.LargeBinary(), nullable=True),
+        sa.ForeignKeyConstraint(["email_id"], ["emails.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("email_id"),
+    )
+    op.create_table(
+        "attachment_contents",
+        sa.Column("attachment_id", postgresql.UUID(as_uuid=False), nullable=False),
+        sa.Column("extracted_text_data", sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(["attachment_id"], ["attachments.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("attachment_id"),
+    )
+
+    # ===========================================
+    # Move Existing Data
+    # ===========================================
+    email_contents = sa.table(
+        "email_contents",
+        sa.column("email_id", postgresql.UUID(as_uuid=False)),
+        sa.column("body_html_data", sa.LargeBinary()),
+        sa.column("headers_data", sa.LargeBinary()),
+    )
+    for rows in _batches(
+        "SELECT id, body_html, headers FROM emails "
+        "WHERE id > CAST(:last_id AS uuid) AND (body_html IS NOT NULL OR headers IS NOT NULL) "
+        "ORDER BY id LIMIT :limit"
+    ):
+        bind.execute(
+            email_contents.insert(),
+            [
+                {
+                    "email_id": email_id,
+                    "body_html_data": compress_text(body_html),
+                    "headers_data": compress_text(headers),
+                }
+                for email_id, body_html, headers in rows
+            ],
+        )
+
+    attachment_contents = sa.table(
+        "attachment_contents",
+        sa.column("attachment_id", postgresql.UUID(as_uuid=False)),
+        sa.column("extracted_text_data", sa.LargeBinary()),
+    )
+    for rows in _batches(
+        "SELECT id, extracted_text FROM attachments "
+        "WHERE id > CAST(:last_id AS uuid) AND extracted_text IS NOT NULL AND extracted_text <> '' "
+        "ORDER BY id LIMIT :limit"
+    ):
+        bind.execute(
+            attachment_contents.insert(),
+            [
+                {"attachment_id": attachment_id, "extracted_text_data": compress_text(text)}
+                for attachment_id, text in rows
+            ],
+        )
+
+    op.add_column(
+        "attachment_extractions",
+        sa.Column("extracted_text_data", sa.LargeBinary(), nullable=True),
+    )
+    for rows in _extraction_batches(
+        "SELECT sha256_hash, extractor_version, extracted_text FROM attachment_extractions "
+        "WHERE (sha256_hash, extractor_version) > (:last_hash, :last_version) "
+        "AND extracted_text IS NOT NULL "
+        "ORDER BY sha256_hash, extractor_version LIMIT :limit"
+    ):
+        bind.execute(
+            sa.text(
+                "UPDATE attachment_extractions SET extracted_text_data = :data "
+                "WHERE sha256_hash = :sha256_hash AND extractor_version = :version"
+            ),
+            [
+                {"sha256_hash": sha256_hash, "version": version, "data": compress_text(text)}
+                for sha256_hash, version, text in rows
+            ],
+        )
+
+    op.drop_column("emails", "body_html")
+    op.drop_column("emails", "headers")
+    op.drop_column("attachments", "extracted_text")
+    op.drop_column("attachment_extractions", "extracted_text")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    op.add_column("emails", sa.Column("body_html", sa.Text(), nullable=True))
+    op.add_column("emails", sa.Column("headers", sa.Text(), nullable=True))
+    op.add_column("attachments", sa.Column("extracted_text", sa.Text(), nullable=True))
+    op.add_column(
+        "attachment_extractions", sa.Column("extracted_text", sa.Text(), nullable=True)
+    )
+
+    for rows in _batches(
+        "SELECT email_id, body_html_data, headers_data FROM email_contents "
+        "WHERE email_id > CAST(:last_id AS uuid) ORDER BY email_id LIMIT :limit"
+    ):
+        bind.execute(
+            sa.text("UPDATE emails SET body_html = :body_html, headers = :headers WHERE id = :id"),
+            [
+                {
+                    "id": email_id,
+                    "body_html": decompress_text(body_html_data),
+                    "headers": decompress_text(headers_data),
+                }
+                for email_id, body_html_data, headers_data in rows
+            ],
+        )
+
+    for rows in _batches(
+        "SELECT attachment_id, extracted_text_data FROM attachment_contents "
+        "WHERE attachment_id > CAST(:last_id AS uuid) ORDER BY attachment_id LIMIT :limit"
+    ):
+        bind.execute(
+            sa.text("UPDATE attachments SET extracted_text = :text WHERE id = :id"),
+            [
+                {"id": attachment_id, "text": decompress_text(data)}
+                for attachment_id, data in rows
+            ],
+        )
+
+    for rows in _extraction_batches(
+        "SELECT sha256_hash, extractor_version, extracted_text_data FROM attachment_extractions "
+        "WHERE (sha256_hash, extractor_version) > (:last_hash, :last_version) "
+        "AND extracted_text_data IS NOT NULL "
+        "ORDER BY sha256_hash, extractor_version LIMIT :limit"
+    ):
+        bind.execute(
+            sa.text(
+                "UPDATE attachment_extractions SET extracted_text = :text "
+                "WHERE sha256_hash = :sha256_hash AND extractor_version = :version"
+            ),
+            [
+                {"sha256_hash": sha256_hash, "version": version, "text": decompress_text(data)}
+                for sha256_hash, version, data in rows
+            ],
+        )
+    op.drop_column("attachment_extractions", "extracted_text_data")
+
+    op.drop_table("attachment_contents")
+    op.drop_table("email_contents")
@@ -0,0 +1,29 @@
+"""Add per-chunk integrity hashes to processing tasks
+
+Revision ID: 010
+Revises: 009
+Create Date: 2024-01-20 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("processing_tasks", sa.Column("chunk_size_bytes", sa.Integer(), nullable=True))
+    op.add_column("processing_tasks", sa.Column("chunk_hashes", sa.LargeBinary(), nullable=True))
+    op.add_column("processing_tasks", sa.Column("merkle_root", sa.String(64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("processing_tasks", "merkle_root")
+    op.drop_column("processing_tasks", "chunk_hashes")
+    op.drop_column("processing_tasks", "chunk_size_bytes")
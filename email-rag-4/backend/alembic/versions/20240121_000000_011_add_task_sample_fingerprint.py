@@ -0,0 +1,33 @@
+"""Add sampled file fingerprint to processing tasks
+
+Revision ID: 011
+Revises: 010
+Create Date: 2024-01-21 00:00:00.000000
+
+Existing tasks are left without a fingerprint; re-uploads of them are
+still caught by the full SHA-256 check after transfer.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "011"
+down_revision: Union[str, None] = "010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("processing_tasks", sa.Column("sample_fingerprint", sa.String(64), nullable=True))
+    op.create_index(
+        "ix_processing_tasks_size_fingerprint",
+        "processing_tasks",
+        ["file_size_bytes", "sample_fingerprint"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_processing_tasks_size_fingerprint", table_name="processing_tasks")
+    op.drop_column("processing_tasks", "sample_fingerprint")
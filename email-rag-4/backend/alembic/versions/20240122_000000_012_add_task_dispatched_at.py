@@ -0,0 +1,38 @@
+"""Add dispatch time to processing tasks for the ingest scheduler
+
+Revision ID: 012
+Revises: 011
+Create Date: 2024-01-22 00:00:00.000000
+
+Tasks created before the scheduler were started directly, so live ones
+are marked dispatched; only chunked uploads still being assembled are
+left to be queued. Their slot lease starts at the upgrade: ones that were
+lost to earlier crashes are requeued or failed by the scheduler once it
+expires, and pending ones still get the time to start from the message
+already sent for them.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "012"
+down_revision: Union[str, None] = "011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "processing_tasks",
+        sa.Column("dispatched_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.execute(
+        "UPDATE processing_tasks SET dispatched_at = now() "
+        "WHERE status IN ('pending', 'parsing', 'extracting', 'embedding', 'indexing')"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("processing_tasks", "dispatched_at")
@@ -477,6 +477,8 @@ async def get_folders(
                     path=f["path"],
                     name=f["name"],
                     email_count=f["email_count"],
+                    message_count=f.get("message_count"),
+                    sub_folder_count=f.get("sub_folder_count"),
                 )
                 for f in folders
             ]
@@ -406,6 +406,7 @@ async def health_check() -> dict[str, Any]:
     Verifies that all required services are available.
     """
     from app.services.embedding_service import embedding_service
+    from app.services.query_embedding_cache import query_embedding_cache
     from app.services.vector_store import vector_store
 
     health = {
@@ -415,12 +416,16 @@ async def health_check() -> dict[str, Any]:
 
     # Check embedding service
     try:
-        # Try to generate a test embedding
-        test_embedding = embedding_service.generate_embedding("test")
+        # Try to generate a test embedding (bypassing the query embedding cache)
+        test_embedding = await embedding_service.query_embedder.embed("test")
         health["components"]["embedding_service"] = {
             "status": "healthy",
             "dimension": len(test_embedding),
         }
+        if query_embedding_cache is not None:
+            health["components"]["embedding_service"]["query_cache"] = (
+                query_embedding_cache.stats()
+            )
     except Exception as e:
         health["components"]["embedding_service"] = {
             "status": "unhealthy",
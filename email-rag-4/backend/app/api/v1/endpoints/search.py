@@ -83,6 +83,7 @@ async def search_emails(
                 attachment_count=r.attachment_count,
                 folder_path=r.folder_path,
                 pst_file_id=r.pst_file_id,
+                duplicate_count=r.duplicate_count,
             )
             for r in result.results
         ]
@@ -183,6 +184,7 @@ async def advanced_search(
                 attachment_count=r.attachment_count,
                 folder_path=r.folder_path,
                 pst_file_id=r.pst_file_id,
+                duplicate_count=r.duplicate_count,
             )
             for r in result.results
         ]
@@ -4,15 +4,17 @@ Upload Endpoints
 Handles PST file uploads and processing task management.
 """
 
+import asyncio
 import hashlib
 import shutil
 from datetime import datetime, timezone
 from pathlib import Path
 from uuid import UUID
 
-from fastapi import APIRouter, File, HTTPException, Query, UploadFile, status
+from fastapi import APIRouter, File, HTTPException, Query, Request, UploadFile, status
 from loguru import logger
 from sqlalchemy import delete, func, select
+from starlette.requests import ClientDisconnect
 
 from app.api.deps import ActiveUser, AdminUser, DbSession
 from app.config import settings
@@ -22,18 +24,29 @@ from app.db.models.processing_task import ProcessingTask, TaskStatus
 from app.schemas.auth import MessageResponse
 from app.schemas.upload import (
     CancelTaskResponse,
+    ChunkReceiptResponse,
+    ChunkUploadInitRequest,
+    ChunkUploadInitResponse,
+    ChunkUploadStatusResponse,
     DeleteTaskResponse,
     TaskDetailResponse,
     TaskListResponse,
     TaskStatusResponse,
+    UploadPrecheckRequest,
+    UploadPrecheckResponse,
     UploadResponse,
-    ChunkUploadInitRequest,
-    ChunkUploadInitResponse,
 )
-from app.workers.email_tasks import cancel_processing, process_pst_file
-from app.workers.indexing_tasks import delete_embeddings_for_task
-import aiofiles
-import os
+from app.services.attachment_store import attachment_store
+from app.services.chunked_upload import (
+    ChunkValidationError,
+    UploadSession,
+    chunked_upload_service,
+)
+from app.services.ingest_scheduler import ScheduledJob, ingest_scheduler
+from app.services.integrity import ChunkHasher, file_fingerprint, merkle_root
+from app.services.near_duplicate import near_duplicate_detector
+from app.workers.email_tasks import assemble_chunked_upload, cancel_processing, schedule_ingestion
+from app.workers.indexing_tasks import delete_embeddings_for_task, embed_email_batch
 
 router = APIRouter(prefix="/upload", tags=["Upload"])
 
@@ -147,152 +160,236 @@ async def delete_pst_file(
             detail="Cannot delete active task. Cancel it first.",
         )
 
+    attachment_hashes = await _task_attachment_hashes(db, file_id)
+
+    # Other PSTs' near-duplicates need a new canonical
+    promoted = await near_duplicate_detector.release_canonicals(db, str(file_id))
+
     # Delete emails and task
     await db.execute(delete(Email).where(Email.pst_file_id == file_id))
     await db.execute(delete(ProcessingTask).where(ProcessingTask.id == file_id))
     await db.commit()
 
+    _embed_promoted_canonicals(promoted)
+
+    # Remove blobs no other task references
+    await attachment_store.release(db, attachment_hashes)
+
     return {"message": "File deleted successfully"}
 
 
+def _embed_promoted_canonicals(promoted: dict[str, list[str]]) -> None:
+    """Queue embedding for emails promoted to canonical by a PST deletion."""
+    for pst_file_id, email_ids in promoted.items():
+        embed_email_batch.delay(pst_file_id, email_ids)
+
+
+async def _task_attachment_hashes(db, task_id: UUID) -> set[str]:
+    """Get the content hashes of a task's attachments."""
+    result = await db.execute(
+        select(Attachment.sha256_hash)
+        .join(Email)
+        .where(
+            Email.pst_file_id == task_id,
+            Attachment.sha256_hash.is_not(None),
+        )
+        .distinct()
+    )
+    return set(result.scalars().all())
+
+
+def _get_upload_session(upload_id: str, current_user) -> UploadSession:
+    """Load a chunked upload session owned by the current user."""
+    session = chunked_upload_service.load(upload_id)
+    if session is None or session.user_id != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+
+@router.post("/precheck", response_model=UploadPrecheckResponse)
+async def precheck_upload(
+    request: UploadPrecheckRequest,
+    current_user: ActiveUser,
+    db: DbSession,
+) -> UploadPrecheckResponse:
+    """
+    Check whether a file was already processed, before uploading it.
+
+    Matches the file size and sampled fingerprint against completed
+    tasks. A match is answered instantly so the client can skip the
+    transfer; uploads that go ahead are still checked against the full
+    SHA-256 once received.
+    """
+    result = await db.execute(
+        select(ProcessingTask.id)
+        .where(
+            ProcessingTask.file_size_bytes == request.file_size,
+            ProcessingTask.sample_fingerprint == request.fingerprint.lower(),
+            ProcessingTask.status == TaskStatus.COMPLETED,
+        )
+        .order_by(ProcessingTask.completed_at.desc())
+        .limit(1)
+    )
+    existing_id = result.scalar_one_or_none()
+
+    if existing_id:
+        return UploadPrecheckResponse(
+            duplicate=True,
+            task_id=existing_id,
+            message=f"This file has already been processed (task: {existing_id})",
+        )
+    return UploadPrecheckResponse(duplicate=False, message="File not seen before")
+
+
 @router.post("/chunk/init", response_model=ChunkUploadInitResponse)
 async def init_chunk_upload(
     request: ChunkUploadInitRequest,
     current_user: ActiveUser,
 ) -> ChunkUploadInitResponse:
-    """Initialize a chunked upload session."""
-    import uuid
-    upload_id = str(uuid.uuid4())
-    
-    # Create temp directory for chunks
-    temp_dir = Path(settings.upload_dir) / "temp" / upload_id
-    temp_dir.mkdir(parents=True, exist_ok=True)
-    
+    """
+    Initialize a resumable chunked upload session.
+
+    The server picks the part size; part N covers bytes
+    [N * chunk_size, (N + 1) * chunk_size) and parts may be sent in any
+    order and in parallel.
+    """
+    if not request.filename.lower().endswith(".pst"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only PST files are allowed",
+        )
+    if request.total_size > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File too large. Maximum size is {MAX_FILE_SIZE / (1024**3):.1f} GB",
+        )
+
+    session = await asyncio.to_thread(
+        chunked_upload_service.create,
+        current_user.id,
+        request.filename,
+        request.total_size,
+    )
+
     return ChunkUploadInitResponse(
-        upload_id=upload_id,
-        chunk_size=95 * 1024 * 1024  # 95MB
+        upload_id=session.upload_id,
+        chunk_size=session.chunk_size,
+        total_chunks=session.total_chunks,
     )
 
 
-@router.post("/chunk/{upload_id}")
+@router.get("/chunk/{upload_id}", response_model=ChunkUploadStatusResponse)
+async def get_chunk_upload_status(
+    upload_id: str,
+    current_user: ActiveUser,
+) -> ChunkUploadStatusResponse:
+    """Get which parts have been received, so an interrupted upload can resume."""
+    session = _get_upload_session(upload_id, current_user)
+    received = await asyncio.to_thread(chunked_upload_service.received, session)
+
+    return ChunkUploadStatusResponse(
+        upload_id=session.upload_id,
+        filename=session.filename,
+        total_size=session.total_size,
+        chunk_size=session.chunk_size,
+        total_chunks=session.total_chunks,
+        received_chunks=sorted(received),
+        missing_chunks=[i for i in range(session.total_chunks) if i not in received],
+        bytes_received=sum(receipt.size for receipt in received.values()),
+    )
+
+
+@router.post("/chunk/{upload_id}", response_model=ChunkReceiptResponse)
 async def upload_chunk(
     upload_id: str,
+    request: Request,
+    current_user: ActiveUser,
     chunk_index: int = Query(..., ge=0),
-    file: UploadFile = File(...),
-    current_user: ActiveUser = None, # Optional auth check if needed, but path is unique
-) -> dict:
-    """Upload a single file chunk."""
-    temp_dir = Path(settings.upload_dir) / "temp" / upload_id
-    if not temp_dir.exists():
-        raise HTTPException(status_code=404, detail="Upload session not found")
-        
-    chunk_path = temp_dir / f"{chunk_index}"
-    
+    sha256: str | None = Query(None, description="SHA-256 of the part, checked on receipt"),
+) -> ChunkReceiptResponse:
+    """
+    Upload one part as the raw request body (application/octet-stream).
+
+    The part is written straight to its offset and hashed while it
+    streams in. Re-sending a part replaces it.
+    """
+    session = _get_upload_session(upload_id, current_user)
+
     try:
-        async with aiofiles.open(chunk_path, 'wb') as f:
-            while content := await file.read(8192):
-                await f.write(content)
-                
-        return {"message": "Chunk uploaded", "index": chunk_index}
-    except Exception as e:
+        receipt = await chunked_upload_service.write_chunk(
+            session,
+            chunk_index,
+            request.stream(),
+            expected_sha256=sha256,
+        )
+    except ChunkValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ClientDisconnect:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Upload interrupted")
+    except OSError as e:
         logger.error(f"Chunk upload error: {e}")
         raise HTTPException(status_code=500, detail="Failed to save chunk")
 
+    return ChunkReceiptResponse(index=receipt.index, size=receipt.size, sha256=receipt.sha256)
 
-@router.post("/chunk/{upload_id}/complete", response_model=UploadResponse)
+
+@router.post(
+    "/chunk/{upload_id}/complete",
+    response_model=UploadResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
 async def complete_chunk_upload(
     upload_id: str,
-    filename: str,
     current_user: ActiveUser,
     db: DbSession,
+    filename: str | None = None,
 ) -> UploadResponse:
-    """Complete a chunked upload by assembling parts."""
-    temp_dir = Path(settings.upload_dir) / "temp" / upload_id
-    if not temp_dir.exists():
-        raise HTTPException(status_code=404, detail="Upload session not found")
+    """
+    Complete a chunked upload.
 
-    try:
-        # Verify all chunks exist (simple check - should be more robust in prod)
-        chunks = sorted([int(f.name) for f in temp_dir.iterdir() if f.name.isdigit()])
-        if not chunks:
-             raise HTTPException(status_code=400, detail="No chunks found")
-             
-        # Create final file path
-        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-        safe_filename = "".join(c for c in filename if c.isalnum() or c in "._-")[:100]
-        unique_filename = f"{current_user.id}_{timestamp}_{safe_filename}"
-        final_path = Path(settings.upload_dir) / unique_filename
-        
-        # Assemble file
-        file_size = 0
-        sha256 = hashlib.sha256()
-        md5 = hashlib.md5()
-        
-        with open(final_path, 'wb') as outfile:
-            for i in chunks:
-                chunk_path = temp_dir / str(i)
-                with open(chunk_path, 'rb') as infile:
-                    while True:
-                        data = infile.read(81920) # 80KB buffer
-                        if not data:
-                            break
-                        outfile.write(data)
-                        sha256.update(data)
-                        md5.update(data)
-                        file_size += len(data)
-
-        # Cleanup chunks
-        import shutil
-        shutil.rmtree(temp_dir)
-        
-        sha256_hash = sha256.hexdigest()
-        md5_hash = md5.hexdigest()
+    Creates the processing task and hands the upload to a background job,
+    which moves the file into place, hashes it, checks for duplicates and
+    starts processing. The task stays in the uploading state until then.
+    """
+    session = _get_upload_session(upload_id, current_user)
 
-        # Check for duplicates
-        result = await db.execute(
-            select(ProcessingTask).where(
-                ProcessingTask.sha256_hash == sha256_hash,
-                ProcessingTask.status != TaskStatus.FAILED,
-            )
+    missing = await asyncio.to_thread(chunked_upload_service.missing, session)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": "Upload is incomplete", "missing_chunks": missing},
         )
-        existing = result.scalar_one_or_none()
-
-        if existing:
-            final_path.unlink()
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail=f"This file has already been processed (task: {existing.id})",
-            )
 
-        # Create task
-        task = ProcessingTask(
-            user_id=current_user.id,
-            original_filename=filename,
-            file_path=str(final_path),
-            file_size_bytes=file_size,
-            sha256_hash=sha256_hash,
-            md5_hash=md5_hash,
-            status=TaskStatus.PENDING,
-        )
+    # Keep the session from expiring while its assembly job is queued
+    await asyncio.to_thread(chunked_upload_service.touch, session)
 
-        db.add(task)
-        await db.commit()
-        await db.refresh(task)
+    filename = filename or session.filename
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    safe_filename = "".join(c for c in filename if c.isalnum() or c in "._-")[:100]
+    unique_filename = f"{current_user.id}_{timestamp}_{safe_filename}"
+    final_path = Path(settings.upload_dir) / unique_filename
+
+    task = ProcessingTask(
+        user_id=current_user.id,
+        original_filename=filename,
+        file_path=str(final_path),
+        file_size_bytes=session.total_size,
+        status=TaskStatus.UPLOADING,
+        current_phase="assembling",
+    )
 
-        process_pst_file.delay(str(task.id))
+    db.add(task)
+    await db.commit()
+    await db.refresh(task)
 
-        return UploadResponse(
-            task_id=task.id,
-            filename=filename,
-            file_size=file_size,
-            message="Upload successful, processing started",
-        )
+    assemble_chunked_upload.delay(str(task.id), upload_id)
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Assembly error: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to assemble file: {str(e)}")
+    return UploadResponse(
+        task_id=task.id,
+        filename=filename,
+        file_size=session.total_size,
+        message="Upload received, verifying before processing",
+    )
 
 
 @router.post("", response_model=UploadResponse, status_code=status.HTTP_201_CREATED)
@@ -341,6 +438,7 @@ async def upload_pst_file(
         # Stream file to disk while calculating hashes
         sha256 = hashlib.sha256()
         md5 = hashlib.md5()
+        chunk_hasher = ChunkHasher()
         file_size = 0
 
         with open(file_path, "wb") as f:
@@ -358,9 +456,11 @@ async def upload_pst_file(
                 f.write(chunk)
                 sha256.update(chunk)
                 md5.update(chunk)
+                chunk_hasher.update(chunk)
 
         sha256_hash = sha256.hexdigest()
         md5_hash = md5.hexdigest()
+        sample_fingerprint = await asyncio.to_thread(file_fingerprint, file_path)
 
         logger.info(f"Uploaded file: {file.filename} ({file_size} bytes)")
 
@@ -389,6 +489,10 @@ async def upload_pst_file(
             file_size_bytes=file_size,
             sha256_hash=sha256_hash,
             md5_hash=md5_hash,
+            chunk_size_bytes=chunk_hasher.chunk_size,
+            chunk_hashes=chunk_hasher.packed(),
+            merkle_root=merkle_root(chunk_hasher.leaves),
+            sample_fingerprint=sample_fingerprint,
             status=TaskStatus.PENDING,
         )
 
@@ -398,14 +502,14 @@ async def upload_pst_file(
 
         logger.info(f"Created processing task: {task.id}")
 
-        # Start background processing
-        process_pst_file.delay(str(task.id))
+        # Queue for processing; the ingest scheduler starts it when a slot is free
+        schedule_ingestion.delay()
 
         return UploadResponse(
             task_id=task.id,
             filename=file.filename,
             file_size=file_size,
-            message="Upload successful, processing started",
+            message="Upload successful, queued for processing",
         )
 
     except HTTPException:
@@ -421,6 +525,27 @@ async def upload_pst_file(
         )
 
 
+async def _queue_estimates(db, tasks: list[ProcessingTask]) -> dict[str, ScheduledJob]:
+    """Get scheduler estimates, if any of the tasks are still queued."""
+    if not any(t.status == TaskStatus.PENDING and t.dispatched_at is None for t in tasks):
+        return {}
+    return await ingest_scheduler.estimate(db)
+
+
+def _eta_seconds(task: ProcessingTask, estimates: dict[str, ScheduledJob]) -> float | None:
+    """Queued tasks get the scheduler's estimate, running ones their progress rate."""
+    scheduled = estimates.get(str(task.id))
+    if scheduled:
+        return max(0.0, (scheduled.finish_at - datetime.now(timezone.utc)).total_seconds())
+    return task.calculate_eta_seconds()
+
+
+def _queue_position(task: ProcessingTask, estimates: dict[str, ScheduledJob]) -> int | None:
+    """Get a queued task's place in the ingest queue."""
+    scheduled = estimates.get(str(task.id))
+    return scheduled.position if scheduled else None
+
+
 @router.get("/tasks", response_model=TaskListResponse)
 async def list_tasks(
     current_user: ActiveUser,
@@ -446,6 +571,7 @@ async def list_tasks(
 
     result = await db.execute(query)
     tasks = list(result.scalars().all())
+    estimates = await _queue_estimates(db, tasks)
 
     return TaskListResponse(
         tasks=[
@@ -457,11 +583,13 @@ async def list_tasks(
                 emails_total=t.emails_total,
                 emails_processed=t.emails_processed,
                 emails_failed=t.emails_failed,
+                emails_searchable=t.emails_searchable,
                 started_at=t.started_at,
                 completed_at=t.completed_at,
                 error_message=t.error_message,
                 duration_seconds=t.duration_seconds,
-                eta_seconds=t.calculate_eta_seconds(),
+                eta_seconds=_eta_seconds(t, estimates),
+                queue_position=_queue_position(t, estimates),
             )
             for t in tasks
         ],
@@ -492,6 +620,8 @@ async def get_task(
             detail="Task not found",
         )
 
+    estimates = await _queue_estimates(db, [task])
+
     return TaskDetailResponse(
         task_id=task.id,
         status=task.status,
@@ -500,11 +630,13 @@ async def get_task(
         emails_total=task.emails_total,
         emails_processed=task.emails_processed,
         emails_failed=task.emails_failed,
+        emails_searchable=task.emails_searchable,
         started_at=task.started_at,
         completed_at=task.completed_at,
         error_message=task.error_message,
         duration_seconds=task.duration_seconds,
-        eta_seconds=task.calculate_eta_seconds(),
+        eta_seconds=_eta_seconds(task, estimates),
+        queue_position=_queue_position(task, estimates),
         original_filename=task.original_filename,
         file_size_bytes=task.file_size_bytes,
         sha256_hash=task.sha256_hash,
@@ -595,6 +727,11 @@ async def delete_task(
         .where(Email.pst_file_id == task_id)
     )
 
+    attachment_hashes = await _task_attachment_hashes(db, task_id)
+
+    # Other PSTs' near-duplicates need a new canonical
+    promoted = await near_duplicate_detector.release_canonicals(db, str(task_id))
+
     # Delete attachments
     await db.execute(
         delete(Attachment).where(
@@ -614,6 +751,7 @@ async def delete_task(
 
     # Delete embeddings asynchronously
     delete_embeddings_for_task.delay(str(task_id))
+    _embed_promoted_canonicals(promoted)
 
     # Delete files
     if delete_files and task.file_path:
@@ -622,7 +760,10 @@ async def delete_task(
             if file_path.exists():
                 file_path.unlink()
 
-            # Delete attachment files
+            # Delete attachment blobs no other task references
+            await attachment_store.release(db, attachment_hashes)
+
+            # Delete attachment files from the per-task layout
             attachments_dir = Path(settings.upload_dir) / "attachments" / str(task_id)
             if attachments_dir.exists():
                 shutil.rmtree(attachments_dir)
@@ -672,6 +813,7 @@ async def admin_list_all_tasks(
 
     result = await db.execute(query)
     tasks = list(result.scalars().all())
+    estimates = await _queue_estimates(db, tasks)
 
     return TaskListResponse(
         tasks=[
@@ -683,11 +825,13 @@ async def admin_list_all_tasks(
                 emails_total=t.emails_total,
                 emails_processed=t.emails_processed,
                 emails_failed=t.emails_failed,
+                emails_searchable=t.emails_searchable,
                 started_at=t.started_at,
                 completed_at=t.completed_at,
                 error_message=t.error_message,
                 duration_seconds=t.duration_seconds,
-                eta_seconds=t.calculate_eta_seconds(),
+                eta_seconds=_eta_seconds(t, estimates),
+                queue_position=_queue_position(t, estimates),
             )
             for t in tasks
         ],
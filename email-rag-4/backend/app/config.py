@@ -115,6 +115,9 @@ class Settings(BaseSettings):
     rabbitmq_vhost: str = Field(default="/")
     celery_broker_url: str | None = Field(default=None)
     celery_result_backend: str | None = Field(default=None)
+    # Worker processes per Celery worker host (its --concurrency); process
+    # pools started inside tasks divide the host's cores by this
+    celery_worker_concurrency: int = Field(default=4)
 
     @property
     def celery_broker(self) -> str:
@@ -190,8 +193,41 @@ class Settings(BaseSettings):
     embedding_model: str = Field(default="all-MiniLM-L6-v2")
     embedding_dimension: int = Field(default=384)
     embedding_batch_size: int = Field(default=256)
+    # Each encode call is split into forward passes of similar token length:
+    # as many texts as fit in the budget of padded tokens, up to the batch size
+    # (0 = fixed-size passes); tuned with benchmarks/bench_token_batching.py
+    embedding_batch_token_budget: int = Field(default=2048)
+    embedding_encode_batch_size: int = Field(default=128)
     embedding_chunk_size: int = Field(default=512)
     embedding_chunk_overlap: int = Field(default=50)
+    # Inference backend: "torch" or "onnx" (int8-quantized on ONNX Runtime, for
+    # CPU workers); onnx falls back to torch if it can't be loaded
+    embedding_backend: str = Field(default="torch")
+    # Quantized file in the model's Hub repository; models without one are
+    # exported and quantized once into embedding_onnx_dir
+    embedding_onnx_file: str = Field(default="onnx/model_quint8_avx2.onnx")
+    embedding_onnx_dir: str = Field(default="/app/data/models/onnx")
+    embedding_onnx_threads: int = Field(default=0)  # 0 = ONNX Runtime default
+    # Large batches (indexing) are sharded across model replicas in worker
+    # processes, each pinned to its own CPU cores; 0 or 1 = encode in-process.
+    # Every Celery worker process starts its own replicas
+    embedding_pool_workers: int = Field(default=0)
+    embedding_pool_cores_per_worker: int = Field(default=0)  # 0 = divide cores evenly
+    # Chunk embeddings cached by (model, text SHA-256): "local" (SQLite file
+    # per host), "redis" (shared; size bounded by Redis maxmemory) or "none"
+    embedding_cache_backend: str = Field(default="local")
+    embedding_cache_path: str = Field(default="/app/data/embedding_cache.sqlite3")
+    embedding_cache_max_entries: int = Field(default=500_000)  # ~0.8 GB at 384 dimensions
+    # Entries unused this long expire, long enough for periodic reindexing; 0 = never
+    embedding_cache_ttl_seconds: int = Field(default=2_592_000)  # 30 days
+    # Search queries are embedded on a dedicated thread; concurrent queries
+    # arriving within the wait window are encoded together in one batch
+    query_embedding_max_batch_size: int = Field(default=32)
+    query_embedding_max_wait_ms: float = Field(default=2.0)
+    # Query and HyDE embeddings cached by (model, normalized text): an
+    # in-process LRU of this many vectors (0 = off), optionally shared via Redis
+    query_embedding_cache_size: int = Field(default=10_000)  # ~15 MB at 384 dimensions
+    query_embedding_cache_redis: bool = Field(default=False)
 
     # ===========================================
     # File Upload Settings
@@ -199,6 +235,14 @@ class Settings(BaseSettings):
     max_upload_size_gb: int = Field(default=50)
     upload_dir: str = Field(default="/app/uploads")
     allowed_extensions: str = Field(default=".pst")
+    # Chunked uploads: parts may arrive in any order and in parallel
+    upload_chunk_size_mb: int = Field(default=96)
+    # Unfinished chunked uploads idle this long are deleted by a beat task
+    upload_session_ttl_hours: int = Field(default=24)
+    # Uploaded PSTs are hashed per fixed-size chunk (Merkle tree leaves) so
+    # integrity checks can hash in parallel and pinpoint changed byte ranges
+    integrity_chunk_size_mb: int = Field(default=16)
+    integrity_verify_workers: int = Field(default=4)
 
     @property
     def max_upload_size_bytes(self) -> int:
@@ -210,6 +254,55 @@ class Settings(BaseSettings):
         """Alias for upload_dir."""
         return self.upload_dir
 
+    @property
+    def integrity_chunk_size(self) -> int:
+        """Get the integrity chunk size in bytes."""
+        return self.integrity_chunk_size_mb * 1024 * 1024
+
+    # ===========================================
+    # PST Ingestion
+    # ===========================================
+    # Sharded mode fans folder groups out to parallel Celery sub-tasks
+    pst_sharding_enabled: bool = Field(default=False)
+    pst_max_shards: int = Field(default=8)
+    pst_shard_min_emails: int = Field(default=10000)
+    # Emails per multi-row INSERT batch (also the commit interval)
+    ingest_batch_size: int = Field(default=500)
+    # Batches buffered between ingest pipeline stages (parse/extract/write/embed)
+    ingest_pipeline_queue_size: int = Field(default=2)
+    # Embed each committed batch in the ingest worker; when false, each batch
+    # is queued as an embedding job for the indexing workers instead
+    ingest_inline_embedding: bool = Field(default=True)
+    # Attachment text extraction runs in a process pool with per-file limits
+    attachment_extraction_pool_enabled: bool = Field(default=True)
+    # 0 = the host's cores divided among its celery_worker_concurrency processes
+    attachment_extraction_workers: int = Field(default=0)
+    attachment_extraction_timeout_seconds: float = Field(default=120.0)
+    attachment_extraction_cpu_seconds: int = Field(default=60)
+    attachment_extraction_memory_mb: int = Field(default=1024)
+    # Near-duplicate emails (MinHash/LSH over the body) share one canonical embedding
+    near_duplicate_enabled: bool = Field(default=True)
+    near_duplicate_threshold: float = Field(default=0.85)  # estimated Jaccard similarity
+    near_duplicate_min_words: int = Field(default=20)
+    # Embed only new content (no quoted history, signatures or disclaimers)
+    body_segmentation_enabled: bool = Field(default=True)
+    # Fair-share scheduler: uploaded PSTs wait for a slot; between users by
+    # weighted fair queuing (weight per role), within a user smallest first
+    ingest_max_concurrent: int = Field(default=4)
+    ingest_max_per_user: int = Field(default=2)
+    ingest_role_weights: dict[str, float] = Field(
+        default={"admin": 2.0, "investigator": 1.0, "viewer": 1.0}
+    )
+    ingest_aging_minutes: float = Field(default=30.0)  # wait that halves a task's effective size
+    # A dispatched task without a progress update for this long (lost message,
+    # killed worker) no longer holds its slot: one that never started is
+    # queued again, one that stalled mid-run is failed
+    ingest_slot_lease_minutes: float = Field(default=30.0)
+    # Failed or lost tasks go back in the queue this many times
+    ingest_max_retries: int = Field(default=3)
+    # ETA estimate until completed tasks give a measured rate
+    ingest_default_throughput_mb_s: float = Field(default=5.0)
+
     # ===========================================
     # JWT Authentication
     # ===========================================
@@ -245,6 +338,7 @@ class Settings(BaseSettings):
     cache_ttl_session: int = Field(default=1800)  # 30 minutes
     cache_ttl_llm_response: int = Field(default=600)  # 10 minutes
     cache_ttl_embeddings: int = Field(default=86400)  # 24 hours
+    cache_ttl_query_embeddings: int = Field(default=86400)  # 1 day
 
 
 @lru_cache
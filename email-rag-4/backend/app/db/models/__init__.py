@@ -5,6 +5,8 @@ Exports all SQLAlchemy models for the application.
 """
 
 from app.db.models.attachment import Attachment
+from app.db.models.attachment_extraction import AttachmentExtraction
+from app.db.models.content import AttachmentContent, EmailContent
 from app.db.models.email import Email, EmailImportance
 from app.db.models.evidence import AuditLog, Evidence, EvidenceAction
 from app.db.models.llm_settings import LLMSettings
@@ -20,6 +22,10 @@ __all__ = [
     "EmailImportance",
     # Attachment
     "Attachment",
+    "AttachmentExtraction",
+    # Content side tables
+    "EmailContent",
+    "AttachmentContent",
     # Processing Task
     "ProcessingTask",
     "TaskStatus",
@@ -1,7 +1,7 @@
 """
 Attachment Database Model
 
-Stores email attachments with metadata and extracted text content.
+Stores email attachments with metadata and extraction status.
 """
 
 from typing import TYPE_CHECKING
@@ -13,6 +13,7 @@ from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base, TimestampMixin, UUIDMixin
 
 if TYPE_CHECKING:
+    from app.db.models.content import AttachmentContent
     from app.db.models.email import Email
 
 
@@ -61,11 +62,7 @@ class Attachment(Base, UUIDMixin, TimestampMixin):
         nullable=True,
     )
 
-    # Extracted text content (for searchable attachments)
-    extracted_text: Mapped[str | None] = mapped_column(
-        Text,
-        nullable=True,
-    )
+    # Extraction error (the extracted text itself is in attachment_contents)
     text_extraction_error: Mapped[str | None] = mapped_column(
         Text,
         nullable=True,
@@ -103,6 +100,13 @@ class Attachment(Base, UUIDMixin, TimestampMixin):
         "Email",
         back_populates="attachments",
     )
+    # Extracted text lives in a compressed side table; load explicitly
+    content: Mapped["AttachmentContent | None"] = relationship(
+        "AttachmentContent",
+        uselist=False,
+        lazy="raise",
+        passive_deletes=True,
+    )
 
     # Indexes
     __table_args__ = (
@@ -119,6 +123,11 @@ class Attachment(Base, UUIDMixin, TimestampMixin):
     def __repr__(self) -> str:
         return f"<Attachment(id={self.id}, filename={self.filename})>"
 
+    @property
+    def extracted_text(self) -> str | None:
+        """Get the extracted text (requires ``content`` to be loaded)."""
+        return self.content.extracted_text if self.content else None
+
     @property
     def extension(self) -> str | None:
         """Get file extension from filename."""
@@ -0,0 +1,60 @@
+"""
+Attachment Extraction Cache Model
+
+Stores text extraction results by attachment content hash so identical
+files are parsed once across emails and PSTs. The text is stored
+compressed (see app.utils.content_codec).
+"""
+
+from sqlalchemy import Integer, LargeBinary, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base, TimestampMixin
+from app.utils.content_codec import decompress_text
+
+
+class AttachmentExtraction(Base, TimestampMixin):
+    """
+    Cached extraction result for one attachment content hash.
+
+    Keyed by (sha256_hash, extractor_version) so bumping
+    AttachmentProcessor.EXTRACTOR_VERSION invalidates old results.
+    Failed extractions are cached too, with the error message.
+    """
+
+    __tablename__ = "attachment_extractions"
+
+    sha256_hash: Mapped[str] = mapped_column(
+        String(64),
+        primary_key=True,
+    )
+    extractor_version: Mapped[int] = mapped_column(
+        Integer,
+        primary_key=True,
+    )
+
+    # Extraction outcome
+    extracted_text_data: Mapped[bytes | None] = mapped_column(
+        LargeBinary,
+        nullable=True,
+    )
+    error: Mapped[str | None] = mapped_column(
+        Text,
+        nullable=True,
+    )
+
+    @property
+    def extracted_text(self) -> str | None:
+        """Get the decompressed extracted text."""
+        return decompress_text(self.extracted_text_data)
+
+    @property
+    def is_extracted(self) -> bool:
+        """Check if extraction succeeded."""
+        return self.error is None
+
+    def __repr__(self) -> str:
+        return (
+            f"<AttachmentExtraction(sha256={self.sha256_hash[:12]}, "
+            f"version={self.extractor_version})>"
+        )
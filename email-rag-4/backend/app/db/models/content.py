@@ -0,0 +1,72 @@
+"""
+Content Side-Table Models
+
+Large, rarely read blobs kept out of the hot ``emails`` and
+``attachments`` tables: the HTML body and transport headers of an email
+and an attachment's extracted text. Values are stored compressed (see
+app.utils.content_codec) and are only loaded when a view asks for them.
+"""
+
+from sqlalchemy import ForeignKey, LargeBinary
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.utils.content_codec import decompress_text
+
+
+class EmailContent(Base):
+    """Compressed HTML body and headers of an email."""
+
+    __tablename__ = "email_contents"
+
+    email_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        ForeignKey("emails.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    body_html_data: Mapped[bytes | None] = mapped_column(
+        LargeBinary,
+        nullable=True,
+    )
+    headers_data: Mapped[bytes | None] = mapped_column(
+        LargeBinary,
+        nullable=True,
+    )
+
+    def __repr__(self) -> str:
+        return f"<EmailContent(email_id={self.email_id})>"
+
+    @property
+    def body_html(self) -> str | None:
+        """Get the decompressed HTML body."""
+        return decompress_text(self.body_html_data)
+
+    @property
+    def headers(self) -> str | None:
+        """Get the decompressed headers (JSON)."""
+        return decompress_text(self.headers_data)
+
+
+class AttachmentContent(Base):
+    """Compressed extracted text of an attachment."""
+
+    __tablename__ = "attachment_contents"
+
+    attachment_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        ForeignKey("attachments.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    extracted_text_data: Mapped[bytes] = mapped_column(
+        LargeBinary,
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        return f"<AttachmentContent(attachment_id={self.attachment_id})>"
+
+    @property
+    def extracted_text(self) -> str | None:
+        """Get the decompressed extracted text."""
+        return decompress_text(self.extracted_text_data)
@@ -9,11 +9,13 @@ from enum import Enum
 from typing import TYPE_CHECKING
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     DateTime,
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
     String,
     Text,
     func,
@@ -25,6 +27,7 @@ from app.db.base import Base, TimestampMixin, UUIDMixin
 
 if TYPE_CHECKING:
     from app.db.models.attachment import Attachment
+    from app.db.models.content import EmailContent
     from app.db.models.processing_task import ProcessingTask
 
 
@@ -114,7 +117,9 @@ class Email(Base, UUIDMixin, TimestampMixin):
         Text,
         nullable=True,
     )
-    body_html: Mapped[str | None] = mapped_column(
+    # body_text without quoted history, signature and disclaimers; this is
+    # what gets embedded (None for emails ingested before segmentation)
+    body_new_text: Mapped[str | None] = mapped_column(
         Text,
         nullable=True,
     )
@@ -156,12 +161,6 @@ class Email(Base, UUIDMixin, TimestampMixin):
         index=True,
     )
 
-    # Headers (full headers for forensics)
-    headers: Mapped[str | None] = mapped_column(
-        Text,
-        nullable=True,
-    )
-
     # Forensic data
     sha256_hash: Mapped[str | None] = mapped_column(
         String(64),
@@ -180,6 +179,23 @@ class Email(Base, UUIDMixin, TimestampMixin):
         nullable=True,
     )
 
+    # Near-duplicate detection: MinHash signature, its LSH band hashes, and
+    # the canonical email this one duplicates (canonical emails have None)
+    minhash_signature: Mapped[bytes | None] = mapped_column(
+        LargeBinary,
+        nullable=True,
+    )
+    lsh_bands: Mapped[list[int] | None] = mapped_column(
+        ARRAY(BigInteger),
+        nullable=True,
+    )
+    duplicate_of: Mapped[str | None] = mapped_column(
+        UUID(as_uuid=False),
+        ForeignKey("emails.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True,
+    )
+
     # Embedding status
     is_embedded: Mapped[bool] = mapped_column(
         Boolean,
@@ -203,6 +219,14 @@ class Email(Base, UUIDMixin, TimestampMixin):
         cascade="all, delete-orphan",
         lazy="selectin",
     )
+    # HTML body and headers live in a compressed side table; load explicitly
+    # (e.g. selectinload(Email.content)) on the views that need them
+    content: Mapped["EmailContent | None"] = relationship(
+        "EmailContent",
+        uselist=False,
+        lazy="raise",
+        passive_deletes=True,
+    )
 
     # Indexes
     __table_args__ = (
@@ -215,6 +239,12 @@ class Email(Base, UUIDMixin, TimestampMixin):
             "search_vector",
             postgresql_using="gin",
         ),
+        # GIN index for LSH candidate lookup
+        Index(
+            "ix_emails_lsh_bands",
+            "lsh_bands",
+            postgresql_using="gin",
+        ),
         # Partial index for unembedded emails
         Index(
             "ix_emails_not_embedded",
@@ -226,6 +256,23 @@ class Email(Base, UUIDMixin, TimestampMixin):
     def __repr__(self) -> str:
         return f"<Email(id={self.id}, subject={self.subject[:50] if self.subject else 'None'})>"
 
+    @property
+    def indexed_body(self) -> str:
+        """Get the body text to embed."""
+        if self.body_new_text is not None:
+            return self.body_new_text
+        return self.body_text or ""
+
+    @property
+    def body_html(self) -> str | None:
+        """Get the HTML body (requires ``content`` to be loaded)."""
+        return self.content.body_html if self.content else None
+
+    @property
+    def headers(self) -> str | None:
+        """Get the transport headers as JSON (requires ``content`` to be loaded)."""
+        return self.content.headers if self.content else None
+
     @property
     def all_recipients(self) -> list[str]:
         """Get all recipients (to, cc, bcc combined)."""
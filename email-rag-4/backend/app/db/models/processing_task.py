@@ -8,8 +8,8 @@ from datetime import datetime
 from enum import Enum
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, Float, ForeignKey, Index, Integer, String, Text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import DateTime, Float, ForeignKey, Index, Integer, LargeBinary, String, Text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base, TimestampMixin, UUIDMixin
@@ -71,6 +71,27 @@ class ProcessingTask(Base, UUIDMixin, TimestampMixin):
         String(32),
         nullable=True,
     )
+    # Per-chunk SHA-256 leaves (concatenated) and their Merkle root, for
+    # parallel and spot-check verification (see app.services.integrity)
+    chunk_size_bytes: Mapped[int | None] = mapped_column(
+        Integer,
+        nullable=True,
+    )
+    chunk_hashes: Mapped[bytes | None] = mapped_column(
+        LargeBinary,
+        nullable=True,
+        deferred=True,
+    )
+    merkle_root: Mapped[str | None] = mapped_column(
+        String(64),
+        nullable=True,
+    )
+    # Sampled head/tail/strided fingerprint, matched before upload to
+    # skip re-sending known evidence (see integrity.file_fingerprint)
+    sample_fingerprint: Mapped[str | None] = mapped_column(
+        String(64),
+        nullable=True,
+    )
 
     # Processing status
     status: Mapped[str] = mapped_column(
@@ -104,6 +125,12 @@ class ProcessingTask(Base, UUIDMixin, TimestampMixin):
         nullable=False,
         default=0,
     )
+    # Emails embedded so far; grows batch by batch during ingestion
+    emails_searchable: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+    )
     attachments_total: Mapped[int | None] = mapped_column(
         Integer,
         nullable=True,
@@ -115,6 +142,12 @@ class ProcessingTask(Base, UUIDMixin, TimestampMixin):
     )
 
     # Timing
+    # Set when the ingest scheduler gives the task a slot; PENDING tasks
+    # without it are queued (see app.services.ingest_scheduler)
+    dispatched_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
     started_at: Mapped[datetime | None] = mapped_column(
         DateTime(timezone=True),
         nullable=True,
@@ -139,6 +172,21 @@ class ProcessingTask(Base, UUIDMixin, TimestampMixin):
         default=0,
     )
 
+    # Folder manifest from a single PST walk: list of
+    # {"index_path", "path", "message_count", "sub_folder_count"}
+    folder_manifest: Mapped[list | None] = mapped_column(
+        JSONB,
+        nullable=True,
+    )
+
+    # Resume cursors per extraction scope ("main" or "shard:<n>"):
+    # {"folder": [index path], "folder_path": str, "message": int,
+    #  "emails_processed": int, "emails_failed": int}
+    checkpoint: Mapped[dict | None] = mapped_column(
+        JSONB,
+        nullable=True,
+    )
+
     # Celery task reference
     celery_task_id: Mapped[str | None] = mapped_column(
         String(100),
@@ -176,6 +224,7 @@ class ProcessingTask(Base, UUIDMixin, TimestampMixin):
     __table_args__ = (
         Index("ix_processing_tasks_user_status", "user_id", "status"),
         Index("ix_processing_tasks_status_created", "status", "created_at"),
+        Index("ix_processing_tasks_size_fingerprint", "file_size_bytes", "sample_fingerprint"),
     )
 
     def __repr__(self) -> str:
@@ -17,6 +17,7 @@ from app.api.v1.endpoints.ws import router as ws_router
 from app.config import settings
 from app.core import close_cache, close_websocket, init_cache, init_websocket
 from app.db import close_db, init_db
+from app.services.embedding_service import embedding_service
 
 
 @asynccontextmanager
@@ -39,6 +40,7 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     await close_websocket()
     await close_cache()
     await close_db()
+    embedding_service.shutdown()
 
     logger.info("Email RAG API shutdown complete")
 
@@ -171,6 +171,8 @@ class FolderSchema(BaseModel):
     path: str
     name: str
     email_count: int
+    message_count: int | None = None
+    sub_folder_count: int | None = None
 
 
 class FolderListResponse(BaseModel):
@@ -131,6 +131,7 @@ class SearchResultSchema(BaseModel):
     attachment_count: int = 0
     folder_path: str | None = None
     pst_file_id: str | None = None
+    duplicate_count: int = 0
 
 
 class ProcessedQueryInfoSchema(BaseModel):
@@ -21,19 +21,63 @@ class UploadResponse(BaseModel):
     message: str = Field(default="Upload successful, processing started")
 
 
+class UploadPrecheckRequest(BaseModel):
+    """Identity of a file the client is about to upload."""
+
+    filename: str | None = None
+    file_size: int = Field(..., ge=0)
+    fingerprint: str = Field(
+        ...,
+        min_length=64,
+        max_length=64,
+        description="Sampled head/tail/strided SHA-256 (see integrity.file_fingerprint)",
+    )
+
+
+class UploadPrecheckResponse(BaseModel):
+    """Whether a file was already processed, answered before upload."""
+
+    duplicate: bool
+    task_id: UUID | None = Field(default=None, description="Completed task with the same file")
+    message: str
+
+
 class ChunkUploadInitRequest(BaseModel):
     """Request to initialize a chunked upload."""
     
     filename: str
-    total_size: int
-    total_chunks: int
+    total_size: int = Field(..., ge=0)
+    # Ignored; the server decides the part size (see ChunkUploadInitResponse)
+    total_chunks: int | None = None
 
 
 class ChunkUploadInitResponse(BaseModel):
     """Response for chunked upload initialization."""
 
     upload_id: str
-    chunk_size: int = 95 * 1024 * 1024  # Default 95MB
+    chunk_size: int = Field(..., description="Part size in bytes; part N starts at N * chunk_size")
+    total_chunks: int
+
+
+class ChunkUploadStatusResponse(BaseModel):
+    """Progress of a chunked upload, for resuming."""
+
+    upload_id: str
+    filename: str
+    total_size: int
+    chunk_size: int
+    total_chunks: int
+    received_chunks: list[int]
+    missing_chunks: list[int]
+    bytes_received: int
+
+
+class ChunkReceiptResponse(BaseModel):
+    """Response after a part is written."""
+
+    index: int
+    size: int
+    sha256: str
 
 
 class TaskStatusResponse(BaseModel):
@@ -46,11 +90,16 @@ class TaskStatusResponse(BaseModel):
     emails_total: int
     emails_processed: int
     emails_failed: int
+    emails_searchable: int = 0
     started_at: datetime | None = None
     completed_at: datetime | None = None
     error_message: str | None = None
     duration_seconds: float | None = None
     eta_seconds: float | None = None
+    queue_position: int | None = Field(
+        default=None,
+        description="Place in the ingest queue (1 = next to start); None once started",
+    )
 
     model_config = {"from_attributes": True}
 
@@ -11,6 +11,24 @@ from app.services.attachment_processor import (
     attachment_processor,
     get_attachment_processor,
 )
+from app.services.attachment_store import (
+    AttachmentStore,
+    attachment_store,
+    get_attachment_store,
+)
+from app.services.body_segmenter import (
+    BodySegmenter,
+    SegmentedBody,
+    body_segmenter,
+    get_body_segmenter,
+)
+from app.services.chunked_upload import (
+    ChunkedUploadError,
+    ChunkedUploadService,
+    ChunkValidationError,
+    chunked_upload_service,
+    get_chunked_upload_service,
+)
 from app.services.email_service import (
     EmailDetail,
     EmailListResponse,
@@ -20,15 +38,57 @@ from app.services.email_service import (
     email_service,
     get_email_service,
 )
+from app.services.embedding_cache import (
+    EmbeddingCache,
+    embedding_cache,
+    get_embedding_cache,
+)
 from app.services.embedding_service import (
     EmbeddingService,
     TextChunk,
     embedding_service,
     get_embedding_service,
 )
+from app.services.extraction_cache import (
+    ExtractionCache,
+    ExtractionResult,
+    extraction_cache,
+    get_extraction_cache,
+)
+from app.services.extraction_executor import (
+    ExtractionExecutor,
+    extraction_executor,
+    get_extraction_executor,
+)
+from app.services.ingest_pipeline import IngestPipeline
+from app.services.ingest_scheduler import (
+    IngestJob,
+    IngestScheduler,
+    ScheduledJob,
+    get_ingest_scheduler,
+    ingest_scheduler,
+)
+from app.services.integrity import (
+    ChunkHasher,
+    IntegrityReport,
+    IntegrityVerifier,
+    file_fingerprint,
+    get_integrity_verifier,
+    integrity_verifier,
+    merkle_root,
+)
+from app.services.ingest_writer import EmailBatch, EmailBulkWriter
+from app.services.near_duplicate import (
+    NearDuplicateDetector,
+    get_near_duplicate_detector,
+    near_duplicate_detector,
+)
 from app.services.pst_processor import (
     ExtractedAttachment,
     ExtractedEmail,
+    FolderManifestEntry,
+    FolderShard,
+    MessageHeaders,
     PSTFileNotFoundError,
     PSTParseError,
     PSTProcessor,
@@ -42,6 +102,12 @@ from app.services.query_processor import (
     get_query_processor,
     query_processor,
 )
+from app.services.query_embedder import QueryEmbedder
+from app.services.query_embedding_cache import (
+    QueryEmbeddingCache,
+    get_query_embedding_cache,
+    query_embedding_cache,
+)
 from app.services.rag_service import (
     ChatMessage,
     RAGResponse,
@@ -82,18 +148,78 @@ __all__ = [
     "PSTParseError",
     "ExtractedEmail",
     "ExtractedAttachment",
+    "FolderManifestEntry",
+    "FolderShard",
+    "MessageHeaders",
     "create_pst_processor",
+    # Extraction Cache
+    "ExtractionCache",
+    "ExtractionResult",
+    "extraction_cache",
+    "get_extraction_cache",
+    # Extraction Executor
+    "ExtractionExecutor",
+    "extraction_executor",
+    "get_extraction_executor",
+    # Ingest Writer
+    "EmailBatch",
+    "EmailBulkWriter",
+    # Ingest Pipeline
+    "IngestPipeline",
+    # Ingest Scheduler
+    "IngestJob",
+    "IngestScheduler",
+    "ScheduledJob",
+    "ingest_scheduler",
+    "get_ingest_scheduler",
+    # Body Segmenter
+    "BodySegmenter",
+    "SegmentedBody",
+    "body_segmenter",
+    "get_body_segmenter",
+    # Near-Duplicate Detection
+    "NearDuplicateDetector",
+    "near_duplicate_detector",
+    "get_near_duplicate_detector",
     # Attachment Processor
     "AttachmentProcessor",
     "AttachmentProcessorError",
     "UnsupportedFormatError",
     "attachment_processor",
     "get_attachment_processor",
+    # Attachment Store
+    "AttachmentStore",
+    "attachment_store",
+    "get_attachment_store",
+    # Chunked Upload
+    "ChunkedUploadService",
+    "ChunkedUploadError",
+    "ChunkValidationError",
+    "chunked_upload_service",
+    "get_chunked_upload_service",
+    # Evidence Integrity
+    "ChunkHasher",
+    "IntegrityReport",
+    "IntegrityVerifier",
+    "integrity_verifier",
+    "get_integrity_verifier",
+    "file_fingerprint",
+    "merkle_root",
+    # Embedding Cache
+    "EmbeddingCache",
+    "embedding_cache",
+    "get_embedding_cache",
     # Embedding Service
     "EmbeddingService",
     "TextChunk",
     "embedding_service",
     "get_embedding_service",
+    # Query Embedder
+    "QueryEmbedder",
+    # Query Embedding Cache
+    "QueryEmbeddingCache",
+    "query_embedding_cache",
+    "get_query_embedding_cache",
     # Query Processor
     "QueryProcessor",
     "QueryType",
@@ -9,6 +9,8 @@ from pathlib import Path
 
 from loguru import logger
 
+from app.utils.html_text import html_to_text
+
 
 class AttachmentProcessorError(Exception):
     """Base exception for attachment processing errors."""
@@ -116,6 +118,9 @@ class AttachmentProcessor:
         b"\xd0\xcf\x11\xe0": "application/msword",  # Old Office format
     }
 
+    # Bump when extraction output changes; invalidates cached results
+    EXTRACTOR_VERSION = 2
+
     def __init__(self, max_text_length: int = 100000):
         """
         Initialize attachment processor.
@@ -508,32 +513,7 @@ class AttachmentProcessor:
 
     def extract_html(self, content: bytes) -> str:
         """Extract text from HTML file."""
-        try:
-            from bs4 import BeautifulSoup
-
-            # Decode content
-            text = self.extract_text_content(content)
-
-            # Parse HTML
-            soup = BeautifulSoup(text, "html.parser")
-
-            # Remove script and style elements
-            for element in soup(["script", "style", "head", "meta", "link"]):
-                element.decompose()
-
-            # Get text
-            return soup.get_text(separator="\n", strip=True)
-
-        except ImportError:
-            # Fall back to basic HTML stripping
-            import re
-
-            text = self.extract_text_content(content)
-            # Remove HTML tags
-            text = re.sub(r"<[^>]+>", " ", text)
-            # Clean up whitespace
-            text = re.sub(r"\s+", " ", text)
-            return text.strip()
+        return html_to_text(self.extract_text_content(content))
 
 
 # Global instance
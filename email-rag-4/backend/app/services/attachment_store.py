@@ -0,0 +1,153 @@
+"""
+Attachment Store Service
+
+Content-addressed storage for attachment files. Blobs are keyed by
+SHA-256 so an attachment repeated across thousands of emails (disclaimer
+PDFs, logos) is written to disk once.
+"""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.models.attachment import Attachment
+
+
+class AttachmentStore:
+    """
+    Write-once blob store with a two-level fan-out layout.
+
+    A blob with hash ``abcdef...`` lives at ``<root>/ab/cd/abcdef...``.
+    Attachment rows are the reference count: a blob is removed only once
+    no Attachment row with its ``sha256_hash`` remains.
+    """
+
+    # Blobs touched more recently than this are never released, so a
+    # concurrent ingest that just reused one can commit its rows first.
+    RELEASE_GRACE_SECONDS = 600
+
+    def __init__(self, root: str | Path | None = None):
+        """
+        Initialize the store.
+
+        Args:
+            root: Blob directory (default: <upload_dir>/blobs)
+        """
+        self._root = Path(root) if root else None
+
+    @property
+    def root(self) -> Path:
+        """Blob root directory."""
+        return self._root or Path(settings.upload_dir) / "blobs"
+
+    def blob_path(self, sha256_hash: str) -> Path:
+        """Get the fan-out path for a blob."""
+        sha256_hash = sha256_hash.lower()
+        return self.root / sha256_hash[:2] / sha256_hash[2:4] / sha256_hash
+
+    def put(self, sha256_hash: str, content: bytes) -> tuple[str, bool]:
+        """
+        Store a blob unless it already exists.
+
+        Args:
+            sha256_hash: SHA-256 hex digest of content
+            content: Attachment bytes
+
+        Returns:
+            Tuple of (storage path, whether the blob was newly written)
+        """
+        path = self.blob_path(sha256_hash)
+
+        if path.exists():
+            # Refresh mtime so a concurrent release leaves it alone
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return str(path), False
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temp file and rename so readers never see a partial blob
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+        return str(path), True
+
+    def discard(self, sha256_hashes: set[str]) -> None:
+        """
+        Remove blobs whose referencing rows were never committed.
+
+        Only for hashes that ``put`` reported as newly written by the
+        caller, so no committed Attachment row can point at them.
+
+        Args:
+            sha256_hashes: Hashes of the blobs to remove
+        """
+        for sha256_hash in sha256_hashes:
+            try:
+                self.blob_path(sha256_hash).unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"Failed to remove attachment blob {sha256_hash}: {e}")
+
+    async def release(self, db: AsyncSession, sha256_hashes: set[str]) -> int:
+        """
+        Remove blobs no longer referenced by any attachment.
+
+        Call after the referencing Attachment rows have been deleted and
+        committed.
+
+        Args:
+            db: Database session
+            sha256_hashes: Hashes whose references may have dropped to zero
+
+        Returns:
+            Number of blobs removed
+        """
+        if not sha256_hashes:
+            return 0
+
+        result = await db.execute(
+            select(Attachment.sha256_hash)
+            .where(Attachment.sha256_hash.in_(sha256_hashes))
+            .distinct()
+        )
+        still_referenced = set(result.scalars().all())
+
+        cutoff = time.time() - self.RELEASE_GRACE_SECONDS
+        removed = 0
+
+        for sha256_hash in sha256_hashes - still_referenced:
+            path = self.blob_path(sha256_hash)
+            try:
+                if path.stat().st_mtime > cutoff:
+                    continue
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f"Failed to remove attachment blob {sha256_hash}: {e}")
+
+        return removed
+
+
+# Global instance
+attachment_store = AttachmentStore()
+
+
+def get_attachment_store() -> AttachmentStore:
+    """Get the attachment store instance."""
+    return attachment_store
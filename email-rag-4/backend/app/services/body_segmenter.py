@@ -0,0 +1,206 @@
+"""
+Body Segmenter Service
+
+Splits an email body into the author's new content and the parts that
+are repeated across a thread: quoted replies, signatures and boilerplate
+footers such as confidentiality disclaimers. Only the new content is
+embedded, so chunk counts grow linearly with thread depth instead of
+quadratically; the full body is still stored and full-text indexed.
+"""
+
+import re
+from dataclasses import dataclass
+
+
+@dataclass
+class SegmentedBody:
+    """An email body split into segments."""
+
+    new_content: str
+    quoted: str = ""
+    signature: str = ""
+    boilerplate: str = ""
+
+
+# Lines that start the quoted history of a reply
+_QUOTE_HEADER_PATTERNS = [
+    re.compile(r"^\s*On\b.{0,300}\bwrote:\s*$", re.IGNORECASE),
+    re.compile(r"^\s*-{2,}\s*Original Message\s*-{2,}\s*$", re.IGNORECASE),
+    re.compile(r"^\s*-{2,}\s*Reply message\s*-{2,}\s*$", re.IGNORECASE),
+]
+
+# An Outlook-style header block: "From:" followed closely by "Sent:"/"Date:"
+_HEADER_FROM = re.compile(r"^\s*\*?From:\*?\s", re.IGNORECASE)
+_HEADER_FIELD = re.compile(r"^\s*\*?(Sent|Date|To|Cc|Subject):\*?\s", re.IGNORECASE)
+_HEADER_DATE = re.compile(r"^\s*\*?(Sent|Date):\*?\s", re.IGNORECASE)
+
+# Forwarded content is usually the only copy in the mailbox, so it is kept
+_FORWARD_MARKERS = [
+    re.compile(r"^\s*-{2,}\s*Forwarded message\s*-{2,}\s*$", re.IGNORECASE),
+    re.compile(r"^\s*Begin forwarded message:\s*$", re.IGNORECASE),
+]
+_FORWARD_SUBJECT = re.compile(r"^\s*(fw|fwd)\s*:", re.IGNORECASE)
+
+_SEPARATOR_LINE = re.compile(r"^\s*[_=\-]{10,}\s*$")
+
+# "-- " (with the space) is the RFC 3676 signature delimiter; a bare "--" is
+# too often a section divider to cut at
+_SIGNATURE_DELIMITER = re.compile(r"^-- $")
+_MOBILE_SIGNATURE = re.compile(
+    r"^\s*(Sent from my \w+|Sent from (Mail|Outlook) for \w+|Get Outlook for \w+)",
+    re.IGNORECASE,
+)
+
+_BOILERPLATE_PATTERNS = [
+    re.compile(p, re.IGNORECASE)
+    for p in (
+        r"\bconfidential(ity)?\b.{0,200}\b(notice|information|intended)\b",
+        r"\bintended (solely|only) for\b",
+        r"\bif you (are not the intended recipient|have received this (e-?mail|message|communication) in error)\b",
+        r"^\s*(disclaimer|confidentiality notice|legal notice)\b",
+        r"\bplease consider the environment before printing\b",
+        r"\bviruses?\b.{0,100}\b(free|scanned|checked)\b",
+    )
+]
+
+
+class BodySegmenter:
+    """
+    Line-based email body segmenter.
+
+    Quoted history starts at the first reply header ("On ... wrote:",
+    "-----Original Message-----", an Outlook "From:/Sent:" block) and
+    runs to the end of the body; ``>``-prefixed lines are quoted
+    wherever they appear. A signature starts at the ``-- `` delimiter
+    or a mobile "Sent from my ..." line, and trailing paragraphs that
+    read as disclaimers are boilerplate.
+    """
+
+    def segment(self, text: str | None, subject: str | None = None) -> SegmentedBody:
+        """
+        Split a body into new content, quoted history, signature and boilerplate.
+
+        Args:
+            text: Plain-text body
+            subject: Subject line; for forwards the header block is kept as content
+
+        Returns:
+            SegmentedBody
+        """
+        if not text:
+            return SegmentedBody(new_content="")
+
+        lines = text.splitlines()
+        is_forward = bool(subject and _FORWARD_SUBJECT.match(subject))
+
+        # Split off the quoted history
+        cut = self._quote_start(lines, is_forward)
+        body_lines, quoted_lines = lines[:cut], lines[cut:]
+
+        # Inline ">" quotes
+        kept = []
+        for line in body_lines:
+            if line.lstrip().startswith(">"):
+                quoted_lines.append(line)
+            else:
+                kept.append(line)
+
+        body_lines, signature_lines = self._split_signature(kept)
+        body_lines, boilerplate_lines = self._split_boilerplate(body_lines)
+
+        # Boilerplate often follows the signature too
+        signature_lines, trailing_boilerplate = self._split_boilerplate(signature_lines)
+
+        return SegmentedBody(
+            new_content=self._join(body_lines),
+            quoted=self._join(quoted_lines),
+            signature=self._join(signature_lines),
+            boilerplate=self._join(boilerplate_lines + trailing_boilerplate),
+        )
+
+    def _quote_start(self, lines: list[str], is_forward: bool) -> int:
+        """Get the index of the line that starts the quoted history."""
+        for i, line in enumerate(lines):
+            if any(p.match(line) for p in _FORWARD_MARKERS):
+                return len(lines)
+
+            if any(p.match(line) for p in _QUOTE_HEADER_PATTERNS):
+                return self._include_separator(lines, i)
+
+            # "On <date>, <name> <address>" wrapped before "wrote:"
+            if (
+                i + 1 < len(lines)
+                and line.lstrip().lower().startswith("on ")
+                and lines[i + 1].strip().lower().endswith("wrote:")
+                and _QUOTE_HEADER_PATTERNS[0].match(f"{line} {lines[i + 1].strip()}")
+            ):
+                return self._include_separator(lines, i)
+
+            if _HEADER_FROM.match(line) and self._is_header_block(lines, i):
+                if is_forward:
+                    return len(lines)
+                return self._include_separator(lines, i)
+
+        return len(lines)
+
+    def _is_header_block(self, lines: list[str], start: int) -> bool:
+        """Check for Sent:/Date: plus another header field just below a From: line."""
+        window = [line for line in lines[start + 1 : start + 6] if line.strip()]
+        return (
+            any(_HEADER_DATE.match(line) for line in window)
+            and sum(bool(_HEADER_FIELD.match(line)) for line in window) >= 2
+        )
+
+    def _include_separator(self, lines: list[str], index: int) -> int:
+        """Move a cut up over the blank lines and separator rule above it."""
+        while index > 0 and (not lines[index - 1].strip() or _SEPARATOR_LINE.match(lines[index - 1])):
+            index -= 1
+        return index
+
+    def _split_signature(self, lines: list[str]) -> tuple[list[str], list[str]]:
+        """Split lines at the signature delimiter, if any."""
+        for i, line in enumerate(lines):
+            if _SIGNATURE_DELIMITER.match(line) or _MOBILE_SIGNATURE.match(line):
+                return lines[:i], lines[i:]
+        return lines, []
+
+    def _split_boilerplate(self, lines: list[str]) -> tuple[list[str], list[str]]:
+        """Split trailing disclaimer paragraphs off a list of lines."""
+        # Paragraphs as lists of line indices
+        paragraphs: list[list[int]] = []
+        in_paragraph = False
+        for i, line in enumerate(lines):
+            if line.strip():
+                if not in_paragraph:
+                    paragraphs.append([])
+                paragraphs[-1].append(i)
+            in_paragraph = bool(line.strip())
+
+        # Strip from the end while paragraphs read as boilerplate, never
+        # the first (a short confidential note is still the author's content)
+        keep = len(paragraphs)
+        while keep > 1 and self._is_boilerplate(" ".join(lines[i] for i in paragraphs[keep - 1])):
+            keep -= 1
+        if keep == len(paragraphs):
+            return lines, []
+
+        cut = paragraphs[keep][0]
+        return lines[:cut], lines[cut:]
+
+    def _is_boilerplate(self, paragraph: str) -> bool:
+        """Check whether a paragraph reads as a disclaimer or footer."""
+        return any(p.search(paragraph) for p in _BOILERPLATE_PATTERNS)
+
+    @staticmethod
+    def _join(lines: list[str]) -> str:
+        """Join lines, trimming blank lines at either end."""
+        return "\n".join(lines).strip("\n").rstrip()
+
+
+# Global instance
+body_segmenter = BodySegmenter()
+
+
+def get_body_segmenter() -> BodySegmenter:
+    """Get the body segmenter instance."""
+    return body_segmenter
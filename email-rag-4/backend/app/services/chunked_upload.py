@@ -0,0 +1,391 @@
+"""
+Chunked Upload Service
+
+Resumable uploads for large PST files. Parts can arrive out of order and
+in parallel; each is written straight to its final offset in a
+preallocated file and checksummed as it streams in. A receipt per part is
+the resume manifest, so a client that lost its connection asks which
+parts are missing and sends only those.
+
+Session layout under ``<upload_dir>/temp/<upload_id>/``::
+
+    session.json     upload parameters, written once
+    data.part        preallocated; part N lives at N * chunk_size
+    chunks/N.json    receipt, written once part N is on disk
+
+Completing an upload renames ``data.part`` into place, so there is no
+assembly copy; the whole-file hashes and Merkle leaves are computed in
+one read by a background job. Sessions with no activity for
+``upload_session_ttl_hours`` are removed by a periodic cleanup task.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from collections.abc import AsyncIterator
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from loguru import logger
+
+from app.config import settings
+from app.services.integrity import ChunkHasher, file_fingerprint, merkle_root
+
+# Incoming bytes are buffered to this size before each positioned write
+_WRITE_SIZE = 4 * 1024 * 1024
+
+# Read size when hashing the assembled file
+_HASH_READ_SIZE = 8 * 1024 * 1024
+
+
+class ChunkedUploadError(Exception):
+    """Base exception for chunked upload errors."""
+
+    pass
+
+
+class ChunkValidationError(ChunkedUploadError):
+    """Raised when a part has the wrong index, size or checksum."""
+
+    pass
+
+
+@dataclass
+class UploadSession:
+    """Parameters of a chunked upload."""
+
+    upload_id: str
+    user_id: str
+    filename: str
+    total_size: int
+    chunk_size: int
+    integrity_chunk_size: int
+    created_at: str
+
+    @property
+    def total_chunks(self) -> int:
+        """Number of parts the file is split into."""
+        return max(1, -(-self.total_size // self.chunk_size))
+
+    def chunk_length(self, index: int) -> int:
+        """Expected size of a part."""
+        if not 0 <= index < self.total_chunks:
+            raise ChunkValidationError(
+                f"Chunk index {index} out of range (0-{self.total_chunks - 1})"
+            )
+        return min(self.chunk_size, self.total_size - index * self.chunk_size)
+
+
+@dataclass
+class ChunkReceipt:
+    """Record of a part that has been written."""
+
+    index: int
+    size: int
+    sha256: str
+
+
+@dataclass
+class AssembledUpload:
+    """Hashes of a completed upload."""
+
+    file_size: int
+    sha256_hash: str
+    md5_hash: str
+    chunk_size: int
+    chunk_hashes: bytes
+    merkle_root: str
+    sample_fingerprint: str
+
+
+class ChunkedUploadService:
+    """Manages chunked upload sessions on local disk."""
+
+    def __init__(
+        self,
+        root: str | Path | None = None,
+        chunk_size: int | None = None,
+        integrity_chunk_size: int | None = None,
+    ):
+        """
+        Initialize the service.
+
+        Args:
+            root: Session directory (default: <upload_dir>/temp)
+            chunk_size: Part size in bytes (default from config)
+            integrity_chunk_size: Merkle leaf size in bytes (default from config)
+        """
+        self._root = Path(root) if root else None
+        self._chunk_size = chunk_size
+        self._integrity_chunk_size = integrity_chunk_size
+
+    @property
+    def root(self) -> Path:
+        """Directory holding upload sessions."""
+        return self._root or Path(settings.upload_dir) / "temp"
+
+    # ===========================================
+    # Sessions
+    # ===========================================
+
+    def create(self, user_id: str, filename: str, total_size: int) -> UploadSession:
+        """
+        Start an upload session and preallocate its data file.
+
+        Args:
+            user_id: Owner of the upload
+            filename: Original filename
+            total_size: File size in bytes
+
+        Returns:
+            UploadSession
+        """
+        session = UploadSession(
+            upload_id=str(uuid.uuid4()),
+            user_id=str(user_id),
+            filename=filename,
+            total_size=total_size,
+            chunk_size=self._chunk_size or settings.upload_chunk_size_mb * 1024 * 1024,
+            integrity_chunk_size=self._integrity_chunk_size or settings.integrity_chunk_size,
+            created_at=datetime.now(timezone.utc).isoformat(),
+        )
+
+        directory = self._directory(session.upload_id)
+        (directory / "chunks").mkdir(parents=True)
+        with open(directory / "data.part", "wb") as f:
+            f.truncate(total_size)
+        _write_json(directory / "session.json", asdict(session))
+
+        return session
+
+    def load(self, upload_id: str) -> UploadSession | None:
+        """Load a session, or None if it doesn't exist."""
+        try:
+            uuid.UUID(upload_id)
+        except ValueError:
+            return None
+
+        path = self._directory(upload_id) / "session.json"
+        if not path.exists():
+            return None
+        return UploadSession(**json.loads(path.read_text()))
+
+    def discard(self, session: UploadSession) -> None:
+        """Delete a session and everything received for it."""
+        shutil.rmtree(self._directory(session.upload_id), ignore_errors=True)
+
+    def touch(self, session: UploadSession) -> None:
+        """Mark a session active, e.g. while its assembly job is queued."""
+        os.utime(self._directory(session.upload_id) / "session.json")
+
+    def expire(self, max_idle_seconds: float) -> int:
+        """
+        Delete sessions with no activity for longer than a given time.
+
+        Activity is the latest of the session being created or touched
+        and a part receipt being written or removed.
+
+        Args:
+            max_idle_seconds: Idle time after which a session is abandoned
+
+        Returns:
+            Number of sessions deleted
+        """
+        if not self.root.is_dir():
+            return 0
+
+        cutoff = time.time() - max_idle_seconds
+        expired = 0
+        for directory in self.root.iterdir():
+            try:
+                last_active = max(
+                    (directory / name).stat().st_mtime for name in ("session.json", "chunks")
+                )
+            except (FileNotFoundError, NotADirectoryError):
+                # Half-created or already being removed; judge by the directory itself
+                try:
+                    last_active = directory.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+            if last_active < cutoff:
+                shutil.rmtree(directory, ignore_errors=True)
+                logger.info(f"Removed abandoned upload session {directory.name}")
+                expired += 1
+        return expired
+
+    def received(self, session: UploadSession) -> dict[int, ChunkReceipt]:
+        """Get the receipts of parts written so far, by index."""
+        receipts = {}
+        for path in (self._directory(session.upload_id) / "chunks").glob("*.json"):
+            data = json.loads(path.read_text())
+            receipt = ChunkReceipt(index=data["index"], size=data["size"], sha256=data["sha256"])
+            receipts[receipt.index] = receipt
+        return receipts
+
+    def missing(self, session: UploadSession) -> list[int]:
+        """Get the indexes of parts not yet written."""
+        received = self.received(session)
+        return [i for i in range(session.total_chunks) if i not in received]
+
+    # ===========================================
+    # Parts
+    # ===========================================
+
+    async def write_chunk(
+        self,
+        session: UploadSession,
+        index: int,
+        stream: AsyncIterator[bytes],
+        expected_sha256: str | None = None,
+    ) -> ChunkReceipt:
+        """
+        Write one part at its offset, checksumming it as it arrives.
+
+        Re-sending a part overwrites it, so retries are safe. The part's
+        old receipt is removed first: if the new bytes fail validation the
+        part is reported missing again instead of keeping a stale receipt.
+
+        Args:
+            session: Upload session
+            index: Part index
+            stream: Part body
+            expected_sha256: Client-computed digest to check the part against
+
+        Returns:
+            ChunkReceipt
+
+        Raises:
+            ChunkValidationError: On a bad index, wrong size or checksum mismatch
+        """
+        expected_size = session.chunk_length(index)
+        offset = index * session.chunk_size
+        sha256 = hashlib.sha256()
+        received = 0
+
+        receipt_path = self._directory(session.upload_id) / "chunks" / f"{index}.json"
+        receipt_path.unlink(missing_ok=True)
+
+        fd = os.open(self._directory(session.upload_id) / "data.part", os.O_WRONLY)
+        try:
+            buffer = bytearray()
+            async for data in stream:
+                received += len(data)
+                if received > expected_size:
+                    raise ChunkValidationError(
+                        f"Chunk {index} is larger than expected ({expected_size} bytes)"
+                    )
+                buffer += data
+                if len(buffer) >= _WRITE_SIZE:
+                    block, buffer = buffer, bytearray()
+                    await asyncio.to_thread(_write_block, fd, block, offset, sha256)
+                    offset += len(block)
+
+            if buffer:
+                await asyncio.to_thread(_write_block, fd, buffer, offset, sha256)
+
+            if received != expected_size:
+                raise ChunkValidationError(
+                    f"Chunk {index} has {received} bytes, expected {expected_size}"
+                )
+            await asyncio.to_thread(os.fsync, fd)
+        finally:
+            os.close(fd)
+
+        digest = sha256.hexdigest()
+        if expected_sha256 and digest != expected_sha256.lower():
+            raise ChunkValidationError(f"Chunk {index} checksum mismatch")
+
+        receipt = ChunkReceipt(index=index, size=received, sha256=digest)
+        _write_json(receipt_path, asdict(receipt))
+        return receipt
+
+    # ===========================================
+    # Completion
+    # ===========================================
+
+    def finalize(self, session: UploadSession, final_path: str | Path) -> AssembledUpload:
+        """
+        Move a complete upload into place and compute its hashes.
+
+        Blocking; runs in a background worker. Safe to retry: a data file
+        already moved into place is hashed where it is. The session is
+        kept until the caller discards it.
+
+        Args:
+            session: Upload session with every part received
+            final_path: Where the assembled file should live
+
+        Returns:
+            AssembledUpload
+
+        Raises:
+            ChunkedUploadError: If parts are missing
+        """
+        final_path = Path(final_path)
+        directory = self._directory(session.upload_id)
+        data_path = directory / "data.part"
+
+        receipts = self.received(session)
+        missing = [i for i in range(session.total_chunks) if i not in receipts]
+        if missing:
+            raise ChunkedUploadError(f"Upload is missing {len(missing)} chunks: {missing[:20]}")
+
+        if data_path.exists():
+            os.replace(data_path, final_path)
+
+        # Leaves come from the file itself, like the whole-file hashes, so the
+        # recorded tree always describes the bytes on disk
+        sha256 = hashlib.sha256()
+        md5 = hashlib.md5()
+        chunk_hasher = ChunkHasher(session.integrity_chunk_size)
+        with open(final_path, "rb") as f:
+            while data := f.read(_HASH_READ_SIZE):
+                sha256.update(data)
+                md5.update(data)
+                chunk_hasher.update(data)
+        leaves = chunk_hasher.leaves
+
+        logger.info(f"Assembled chunked upload {session.upload_id} ({session.total_size} bytes)")
+
+        return AssembledUpload(
+            file_size=session.total_size,
+            sha256_hash=sha256.hexdigest(),
+            md5_hash=md5.hexdigest(),
+            chunk_size=session.integrity_chunk_size,
+            chunk_hashes=b"".join(leaves),
+            merkle_root=merkle_root(leaves),
+            sample_fingerprint=file_fingerprint(final_path),
+        )
+
+    def _directory(self, upload_id: str) -> Path:
+        return self.root / upload_id
+
+
+def _write_block(fd: int, block: bytearray, offset: int, sha256) -> None:
+    """Write a block at an offset and feed it to the part's checksum."""
+    view = memoryview(block)
+    written = 0
+    while written < len(view):
+        written += os.pwrite(fd, view[written:], offset + written)
+    sha256.update(view)
+
+
+def _write_json(path: Path, data: dict) -> None:
+    """Write JSON atomically so readers never see a partial file."""
+    temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+    temp_path.write_text(json.dumps(data))
+    os.replace(temp_path, path)
+
+
+# Global instance
+chunked_upload_service = ChunkedUploadService()
+
+
+def get_chunked_upload_service() -> ChunkedUploadService:
+    """Get the chunked upload service instance."""
+    return chunked_upload_service
@@ -19,6 +19,7 @@ from sqlalchemy.orm import selectinload
 from app.config import settings
 from app.db.models.attachment import Attachment
 from app.db.models.email import Email
+from app.db.models.processing_task import ProcessingTask
 from app.db.session import get_db_context
 
 
@@ -246,7 +247,7 @@ class EmailService:
         async with get_db_context() as db:
             stmt = (
                 select(Email)
-                .options(selectinload(Email.attachments))
+                .options(selectinload(Email.attachments), selectinload(Email.content))
                 .where(Email.id == email_id)
             )
             result = await db.execute(stmt)
@@ -277,7 +278,7 @@ class EmailService:
         async with get_db_context() as db:
             stmt = (
                 select(Email)
-                .options(selectinload(Email.attachments))
+                .options(selectinload(Email.attachments), selectinload(Email.content))
                 .where(Email.thread_id == thread_id)
                 .order_by(Email.sent_date.asc())
             )
@@ -437,6 +438,10 @@ class EmailService:
         """
         Get folder structure with email counts.
 
+        For a single PST with a stored folder manifest, folders come from
+        the manifest (including empty ones, with PST message and sub-folder
+        counts) in depth-first order.
+
         Args:
             pst_file_id: Optional filter by PST file
 
@@ -444,6 +449,14 @@ class EmailService:
             List of folder info with counts
         """
         async with get_db_context() as db:
+            manifest = None
+            if pst_file_id:
+                manifest = await db.scalar(
+                    select(ProcessingTask.folder_manifest).where(
+                        ProcessingTask.id == pst_file_id
+                    )
+                )
+
             stmt = (
                 select(
                     Email.folder_path,
@@ -459,6 +472,19 @@ class EmailService:
             result = await db.execute(stmt)
             rows = result.all()
 
+            if manifest:
+                stored_counts = {row.folder_path: row.count for row in rows}
+                return [
+                    {
+                        "path": entry["path"],
+                        "name": entry["path"].split("/")[-1],
+                        "email_count": stored_counts.get(entry["path"], 0),
+                        "message_count": entry["message_count"],
+                        "sub_folder_count": entry["sub_folder_count"],
+                    }
+                    for entry in manifest
+                ]
+
             folders = []
             for row in rows:
                 if row.folder_path:
@@ -611,7 +637,7 @@ class EmailService:
             content_type=attachment.content_type,
             size_bytes=attachment.size_bytes,
             is_inline=attachment.is_inline,
-            has_extracted_text=bool(attachment.extracted_text),
+            has_extracted_text=attachment.is_extracted,
         )
 
 
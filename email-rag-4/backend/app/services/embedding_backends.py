@@ -0,0 +1,436 @@
+"""
+Embedding Backends
+
+Inference backends for the sentence-transformers embedding model:
+
+- ``torch``: the PyTorch SentenceTransformer.
+- ``onnx``: ONNX Runtime on an int8 dynamically quantized export of the
+  same model, for CPU-only workers. Tokenization, pooling and
+  normalization follow the model's sentence-transformers configuration,
+  so vectors match the PyTorch ones up to quantization error.
+
+The ONNX backend uses the quantized file published with the model
+(``embedding_onnx_file``) when there is one; otherwise it exports and
+quantizes the model once into ``embedding_onnx_dir``. If ONNX Runtime or
+the model can't be loaded, the PyTorch backend is used instead.
+"""
+
+import json
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from loguru import logger
+
+from app.config import settings
+
+# Model inputs in the order the exported graph takes them
+_ONNX_INPUTS = ("input_ids", "attention_mask", "token_type_ids")
+
+
+def plan_batches(
+    lengths: list[int],
+    max_batch_size: int,
+    token_budget: int = 0,
+) -> list[np.ndarray]:
+    """
+    Group texts into forward passes of similar length.
+
+    Texts are ordered longest first, so each batch pads to about its own
+    length. With a token budget, a batch takes as many texts as fit in
+    ``token_budget`` padded tokens (texts times the longest one), up to
+    ``max_batch_size``: short texts go in large batches, long ones in
+    small batches. Without one, every batch has ``max_batch_size`` texts.
+
+    Args:
+        lengths: Length of each text, in tokens (or an estimate)
+        max_batch_size: Most texts per batch
+        token_budget: Padded tokens per batch (0 = fixed-size batches)
+
+    Returns:
+        Indices into the input for each batch
+    """
+    order = np.argsort(-np.asarray(lengths), kind="stable")
+    max_batch_size = max(1, max_batch_size)
+
+    batches = []
+    start = 0
+    while start < len(order):
+        size = max_batch_size
+        if token_budget:
+            longest = max(1, int(lengths[order[start]]))
+            size = min(max_batch_size, max(1, token_budget // longest))
+        batches.append(order[start : start + size])
+        start += size
+    return batches
+
+
+class EmbeddingBackend(ABC):
+    """Turns texts into embedding vectors."""
+
+    # Recorded alongside cached embeddings, since backends differ slightly
+    name: str
+
+    @abstractmethod
+    def encode(
+        self,
+        texts: list[str],
+        batch_size: int = 32,
+        token_budget: int = 0,
+    ) -> np.ndarray:
+        """
+        Embed texts, batched by plan_batches; output is in input order.
+
+        Args:
+            texts: Texts to embed
+            batch_size: Most texts per forward pass
+            token_budget: Padded tokens per forward pass (0 = fixed-size batches)
+
+        Returns:
+            float32 array of shape (len(texts), dimension)
+        """
+
+
+# ===========================================
+# PyTorch
+# ===========================================
+
+class TorchBackend(EmbeddingBackend):
+    """sentence-transformers on PyTorch."""
+
+    name = "torch"
+
+    def __init__(self, model_name: str, threads: int | None = None):
+        """
+        Load the model.
+
+        Args:
+            model_name: Hugging Face model ID or local model directory
+            threads: PyTorch intra-op threads for this process (default: PyTorch's)
+        """
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            logger.error("sentence-transformers not installed")
+            raise RuntimeError(
+                "sentence-transformers is required for embeddings. "
+                "Install with: pip install sentence-transformers"
+            )
+        if threads:
+            import torch
+
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name)
+
+    def encode(
+        self,
+        texts: list[str],
+        batch_size: int = 32,
+        token_budget: int = 0,
+    ) -> np.ndarray:
+        if not texts or not token_budget:
+            # sentence-transformers sorts by length and batches by count itself
+            return self.model.encode(
+                texts,
+                convert_to_numpy=True,
+                batch_size=batch_size,
+                show_progress_bar=len(texts) > 100,
+            )
+
+        tokenized = self.model.tokenizer(
+            texts, truncation=True, max_length=self.model.max_seq_length
+        )
+        lengths = [len(ids) for ids in tokenized["input_ids"]]
+
+        result = None
+        for batch in plan_batches(lengths, batch_size, token_budget):
+            vectors = self.model.encode(
+                [texts[i] for i in batch],
+                convert_to_numpy=True,
+                batch_size=len(batch),
+                show_progress_bar=False,
+            )
+            if result is None:
+                result = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            result[batch] = vectors
+        return result
+
+
+# ===========================================
+# ONNX Runtime
+# ===========================================
+
+class OnnxBackend(EmbeddingBackend):
+    """Int8-quantized model on ONNX Runtime (CPU)."""
+
+    name = "onnx-int8"
+
+    def __init__(
+        self,
+        model_name: str,
+        onnx_file: str | None = None,
+        export_dir: str | Path | None = None,
+        threads: int | None = None,
+    ):
+        """
+        Load the quantized model, exporting it first if needed.
+
+        Args:
+            model_name: Hugging Face model ID or local model directory
+            onnx_file: Quantized file within the model repository
+                (default from config)
+            export_dir: Where to export models that don't ship one
+                (default from config)
+            threads: ONNX Runtime intra-op threads, 0 for its default
+                (default from config)
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        onnx_file = onnx_file or settings.embedding_onnx_file
+        export_dir = Path(export_dir or settings.embedding_onnx_dir)
+        threads = settings.embedding_onnx_threads if threads is None else threads
+
+        model_dir = _model_directory(model_name, onnx_file)
+        onnx_path = model_dir / onnx_file
+        if not onnx_path.is_file():
+            onnx_path = export_dir / _safe_name(model_name) / "model_qint8.onnx"
+            if not onnx_path.is_file():
+                export_quantized_onnx(model_name, onnx_path)
+
+        config = _read_sentence_config(model_dir)
+        self.max_seq_length = config["max_seq_length"]
+        self.pooling = config["pooling"]
+        self.normalize = config["normalize"]
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.max_seq_length)
+        # Texts are tokenized once unpadded, then padded per batch
+        self.tokenizer.no_padding()
+        self.pad_id = self.tokenizer.token_to_id(config["pad_token"]) or 0
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            str(onnx_path), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        outputs = [o.name for o in self.session.get_outputs()]
+        self.output_name = "last_hidden_state" if "last_hidden_state" in outputs else outputs[0]
+        logger.info(f"Loaded ONNX embedding model {onnx_path}")
+
+    def encode(
+        self,
+        texts: list[str],
+        batch_size: int = 32,
+        token_budget: int = 0,
+    ) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        encodings = self.tokenizer.encode_batch(texts)
+        lengths = [len(encoding.ids) for encoding in encodings]
+        result = None
+
+        for batch in plan_batches(lengths, batch_size, token_budget):
+            width = max(lengths[i] for i in batch)
+            input_ids = np.full((len(batch), width), self.pad_id, dtype=np.int64)
+            attention_mask = np.zeros((len(batch), width), dtype=np.int64)
+            token_type_ids = np.zeros((len(batch), width), dtype=np.int64)
+            for row, i in enumerate(batch):
+                input_ids[row, : lengths[i]] = encodings[i].ids
+                attention_mask[row, : lengths[i]] = 1
+                token_type_ids[row, : lengths[i]] = encodings[i].type_ids
+
+            feeds = {
+                "input_ids": input_ids,
+                "attention_mask": attention_mask,
+                "token_type_ids": token_type_ids,
+            }
+            hidden = self.session.run(
+                [self.output_name],
+                {name: value for name, value in feeds.items() if name in self.input_names},
+            )[0]
+
+            vectors = self._pool(hidden, attention_mask)
+            if result is None:
+                result = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            result[batch] = vectors
+
+        return result
+
+    def _pool(self, hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        """Pool token embeddings into one vector per text."""
+        if self.pooling == "cls":
+            vectors = hidden[:, 0]
+        elif self.pooling == "max":
+            masked = np.where(attention_mask[..., None] > 0, hidden, -1e9)
+            vectors = masked.max(axis=1)
+        else:
+            mask = attention_mask[..., None].astype(np.float32)
+            vectors = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        if self.normalize:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.clip(norms, 1e-12, None)
+        return vectors.astype(np.float32)
+
+
+def export_quantized_onnx(model_name: str, output_path: str | Path) -> Path:
+    """
+    Export a transformer to ONNX and quantize its weights to int8.
+
+    Needs PyTorch, transformers and the ``onnx`` package; the output is
+    written atomically so concurrent workers can race safely.
+
+    Args:
+        model_name: Hugging Face model ID or local model directory
+        output_path: Quantized model file to write
+
+    Returns:
+        The output path
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    logger.info(f"Exporting {model_name} to int8 ONNX at {output_path}")
+
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    class HiddenStates(torch.nn.Module):
+        """Keyword call with the last hidden state as the only output."""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                token_type_ids=token_type_ids,
+            ).last_hidden_state
+
+    sample = torch.ones(2, 8, dtype=torch.long)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in _ONNX_INPUTS}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    with tempfile.TemporaryDirectory(dir=output_path.parent) as workdir:
+        float_path = Path(workdir) / "model.onnx"
+        quantized_path = Path(workdir) / output_path.name
+        with torch.no_grad():
+            torch.onnx.export(
+                HiddenStates(model),
+                (sample, sample, torch.zeros_like(sample)),
+                str(float_path),
+                input_names=list(_ONNX_INPUTS),
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+                dynamo=False,
+            )
+        quantize_dynamic(float_path, quantized_path, weight_type=QuantType.QInt8)
+        os.replace(quantized_path, output_path)
+
+    return output_path
+
+
+def _model_directory(model_name: str, onnx_file: str) -> Path:
+    """Local directory with the model's configs, tokenizer and any quantized file."""
+    path = Path(model_name)
+    if path.is_dir():
+        return path
+
+    from huggingface_hub import snapshot_download
+
+    return Path(
+        snapshot_download(model_name, allow_patterns=["*.json", "*.txt", onnx_file])
+    )
+
+
+def _read_sentence_config(model_dir: Path) -> dict:
+    """Read max length, pooling and normalization from the sentence-transformers config."""
+
+    def load(name: str) -> Any:
+        file = model_dir / name
+        return json.loads(file.read_text()) if file.is_file() else {}
+
+    tokenizer_config = load("tokenizer_config.json")
+    max_seq_length = load("sentence_bert_config.json").get("max_seq_length")
+    if not max_seq_length:
+        model_max_length = tokenizer_config.get("model_max_length") or 512
+        max_seq_length = min(int(model_max_length), 512)
+
+    pooling, normalize = "mean", False
+    for module in load("modules.json") or []:
+        module_type = module.get("type", "")
+        if module_type.endswith("Pooling"):
+            pooling_config = load(f"{module.get('path', '')}/config.json")
+            pooling = pooling_config.get("pooling_mode") or next(
+                (
+                    mode
+                    for mode, key in (
+                        ("cls", "pooling_mode_cls_token"),
+                        ("max", "pooling_mode_max_tokens"),
+                        ("mean", "pooling_mode_mean_tokens"),
+                    )
+                    if pooling_config.get(key)
+                ),
+                "mean",
+            )
+        elif module_type.endswith("Normalize"):
+            normalize = True
+
+    if pooling not in ("mean", "cls", "max"):
+        raise ValueError(f"Unsupported pooling mode for ONNX embeddings: {pooling}")
+
+    pad_token = tokenizer_config.get("pad_token") or "[PAD]"
+    if isinstance(pad_token, dict):
+        pad_token = pad_token.get("content", "[PAD]")
+
+    return {
+        "max_seq_length": int(max_seq_length),
+        "pooling": pooling,
+        "normalize": normalize,
+        "pad_token": pad_token,
+    }
+
+
+def _safe_name(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "--", model_name.strip("/"))
+
+
+def load_embedding_backend(
+    model_name: str,
+    backend: str | None = None,
+    threads: int | None = None,
+) -> EmbeddingBackend:
+    """
+    Load the configured inference backend.
+
+    Args:
+        model_name: Hugging Face model ID or local model directory
+        backend: "torch" or "onnx" (default from config)
+        threads: Intra-op threads (default from config for ONNX, PyTorch's own otherwise)
+
+    Returns:
+        The backend, PyTorch if ONNX could not be loaded
+    """
+    backend = (backend or settings.embedding_backend).lower()
+    if backend == "onnx":
+        try:
+            return OnnxBackend(model_name, threads=threads)
+        except Exception as e:
+            logger.warning(f"ONNX embedding backend unavailable, falling back to PyTorch: {e}")
+    elif backend != "torch":
+        logger.warning(f"Unknown embedding backend {backend!r}, using PyTorch")
+    return TorchBackend(model_name, threads=threads)
@@ -0,0 +1,347 @@
+"""
+Embedding Cache
+
+Content-addressed cache of chunk embeddings, keyed by model name and the
+SHA-256 of the chunk text, so boilerplate, forwarded content and
+re-ingested or reindexed mail are encoded once.
+
+Vectors are stored as raw float32 bytes (1.5 KB at 384 dimensions) in
+one of two stores:
+
+- ``local``: a SQLite file shared by the workers on a host, holding at
+  most ``embedding_cache_max_entries`` vectors (least recently used are
+  evicted first).
+- ``redis``: shared by all hosts; Redis' maxmemory policy bounds the
+  total size.
+
+In both, entries expire after ``embedding_cache_ttl_seconds`` without a
+hit.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+from app.config import settings
+
+# Bound parameters per SQLite statement
+_SQLITE_BATCH = 500
+
+
+def chunk_key(text: str) -> str:
+    """Get the cache key (SHA-256 hex digest) of a chunk's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore(ABC):
+    """Storage backend for cached embeddings."""
+
+    @abstractmethod
+    def get_many(self, model: str, keys: list[str]) -> dict[str, bytes]:
+        """
+        Look up cached vectors.
+
+        Args:
+            model: Embedding model name
+            keys: Chunk keys (see chunk_key)
+
+        Returns:
+            float32 vector bytes by key for every hit
+        """
+
+    @abstractmethod
+    def put_many(self, model: str, vectors: dict[str, bytes]) -> None:
+        """
+        Store vectors.
+
+        Args:
+            model: Embedding model name
+            vectors: float32 vector bytes by chunk key
+        """
+
+
+# ===========================================
+# Local Store
+# ===========================================
+
+class LocalEmbeddingStore(EmbeddingStore):
+    """
+    SQLite-backed store shared by processes on one host.
+
+    Each hit refreshes the entry's access time; when the entry count goes
+    over ``max_entries``, the least recently used tenth is evicted.
+    """
+
+    def __init__(self, path: str | Path, max_entries: int, ttl_seconds: int = 0):
+        """
+        Initialize the store.
+
+        Args:
+            path: SQLite database file (created on first use)
+            max_entries: Vectors to keep before evicting
+            ttl_seconds: Drop entries unused for this long (0 = never)
+        """
+        self.path = Path(path)
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._pid: int | None = None
+        self._entries = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database once per process (connections don't survive a fork)."""
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " sha256 TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (model, sha256)"
+                ") WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_embeddings_accessed_at ON embeddings (accessed_at)"
+            )
+            self._entries = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get_many(self, model: str, keys: list[str]) -> dict[str, bytes]:
+        if not keys:
+            return {}
+
+        now = time.time()
+        oldest = now - self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+        found: dict[str, bytes] = {}
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(keys), _SQLITE_BATCH):
+                batch = keys[start : start + _SQLITE_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    "SELECT sha256, vector FROM embeddings"
+                    f" WHERE model = ? AND accessed_at >= ? AND sha256 IN ({placeholders})",
+                    [model, oldest, *batch],
+                )
+                found.update(rows)
+
+            if found:
+                conn.executemany(
+                    "UPDATE embeddings SET accessed_at = ? WHERE model = ? AND sha256 = ?",
+                    [(now, model, key) for key in found],
+                )
+        return found
+
+    def put_many(self, model: str, vectors: dict[str, bytes]) -> None:
+        if not vectors:
+            return
+
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, sha256, vector, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                [(model, key, vector, now) for key, vector in vectors.items()],
+            )
+            conn.execute("COMMIT")
+            # Approximate: other processes insert too, so recount before evicting
+            self._entries += len(vectors)
+            if self._entries > self.max_entries:
+                self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then least recently used down to 90% of the limit."""
+        if self.ttl_seconds > 0:
+            conn.execute(
+                "DELETE FROM embeddings WHERE accessed_at < ?", (now - self.ttl_seconds,)
+            )
+        count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = count - int(self.max_entries * 0.9)
+        if count > self.max_entries and excess > 0:
+            conn.execute(
+                "DELETE FROM embeddings WHERE (model, sha256) IN ("
+                " SELECT model, sha256 FROM embeddings ORDER BY accessed_at LIMIT ?"
+                ")",
+                (excess,),
+            )
+            count -= excess
+            logger.debug(f"Evicted {excess} cached embeddings")
+        self._entries = count
+
+
+# ===========================================
+# Redis Store
+# ===========================================
+
+class RedisEmbeddingStore(EmbeddingStore):
+    """Redis-backed store shared across hosts."""
+
+    KEY_PREFIX = "embedding"
+
+    def __init__(self, url: str, ttl_seconds: int = 0):
+        """
+        Initialize the store.
+
+        Args:
+            url: Redis connection URL
+            ttl_seconds: Expire entries unused for this long (0 = never)
+        """
+        self.url = url
+        self.ttl_seconds = ttl_seconds
+        self._client = None
+
+    @property
+    def client(self):
+        """Get or create the (synchronous) Redis client."""
+        if self._client is None:
+            import redis
+
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def _key(self, model: str, key: str) -> str:
+        return f"{self.KEY_PREFIX}:{model}:{key}"
+
+    def get_many(self, model: str, keys: list[str]) -> dict[str, bytes]:
+        if not keys:
+            return {}
+
+        values = self.client.mget([self._key(model, key) for key in keys])
+        found = {key: value for key, value in zip(keys, values) if value is not None}
+
+        if found and self.ttl_seconds > 0:
+            pipe = self.client.pipeline(transaction=False)
+            for key in found:
+                pipe.expire(self._key(model, key), self.ttl_seconds)
+            pipe.execute()
+        return found
+
+    def put_many(self, model: str, vectors: dict[str, bytes]) -> None:
+        if not vectors:
+            return
+
+        pipe = self.client.pipeline(transaction=False)
+        for key, vector in vectors.items():
+            pipe.set(self._key(model, key), vector, ex=self.ttl_seconds or None)
+        pipe.execute()
+
+
+# ===========================================
+# Cache
+# ===========================================
+
+class EmbeddingCache:
+    """
+    Reads and writes cached chunk embeddings as float32 vectors.
+
+    The cache only saves work: if the store fails, it is switched off for
+    the rest of the process and embeddings are generated as usual.
+    """
+
+    def __init__(self, store: EmbeddingStore, dimension: int | None = None):
+        """
+        Initialize the cache.
+
+        Args:
+            store: Storage backend
+            dimension: Expected vector length; other lengths are misses
+                (default from config)
+        """
+        self.store = store
+        self.dimension = dimension or settings.embedding_dimension
+        self.enabled = True
+
+    def get_many(self, model: str, keys: list[str]) -> dict[str, np.ndarray]:
+        """
+        Look up cached embeddings.
+
+        Args:
+            model: Embedding model name
+            keys: Chunk keys (see chunk_key)
+
+        Returns:
+            Vector by key for every hit
+        """
+        if not self.enabled or not keys:
+            return {}
+        try:
+            found = self.store.get_many(model, keys)
+        except Exception as e:
+            self._disable(e)
+            return {}
+
+        vectors = {}
+        for key, blob in found.items():
+            vector = np.frombuffer(blob, dtype=np.float32)
+            if vector.shape[0] == self.dimension:
+                vectors[key] = vector
+        return vectors
+
+    def put_many(self, model: str, vectors: dict[str, np.ndarray]) -> None:
+        """
+        Store new embeddings.
+
+        Args:
+            model: Embedding model name
+            vectors: Vector by chunk key
+        """
+        if not self.enabled or not vectors:
+            return
+        try:
+            self.store.put_many(
+                model,
+                {
+                    key: np.asarray(vector, dtype=np.float32).tobytes()
+                    for key, vector in vectors.items()
+                },
+            )
+        except Exception as e:
+            self._disable(e)
+
+    def _disable(self, error: Exception) -> None:
+        logger.warning(f"Embedding cache unavailable, continuing without it: {error}")
+        self.enabled = False
+
+
+def _create_embedding_cache() -> EmbeddingCache | None:
+    """Build the cache configured by ``embedding_cache_backend``."""
+    backend = settings.embedding_cache_backend.lower()
+    ttl = settings.embedding_cache_ttl_seconds
+    if backend == "local":
+        store = LocalEmbeddingStore(
+            settings.embedding_cache_path, settings.embedding_cache_max_entries, ttl
+        )
+    elif backend == "redis":
+        store = RedisEmbeddingStore(settings.redis_connection_url, ttl)
+    else:
+        if backend != "none":
+            logger.warning(f"Unknown embedding cache backend {backend!r}, caching disabled")
+        return None
+    return EmbeddingCache(store)
+
+
+# Global instance (None when disabled)
+embedding_cache = _create_embedding_cache()
+
+
+def get_embedding_cache() -> EmbeddingCache | None:
+    """Get the embedding cache instance, if enabled."""
+    return embedding_cache
@@ -0,0 +1,218 @@
+"""
+Embedding Pool
+
+Encodes large batches on a pool of model replicas in worker processes,
+each pinned to its own subset of CPU cores. One process with many
+intra-op threads scales poorly for a model as small as MiniLM; replicas
+with a few cores each keep every core busy.
+
+A batch is cut into shards of about one forward pass each, grouped by
+length (see plan_batches); idle replicas pick up the next shard and
+results are reassembled in input order.
+
+The pool is a billiard pool (Celery's fork of multiprocessing), which
+unlike concurrent.futures can start worker processes from inside a
+daemonic prefork Celery worker.
+"""
+
+import os
+
+import billiard
+import numpy as np
+from billiard.exceptions import WorkerLostError
+from billiard.pool import Pool
+from loguru import logger
+
+from app.config import settings
+from app.services.embedding_backends import (
+    EmbeddingBackend,
+    load_embedding_backend,
+    plan_batches,
+)
+
+# Rough characters per token, to size shards without a tokenizer in this process
+_CHARS_PER_TOKEN = 4
+
+# ===========================================
+# Worker process side
+# ===========================================
+
+_worker_backend: EmbeddingBackend | None = None
+_worker_error: Exception | None = None
+
+
+def _init_worker(model_name: str, backend: str | None, core_sets) -> None:
+    """Pin the worker to the next free core subset and load its model replica."""
+    global _worker_backend, _worker_error
+
+    try:
+        cores = core_sets.get_nowait()
+    except Exception:
+        cores = []
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+
+    try:
+        _worker_backend = load_embedding_backend(model_name, backend, threads=len(cores) or None)
+    except Exception as e:
+        # Reported by the first job: billiard respawns a failing initializer forever
+        _worker_error = e
+
+
+def _get_worker_backend() -> EmbeddingBackend:
+    if _worker_backend is None:
+        raise RuntimeError(f"Embedding model replica failed to load: {_worker_error}")
+    return _worker_backend
+
+
+def _backend_name() -> str:
+    return _get_worker_backend().name
+
+
+def _encode_in_worker(texts: list[str], batch_size: int, token_budget: int) -> np.ndarray:
+    return _get_worker_backend().encode(texts, batch_size=batch_size, token_budget=token_budget)
+
+
+# ===========================================
+# Pool
+# ===========================================
+
+def partition_cores(cores: list[int], workers: int, cores_per_worker: int = 0) -> list[list[int]]:
+    """
+    Split CPU cores into one subset per worker.
+
+    Args:
+        cores: Available core IDs
+        workers: Number of workers
+        cores_per_worker: Cores per worker (0 = divide evenly)
+
+    Returns:
+        A contiguous core subset for each worker
+    """
+    cores = sorted(cores)
+    if not cores:
+        return [[] for _ in range(workers)]
+
+    if not cores_per_worker:
+        if workers <= len(cores):
+            # Spread any remainder so no core is left idle
+            return [[int(core) for core in part] for part in np.array_split(cores, workers)]
+        cores_per_worker = 1
+
+    size = min(cores_per_worker, len(cores))
+    return [
+        [cores[(worker * size + i) % len(cores)] for i in range(size)]
+        for worker in range(workers)
+    ]
+
+
+class EmbeddingPool(EmbeddingBackend):
+    """
+    Model replicas in worker processes, pinned to core subsets.
+
+    The pool starts lazily. If a worker dies, the pool is restarted and
+    the batch retried once.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        workers: int | None = None,
+        cores_per_worker: int | None = None,
+        backend: str | None = None,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            model_name: Hugging Face model ID or local model directory
+            workers: Model replicas (default from config)
+            cores_per_worker: Cores pinned per replica, 0 to divide the
+                available cores evenly (default from config)
+            backend: Inference backend for the replicas (default from config)
+        """
+        self.model_name = model_name
+        self.workers = max(1, workers or settings.embedding_pool_workers)
+        self.cores_per_worker = (
+            settings.embedding_pool_cores_per_worker
+            if cores_per_worker is None
+            else cores_per_worker
+        )
+        self.backend = backend
+        self._pool: Pool | None = None
+        self._name: str | None = None
+
+    @property
+    def name(self) -> str:
+        """Name of the replicas' backend (after any fallback), for cache keys."""
+        if self._name is None:
+            self._name = self._get_pool().apply(_backend_name)
+        return self._name
+
+    def _get_pool(self) -> Pool:
+        """Get the pool, starting it if needed."""
+        if self._pool is None:
+            # Spawned workers don't inherit the parent's threads or model memory
+            context = billiard.get_context("spawn")
+            available = (
+                os.sched_getaffinity(0)
+                if hasattr(os, "sched_getaffinity")
+                else range(os.cpu_count() or 1)
+            )
+            core_sets = context.Queue()
+            for cores in partition_cores(list(available), self.workers, self.cores_per_worker):
+                core_sets.put(cores)
+
+            self._pool = Pool(
+                processes=self.workers,
+                initializer=_init_worker,
+                initargs=(self.model_name, self.backend, core_sets),
+                context=context,
+            )
+            logger.info(f"Started embedding pool with {self.workers} model replicas")
+        return self._pool
+
+    def encode(
+        self,
+        texts: list[str],
+        batch_size: int = 32,
+        token_budget: int = 0,
+    ) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Each shard is about one forward pass; the replica re-plans it by real tokens
+        estimates = [len(text) // _CHARS_PER_TOKEN + 2 for text in texts]
+        shards = plan_batches(estimates, batch_size, token_budget)
+
+        for attempt in range(2):
+            pool = self._get_pool()
+            try:
+                jobs = [
+                    pool.apply_async(
+                        _encode_in_worker, ([texts[i] for i in shard], batch_size, token_budget)
+                    )
+                    for shard in shards
+                ]
+                result = None
+                for shard, job in zip(shards, jobs):
+                    vectors = job.get()
+                    if result is None:
+                        result = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+                    result[shard] = vectors
+                return result
+            except Exception as e:
+                # billiard raises a lost worker's error wrapped with its traceback
+                if not isinstance(getattr(e, "exc", e), WorkerLostError):
+                    raise
+                # Restarted rather than left to billiard, so replacements get their cores
+                logger.warning("Embedding pool worker died, restarting pool")
+                self.shutdown()
+                if attempt:
+                    raise
+
+    def shutdown(self) -> None:
+        """Stop the pool."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
@@ -6,11 +6,18 @@ Uses all-MiniLM-L6-v2 model (384 dimensions).
 """
 
 import hashlib
+from dataclasses import dataclass, field
 from typing import Any
 
+import numpy as np
 from loguru import logger
 
 from app.config import settings
+from app.services.embedding_backends import EmbeddingBackend, load_embedding_backend
+from app.services.embedding_cache import chunk_key, embedding_cache
+from app.services.embedding_pool import EmbeddingPool
+from app.services.query_embedder import QueryEmbedder
+from app.services.query_embedding_cache import query_embedding_cache
 from app.services.vector_store import vector_store
 
 
@@ -22,11 +29,12 @@ class TextChunk:
         text: str,
         metadata: dict[str, Any],
         chunk_index: int = 0,
+        chunk_id: str | None = None,
     ):
         self.text = text
         self.metadata = metadata
         self.chunk_index = chunk_index
-        self.id = self._generate_id()
+        self.id = chunk_id or self._generate_id()
 
     def _generate_id(self) -> str:
         """Generate unique ID for this chunk."""
@@ -34,6 +42,39 @@ class TextChunk:
         return f"{email_id}_chunk_{self.chunk_index}"
 
 
+@dataclass
+class EmailEmbeddingInput:
+    """An email to embed in a batch (see EmbeddingService.store_embeddings_batch)."""
+
+    email_id: str
+    subject: str
+    body: str
+    sender: str
+    recipients: list[str]
+    metadata: dict[str, Any]
+
+
+@dataclass
+class AttachmentEmbeddingInput:
+    """An attachment to embed in a batch (see EmbeddingService.store_embeddings_batch)."""
+
+    attachment_id: str
+    email_id: str
+    filename: str
+    content: str
+    metadata: dict[str, Any]
+
+
+@dataclass
+class BatchEmbeddingResult:
+    """Outcome of a batched embedding run."""
+
+    # Items whose chunks were all stored, in input order
+    email_ids: list[str] = field(default_factory=list)
+    attachment_ids: list[str] = field(default_factory=list)
+    chunks_stored: int = 0
+
+
 class EmbeddingService:
     """
     Service for generating and storing text embeddings.
@@ -51,34 +92,57 @@ class EmbeddingService:
     DEFAULT_CHUNK_SIZE = 512  # tokens
     DEFAULT_CHUNK_OVERLAP = 50  # tokens
     MAX_BATCH_SIZE = 256
+    # Batches at least this large go to the embedding pool, when enabled
+    POOL_MIN_TEXTS = 64
 
     def __init__(self):
         """Initialize embedding service."""
-        self._model = None
+        self._model: EmbeddingBackend | None = None
+        self._pool: EmbeddingPool | None = None
+        self._query_embedder: QueryEmbedder | None = None
         self._tokenizer = None
 
     @property
-    def model(self):
+    def model(self) -> EmbeddingBackend:
         """Lazy load the embedding model."""
         if self._model is None:
             self._load_model()
         return self._model
 
     def _load_model(self) -> None:
-        """Load the sentence-transformers model."""
-        try:
-            from sentence_transformers import SentenceTransformer
-
-            logger.info(f"Loading embedding model: {self.MODEL_NAME}")
-            self._model = SentenceTransformer(self.MODEL_NAME)
-            logger.info("Embedding model loaded successfully")
-
-        except ImportError:
-            logger.error("sentence-transformers not installed")
-            raise RuntimeError(
-                "sentence-transformers is required for embeddings. "
-                "Install with: pip install sentence-transformers"
-            )
+        """Load the embedding model on the configured inference backend."""
+        logger.info(f"Loading embedding model: {self.MODEL_NAME}")
+        self._model = load_embedding_backend(self.MODEL_NAME)
+        logger.info(f"Embedding model loaded successfully ({self._model.name} backend)")
+
+    @property
+    def query_embedder(self) -> QueryEmbedder:
+        """Micro-batching query encoder on its own inference thread."""
+        if self._query_embedder is None:
+            self._query_embedder = QueryEmbedder(self._encode_queries)
+        return self._query_embedder
+
+    def _encode_queries(self, queries: list[str]) -> np.ndarray:
+        """Encode a batch of search queries (runs on the query embedder's thread)."""
+        return self.model.encode(
+            queries,
+            batch_size=settings.embedding_encode_batch_size,
+            token_budget=settings.embedding_batch_token_budget,
+        )
+
+    def _encoder_for(self, count: int) -> EmbeddingBackend:
+        """Get the process pool for large batches when enabled, else the in-process model."""
+        if settings.embedding_pool_workers > 1 and count >= self.POOL_MIN_TEXTS:
+            if self._pool is None:
+                self._pool = EmbeddingPool(self.MODEL_NAME)
+            return self._pool
+        return self.model
+
+    def _model_key(self, encoder: EmbeddingBackend) -> str:
+        """Model name plus any non-default inference backend; keys cached embeddings."""
+        if encoder.name == "torch":
+            return self.MODEL_NAME
+        return f"{self.MODEL_NAME}:{encoder.name}"
 
     def generate_embedding(self, text: str) -> list[float]:
         """
@@ -94,13 +158,17 @@ class EmbeddingService:
             # Return zero vector for empty text
             return [0.0] * self.EMBEDDING_DIMENSION
 
-        embedding = self.model.encode(text, convert_to_numpy=True)
+        embedding = self.model.encode([text])[0]
         return embedding.tolist()
 
     def generate_embeddings(self, texts: list[str]) -> list[list[float]]:
         """
         Generate embeddings for multiple texts in batch.
 
+        Texts already in the embedding cache are not re-encoded, and
+        repeated texts within the batch are encoded once. Large batches
+        are sharded across the embedding pool when it is enabled.
+
         Args:
             texts: List of texts to embed
 
@@ -110,32 +178,33 @@ class EmbeddingService:
         if not texts:
             return []
 
-        # Filter empty texts and track indices
-        non_empty_texts = []
-        non_empty_indices = []
-
-        for i, text in enumerate(texts):
-            if text.strip():
-                non_empty_texts.append(text)
-                non_empty_indices.append(i)
-
-        # Generate embeddings for non-empty texts
-        if non_empty_texts:
-            embeddings = self.model.encode(
-                non_empty_texts,
-                convert_to_numpy=True,
-                batch_size=min(len(non_empty_texts), self.MAX_BATCH_SIZE),
-                show_progress_bar=len(non_empty_texts) > 100,
-            )
-        else:
-            embeddings = []
+        # Unique non-empty texts by cache key
+        keys = [chunk_key(text) if text.strip() else None for text in texts]
+        unique = {key: text for key, text in zip(keys, texts) if key is not None}
 
-        # Build result with zero vectors for empty texts
-        result = [[0.0] * self.EMBEDDING_DIMENSION] * len(texts)
-        for i, idx in enumerate(non_empty_indices):
-            result[idx] = embeddings[i].tolist()
+        encoder = self._encoder_for(len(unique))
+        model_key = self._model_key(encoder)
 
-        return result
+        vectors = {}
+        if embedding_cache is not None:
+            vectors = embedding_cache.get_many(model_key, list(unique))
+
+        misses = [key for key in unique if key not in vectors]
+        if misses:
+            # Forward passes of similar length, sized by a padded-token budget
+            encoded = encoder.encode(
+                [unique[key] for key in misses],
+                batch_size=settings.embedding_encode_batch_size,
+                token_budget=settings.embedding_batch_token_budget,
+            )
+            new_vectors = dict(zip(misses, encoded))
+            if embedding_cache is not None:
+                embedding_cache.put_many(model_key, new_vectors)
+            vectors.update(new_vectors)
+
+        # Zero vectors for empty texts
+        zero = [0.0] * self.EMBEDDING_DIMENSION
+        return [vectors[key].tolist() if key is not None else zero for key in keys]
 
     def chunk_text(
         self,
@@ -311,8 +380,7 @@ class EmbeddingService:
         Returns:
             Number of chunks stored
         """
-        # Prepare chunks
-        chunks = self.prepare_email_for_embedding(
+        return self.store_email_embeddings(
             email_id=email_id,
             subject=subject,
             body=body,
@@ -321,22 +389,36 @@ class EmbeddingService:
             metadata=metadata,
         )
 
-        if not chunks:
-            return 0
+    def store_email_embeddings(
+        self,
+        email_id: str,
+        subject: str,
+        body: str,
+        sender: str,
+        recipients: list[str],
+        metadata: dict[str, Any],
+    ) -> int:
+        """
+        Blocking implementation of embed_and_store_email.
+
+        Safe to run in a worker thread (e.g. via asyncio.to_thread).
 
-        # Generate embeddings
-        texts = [chunk.text for chunk in chunks]
-        embeddings = self.generate_embeddings(texts)
+        Args:
+            email_id: Unique email identifier
+            subject: Email subject
+            body: Email body text
+            sender: Sender email address
+            recipients: List of recipient email addresses
+            metadata: Additional metadata
 
-        # Store in vector database
-        vector_store.add_email_embeddings(
-            ids=[chunk.id for chunk in chunks],
-            embeddings=embeddings,
-            documents=texts,
-            metadatas=[chunk.metadata for chunk in chunks],
+        Returns:
+            Number of chunks stored
+        """
+        result = self.store_embeddings_batch(
+            emails=[EmailEmbeddingInput(email_id, subject, body, sender, recipients, metadata)],
+            raise_on_error=True,
         )
-
-        return len(chunks)
+        return result.chunks_stored
 
     async def embed_and_store_attachment(
         self,
@@ -359,53 +441,213 @@ class EmbeddingService:
         Returns:
             Number of chunks stored
         """
-        if not content.strip():
-            return 0
+        return self.store_attachment_embeddings(
+            attachment_id=attachment_id,
+            email_id=email_id,
+            filename=filename,
+            content=content,
+            metadata=metadata,
+        )
+
+    def store_attachment_embeddings(
+        self,
+        attachment_id: str,
+        email_id: str,
+        filename: str,
+        content: str,
+        metadata: dict[str, Any],
+    ) -> int:
+        """
+        Blocking implementation of embed_and_store_attachment.
 
-        # Chunk the content
-        chunks = self.chunk_text(content)
+        Safe to run in a worker thread (e.g. via asyncio.to_thread).
 
-        if not chunks:
-            return 0
+        Args:
+            attachment_id: Unique attachment identifier
+            email_id: Parent email identifier
+            filename: Attachment filename
+            content: Extracted text content
+            metadata: Additional metadata
 
-        # Generate embeddings
-        embeddings = self.generate_embeddings(chunks)
+        Returns:
+            Number of chunks stored
+        """
+        result = self.store_embeddings_batch(
+            attachments=[
+                AttachmentEmbeddingInput(attachment_id, email_id, filename, content, metadata)
+            ],
+            raise_on_error=True,
+        )
+        return result.chunks_stored
 
-        # Prepare IDs and metadata
-        ids = [f"{attachment_id}_chunk_{i}" for i in range(len(chunks))]
-        metadatas = [
-            {
-                "attachment_id": attachment_id,
-                "email_id": email_id,
-                "filename": filename,
-                "chunk_index": i,
-                "total_chunks": len(chunks),
-                **metadata,
-            }
-            for i in range(len(chunks))
+    def prepare_attachment_for_embedding(
+        self,
+        attachment_id: str,
+        email_id: str,
+        filename: str,
+        content: str,
+        metadata: dict[str, Any],
+    ) -> list[TextChunk]:
+        """
+        Prepare attachment content for embedding.
+
+        Args:
+            attachment_id: Unique attachment identifier
+            email_id: Parent email identifier
+            filename: Attachment filename
+            content: Extracted text content
+            metadata: Additional metadata
+
+        Returns:
+            List of TextChunk objects ready for embedding
+        """
+        if not content.strip():
+            return []
+
+        texts = self.chunk_text(content)
+        return [
+            TextChunk(
+                text=text,
+                metadata={
+                    "attachment_id": attachment_id,
+                    "email_id": email_id,
+                    "filename": filename,
+                    "chunk_index": i,
+                    "total_chunks": len(texts),
+                    **metadata,
+                },
+                chunk_index=i,
+                chunk_id=f"{attachment_id}_chunk_{i}",
+            )
+            for i, text in enumerate(texts)
         ]
 
-        # Store in vector database
-        vector_store.add_attachment_embeddings(
-            ids=ids,
-            embeddings=embeddings,
-            documents=chunks,
-            metadatas=metadatas,
-        )
+    def store_embeddings_batch(
+        self,
+        emails: list[EmailEmbeddingInput] | None = None,
+        attachments: list[AttachmentEmbeddingInput] | None = None,
+        batch_size: int | None = None,
+        raise_on_error: bool = False,
+    ) -> BatchEmbeddingResult:
+        """
+        Embed many emails and attachments together and store them.
+
+        Chunks from all items are pooled and encoded in model batches of
+        up to ``batch_size`` chunks, with one vector upsert per collection
+        per batch, instead of an encode and an upsert for every email.
 
-        return len(chunks)
+        Blocking; safe to run in a worker thread.
+
+        Args:
+            emails: Emails to embed
+            attachments: Attachments to embed
+            batch_size: Chunks per encode/upsert (default from config)
+            raise_on_error: Raise instead of leaving a failed batch's items out
+
+        Returns:
+            BatchEmbeddingResult; items in a batch that failed are omitted
+            so the caller can leave them for a later retry
+        """
+        batch_size = batch_size or settings.embedding_batch_size
+
+        # (collection, owner ID, chunk) for every chunk of every item
+        pending: list[tuple[str, str, TextChunk]] = []
+        for email in emails or []:
+            for chunk in self.prepare_email_for_embedding(
+                email_id=email.email_id,
+                subject=email.subject,
+                body=email.body,
+                sender=email.sender,
+                recipients=email.recipients,
+                metadata=email.metadata,
+            ):
+                pending.append(("email", email.email_id, chunk))
+        for attachment in attachments or []:
+            for chunk in self.prepare_attachment_for_embedding(
+                attachment_id=attachment.attachment_id,
+                email_id=attachment.email_id,
+                filename=attachment.filename,
+                content=attachment.content,
+                metadata=attachment.metadata,
+            ):
+                pending.append(("attachment", attachment.attachment_id, chunk))
+
+        result = BatchEmbeddingResult()
+        failed: set[tuple[str, str]] = set()
+
+        for start in range(0, len(pending), batch_size):
+            window = pending[start : start + batch_size]
+            try:
+                embeddings = self.generate_embeddings([chunk.text for _, _, chunk in window])
+                for kind, add in (
+                    ("email", vector_store.add_email_embeddings),
+                    ("attachment", vector_store.add_attachment_embeddings),
+                ):
+                    rows = [
+                        (chunk, embedding)
+                        for (collection, _, chunk), embedding in zip(window, embeddings)
+                        if collection == kind
+                    ]
+                    if rows:
+                        add(
+                            ids=[chunk.id for chunk, _ in rows],
+                            embeddings=[embedding for _, embedding in rows],
+                            documents=[chunk.text for chunk, _ in rows],
+                            metadatas=[chunk.metadata for chunk, _ in rows],
+                        )
+                result.chunks_stored += len(window)
+            except Exception as e:
+                if raise_on_error:
+                    raise
+                logger.error(f"Error embedding batch of {len(window)} chunks: {e}")
+                failed.update((collection, owner) for collection, owner, _ in window)
+
+        result.email_ids = [
+            email.email_id for email in emails or [] if ("email", email.email_id) not in failed
+        ]
+        result.attachment_ids = [
+            attachment.attachment_id
+            for attachment in attachments or []
+            if ("attachment", attachment.attachment_id) not in failed
+        ]
+        return result
 
     async def embed_query(self, query: str) -> list[float]:
         """
         Generate embedding for a search query.
 
+        Repeated queries (and HyDE documents) come from the query
+        embedding cache. Others are encoded on the query embedder's
+        thread, batched with any concurrent queries, so the event loop is
+        not blocked.
+
         Args:
-            query: Search query text
+            query: Search query or HyDE document text
 
         Returns:
             Query embedding vector
         """
-        return self.generate_embedding(query)
+        if not query.strip():
+            return [0.0] * self.EMBEDDING_DIMENSION
+
+        # Until the model has loaded (on the embedder's thread) its backend isn't known
+        model_key = self._model_key(self._model) if self._model is not None else None
+        if query_embedding_cache is not None and model_key is not None:
+            cached = await query_embedding_cache.get(model_key, query)
+            if cached is not None:
+                return cached.tolist()
+
+        embedding = await self.query_embedder.embed(query)
+        if query_embedding_cache is not None:
+            await query_embedding_cache.put(self._model_key(self.model), query, embedding)
+        return embedding.tolist()
+
+    def shutdown(self) -> None:
+        """Stop the query embedder thread and the embedding pool."""
+        if self._query_embedder is not None:
+            self._query_embedder.shutdown()
+        if self._pool is not None:
+            self._pool.shutdown()
 
     def calculate_content_hash(self, content: str) -> str:
         """Calculate hash for content deduplication."""
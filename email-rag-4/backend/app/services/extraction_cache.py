@@ -0,0 +1,116 @@
+"""
+Extraction Cache Service
+
+Persistent cache of attachment text extraction results, keyed by content
+SHA-256 and extractor version, so recurring attachments are parsed once.
+Texts are stored compressed, like the attachment content side table.
+"""
+
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.attachment_extraction import AttachmentExtraction
+from app.services.attachment_processor import AttachmentProcessor
+from app.utils.content_codec import compress_text, decompress_text
+
+
+@dataclass
+class ExtractionResult:
+    """Outcome of extracting text from one attachment."""
+
+    text: str | None
+    error: str | None = None
+    # Timeouts and worker crashes depend on load, not the file: never cached
+    transient: bool = False
+
+    @property
+    def is_extracted(self) -> bool:
+        """Check if extraction succeeded."""
+        return self.error is None
+
+
+class ExtractionCache:
+    """
+    Reads and writes cached extraction results in batches.
+
+    Failed extractions are cached as well so a corrupt file that recurs
+    across custodians is not re-parsed every time; transient failures
+    (timeouts, crashed workers) are not, so the file is retried.
+    """
+
+    def __init__(self, extractor_version: int | None = None):
+        """
+        Initialize the cache.
+
+        Args:
+            extractor_version: Version to key results by
+                (default: AttachmentProcessor.EXTRACTOR_VERSION)
+        """
+        self.extractor_version = extractor_version or AttachmentProcessor.EXTRACTOR_VERSION
+
+    async def get_many(
+        self,
+        db: AsyncSession,
+        sha256_hashes: set[str],
+    ) -> dict[str, ExtractionResult]:
+        """
+        Look up cached results for a set of hashes.
+
+        Returns:
+            Mapping of hash to result for every cache hit
+        """
+        if not sha256_hashes:
+            return {}
+
+        result = await db.execute(
+            select(
+                AttachmentExtraction.sha256_hash,
+                AttachmentExtraction.extracted_text_data,
+                AttachmentExtraction.error,
+            ).where(
+                AttachmentExtraction.sha256_hash.in_(sha256_hashes),
+                AttachmentExtraction.extractor_version == self.extractor_version,
+            )
+        )
+        return {
+            sha256_hash: ExtractionResult(text=decompress_text(text_data), error=error)
+            for sha256_hash, text_data, error in result.all()
+        }
+
+    async def put_many(
+        self,
+        db: AsyncSession,
+        results: dict[str, ExtractionResult],
+    ) -> None:
+        """
+        Store new results (flushed with the caller's transaction).
+
+        Concurrent workers may extract the same hash; the first write wins.
+        """
+        if not results:
+            return
+
+        await db.execute(
+            pg_insert(AttachmentExtraction).on_conflict_do_nothing(),
+            [
+                {
+                    "sha256_hash": sha256_hash,
+                    "extractor_version": self.extractor_version,
+                    "extracted_text_data": compress_text(result.text),
+                    "error": result.error,
+                }
+                for sha256_hash, result in results.items()
+            ],
+        )
+
+
+# Global instance
+extraction_cache = ExtractionCache()
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Get the extraction cache instance."""
+    return extraction_cache
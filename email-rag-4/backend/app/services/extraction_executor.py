@@ -0,0 +1,271 @@
+"""
+Extraction Executor Service
+
+Runs attachment text extraction in a pool of worker processes so a
+pathological file can't stall PST ingestion or block the event loop.
+Each job runs under a CPU-time limit, each worker under an address-space
+limit, and jobs that exceed the wall-clock timeout have their worker
+killed.
+
+The pool is a billiard pool (Celery's fork of multiprocessing): it is
+started inside prefork Celery workers, whose daemonic processes may not
+start children through the standard library.
+"""
+
+import asyncio
+import os
+import signal
+
+import billiard
+from billiard.exceptions import TimeLimitExceeded
+from billiard.pool import Pool
+from loguru import logger
+
+from app.config import settings
+from app.services.attachment_processor import AttachmentProcessor, AttachmentProcessorError
+from app.services.extraction_cache import ExtractionResult
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class ExtractionLimitExceeded(AttachmentProcessorError):
+    """Raised inside a worker when a job exceeds its CPU-time limit."""
+
+    pass
+
+
+# ===========================================
+# Worker process side
+# ===========================================
+
+_worker_processor: AttachmentProcessor | None = None
+_worker_cpu_seconds: int | None = None
+
+
+def _raise_cpu_limit(signum, frame) -> None:
+    raise ExtractionLimitExceeded("CPU time limit exceeded")
+
+
+def _current_address_space() -> int:
+    """Get this process's current virtual memory size in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def _init_worker(max_text_length: int, cpu_seconds: int | None, memory_mb: int | None) -> None:
+    """Set up a pool worker: processor instance and resource limits."""
+    global _worker_processor, _worker_cpu_seconds
+
+    _worker_processor = AttachmentProcessor(max_text_length=max_text_length)
+    _worker_cpu_seconds = cpu_seconds
+
+    if resource is None:
+        return
+
+    if cpu_seconds:
+        signal.signal(signal.SIGXCPU, _raise_cpu_limit)
+
+    if memory_mb:
+        # Headroom on top of what the interpreter and imports already map
+        limit = _current_address_space() + memory_mb * 1024 * 1024
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _extract_in_worker(
+    content: bytes,
+    filename: str,
+    content_type: str | None,
+) -> ExtractionResult:
+    """Extract one attachment under the per-job CPU limit."""
+    cpu_limited = resource is not None and _worker_cpu_seconds
+    if cpu_limited:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        used = int(usage.ru_utime + usage.ru_stime)
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        soft = used + _worker_cpu_seconds
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+    try:
+        text = _worker_processor.extract_text_from_attachment(content, filename, content_type)
+        return ExtractionResult(text=text)
+    except MemoryError:
+        return ExtractionResult(text=None, error="Memory limit exceeded")
+    except Exception as e:
+        return ExtractionResult(text=None, error=str(e))
+    finally:
+        if cpu_limited:
+            _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+            resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+
+# ===========================================
+# Executor
+# ===========================================
+
+class ExtractionExecutor:
+    """
+    Process pool for attachment text extraction.
+
+    The pool is created lazily. A job that overruns its wall-clock timeout
+    has its worker killed and replaced; other jobs carry on unaffected.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        timeout_seconds: float | None = None,
+        cpu_seconds: int | None = None,
+        memory_mb: int | None = None,
+        max_text_length: int = 100000,
+    ):
+        """
+        Initialize the executor.
+
+        Args:
+            max_workers: Worker processes (default from config, else this
+                process's share of the host's CPU cores)
+            timeout_seconds: Wall-clock limit per file (default from config)
+            cpu_seconds: CPU-time limit per file (default from config)
+            memory_mb: Address-space headroom per worker (default from config)
+            max_text_length: Maximum text length to extract
+        """
+        # Each Celery worker process runs its own pool, so they split the cores
+        self.max_workers = (
+            max_workers
+            or settings.attachment_extraction_workers
+            or max(1, (os.cpu_count() or 1) // max(1, settings.celery_worker_concurrency))
+        )
+        self.timeout_seconds = timeout_seconds or settings.attachment_extraction_timeout_seconds
+        self.cpu_seconds = cpu_seconds or settings.attachment_extraction_cpu_seconds
+        self.memory_mb = memory_mb or settings.attachment_extraction_memory_mb
+        self.max_text_length = max_text_length
+
+        self._pool: Pool | None = None
+
+    def _get_pool(self) -> Pool:
+        """Get the pool, starting it if needed."""
+        if self._pool is None:
+            self._pool = Pool(
+                processes=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.max_text_length, self.cpu_seconds, self.memory_mb),
+                enable_timeouts=True,
+                # Spawned workers don't inherit the parent's threads or model memory
+                context=billiard.get_context("spawn"),
+            )
+            logger.info(f"Started attachment extraction pool with {self.max_workers} workers")
+        return self._pool
+
+    async def extract_many(
+        self,
+        jobs: list[tuple[bytes, str, str | None]],
+    ) -> list[ExtractionResult]:
+        """
+        Extract text from several attachments in parallel.
+
+        At most ``max_workers`` jobs are in flight at once, so only that
+        many attachments are held in the pool's queues.
+
+        Args:
+            jobs: (content, filename, content_type) tuples
+
+        Returns:
+            Results in the same order as jobs
+        """
+        slots = asyncio.Semaphore(self.max_workers)
+
+        async def run(job: tuple[bytes, str, str | None]) -> ExtractionResult:
+            async with slots:
+                return await self._run(*job)
+
+        return list(await asyncio.gather(*(run(job) for job in jobs)))
+
+    async def extract(
+        self,
+        content: bytes,
+        filename: str,
+        content_type: str | None = None,
+    ) -> ExtractionResult:
+        """Extract text from a single attachment in a worker process."""
+        return await self._run(content, filename, content_type)
+
+    async def _run(
+        self,
+        content: bytes,
+        filename: str,
+        content_type: str | None,
+    ) -> ExtractionResult:
+        """
+        Run one job on the pool.
+
+        Never raises for extraction problems; failures, timeouts and
+        crashes are returned as results with an error (timeouts and
+        crashes marked transient).
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def settle(outcome) -> None:
+            # Called on the pool's result thread
+            try:
+                loop.call_soon_threadsafe(_settle, future, outcome)
+            except RuntimeError:
+                pass  # The caller's event loop has closed
+
+        # The pool kills the worker once the job has run for the timeout
+        submitted = self._get_pool().apply_async(
+            _extract_in_worker,
+            (content, filename, content_type),
+            callback=settle,
+            error_callback=settle,
+            timeout=self.timeout_seconds,
+        )
+        if submitted is None:
+            return ExtractionResult(text=None, error="Extraction pool is shut down", transient=True)
+
+        outcome = await future
+        if isinstance(outcome, ExtractionResult):
+            return outcome
+
+        # Anything else is billiard's ExceptionInfo for a killed or lost worker
+        if issubclass(outcome.type, TimeLimitExceeded):
+            logger.warning(f"Extraction of {filename} exceeded {self.timeout_seconds}s, killed")
+            return ExtractionResult(
+                text=None,
+                error=f"Extraction timed out after {self.timeout_seconds}s",
+                transient=True,
+            )
+        logger.warning(f"Extraction worker for {filename} died: {outcome.type.__name__}")
+        return ExtractionResult(text=None, error="Extraction worker crashed", transient=True)
+
+    def shutdown(self) -> None:
+        """Stop the pool."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+
+def _settle(future: asyncio.Future, outcome) -> None:
+    """Hand a job's result (or billiard's error) to the waiting coroutine."""
+    if not future.done():
+        future.set_result(outcome)
+
+
+# Global instance
+extraction_executor = ExtractionExecutor()
+
+
+def get_extraction_executor() -> ExtractionExecutor:
+    """Get the extraction executor instance."""
+    return extraction_executor
@@ -0,0 +1,348 @@
+"""
+Ingest Pipeline Service
+
+Runs PST ingestion as concurrent stages joined by bounded queues:
+
+    parse (thread) -> attachment extraction -> bulk write -> embed
+
+Each queue holds at most a few items, so a slow stage blocks the one
+feeding it instead of letting work pile up in memory. Emails become
+searchable batch by batch while the rest of the PST is still being
+parsed, and total time tends toward that of the slowest stage.
+"""
+
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable, Iterable
+from contextlib import AbstractAsyncContextManager
+from typing import Any
+
+from loguru import logger
+from sqlalchemy import String, cast, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.models.attachment import Attachment
+from app.db.models.email import Email
+from app.db.models.processing_task import ProcessingTask
+from app.services.embedding_service import (
+    AttachmentEmbeddingInput,
+    EmailEmbeddingInput,
+    embedding_service,
+)
+from app.services.ingest_writer import EmailBatch, EmailBulkWriter
+from app.services.pst_processor import ExtractedEmail
+
+# Marks the end of a stage's output
+_DONE = object()
+
+WrittenItems = list[tuple[dict[str, Any], list[dict[str, Any]]]]
+
+
+async def mark_emails_embedded(
+    db: AsyncSession,
+    pst_file_id: str,
+    email_ids: list[str],
+) -> int:
+    """
+    Mark emails as embedded and add them to the task's searchable count.
+
+    Near-duplicates are included: they are searchable through their
+    canonical email's vectors. Only emails not already marked are counted, so the per-batch jobs and
+    the end-of-task sweep can overlap without double counting. Runs in
+    the caller's transaction.
+
+    Returns:
+        Number of emails newly marked
+    """
+    if not email_ids:
+        return 0
+
+    result = await db.execute(
+        update(Email)
+        .where(Email.id.in_(email_ids), Email.is_embedded.is_(False))
+        .values(
+            is_embedded=True,
+            # Near-duplicates point at their canonical's vectors
+            embedding_id=cast(func.coalesce(Email.duplicate_of, Email.id), String),
+        )
+        .returning(Email.id)
+    )
+    marked = len(result.all())
+
+    if marked:
+        await db.execute(
+            update(ProcessingTask)
+            .where(ProcessingTask.id == pst_file_id)
+            .values(emails_searchable=ProcessingTask.emails_searchable + marked)
+        )
+
+    return marked
+
+
+def _indexed_body(email_row: dict[str, Any]) -> str:
+    """Get the body text to embed for an email row (see Email.indexed_body)."""
+    if email_row.get("body_new_text") is not None:
+        return email_row["body_new_text"]
+    return email_row["body_text"] or ""
+
+
+class PipelineStopped(Exception):
+    """Raised in the parse thread when the pipeline is shutting down."""
+
+    pass
+
+
+class IngestPipeline:
+    """
+    Staged, back-pressured PST ingestion.
+
+    The parse stage runs the (blocking) PST iterator in a thread. The
+    other stages run on the event loop, each with its own database
+    session so they never share one concurrently: extraction uses one
+    for the extraction cache, the writer's session commits batches, and
+    the embed stage marks written emails and attachments as embedded.
+    """
+
+    def __init__(
+        self,
+        writer: EmailBulkWriter,
+        session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]],
+        embed: bool = True,
+        queue_size: int | None = None,
+        on_batch_written: Callable[[WrittenItems], Awaitable[None]] | None = None,
+        on_batch_embedded: Callable[[int], Awaitable[None]] | None = None,
+    ):
+        """
+        Initialize the pipeline.
+
+        Args:
+            writer: Bulk writer used for batching and committing
+            session_factory: Opens extra sessions for the extraction and embed stages
+            embed: Whether to run the embed stage
+            queue_size: Capacity of each inter-stage queue (default from config)
+            on_batch_written: Called with the written rows after each commit
+            on_batch_embedded: Called with the email count after each embedded batch
+        """
+        self._writer = writer
+        self._session_factory = session_factory
+        self._embed_enabled = embed
+        self._queue_size = queue_size or settings.ingest_pipeline_queue_size
+        self._on_batch_written = on_batch_written
+        self._on_batch_embedded = on_batch_embedded
+
+        self._stopping = threading.Event()
+
+        self.emails_failed = 0
+        self.emails_embedded = 0
+
+    async def run(self, emails: Iterable[ExtractedEmail]) -> None:
+        """
+        Ingest every email from an iterator.
+
+        Returns once the last batch is written (and embedded). If any
+        stage fails, the others are cancelled and the error is raised.
+        """
+        loop = asyncio.get_running_loop()
+
+        # Parsed emails; batches ready to write; written batches to embed
+        parsed: asyncio.Queue = asyncio.Queue(maxsize=self._queue_size * self._writer.batch_size)
+        prepared: asyncio.Queue = asyncio.Queue(maxsize=self._queue_size)
+        written: asyncio.Queue | None = (
+            asyncio.Queue(maxsize=self._queue_size) if self._embed_enabled else None
+        )
+
+        # A plain thread (not to_thread) so it can always be joined below;
+        # callers close the PST as soon as run() returns
+        parser = threading.Thread(
+            target=self._parse,
+            args=(emails, parsed, loop),
+            name="pst-parse",
+            daemon=True,
+        )
+        parser.start()
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(self._extract(parsed, prepared))
+                group.create_task(self._write(prepared, written))
+                if written is not None:
+                    group.create_task(self._embed(written))
+        except BaseExceptionGroup as group_error:
+            # Surface the first real failure rather than the group
+            raise group_error.exceptions[0] from None
+        finally:
+            self._stopping.set()
+            await asyncio.to_thread(parser.join)
+
+    # ===========================================
+    # Stages
+    # ===========================================
+
+    def _parse(
+        self,
+        emails: Iterable[ExtractedEmail],
+        out: asyncio.Queue,
+        loop: asyncio.AbstractEventLoop,
+    ) -> None:
+        """
+        Pull emails from the PST iterator (in a thread) onto the parsed queue.
+
+        A parser error is queued in place of the end marker so the
+        extraction stage raises it on the event loop.
+        """
+        try:
+            for email in emails:
+                self._put_from_thread(out, email, loop)
+            self._put_from_thread(out, _DONE, loop)
+        except PipelineStopped:
+            return
+        except Exception as e:
+            try:
+                self._put_from_thread(out, e, loop)
+            except PipelineStopped:
+                pass
+
+    def _put_from_thread(self, queue: asyncio.Queue, item: Any, loop: asyncio.AbstractEventLoop) -> None:
+        """Blocking put from the parse thread; gives up if the pipeline stops."""
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while True:
+            try:
+                future.result(timeout=0.5)
+                return
+            except TimeoutError:
+                if self._stopping.is_set():
+                    future.cancel()
+                    raise PipelineStopped()
+
+    async def _extract(self, inp: asyncio.Queue, out: asyncio.Queue) -> None:
+        """Group parsed emails into batches and resolve their attachment text."""
+        async with self._session_factory() as db:
+            batch = EmailBatch()
+
+            while True:
+                email = await inp.get()
+                if email is _DONE:
+                    break
+                if isinstance(email, Exception):
+                    raise email
+
+                try:
+                    # Row building (MinHash, body segmentation) is CPU-bound; keep it
+                    # off the event loop so the other stages keep overlapping
+                    await asyncio.to_thread(self._writer.add_to_batch, batch, email)
+                except Exception as e:
+                    logger.error(f"Error processing email: {e}")
+                    self.emails_failed += 1
+                    continue
+
+                if len(batch) >= self._writer.batch_size:
+                    await self._resolve(db, batch)
+                    await out.put(batch)
+                    batch = EmailBatch()
+
+            if batch:
+                await self._resolve(db, batch)
+                await out.put(batch)
+
+        await out.put(_DONE)
+
+    async def _resolve(self, db: AsyncSession, batch: EmailBatch) -> None:
+        """Resolve a batch's attachment text and persist new cache entries."""
+        await self._writer.resolve_extractions(batch, db)
+        await db.commit()
+
+    async def _write(self, inp: asyncio.Queue, out: asyncio.Queue | None) -> None:
+        """Commit batches and hand the written rows to the embed stage."""
+        while True:
+            batch = await inp.get()
+            if batch is _DONE:
+                break
+
+            items = await self._writer.write(batch)
+
+            if self._on_batch_written is not None:
+                await self._on_batch_written(items)
+
+            if out is not None and items:
+                await out.put(items)
+
+        if out is not None:
+            await out.put(_DONE)
+
+    async def _embed(self, inp: asyncio.Queue) -> None:
+        """Embed written emails and their attachments, then mark them embedded."""
+        async with self._session_factory() as db:
+            while True:
+                items = await inp.get()
+                if items is _DONE:
+                    break
+
+                email_ids, attachment_ids = await asyncio.to_thread(self._embed_items, items)
+
+                marked = await mark_emails_embedded(db, self._writer.pst_file_id, email_ids)
+                if attachment_ids:
+                    await db.execute(
+                        update(Attachment)
+                        .where(Attachment.id.in_(attachment_ids))
+                        .values(is_embedded=True)
+                    )
+                await db.commit()
+
+                self.emails_embedded += marked
+                if self._on_batch_embedded is not None:
+                    await self._on_batch_embedded(marked)
+
+    def _embed_items(self, items: WrittenItems) -> tuple[list[str], list[str]]:
+        """
+        Embed a written batch (blocking; runs in a thread).
+
+        Chunks from the whole batch are encoded together. Emails or
+        attachments that fail are left unembedded for the end-of-task
+        embedding sweep to retry.
+        """
+        duplicate_ids: list[str] = []
+        emails: list[EmailEmbeddingInput] = []
+        attachments: list[AttachmentEmbeddingInput] = []
+
+        for email_row, attachment_rows in items:
+            # Near-duplicates are searchable through their canonical's embedding
+            if email_row.get("duplicate_of"):
+                duplicate_ids.append(email_row["id"])
+                continue
+
+            sent_date = email_row["sent_date"]
+            emails.append(
+                EmailEmbeddingInput(
+                    email_id=email_row["id"],
+                    subject=email_row["subject"] or "",
+                    body=_indexed_body(email_row),
+                    sender=email_row["sender_email"] or "",
+                    recipients=email_row["to_recipients"] or [],
+                    metadata={
+                        "pst_file_id": email_row["pst_file_id"],
+                        "date": sent_date.timestamp() if sent_date else None,
+                        "sent_date": sent_date.isoformat() if sent_date else None,
+                        "folder_path": email_row["folder_path"],
+                    },
+                )
+            )
+
+            for attachment_row in attachment_rows:
+                if not attachment_row["is_extracted"] or not attachment_row["extracted_text"]:
+                    continue
+                attachments.append(
+                    AttachmentEmbeddingInput(
+                        attachment_id=attachment_row["id"],
+                        email_id=email_row["id"],
+                        filename=attachment_row["filename"],
+                        content=attachment_row["extracted_text"],
+                        metadata={
+                            "pst_file_id": email_row["pst_file_id"],
+                            "content_type": attachment_row["content_type"],
+                        },
+                    )
+                )
+
+        result = embedding_service.store_embeddings_batch(emails, attachments)
+        return duplicate_ids + result.email_ids, result.attachment_ids
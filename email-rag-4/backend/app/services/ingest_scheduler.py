@@ -0,0 +1,412 @@
+"""
+Ingest Scheduler
+
+Decides which uploaded PSTs start processing, so one user's backlog can't
+starve everyone else and small files don't wait behind huge ones.
+
+Uploaded tasks wait in the database (PENDING, not yet dispatched) until
+the scheduler gives them a slot:
+
+- At most ``ingest_max_concurrent`` tasks run at once, and at most
+  ``ingest_max_per_user`` for any one user.
+- Between users, weighted fair queuing: the next slot goes to the task
+  with the smallest virtual finish tag, i.e. its user's bytes running or
+  scheduled ahead of it plus the task's size, divided by the user's
+  weight (by role).
+- Within a user, shortest job first on ``file_size_bytes``. Waiting ages
+  a task: its effective size is divided by ``1 + waited / aging``, so
+  large files still get their turn.
+- A dispatched task holds its slot on a lease renewed by every progress
+  update (``updated_at``). After ``ingest_slot_lease_minutes`` without
+  one the slot is released, so stuck tasks can't stall ingestion. A task
+  that never started (a lost Celery message) is queued again; one that
+  stalled mid-run (a killed worker, a chord that never finalized) is
+  marked failed.
+- Retries go back through the queue, up to ``ingest_max_retries`` times,
+  so they are subject to the same caps as new uploads.
+
+Replaying the same policy over time gives each queued task its queue
+position and an ETA.
+"""
+
+import heapq
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from loguru import logger
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.models.processing_task import ProcessingTask, TaskStatus
+from app.db.models.user import User
+
+# Statuses that hold a slot once a task has been dispatched
+RUNNING_STATUSES = (
+    TaskStatus.PENDING,
+    TaskStatus.PARSING,
+    TaskStatus.EXTRACTING,
+    TaskStatus.EMBEDDING,
+    TaskStatus.INDEXING,
+)
+
+# Serializes dispatch rounds across workers (pg advisory lock key)
+_DISPATCH_LOCK_KEY = 0x1D6E5C4D
+
+# Completed tasks sampled to measure throughput
+_THROUGHPUT_SAMPLE = 20
+
+
+@dataclass
+class IngestJob:
+    """A task as the scheduler sees it."""
+
+    task_id: str
+    user_id: str
+    size: int
+    weight: float
+    queued_at: datetime
+    # Set for running tasks
+    started_at: datetime | None = None
+    # Progress-based estimate for running tasks, when known
+    remaining_seconds: float | None = None
+
+
+@dataclass
+class ScheduledJob:
+    """Where a queued task lands in the replayed schedule."""
+
+    job: IngestJob
+    position: int
+    start_at: datetime
+    finish_at: datetime
+
+
+class IngestScheduler:
+    """Fair-share, shortest-job-first scheduler for PST processing."""
+
+    def __init__(
+        self,
+        max_concurrent: int | None = None,
+        max_per_user: int | None = None,
+        aging_minutes: float | None = None,
+        role_weights: dict[str, float] | None = None,
+        lease_minutes: float | None = None,
+        max_retries: int | None = None,
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_concurrent: Tasks running at once (default from config)
+            max_per_user: Tasks running at once per user (default from config)
+            aging_minutes: Wait after which a task's effective size halves
+            role_weights: Fair-share weight per user role (default 1.0)
+            lease_minutes: Minutes without progress after which a
+                dispatched task stops holding its slot (default from config)
+            max_retries: Times a task is queued again (default from config)
+        """
+        self.max_concurrent = max(1, max_concurrent or settings.ingest_max_concurrent)
+        self.max_per_user = max(1, max_per_user or settings.ingest_max_per_user)
+        self.aging_minutes = aging_minutes or settings.ingest_aging_minutes
+        self.role_weights = (
+            role_weights if role_weights is not None else settings.ingest_role_weights
+        )
+        self.lease = timedelta(minutes=lease_minutes or settings.ingest_slot_lease_minutes)
+        self.max_retries = (
+            settings.ingest_max_retries if max_retries is None else max(0, max_retries)
+        )
+
+    # ===========================================
+    # Policy
+    # ===========================================
+
+    def plan(
+        self,
+        queued: list[IngestJob],
+        running: list[IngestJob],
+        now: datetime,
+        throughput: float,
+    ) -> list[ScheduledJob]:
+        """
+        Replay the scheduling policy over the queue.
+
+        Args:
+            queued: Tasks waiting for a slot
+            running: Tasks holding a slot
+            now: Current time
+            throughput: Estimated processing rate in bytes per second
+
+        Returns:
+            Queued tasks in dispatch order with estimated start and finish
+        """
+        # Bytes running or scheduled per user, over weight (attained service)
+        service: dict[str, float] = defaultdict(float)
+        per_user: dict[str, int] = defaultdict(int)
+        # Slot releases: (time, sequence, user_id)
+        releases: list[tuple[datetime, int, str]] = []
+
+        for sequence, job in enumerate(running):
+            service[job.user_id] += job.size / job.weight
+            per_user[job.user_id] += 1
+            releases.append((self._finish_of_running(job, now, throughput), sequence, job.user_id))
+        heapq.heapify(releases)
+        sequence = len(running)
+
+        clock = now
+        pending = list(queued)
+        schedule = []
+
+        while pending:
+            candidates = [job for job in pending if per_user[job.user_id] < self.max_per_user]
+            if len(releases) < self.max_concurrent and candidates:
+                job = min(
+                    candidates,
+                    key=lambda j: (
+                        service[j.user_id] + self._effective_size(j, clock) / j.weight,
+                        j.queued_at,
+                    ),
+                )
+                pending.remove(job)
+
+                finish_at = clock + timedelta(seconds=self.duration(job.size, throughput))
+                schedule.append(ScheduledJob(job, len(schedule) + 1, clock, finish_at))
+
+                service[job.user_id] += job.size / job.weight
+                per_user[job.user_id] += 1
+                heapq.heappush(releases, (finish_at, sequence, job.user_id))
+                sequence += 1
+            else:
+                # Wait for the next slot to free up
+                released_at, _, user_id = heapq.heappop(releases)
+                clock = max(clock, released_at)
+                per_user[user_id] -= 1
+
+        return schedule
+
+    def duration(self, size: int, throughput: float) -> float:
+        """Estimate seconds to process a file of this size."""
+        return size / throughput if throughput > 0 else 0.0
+
+    def weight_for(self, role: str | None) -> float:
+        """Get the fair-share weight of a user role."""
+        weight = self.role_weights.get(role or "", 1.0)
+        return weight if weight > 0 else 1.0
+
+    def _effective_size(self, job: IngestJob, clock: datetime) -> float:
+        """Size discounted by time spent waiting, so big files age into a slot."""
+        waited_minutes = max(0.0, (clock - job.queued_at).total_seconds() / 60)
+        return job.size / (1 + waited_minutes / self.aging_minutes)
+
+    def _finish_of_running(self, job: IngestJob, now: datetime, throughput: float) -> datetime:
+        """Estimate when a running task frees its slot."""
+        if job.remaining_seconds is not None:
+            return now + timedelta(seconds=job.remaining_seconds)
+        started_at = job.started_at or now
+        finish_at = started_at + timedelta(seconds=self.duration(job.size, throughput))
+        return max(finish_at, now)
+
+    # ===========================================
+    # Database
+    # ===========================================
+
+    async def dispatch(self, db: AsyncSession) -> list[str]:
+        """
+        Give free slots to the next queued tasks.
+
+        Requeues or fails tasks whose lease has expired, marks the chosen
+        tasks dispatched and commits; the caller starts processing for the
+        returned task IDs. Concurrent rounds are
+        serialized with a transaction-scoped advisory lock.
+
+        Args:
+            db: Database session
+
+        Returns:
+            IDs of the tasks to start
+        """
+        await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _DISPATCH_LOCK_KEY})
+
+        now = datetime.now(timezone.utc)
+        queued, running, expired = await self._load(db, now)
+        self.release(expired)
+        if not queued or len(running) >= self.max_concurrent:
+            await db.commit()
+            return []
+
+        throughput = await self.measure_throughput(db)
+        to_start = [
+            scheduled.job.task_id
+            for scheduled in self.plan(queued, running, now, throughput)
+            if scheduled.start_at <= now
+        ]
+
+        if to_start:
+            result = await db.execute(
+                select(ProcessingTask).where(ProcessingTask.id.in_(to_start))
+            )
+            for task in result.scalars():
+                task.dispatched_at = now
+        await db.commit()
+
+        if to_start:
+            still_queued = len(queued) - len(to_start)
+            logger.info(f"Dispatched {len(to_start)} PST task(s), {still_queued} still queued")
+        return to_start
+
+    async def estimate(self, db: AsyncSession) -> dict[str, ScheduledJob]:
+        """
+        Get the queue position and estimated timing of every queued task.
+
+        Args:
+            db: Database session
+
+        Returns:
+            ScheduledJob by task ID
+        """
+        now = datetime.now(timezone.utc)
+        queued, running, _ = await self._load(db, now)
+        if not queued:
+            return {}
+
+        throughput = await self.measure_throughput(db)
+        return {
+            scheduled.job.task_id: scheduled
+            for scheduled in self.plan(queued, running, now, throughput)
+        }
+
+    async def measure_throughput(self, db: AsyncSession) -> float:
+        """Bytes per second over recently completed tasks, or the configured default."""
+        elapsed = ProcessingTask.completed_at - ProcessingTask.started_at
+        recent = (
+            select(
+                ProcessingTask.file_size_bytes.label("size"),
+                func.extract("epoch", elapsed).label("seconds"),
+            )
+            .where(
+                ProcessingTask.status == TaskStatus.COMPLETED,
+                ProcessingTask.started_at.is_not(None),
+                ProcessingTask.completed_at.is_not(None),
+            )
+            .order_by(ProcessingTask.completed_at.desc())
+            .limit(_THROUGHPUT_SAMPLE)
+            .subquery()
+        )
+        row = (await db.execute(select(func.sum(recent.c.size), func.sum(recent.c.seconds)))).one()
+        total_bytes, total_seconds = row
+        if total_bytes and total_seconds and total_seconds > 0:
+            return float(total_bytes) / float(total_seconds)
+        return settings.ingest_default_throughput_mb_s * 1024 * 1024
+
+    def release(self, expired: list[ProcessingTask]) -> None:
+        """
+        Requeue or fail tasks whose lease has expired (see classify).
+
+        A task lost before it started is queued again while it has
+        retries left; one that stalled mid-run is marked failed.
+
+        Args:
+            expired: Lease-expired tasks; the caller commits
+        """
+        for task in expired:
+            if task.status == TaskStatus.PENDING and self.requeue(task):
+                continue
+            task.status = TaskStatus.FAILED
+            task.current_phase = None
+            task.error_message = f"Processing stalled (no progress for {self.lease})"
+
+    def requeue(self, task: ProcessingTask) -> bool:
+        """
+        Put a dispatched task back in the queue to be retried.
+
+        The caller commits; the task then waits for a slot like a new
+        upload.
+
+        Args:
+            task: Task to retry
+
+        Returns:
+            False (task unchanged) if it has used up its retries
+        """
+        if not self._has_retries(task):
+            return False
+        task.status = TaskStatus.PENDING
+        task.current_phase = None
+        task.dispatched_at = None
+        task.retry_count = (task.retry_count or 0) + 1
+        return True
+
+    def _has_retries(self, task: ProcessingTask) -> bool:
+        """Check whether a task may be queued again."""
+        return (task.retry_count or 0) < self.max_retries
+
+    async def _load(
+        self,
+        db: AsyncSession,
+        now: datetime,
+    ) -> tuple[list[IngestJob], list[IngestJob], list[ProcessingTask]]:
+        """Load queued, running and lease-expired tasks."""
+        result = await db.execute(
+            select(ProcessingTask, User.role)
+            .join(User, User.id == ProcessingTask.user_id)
+            .where(ProcessingTask.status.in_(RUNNING_STATUSES))
+        )
+        return self.classify(result.all(), now)
+
+    def classify(
+        self,
+        rows: list[tuple[ProcessingTask, str | None]],
+        now: datetime,
+    ) -> tuple[list[IngestJob], list[IngestJob], list[ProcessingTask]]:
+        """
+        Split tasks into queued ones and ones holding a slot.
+
+        Dispatched tasks whose lease has expired are returned for the
+        caller to requeue or fail. One that never started and has retries
+        left is also counted as queued, since it will be requeued.
+
+        Args:
+            rows: (task, owner's role) for tasks in RUNNING_STATUSES
+            now: Current time
+
+        Returns:
+            Queued jobs, running jobs and lease-expired tasks
+        """
+        queued, running, expired = [], [], []
+        for task, role in rows:
+            job = IngestJob(
+                task_id=str(task.id),
+                user_id=str(task.user_id),
+                size=task.file_size_bytes or 0,
+                weight=self.weight_for(role),
+                queued_at=task.created_at,
+            )
+            if task.dispatched_at is None:
+                queued.append(job)
+                continue
+
+            last_progress = max(task.dispatched_at, task.updated_at or task.dispatched_at)
+            if now - last_progress > self.lease:
+                logger.warning(
+                    f"PST task {task.id} ({task.status}) has made no progress since "
+                    f"{last_progress.isoformat()}, releasing its slot"
+                )
+                expired.append(task)
+                if task.status == TaskStatus.PENDING and self._has_retries(task):
+                    queued.append(job)
+                continue
+
+            job.started_at = task.started_at or task.dispatched_at
+            job.remaining_seconds = task.calculate_eta_seconds()
+            running.append(job)
+        return queued, running, expired
+
+
+# Global instance
+ingest_scheduler = IngestScheduler()
+
+
+def get_ingest_scheduler() -> IngestScheduler:
+    """Get the ingest scheduler instance."""
+    return ingest_scheduler
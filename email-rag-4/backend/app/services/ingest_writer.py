@@ -0,0 +1,457 @@
+"""
+Ingest Writer Service
+
+Batches extracted emails and attachments into multi-row INSERTs so PST
+ingestion does one database round trip per batch instead of per email.
+"""
+
+import asyncio
+import json
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+from uuid import uuid4
+
+from loguru import logger
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.models.attachment import Attachment
+from app.db.models.content import AttachmentContent, EmailContent
+from app.db.models.email import Email
+from app.services.attachment_processor import AttachmentProcessor, UnsupportedFormatError
+from app.services.attachment_store import attachment_store
+from app.services.body_segmenter import body_segmenter
+from app.services.extraction_cache import ExtractionCache, ExtractionResult, extraction_cache
+from app.services.extraction_executor import ExtractionExecutor
+from app.services.near_duplicate import NearDuplicateDetector, near_duplicate_detector
+from app.services.pst_processor import ExtractedAttachment, ExtractedEmail
+from app.utils.content_codec import compress_text
+
+sanitize_text_for_db = AttachmentProcessor.sanitize_text_for_db
+
+# Row keys written to the compressed content side tables, not the hot tables
+_EMAIL_CONTENT_KEYS = ("body_html", "headers")
+_ATTACHMENT_CONTENT_KEYS = ("extracted_text",)
+
+
+@dataclass
+class EmailBatch:
+    """Rows for one batch of emails, written once attachment text is resolved."""
+
+    # (email_row, attachment_rows) pairs
+    items: list[tuple[dict[str, Any], list[dict[str, Any]]]] = field(default_factory=list)
+    # Attachment rows awaiting text extraction
+    extractions: list[tuple[dict[str, Any], ExtractedAttachment]] = field(default_factory=list)
+    # Attachment bytes by SHA-256, stored once the batch's rows are inserted
+    blobs: dict[str, bytes] = field(default_factory=dict)
+    # (folder index path, folder path, message index) of the batch's last email
+    position: tuple[list[int], str, int] | None = None
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class EmailBulkWriter:
+    """
+    Accumulates extracted emails into batches and writes them in bulk.
+
+    IDs are assigned client-side so attachment rows can reference their
+    email before anything reaches Postgres. Each batch is written with
+    multi-row INSERTs and committed; afterwards the session's identity map
+    is cleared (except for retained objects such as the ProcessingTask) so
+    memory stays flat regardless of PST size. Attachment text is resolved
+    per batch through the extraction cache.
+
+    ``add``/``flush`` run the steps back to back; the ingest pipeline
+    calls ``add_to_batch``, ``resolve_extractions`` and ``write`` from
+    separate stages instead.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        pst_file_id: str,
+        attachment_processor: AttachmentProcessor,
+        batch_size: int | None = None,
+        retain: list[Any] | None = None,
+        before_commit: Callable[[int], Awaitable[None]] | None = None,
+        cache: ExtractionCache | None = None,
+        executor: ExtractionExecutor | None = None,
+        detector: NearDuplicateDetector | None = None,
+    ):
+        """
+        Initialize the writer.
+
+        Args:
+            db: Session to write through
+            pst_file_id: ProcessingTask ID the emails belong to
+            attachment_processor: Processor used for attachment text extraction
+            batch_size: Emails per batch (default from config)
+            retain: ORM objects to keep attached across batch commits
+            before_commit: Called with the batch's written-email count after the
+                INSERTs and before the commit, so bookkeeping joins the same transaction
+            cache: Extraction result cache (default: global cache)
+            executor: Process pool for parsing; None parses inline
+            detector: Near-duplicate detector (default: global detector if enabled)
+        """
+        self._db = db
+        self.pst_file_id = str(pst_file_id)
+        self._attachment_processor = attachment_processor
+        self.batch_size = batch_size or settings.ingest_batch_size
+        self._retain = retain or []
+        self._before_commit = before_commit
+        self._cache = cache or extraction_cache
+        self._executor = executor
+        if detector is None and settings.near_duplicate_enabled:
+            detector = near_duplicate_detector
+        self._detector = detector
+
+        self._batch = EmailBatch()
+
+        self.emails_written = 0
+        self.emails_failed = 0
+
+        # Resume cursor of the batch being committed (see EmailBatch.position)
+        self.position: tuple[list[int], str, int] | None = None
+
+    @property
+    def pending_count(self) -> int:
+        """Number of emails waiting for the next flush."""
+        return len(self._batch)
+
+    async def add(self, extracted_email: ExtractedEmail) -> int:
+        """
+        Queue an email (and its attachments) for writing.
+
+        Flushes automatically once the batch is full.
+
+        Returns:
+            Number of emails written if a flush happened, else 0
+        """
+        self.add_to_batch(self._batch, extracted_email)
+
+        if len(self._batch) >= self.batch_size:
+            return await self.flush()
+        return 0
+
+    async def flush(self) -> int:
+        """
+        Write and commit all pending rows.
+
+        Returns:
+            Number of emails written
+        """
+        batch, self._batch = self._batch, EmailBatch()
+        if not batch:
+            return 0
+
+        await self.resolve_extractions(batch)
+        return len(await self.write(batch))
+
+    def add_to_batch(self, batch: EmailBatch, extracted_email: ExtractedEmail) -> None:
+        """Build an email's rows and append them (and their attachment bytes) to a batch."""
+        email_row = self._email_row(extracted_email)
+        attachment_rows = [
+            self._attachment_row(email_row["id"], ext_attachment, batch)
+            for ext_attachment in extracted_email.attachments
+        ]
+        batch.items.append((email_row, attachment_rows))
+        batch.position = (
+            extracted_email.folder_index,
+            extracted_email.folder_path,
+            extracted_email.message_index,
+        )
+
+    async def write(
+        self,
+        batch: EmailBatch,
+    ) -> list[tuple[dict[str, Any], list[dict[str, Any]]]]:
+        """
+        Write and commit a batch whose attachment text is resolved.
+
+        A batch that fails as a whole (e.g. one over-long value) is retried
+        row by row so a single bad email doesn't drop its neighbours.
+        Attachment blobs are stored only for rows that were inserted, and
+        blobs new to the store are removed again if the commit fails.
+
+        Returns:
+            The (email_row, attachment_rows) pairs that were written
+        """
+        if not batch:
+            return []
+
+        await self._assign_canonicals(batch)
+
+        try:
+            async with self._db.begin_nested():
+                await self._insert(batch.items)
+            written = list(batch.items)
+        except SQLAlchemyError as e:
+            logger.warning(f"Batch insert of {len(batch)} emails failed, retrying per email: {e}")
+            written = []
+            for item in batch.items:
+                try:
+                    async with self._db.begin_nested():
+                        await self._insert([item])
+                    written.append(item)
+                except SQLAlchemyError as row_error:
+                    logger.error(f"Error writing email {item[0]['message_id']}: {row_error}")
+                    self.emails_failed += 1
+
+        self.emails_written += len(written)
+        self.position = batch.position
+
+        stored = {row["sha256_hash"] for _, rows in written for row in rows}
+        new_blobs = await asyncio.to_thread(
+            _store_blobs, {digest: batch.blobs[digest] for digest in stored}
+        )
+
+        try:
+            if self._before_commit is not None:
+                await self._before_commit(len(written))
+
+            await self._db.commit()
+        except BaseException:
+            # The rows roll back; nothing else references blobs they brought in
+            await asyncio.to_thread(attachment_store.discard, new_blobs)
+            raise
+
+        self._release_session_objects()
+
+        return written
+
+    async def _assign_canonicals(self, batch: EmailBatch) -> None:
+        """Group the batch's near-duplicate emails under existing canonicals."""
+        if self._detector is None:
+            return
+        try:
+            async with self._db.begin_nested():
+                await self._detector.assign_canonicals(
+                    self._db,
+                    self.pst_file_id,
+                    [email_row for email_row, _ in batch.items],
+                    {
+                        email_row["id"]: {row["sha256_hash"] for row in attachment_rows}
+                        for email_row, attachment_rows in batch.items
+                    },
+                )
+        except SQLAlchemyError as e:
+            # Emails stay ungrouped (and are embedded individually)
+            logger.warning(f"Near-duplicate lookup failed: {e}")
+
+    async def _insert(self, items: list[tuple[dict[str, Any], list[dict[str, Any]]]]) -> None:
+        """Issue multi-row INSERTs for emails, then their attachments, then their content."""
+        email_rows = [email_row for email_row, _ in items]
+        attachment_rows = [row for _, rows in items for row in rows]
+
+        await self._db.execute(
+            insert(Email),
+            [_without(row, _EMAIL_CONTENT_KEYS) for row in email_rows],
+        )
+        if attachment_rows:
+            await self._db.execute(
+                insert(Attachment),
+                [_without(row, _ATTACHMENT_CONTENT_KEYS) for row in attachment_rows],
+            )
+
+        email_contents = [
+            {
+                "email_id": row["id"],
+                "body_html_data": compress_text(row["body_html"]),
+                "headers_data": compress_text(row["headers"]),
+            }
+            for row in email_rows
+            if row["body_html"] or row["headers"]
+        ]
+        if email_contents:
+            await self._db.execute(insert(EmailContent), email_contents)
+
+        attachment_contents = [
+            {
+                "attachment_id": row["id"],
+                "extracted_text_data": compress_text(row["extracted_text"]),
+            }
+            for row in attachment_rows
+            if row["extracted_text"]
+        ]
+        if attachment_contents:
+            await self._db.execute(insert(AttachmentContent), attachment_contents)
+
+    def _release_session_objects(self) -> None:
+        """Expunge everything from the session except retained objects."""
+        retained = {id(obj) for obj in self._retain}
+        for obj in list(self._db.identity_map.values()):
+            if id(obj) not in retained:
+                self._db.expunge(obj)
+
+    def _email_row(self, extracted_email: ExtractedEmail) -> dict[str, Any]:
+        """Build the INSERT parameters for an email."""
+        body_text = sanitize_text_for_db(extracted_email.body_text)
+        body_new_text = None
+        if settings.body_segmentation_enabled:
+            body_new_text = body_segmenter.segment(body_text, extracted_email.subject).new_content
+        # Sketch only what would be embedded, so a reply isn't matched on its quoted history
+        minhash_signature, lsh_bands = (
+            self._detector.sketch(body_new_text if body_new_text is not None else body_text)
+            if self._detector is not None
+            else (None, None)
+        )
+
+        return {
+            "id": str(uuid4()),
+            "pst_file_id": self.pst_file_id,
+            "message_id": extracted_email.message_id,
+            "internet_message_id": extracted_email.internet_message_id,
+            "thread_id": extracted_email.thread_id,
+            "in_reply_to": extracted_email.in_reply_to,
+            # References list stored space-separated
+            "references": " ".join(extracted_email.references) if extracted_email.references else None,
+            "sender_email": extracted_email.sender_email,
+            "sender_name": sanitize_text_for_db(extracted_email.sender_name),
+            "to_recipients": extracted_email.to_recipients,
+            "cc_recipients": extracted_email.cc_recipients,
+            "bcc_recipients": extracted_email.bcc_recipients,
+            "subject": sanitize_text_for_db(extracted_email.subject),
+            "body_text": body_text,
+            "body_new_text": body_new_text,
+            "body_html": sanitize_text_for_db(extracted_email.body_html),
+            "sent_date": extracted_email.sent_date,
+            "received_date": extracted_email.received_date,
+            "importance": extracted_email.importance,
+            "is_read": extracted_email.is_read,
+            "has_attachments": extracted_email.has_attachments,
+            "folder_path": sanitize_text_for_db(extracted_email.folder_path),
+            "headers": json.dumps(extracted_email.headers) if extracted_email.headers else None,
+            "sha256_hash": extracted_email.sha256_hash,
+            "minhash_signature": minhash_signature,
+            "lsh_bands": lsh_bands,
+            "duplicate_of": None,
+            "is_embedded": False,
+        }
+
+    def _attachment_row(
+        self,
+        email_id: str,
+        ext_attachment: ExtractedAttachment,
+        batch: EmailBatch,
+    ) -> dict[str, Any]:
+        """Build the INSERT parameters for an attachment and queue its blob."""
+        # Identical attachments share one blob
+        storage_path = str(attachment_store.blob_path(ext_attachment.sha256_hash))
+        batch.blobs.setdefault(ext_attachment.sha256_hash, ext_attachment.content)
+
+        row = {
+            "id": str(uuid4()),
+            "email_id": email_id,
+            "filename": ext_attachment.filename,
+            "content_type": ext_attachment.content_type,
+            "size_bytes": ext_attachment.size_bytes,
+            "md5_hash": ext_attachment.md5_hash,
+            "sha256_hash": ext_attachment.sha256_hash,
+            "storage_path": storage_path,
+            "extracted_text": None,
+            "text_extraction_error": None,
+            "is_extracted": False,
+            "is_embedded": False,
+            "is_inline": False,
+        }
+
+        # Pass content for magic byte detection since filenames may be generic
+        if self._attachment_processor.can_process(
+            ext_attachment.filename,
+            ext_attachment.content_type,
+            ext_attachment.content,
+        ):
+            batch.extractions.append((row, ext_attachment))
+
+        return row
+
+    async def resolve_extractions(
+        self,
+        batch: EmailBatch,
+        db: AsyncSession | None = None,
+    ) -> None:
+        """
+        Fill in extracted text for a batch's attachments.
+
+        Results come from the extraction cache where possible; each
+        remaining distinct hash is parsed once and added to the cache.
+
+        Args:
+            batch: Batch to resolve
+            db: Session for cache reads/writes (default: the writer's session)
+        """
+        extractions, batch.extractions = batch.extractions, []
+        if not extractions:
+            return
+
+        db = db or self._db
+
+        try:
+            async with db.begin_nested():
+                results = await self._cache.get_many(
+                    db,
+                    {attachment.sha256_hash for _, attachment in extractions},
+                )
+        except SQLAlchemyError as e:
+            logger.warning(f"Extraction cache lookup failed: {e}")
+            results = {}
+
+        # One parse per distinct uncached hash
+        misses: dict[str, ExtractedAttachment] = {}
+        for _, attachment in extractions:
+            if attachment.sha256_hash not in results:
+                misses.setdefault(attachment.sha256_hash, attachment)
+
+        if self._executor is not None:
+            parsed = await self._executor.extract_many([
+                (attachment.content, attachment.filename, attachment.content_type)
+                for attachment in misses.values()
+            ])
+        else:
+            parsed = [self._extract(attachment) for attachment in misses.values()]
+
+        fresh = dict(zip(misses, parsed))
+        results.update(fresh)
+        # Timeouts and crashes are retried on the next ingest rather than cached
+        fresh = {digest: result for digest, result in fresh.items() if not result.transient}
+
+        for row, attachment in extractions:
+            result = results[attachment.sha256_hash]
+            row["extracted_text"] = result.text
+            row["text_extraction_error"] = result.error
+            row["is_extracted"] = result.is_extracted
+
+        try:
+            async with db.begin_nested():
+                await self._cache.put_many(db, fresh)
+        except SQLAlchemyError as e:
+            logger.warning(f"Failed to cache extraction results: {e}")
+
+    def _extract(self, attachment: ExtractedAttachment) -> ExtractionResult:
+        """Extract text from one attachment, capturing failures as results."""
+        try:
+            text = self._attachment_processor.extract_text_from_attachment(
+                attachment.content,
+                attachment.filename,
+                attachment.content_type,
+            )
+            return ExtractionResult(text=text)
+        except UnsupportedFormatError as e:
+            return ExtractionResult(text=None, error=str(e))
+        except Exception as e:
+            logger.warning(f"Failed to extract text from {attachment.filename}: {e}")
+            return ExtractionResult(text=None, error=str(e))
+
+
+def _store_blobs(blobs: dict[str, bytes]) -> set[str]:
+    """Write attachment blobs; return the hashes that were new to the store."""
+    return {digest for digest, content in blobs.items() if attachment_store.put(digest, content)[1]}
+
+
+def _without(row: dict[str, Any], keys: tuple[str, ...]) -> dict[str, Any]:
+    """Copy a row without the given keys."""
+    return {key: value for key, value in row.items() if key not in keys}
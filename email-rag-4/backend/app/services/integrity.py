@@ -0,0 +1,274 @@
+"""
+Evidence Integrity Service
+
+Chunk-level integrity for uploaded PST files. At upload the file is
+hashed in fixed-size chunks (the leaves of a Merkle tree) alongside the
+whole-file SHA-256. Verification re-hashes chunks in parallel straight
+from an mmap of the file, so it can report exactly which byte ranges
+changed and can spot-check a random sample of chunks instead of reading
+the whole file.
+
+A sampled fingerprint (file size plus a hash of the head, tail and evenly
+spaced blocks) identifies a file cheaply enough for a browser to compute
+before uploading, so re-submitted evidence can be recognised without
+transferring it.
+"""
+
+import hashlib
+import mmap
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from app.config import settings
+
+DIGEST_SIZE = hashlib.sha256().digest_size
+
+# Domain separation so a leaf can't be passed off as an interior node
+_NODE_PREFIX = b"\x01"
+
+# Sampled fingerprint: head and tail blocks plus this many evenly spaced
+# ones. The frontend computes the same thing (computeFileFingerprint).
+FINGERPRINT_BLOCK_SIZE = 64 * 1024
+FINGERPRINT_STRIDE_BLOCKS = 16
+
+
+class ChunkHasher:
+    """
+    Streaming per-chunk SHA-256.
+
+    Feed the file in reads of any size; a leaf digest is produced every
+    ``chunk_size`` bytes (plus one for the trailing partial chunk).
+    """
+
+    def __init__(self, chunk_size: int | None = None):
+        """
+        Initialize the hasher.
+
+        Args:
+            chunk_size: Bytes per chunk (default from config)
+        """
+        self.chunk_size = chunk_size or settings.integrity_chunk_size
+        self._leaves: list[bytes] = []
+        self._current = hashlib.sha256()
+        self._filled = 0
+
+    def update(self, data: bytes) -> None:
+        """Add the next bytes of the file."""
+        view = memoryview(data)
+        while view:
+            take = min(len(view), self.chunk_size - self._filled)
+            self._current.update(view[:take])
+            self._filled += take
+            view = view[take:]
+            if self._filled == self.chunk_size:
+                self._leaves.append(self._current.digest())
+                self._current = hashlib.sha256()
+                self._filled = 0
+
+    @property
+    def leaves(self) -> list[bytes]:
+        """Get the leaf digests, including the trailing partial chunk."""
+        if self._filled:
+            return self._leaves + [self._current.digest()]
+        return list(self._leaves)
+
+    def packed(self) -> bytes:
+        """Get the leaf digests concatenated, for storage."""
+        return b"".join(self.leaves)
+
+
+def unpack_leaves(packed: bytes) -> list[bytes]:
+    """Split stored leaf digests."""
+    return [packed[i : i + DIGEST_SIZE] for i in range(0, len(packed), DIGEST_SIZE)]
+
+
+def merkle_root(leaves: list[bytes]) -> str:
+    """
+    Compute the Merkle root of leaf digests.
+
+    Interior nodes are SHA-256(0x01 || left || right); an odd node at
+    the end of a level is carried up unchanged.
+    """
+    if not leaves:
+        return hashlib.sha256(b"").hexdigest()
+
+    level = list(leaves)
+    while len(level) > 1:
+        paired = [
+            hashlib.sha256(_NODE_PREFIX + level[i] + level[i + 1]).digest()
+            for i in range(0, len(level) - 1, 2)
+        ]
+        if len(level) % 2:
+            paired.append(level[-1])
+        level = paired
+    return level[0].hex()
+
+
+def fingerprint_ranges(size: int) -> list[tuple[int, int]]:
+    """
+    Get the byte ranges a sampled fingerprint covers, in order.
+
+    Small files are covered whole; otherwise the head block, the tail
+    block and FINGERPRINT_STRIDE_BLOCKS blocks starting at
+    ``size * i // (FINGERPRINT_STRIDE_BLOCKS + 1)``.
+    """
+    block = FINGERPRINT_BLOCK_SIZE
+    if size <= block * (FINGERPRINT_STRIDE_BLOCKS + 2):
+        return [(0, size)]
+
+    stride = FINGERPRINT_STRIDE_BLOCKS + 1
+    starts = [size * i // stride for i in range(1, stride)]
+    return [(0, block)] + [(start, start + block) for start in starts] + [(size - block, size)]
+
+
+def file_fingerprint(path: str | Path) -> str:
+    """
+    Compute the sampled fingerprint of a file.
+
+    SHA-256 of the decimal size and a newline, followed by the bytes of
+    each range from fingerprint_ranges. Reads about 1 MiB whatever the
+    file size; a match is a strong hint, not proof, that two files are
+    the same.
+    """
+    size = Path(path).stat().st_size
+    sha256 = hashlib.sha256(f"{size}\n".encode())
+    with open(path, "rb") as f:
+        for start, end in fingerprint_ranges(size):
+            f.seek(start)
+            sha256.update(f.read(end - start))
+    return sha256.hexdigest()
+
+
+@dataclass
+class IntegrityReport:
+    """Result of verifying a file against its recorded chunk hashes."""
+
+    is_valid: bool
+    chunks_total: int
+    chunks_checked: int
+    sampled: bool
+    size_matches: bool
+    # Recorded leaves reproduce the recorded Merkle root
+    tree_matches: bool
+    # Half-open [start, end) byte ranges whose content changed
+    changed_ranges: list[tuple[int, int]] = field(default_factory=list)
+
+
+class IntegrityVerifier:
+    """Verifies files against recorded per-chunk hashes."""
+
+    def __init__(self, workers: int | None = None):
+        """
+        Initialize the verifier.
+
+        Args:
+            workers: Threads hashing chunks in parallel (default from config)
+        """
+        self.workers = workers or settings.integrity_verify_workers
+
+    def verify(
+        self,
+        path: str | Path,
+        chunk_size: int,
+        packed_leaves: bytes,
+        expected_root: str,
+        expected_size: int,
+        sample: int | None = None,
+    ) -> IntegrityReport:
+        """
+        Verify a file against the chunk hashes recorded at upload.
+
+        Args:
+            path: File to verify
+            chunk_size: Chunk size the leaves were recorded with
+            packed_leaves: Recorded leaf digests (ChunkHasher.packed)
+            expected_root: Recorded Merkle root
+            expected_size: Recorded file size in bytes
+            sample: Check only this many randomly chosen chunks
+
+        Returns:
+            IntegrityReport
+        """
+        leaves = unpack_leaves(packed_leaves)
+        tree_matches = merkle_root(leaves) == expected_root
+        actual_size = Path(path).stat().st_size
+
+        indexes = list(range(len(leaves)))
+        sampled = sample is not None and sample < len(leaves)
+        if sampled:
+            indexes = sorted(secrets.SystemRandom().sample(indexes, sample))
+
+        actual = self._hash_chunks(path, chunk_size, indexes, actual_size)
+
+        changed = [i for i, digest in zip(indexes, actual) if digest != leaves[i]]
+        ranges = [(i * chunk_size, min((i + 1) * chunk_size, expected_size)) for i in changed]
+        if actual_size != expected_size:
+            # Truncated or extended: everything past the shorter length differs
+            start = min(actual_size, expected_size)
+            ranges.append((start, max(actual_size, expected_size)))
+
+        return IntegrityReport(
+            is_valid=tree_matches and not ranges,
+            chunks_total=len(leaves),
+            chunks_checked=len(indexes),
+            sampled=sampled,
+            size_matches=actual_size == expected_size,
+            tree_matches=tree_matches,
+            changed_ranges=_merge_ranges(ranges),
+        )
+
+    def _hash_chunks(
+        self,
+        path: str | Path,
+        chunk_size: int,
+        indexes: list[int],
+        file_size: int,
+    ) -> list[bytes | None]:
+        """Hash the given chunks from an mmap; None for chunks past EOF."""
+        if file_size == 0:
+            return [hashlib.sha256(b"").digest() if i == 0 else None for i in indexes]
+
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                def hash_chunk(index: int) -> bytes | None:
+                    start = index * chunk_size
+                    if start >= file_size:
+                        return None
+                    # hashlib releases the GIL on large buffers, so threads scale
+                    return hashlib.sha256(view[start : start + chunk_size]).digest()
+
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    return list(pool.map(hash_chunk, indexes))
+            finally:
+                view.release()
+
+    def file_sha256(self, path: str | Path, read_size: int = 8 * 1024 * 1024) -> str:
+        """Hash a whole file (for evidence recorded before chunk hashes)."""
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(read_size):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+
+def _merge_ranges(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Merge overlapping or adjacent byte ranges."""
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+# Global instance
+integrity_verifier = IntegrityVerifier()
+
+
+def get_integrity_verifier() -> IntegrityVerifier:
+    """Get the integrity verifier instance."""
+    return integrity_verifier
@@ -0,0 +1,465 @@
+"""
+Near-Duplicate Detection Service
+
+Groups near-identical emails (the same message in Sent Items, every
+recipient's Inbox and forwarded copies across custodians) under one
+canonical email using MinHash signatures and locality-sensitive hashing.
+Only canonical emails are embedded; search collapses each group.
+
+Signatures cover an email's new content (quoted history excluded), and an
+email is only grouped under a canonical that already holds all of its
+words and attachments, since a duplicate's own content is never embedded.
+"""
+
+import hashlib
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+from loguru import logger
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.config import settings
+from app.db.models.attachment import Attachment
+from app.db.models.email import Email
+from app.db.models.processing_task import ProcessingTask
+
+# Mersenne prime modulus for the universal hash permutations
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Shingles hashed per numpy step
+_SHINGLE_CHUNK = 4096
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+@dataclass
+class _Candidate:
+    """An email that later emails may be grouped under."""
+
+    email_id: str
+    canonical_id: str
+    signature: np.ndarray
+
+
+@dataclass
+class StandIn:
+    """A canonical's near-duplicate that represents it inside a PST filter."""
+
+    email_id: str
+    pst_file_id: str
+    folder_path: str | None
+    sent_date: datetime | None
+
+
+@dataclass
+class _Contents:
+    """What a canonical email makes searchable: its words and attachments."""
+
+    words: set[str]
+    attachments: set[str] = field(default_factory=set)
+
+
+def _sketch_text(row: dict[str, Any]) -> str | None:
+    """The part of an email row that is sketched: new content when segmented."""
+    if row.get("body_new_text") is not None:
+        return row["body_new_text"]
+    return row.get("body_text")
+
+
+class NearDuplicateDetector:
+    """
+    MinHash/LSH near-duplicate detector.
+
+    Signatures hold ``num_perm`` 32-bit minimum hashes over word shingles
+    of the normalized body. They are split into ``bands`` bands whose
+    hashes are stored (GIN-indexed) so candidates are found with one
+    array-overlap query per batch; candidates are then confirmed by
+    estimated Jaccard similarity.
+    """
+
+    def __init__(
+        self,
+        threshold: float | None = None,
+        min_words: int | None = None,
+        num_perm: int = 128,
+        bands: int = 16,
+        shingle_size: int = 5,
+        seed: int = 1,
+    ):
+        """
+        Initialize the detector.
+
+        Args:
+            threshold: Minimum estimated Jaccard similarity (default from config)
+            min_words: Bodies with fewer words are never grouped (default from config)
+            num_perm: Number of hash permutations in a signature
+            bands: LSH bands; must divide num_perm
+            shingle_size: Words per shingle
+            seed: Seed for the permutation parameters (changing it invalidates stored signatures)
+        """
+        if num_perm % bands:
+            raise ValueError("bands must divide num_perm")
+
+        self.threshold = threshold or settings.near_duplicate_threshold
+        self.min_words = min_words or settings.near_duplicate_min_words
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    # ===========================================
+    # Signatures
+    # ===========================================
+
+    def normalize(self, text: str | None) -> list[str]:
+        """Lowercased words of a body, ignoring quoted (``>``) lines."""
+        if not text:
+            return []
+        lines = (line for line in text.splitlines() if not line.lstrip().startswith(">"))
+        return _WORD_PATTERN.findall("\n".join(lines).lower())
+
+    def signature(self, text: str | None) -> np.ndarray | None:
+        """Compute a MinHash signature, or None if the body is too short."""
+        words = self.normalize(text)
+        if len(words) < self.min_words:
+            return None
+
+        shingles = {
+            " ".join(words[i : i + self.shingle_size])
+            for i in range(len(words) - self.shingle_size + 1)
+        }
+        hashes = np.fromiter(
+            (
+                int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little")
+                for s in shingles
+            ),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+
+        # (a * h + b) mod p for every permutation/shingle pair; a, h < 2**32 so no
+        # overflow. Chunked so very long bodies don't allocate a huge matrix.
+        signature = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        for start in range(0, len(hashes), _SHINGLE_CHUNK):
+            chunk = hashes[start : start + _SHINGLE_CHUNK]
+            permuted = (np.outer(chunk, self._a) + self._b) % _MERSENNE_PRIME
+            np.minimum(signature, (permuted & _MAX_HASH).min(axis=0), out=signature)
+        return signature.astype(np.uint32)
+
+    def band_hashes(self, signature: np.ndarray) -> list[int]:
+        """Hash each band of a signature to a signed 64-bit integer."""
+        return [
+            int.from_bytes(
+                hashlib.blake2b(
+                    band.tobytes(),
+                    digest_size=8,
+                    person=index.to_bytes(2, "little"),
+                ).digest(),
+                "little",
+                signed=True,
+            )
+            for index, band in enumerate(signature.reshape(self.bands, self.rows_per_band))
+        ]
+
+    def sketch(self, text: str | None) -> tuple[bytes | None, list[int] | None]:
+        """Get the (packed signature, band hashes) to store for a body."""
+        signature = self.signature(text)
+        if signature is None:
+            return None, None
+        return signature.tobytes(), self.band_hashes(signature)
+
+    @staticmethod
+    def similarity(signature_a: np.ndarray, signature_b: np.ndarray) -> float:
+        """Estimate Jaccard similarity from two signatures."""
+        return float(np.mean(signature_a == signature_b))
+
+    # ===========================================
+    # Grouping
+    # ===========================================
+
+    async def assign_canonicals(
+        self,
+        db: AsyncSession,
+        pst_file_id: str,
+        email_rows: list[dict[str, Any]],
+        attachment_hashes: dict[str, set[str]] | None = None,
+    ) -> int:
+        """
+        Point each near-duplicate in a batch at its canonical email.
+
+        Candidates are the owner's existing emails (across all their PSTs)
+        plus earlier emails in the batch. A row is grouped under the most
+        similar canonical whose new content contains all of the row's
+        words and whose attachments include all of the row's. Sets
+        ``duplicate_of`` on the rows in place; rows without a signature
+        are left alone.
+
+        Args:
+            db: Database session
+            pst_file_id: ProcessingTask ID the rows belong to
+            email_rows: Email rows of the batch, in order
+            attachment_hashes: SHA-256 hashes of each row's attachments, by email ID
+
+        Returns:
+            Number of rows grouped under a canonical email
+        """
+        attachment_hashes = attachment_hashes or {}
+        sketched = [row for row in email_rows if row.get("lsh_bands")]
+        if not sketched:
+            return 0
+
+        owner = (
+            select(ProcessingTask.user_id)
+            .where(ProcessingTask.id == pst_file_id)
+            .scalar_subquery()
+        )
+        all_bands = sorted({band for row in sketched for band in row["lsh_bands"]})
+        result = await db.execute(
+            select(Email.id, Email.duplicate_of, Email.minhash_signature, Email.lsh_bands)
+            .join(ProcessingTask, Email.pst_file_id == ProcessingTask.id)
+            .where(
+                ProcessingTask.user_id == owner,
+                Email.lsh_bands.overlap(all_bands),
+            )
+        )
+
+        index: dict[int, list[_Candidate]] = defaultdict(list)
+
+        def add_candidate(email_id: str, canonical_id: str, signature: np.ndarray, bands: list[int]):
+            candidate = _Candidate(str(email_id), str(canonical_id), signature)
+            for band in bands:
+                index[band].append(candidate)
+
+        for email_id, duplicate_of, packed, bands in result.all():
+            add_candidate(
+                email_id,
+                duplicate_of or email_id,
+                np.frombuffer(packed, dtype=np.uint32),
+                bands,
+            )
+
+        def matches(row: dict[str, Any], signature: np.ndarray) -> list[_Candidate]:
+            """Candidates above the threshold, most similar first."""
+            scored: dict[str, tuple[float, _Candidate]] = {}
+            for band in row["lsh_bands"]:
+                for candidate in index.get(band, ()):
+                    if candidate.email_id not in scored:
+                        score = self.similarity(signature, candidate.signature)
+                        scored[candidate.email_id] = (score, candidate)
+            ranked = sorted(scored.values(), key=lambda pair: pair[0], reverse=True)
+            return [candidate for score, candidate in ranked if score >= self.threshold]
+
+        signatures = {
+            row["id"]: np.frombuffer(row["minhash_signature"], dtype=np.uint32) for row in sketched
+        }
+        # Contents of the stored canonicals the batch could be grouped under
+        contents = await self._load_contents(
+            db,
+            {
+                candidate.canonical_id
+                for row in sketched
+                for candidate in matches(row, signatures[row["id"]])
+            },
+        )
+
+        grouped = 0
+        for row in sketched:
+            signature = signatures[row["id"]]
+            words = set(self.normalize(_sketch_text(row)))
+            attachments = attachment_hashes.get(row["id"], set())
+
+            for candidate in matches(row, signature):
+                canonical = contents.get(candidate.canonical_id)
+                if (
+                    canonical is not None
+                    and words <= canonical.words
+                    and attachments <= canonical.attachments
+                ):
+                    row["duplicate_of"] = candidate.canonical_id
+                    grouped += 1
+                    break
+            else:
+                contents[row["id"]] = _Contents(words, set(attachments))
+
+            add_candidate(row["id"], row.get("duplicate_of") or row["id"], signature, row["lsh_bands"])
+
+        return grouped
+
+    async def _load_contents(
+        self,
+        db: AsyncSession,
+        canonical_ids: set[str],
+    ) -> dict[str, _Contents]:
+        """Load the words and attachment hashes of stored canonical emails."""
+        if not canonical_ids:
+            return {}
+
+        result = await db.execute(
+            select(Email.id, func.coalesce(Email.body_new_text, Email.body_text))
+            .where(Email.id.in_(canonical_ids))
+        )
+        contents = {
+            str(email_id): _Contents(set(self.normalize(text)))
+            for email_id, text in result.all()
+        }
+
+        result = await db.execute(
+            select(Attachment.email_id, Attachment.sha256_hash)
+            .where(Attachment.email_id.in_(canonical_ids))
+        )
+        for email_id, sha256_hash in result.all():
+            if str(email_id) in contents:
+                contents[str(email_id)].attachments.add(sha256_hash)
+
+        return contents
+
+    async def release_canonicals(
+        self,
+        db: AsyncSession,
+        pst_file_id: str,
+    ) -> dict[str, list[str]]:
+        """
+        Regroup emails whose canonical is about to be deleted with its PST.
+
+        For each affected group the oldest surviving member becomes the
+        new canonical and is marked unembedded (and no longer counted as
+        searchable) so it can be embedded in the canonical's place. Call
+        before deleting the PST's emails, in the same transaction.
+
+        Returns:
+            Promoted email IDs keyed by their PST file ID, for embedding
+        """
+        doomed = select(Email.id).where(Email.pst_file_id == pst_file_id)
+        result = await db.execute(
+            select(Email.id, Email.pst_file_id, Email.duplicate_of, Email.is_embedded)
+            .where(
+                Email.duplicate_of.in_(doomed),
+                Email.pst_file_id != pst_file_id,
+            )
+            .order_by(Email.duplicate_of, Email.created_at)
+        )
+
+        groups: dict[str, list] = defaultdict(list)
+        for row in result.all():
+            groups[str(row.duplicate_of)].append(row)
+
+        promoted: dict[str, list[str]] = defaultdict(list)
+        unsearchable: dict[str, int] = defaultdict(int)
+
+        for members in groups.values():
+            canonical, rest = members[0], members[1:]
+            await db.execute(
+                update(Email)
+                .where(Email.id == canonical.id)
+                .values(duplicate_of=None, is_embedded=False, embedding_id=None)
+            )
+            if rest:
+                await db.execute(
+                    update(Email)
+                    .where(Email.id.in_([member.id for member in rest]))
+                    .values(duplicate_of=canonical.id, embedding_id=str(canonical.id))
+                )
+            promoted[str(canonical.pst_file_id)].append(str(canonical.id))
+            if canonical.is_embedded:
+                unsearchable[str(canonical.pst_file_id)] += 1
+
+        for task_id, count in unsearchable.items():
+            await db.execute(
+                update(ProcessingTask)
+                .where(ProcessingTask.id == task_id)
+                .values(emails_searchable=ProcessingTask.emails_searchable - count)
+            )
+
+        if promoted:
+            logger.info(
+                f"Promoted {sum(map(len, promoted.values()))} near-duplicate emails "
+                f"to canonical before deleting {pst_file_id}"
+            )
+        return dict(promoted)
+
+
+# ===========================================
+# PST-filtered search
+# ===========================================
+
+async def canonical_pst_ids(db: AsyncSession, pst_file_ids: list[str]) -> list[str]:
+    """
+    Get other PSTs holding canonicals of near-duplicates in the given PSTs.
+
+    Near-duplicates aren't embedded, so a PST-filtered vector search has
+    to include these PSTs and map their hits back with ``load_stand_ins``.
+    """
+    canonical = aliased(Email)
+    result = await db.execute(
+        select(canonical.pst_file_id)
+        .join(Email, Email.duplicate_of == canonical.id)
+        .where(
+            Email.pst_file_id.in_(pst_file_ids),
+            canonical.pst_file_id.notin_(pst_file_ids),
+        )
+        .distinct()
+    )
+    return [str(pst_file_id) for pst_file_id in result.scalars().all()]
+
+
+async def load_stand_ins(
+    db: AsyncSession,
+    canonical_ids: list[str],
+    pst_file_ids: list[str],
+) -> dict[str, StandIn]:
+    """
+    Get each canonical's first near-duplicate inside the given PSTs.
+
+    Args:
+        db: Database session
+        canonical_ids: Canonical emails found outside the PSTs
+        pst_file_ids: PSTs the search is restricted to
+
+    Returns:
+        Stand-ins keyed by canonical email ID; canonicals without a
+        duplicate in the PSTs are missing
+    """
+    if not canonical_ids:
+        return {}
+
+    result = await db.execute(
+        select(
+            Email.duplicate_of,
+            Email.id,
+            Email.pst_file_id,
+            Email.folder_path,
+            Email.sent_date,
+        )
+        .where(
+            Email.duplicate_of.in_(canonical_ids),
+            Email.pst_file_id.in_(pst_file_ids),
+        )
+        .order_by(Email.created_at)
+    )
+    stand_ins: dict[str, StandIn] = {}
+    for canonical_id, email_id, pst_file_id, folder_path, sent_date in result.all():
+        stand_ins.setdefault(
+            str(canonical_id),
+            StandIn(str(email_id), str(pst_file_id), folder_path, sent_date),
+        )
+    return stand_ins
+
+
+# Global instance
+near_duplicate_detector = NearDuplicateDetector()
+
+
+def get_near_duplicate_detector() -> NearDuplicateDetector:
+    """Get the near-duplicate detector instance."""
+    return near_duplicate_detector
@@ -6,14 +6,19 @@ Uses pypff library for PST parsing.
 """
 
 import hashlib
-from dataclasses import dataclass, field
+import heapq
+import re
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
+from functools import cached_property
 from pathlib import Path
 from typing import Any, Generator
 from uuid import UUID
 
 from loguru import logger
 
+from app.utils.html_text import html_to_text
+
 
 @dataclass
 class ExtractedAttachment:
@@ -53,6 +58,219 @@ class ExtractedEmail:
     references: list[str] = field(default_factory=list)
     thread_id: str | None = None
     attachments: list[ExtractedAttachment] = field(default_factory=list)
+    # Position in the PST, used as the resume cursor
+    folder_index: list[int] = field(default_factory=list)
+    message_index: int = 0
+
+
+@dataclass
+class FolderManifestEntry:
+    """
+    One folder in a PST's folder manifest.
+
+    The manifest is built in a single walk and lists folders depth-first;
+    ``index_path`` is the handle used to resolve the folder again.
+    """
+
+    index_path: list[int]
+    path: str
+    message_count: int
+    sub_folder_count: int
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize for JSON storage."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "FolderManifestEntry":
+        """Deserialize from JSON storage."""
+        return cls(
+            index_path=list(data["index_path"]),
+            path=data["path"],
+            message_count=data["message_count"],
+            sub_folder_count=data["sub_folder_count"],
+        )
+
+
+@dataclass
+class FolderShard:
+    """
+    A group of PST folders extracted together by one ingestion sub-task.
+
+    Folders are addressed by their sub-folder index path from the root
+    folder (e.g. ``[0, 3]`` is the fourth sub-folder of the first
+    top-level folder), which stays stable across separate opens of the
+    same PST file and is JSON-serializable for Celery.
+    """
+
+    index: int
+    folders: list[list[int]] = field(default_factory=list)
+    message_count: int = 0
+
+
+# Quoted display names in address lists
+_QUOTED_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+
+
+def _parse_message_id_list(value: str) -> list[str]:
+    """Parse a References-style header into a list of <message-id> tokens."""
+    if not value:
+        return []
+
+    # References are space-separated message IDs
+    refs = []
+    for ref in value.split():
+        ref = ref.strip()
+        if ref.startswith("<") and ref.endswith(">"):
+            refs.append(ref)
+        elif ref:
+            refs.append(f"<{ref}>")
+
+    return refs
+
+
+class MessageHeaders:
+    """
+    Parsed view of a message's transport headers.
+
+    The raw header blob is decoded and split once; RFC 5322 folded
+    continuation lines are unfolded into their header. Structured
+    accessors (addresses, message IDs) are computed lazily and cached.
+    """
+
+    def __init__(self, raw: str | bytes | None):
+        """
+        Parse transport headers.
+
+        Args:
+            raw: Transport header block as returned by pypff
+        """
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8", errors="replace")
+
+        self._fields: dict[str, list[str]] = {}
+
+        if not raw:
+            return
+
+        fields = self._fields
+        name = ""
+        parts: list[str] | None = None
+
+        for line in raw.split("\n"):
+            if line[:1] in (" ", "\t"):
+                # Folded continuation line (RFC 5322 section 2.2.3)
+                if parts is not None:
+                    parts.append(line.rstrip("\r"))
+                continue
+
+            if parts is not None:
+                fields.setdefault(name, []).append("".join(parts).strip())
+                parts = None
+
+            if not line.strip():
+                # A blank line terminates the header block
+                if fields:
+                    break
+                continue
+
+            key, sep, value = line.partition(":")
+            if sep:
+                name = key.strip().lower()
+                parts = [value.rstrip("\r")]
+
+        if parts is not None:
+            fields.setdefault(name, []).append("".join(parts).strip())
+
+    @classmethod
+    def from_message(cls, message) -> "MessageHeaders":
+        """Build the header view for a pypff message."""
+        try:
+            return cls(message.get_transport_headers())
+        except Exception:
+            return cls(None)
+
+    def get(self, name: str, default: str | None = None) -> str | None:
+        """Get the last value of a header (case-insensitive)."""
+        values = self._fields.get(name.lower())
+        return values[-1] if values else default
+
+    def get_all(self, name: str) -> list[str]:
+        """Get every value of a repeated header (e.g. Received)."""
+        return list(self._fields.get(name.lower(), []))
+
+    def as_dict(self) -> dict[str, str]:
+        """Flatten to a name -> last value mapping."""
+        return {name: values[-1] for name, values in self._fields.items()}
+
+    def __bool__(self) -> bool:
+        return bool(self._fields)
+
+    def _addresses(self, name: str) -> list[str]:
+        """Parse an address-list header into bare email addresses."""
+        values = self._fields.get(name)
+        if not values:
+            return []
+
+        addresses = []
+        for value in values:
+            # Drop quoted display names so commas inside them don't split
+            if '"' in value:
+                value = _QUOTED_STRING.sub("", value)
+            for part in value.split(","):
+                if "<" in part and ">" in part:
+                    addr = part[part.index("<") + 1 : part.index(">")].strip()
+                else:
+                    addr = part.strip()
+                if "@" in addr:
+                    addresses.append(addr)
+
+        return addresses
+
+    @cached_property
+    def from_address(self) -> str:
+        """Sender address from the From header."""
+        addresses = self._addresses("from")
+        return addresses[0] if addresses else ""
+
+    @cached_property
+    def to_addresses(self) -> list[str]:
+        """Addresses from the To header."""
+        return self._addresses("to")
+
+    @cached_property
+    def cc_addresses(self) -> list[str]:
+        """Addresses from the Cc header."""
+        return self._addresses("cc")
+
+    @cached_property
+    def bcc_addresses(self) -> list[str]:
+        """Addresses from the Bcc header."""
+        return self._addresses("bcc")
+
+    @cached_property
+    def message_id(self) -> str:
+        """Message-ID header value."""
+        return self.get("message-id", "") or ""
+
+    @cached_property
+    def in_reply_to(self) -> str | None:
+        """In-Reply-To header value."""
+        return self.get("in-reply-to")
+
+    @cached_property
+    def references(self) -> list[str]:
+        """References header as a list of message IDs."""
+        return _parse_message_id_list(self.get("references", "") or "")
+
+    def recipients(self, recipient_type: str) -> list[str]:
+        """Addresses for a recipient type ("to", "cc" or "bcc")."""
+        addresses = {
+            "to": self.to_addresses,
+            "cc": self.cc_addresses,
+            "bcc": self.bcc_addresses,
+        }.get(recipient_type.lower(), [])
+        return list(addresses)
 
 
 class PSTProcessorError(Exception):
@@ -162,28 +380,116 @@ class PSTProcessor:
         Returns:
             Total number of emails
         """
+        return sum(entry.message_count for entry in self.build_folder_manifest())
+
+    def build_folder_manifest(self) -> list[FolderManifestEntry]:
+        """
+        Walk the folder tree once, recording each folder's path and counts.
+
+        Only folder metadata is read, no messages, so this is cheap even for
+        very large PSTs. The result serves progress totals, shard planning
+        and folder listings without further traversals.
+
+        Returns:
+            Manifest entries in depth-first order (root first)
+        """
         if self._pst_file is None:
-            return 0
+            return []
 
-        count = 0
+        manifest: list[FolderManifestEntry] = []
         root = self._pst_file.get_root_folder()
-        count = self._count_folder_emails(root)
-        return count
+        self._walk_folders(root, [], "", manifest)
+        return manifest
 
-    def _count_folder_emails(self, folder) -> int:
-        """Recursively count emails in a folder."""
-        count = folder.get_number_of_sub_messages()
+    def _walk_folders(
+        self,
+        folder,
+        index_path: list[int],
+        parent_path: str,
+        manifest: list[FolderManifestEntry],
+    ) -> None:
+        """Append a folder and its sub-folders to the manifest, depth-first."""
+        folder_name = folder.get_name() or "Root"
+        current_path = f"{parent_path}/{folder_name}" if parent_path else folder_name
+        sub_folder_count = folder.get_number_of_sub_folders()
 
-        for i in range(folder.get_number_of_sub_folders()):
-            sub_folder = folder.get_sub_folder(i)
-            count += self._count_folder_emails(sub_folder)
+        manifest.append(FolderManifestEntry(
+            index_path=index_path,
+            path=current_path,
+            message_count=folder.get_number_of_sub_messages(),
+            sub_folder_count=sub_folder_count,
+        ))
+
+        for i in range(sub_folder_count):
+            self._walk_folders(folder.get_sub_folder(i), index_path + [i], current_path, manifest)
+
+    def plan_folder_shards(
+        self,
+        max_shards: int,
+        manifest: list[FolderManifestEntry] | None = None,
+    ) -> list[FolderShard]:
+        """
+        Split the folder tree into message-count balanced shards.
+
+        Uses longest-processing-time-first greedy assignment: folders are
+        taken largest first and each goes to the currently lightest shard.
+        Empty folders are skipped. Within a shard, folders keep their
+        depth-first order so extraction order is deterministic.
+
+        Args:
+            max_shards: Upper bound on the number of shards to create
+            manifest: Folder manifest to plan from (built if not given)
+
+        Returns:
+            Non-empty shards, ordered by shard index
+        """
+        if max_shards < 1:
+            return []
+
+        if manifest is None:
+            manifest = self.build_folder_manifest()
+
+        folders = [
+            (order, entry.index_path, entry.message_count)
+            for order, entry in enumerate(manifest)
+            if entry.message_count > 0
+        ]
+
+        shard_count = min(max_shards, len(folders))
+        if shard_count == 0:
+            return []
+
+        shards = [FolderShard(index=i) for i in range(shard_count)]
+        assigned: list[list[tuple[int, list[int]]]] = [[] for _ in range(shard_count)]
+        heap = [(0, i) for i in range(shard_count)]
+
+        for order, index_path, count in sorted(folders, key=lambda f: (-f[2], f[0])):
+            load, shard_index = heapq.heappop(heap)
+            assigned[shard_index].append((order, index_path))
+            shards[shard_index].message_count += count
+            heapq.heappush(heap, (load + count, shard_index))
+
+        for shard, folder_refs in zip(shards, assigned):
+            shard.folders = [index_path for _, index_path in sorted(folder_refs)]
+
+        return shards
+
+    def _resolve_folder(self, index_path: list[int]) -> tuple[Any, str]:
+        """Resolve a sub-folder index path to (folder, folder_path)."""
+        folder = self._pst_file.get_root_folder()
+        current_path = folder.get_name() or "Root"
+
+        for i in index_path:
+            folder = folder.get_sub_folder(i)
+            current_path = f"{current_path}/{folder.get_name() or 'Root'}"
 
-        return count
+        return folder, current_path
 
     def extract_emails(
         self,
         include_attachments: bool = True,
         max_attachment_size: int = 50 * 1024 * 1024,  # 50MB
+        resume_from: tuple[list[int], int] | None = None,
     ) -> Generator[ExtractedEmail, None, None]:
         """
         Extract all emails from the PST file.
@@ -191,6 +497,8 @@ class PSTProcessor:
         Args:
             include_attachments: Whether to include attachment content
             max_attachment_size: Maximum attachment size to extract (bytes)
+            resume_from: (folder index path, message index) of the last
+                message already stored; extraction continues after it
 
         Yields:
             ExtractedEmail objects
@@ -205,21 +513,131 @@ class PSTProcessor:
             "",
             include_attachments,
             max_attachment_size,
+            [],
+            resume_from,
         )
 
+    def extract_emails_from_folders(
+        self,
+        folders: list[list[int]],
+        include_attachments: bool = True,
+        max_attachment_size: int = 50 * 1024 * 1024,  # 50MB
+        resume_from: tuple[list[int], int] | None = None,
+    ) -> Generator[ExtractedEmail, None, None]:
+        """
+        Extract emails from specific folders only (sub-folders are not descended).
+
+        Args:
+            folders: Sub-folder index paths, as produced by plan_folder_shards
+            include_attachments: Whether to include attachment content
+            max_attachment_size: Maximum attachment size to extract (bytes)
+            resume_from: (folder index path, message index) of the last
+                message already stored; earlier folders are skipped
+
+        Yields:
+            ExtractedEmail objects
+        """
+        if self._pst_file is None:
+            logger.warning("PST file not opened, cannot extract emails")
+            return
+
+        start_folder = 0
+        start_message = 0
+        if resume_from is not None:
+            resume_folder, resume_message = resume_from
+            if list(resume_folder) in folders:
+                start_folder = folders.index(list(resume_folder))
+                start_message = resume_message + 1
+            else:
+                logger.warning(f"Resume folder {resume_folder} not in shard, starting over")
+
+        for position, index_path in enumerate(folders[start_folder:], start_folder):
+            try:
+                folder, current_path = self._resolve_folder(index_path)
+            except Exception as e:
+                logger.error(f"Error resolving folder {index_path}: {e}")
+                continue
+
+            yield from self._extract_folder_messages(
+                folder,
+                current_path,
+                include_attachments,
+                max_attachment_size,
+                index_path,
+                start_message if position == start_folder else 0,
+            )
+
     def _extract_folder_emails(
         self,
         folder,
         folder_path: str,
         include_attachments: bool,
         max_attachment_size: int,
+        index_path: list[int] | None = None,
+        resume_from: tuple[list[int], int] | None = None,
     ) -> Generator[ExtractedEmail, None, None]:
-        """Recursively extract emails from a folder."""
+        """
+        Recursively extract emails from a folder.
+
+        Folders are visited depth-first with a folder's own messages before
+        its sub-folders, i.e. in lexicographic order of index paths, so a
+        resume cursor splits the walk into "done" and "to do" by comparison.
+        """
+        index_path = index_path or []
         folder_name = folder.get_name() or "Root"
         current_path = f"{folder_path}/{folder_name}" if folder_path else folder_name
 
-        # Extract messages in this folder
-        for i in range(folder.get_number_of_sub_messages()):
+        # Messages in this folder: all, the tail after the cursor, or none
+        # (a folder on the way down to the cursor folder is already done)
+        start = 0
+        if resume_from is not None:
+            resume_folder, resume_message = resume_from
+            if index_path == resume_folder:
+                start = resume_message + 1
+            elif index_path < resume_folder:
+                start = None
+
+        if start is not None:
+            yield from self._extract_folder_messages(
+                folder,
+                current_path,
+                include_attachments,
+                max_attachment_size,
+                index_path,
+                start,
+            )
+
+        # Process sub-folders, skipping subtrees entirely before the cursor
+        for i in range(folder.get_number_of_sub_folders()):
+            sub_path = index_path + [i]
+            if (
+                resume_from is not None
+                and sub_path < resume_from[0]
+                and resume_from[0][: len(sub_path)] != sub_path
+            ):
+                continue
+
+            sub_folder = folder.get_sub_folder(i)
+            yield from self._extract_folder_emails(
+                sub_folder,
+                current_path,
+                include_attachments,
+                max_attachment_size,
+                sub_path,
+                resume_from,
+            )
+
+    def _extract_folder_messages(
+        self,
+        folder,
+        current_path: str,
+        include_attachments: bool,
+        max_attachment_size: int,
+        index_path: list[int] | None = None,
+        start: int = 0,
+    ) -> Generator[ExtractedEmail, None, None]:
+        """Extract the messages directly inside a folder, from index ``start``."""
+        for i in range(start, folder.get_number_of_sub_messages()):
             try:
                 message = folder.get_sub_message(i)
                 email = self._extract_message(
@@ -229,22 +647,14 @@ class PSTProcessor:
                     max_attachment_size,
                 )
                 if email:
+                    email.folder_index = list(index_path or [])
+                    email.message_index = i
                     self._email_count += 1
                     yield email
             except Exception as e:
                 logger.error(f"Error extracting message {i} from {current_path}: {e}")
                 continue
 
-        # Process sub-folders
-        for i in range(folder.get_number_of_sub_folders()):
-            sub_folder = folder.get_sub_folder(i)
-            yield from self._extract_folder_emails(
-                sub_folder,
-                current_path,
-                include_attachments,
-                max_attachment_size,
-            )
-
     def _extract_message(
         self,
         message,
@@ -254,15 +664,18 @@ class PSTProcessor:
     ) -> ExtractedEmail | None:
         """Extract a single message."""
         try:
+            # Parse transport headers once for all header-derived fields
+            parsed_headers = MessageHeaders.from_message(message)
+
             # Get basic properties
             subject = message.get_subject() or ""
-            sender_email = self._get_sender_email(message)
+            sender_email = self._get_sender_email(message, parsed_headers)
             sender_name = message.get_sender_name() or ""
 
             # Get recipients
-            to_recipients = self._get_recipients(message, "to")
-            cc_recipients = self._get_recipients(message, "cc")
-            bcc_recipients = self._get_recipients(message, "bcc")
+            to_recipients = self._get_recipients(message, "to", parsed_headers)
+            cc_recipients = self._get_recipients(message, "cc", parsed_headers)
+            bcc_recipients = self._get_recipients(message, "bcc", parsed_headers)
 
             # Get body - try plain text first, then extract from HTML
             body_text = message.get_plain_text_body() or ""
@@ -282,12 +695,12 @@ class PSTProcessor:
             received_date = self._parse_date(message.get_delivery_time())
 
             # Get headers
-            headers = self._extract_headers(message)
+            headers = parsed_headers.as_dict()
 
             # Get message IDs
-            internet_message_id = headers.get("message-id", "")
-            in_reply_to = headers.get("in-reply-to")
-            references = self._parse_references(headers.get("references", ""))
+            internet_message_id = parsed_headers.message_id
+            in_reply_to = parsed_headers.in_reply_to
+            references = parsed_headers.references
 
             # Generate thread ID from conversation index or references
             thread_id = self._generate_thread_id(message, headers)
@@ -351,7 +764,7 @@ class PSTProcessor:
             logger.error(f"Error extracting message: {e}")
             return None
 
-    def _get_sender_email(self, message) -> str:
+    def _get_sender_email(self, message, headers: MessageHeaders | None = None) -> str:
         """Extract sender email address."""
         # Try get_sender_email_address if available (older pypff versions)
         if hasattr(message, "get_sender_email_address"):
@@ -363,15 +776,10 @@ class PSTProcessor:
                 pass
 
         # Try transport headers - most reliable method
-        headers = self._extract_headers(message)
-        from_header = headers.get("from", "")
-        if from_header:
-            # Extract email from "Name <email@example.com>" format
-            if "<" in from_header and ">" in from_header:
-                return from_header[from_header.index("<") + 1 : from_header.index(">")]
-            # Handle bare email addresses
-            elif "@" in from_header:
-                return from_header.strip()
+        if headers is None:
+            headers = MessageHeaders.from_message(message)
+        if headers.from_address:
+            return headers.from_address
 
         # Fallback to sender name if it looks like an email
         sender_name = message.get_sender_name() or ""
@@ -380,7 +788,12 @@ class PSTProcessor:
 
         return ""
 
-    def _get_recipients(self, message, recipient_type: str) -> list[str]:
+    def _get_recipients(
+        self,
+        message,
+        recipient_type: str,
+        headers: MessageHeaders | None = None,
+    ) -> list[str]:
         """Extract recipients of a specific type."""
         recipients = []
 
@@ -423,39 +836,15 @@ class PSTProcessor:
 
         # Fallback to headers if no recipients found
         if not recipients:
-            headers = self._extract_headers(message)
-            header_key = recipient_type.lower()
-            header_value = headers.get(header_key, "")
-            if header_value:
-                # Parse comma-separated list
-                for addr in header_value.split(","):
-                    addr = addr.strip()
-                    if "<" in addr and ">" in addr:
-                        email = addr[addr.index("<") + 1 : addr.index(">")]
-                        recipients.append(email)
-                    elif "@" in addr:
-                        recipients.append(addr)
+            if headers is None:
+                headers = MessageHeaders.from_message(message)
+            recipients = headers.recipients(recipient_type)
 
         return recipients
 
     def _extract_headers(self, message) -> dict[str, str]:
         """Extract email headers."""
-        headers = {}
-
-        try:
-            transport_headers = message.get_transport_headers()
-            if transport_headers:
-                if isinstance(transport_headers, bytes):
-                    transport_headers = transport_headers.decode("utf-8", errors="replace")
-
-                for line in transport_headers.split("\n"):
-                    if ":" in line:
-                        key, value = line.split(":", 1)
-                        headers[key.strip().lower()] = value.strip()
-        except Exception:
-            pass
-
-        return headers
+        return MessageHeaders.from_message(message).as_dict()
 
     def _parse_date(self, date_value) -> datetime | None:
         """Parse date from various formats."""
@@ -476,19 +865,7 @@ class PSTProcessor:
 
     def _parse_references(self, references_str: str) -> list[str]:
         """Parse References header into list of message IDs."""
-        if not references_str:
-            return []
-
-        # References are space-separated message IDs
-        refs = []
-        for ref in references_str.split():
-            ref = ref.strip()
-            if ref.startswith("<") and ref.endswith(">"):
-                refs.append(ref)
-            elif ref:
-                refs.append(f"<{ref}>")
-
-        return refs
+        return _parse_message_id_list(references_str)
 
     def _generate_thread_id(self, message, headers: dict[str, str]) -> str | None:
         """Generate or extract thread ID."""
@@ -631,8 +1008,6 @@ class PSTProcessor:
         """
         Extract plain text from HTML content.
 
-        Uses BeautifulSoup if available, otherwise falls back to regex-based extraction.
-
         Args:
             html_content: HTML content string
 
@@ -643,50 +1018,7 @@ class PSTProcessor:
             return ""
 
         try:
-            # Try using BeautifulSoup for better HTML parsing
-            from bs4 import BeautifulSoup
-
-            soup = BeautifulSoup(html_content, "html.parser")
-
-            # Remove script and style elements
-            for element in soup(["script", "style", "head", "meta", "link"]):
-                element.decompose()
-
-            # Get text and clean it up
-            text = soup.get_text(separator="\n")
-
-            # Clean up whitespace
-            lines = (line.strip() for line in text.splitlines())
-            # Break multi-headlines into a line each
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            # Drop blank lines
-            text = "\n".join(chunk for chunk in chunks if chunk)
-
-            return text
-
-        except ImportError:
-            # Fallback to regex-based extraction
-            import re
-
-            # Remove script and style blocks
-            text = re.sub(r"<script[^>]*>.*?</script>", "", html_content, flags=re.DOTALL | re.IGNORECASE)
-            text = re.sub(r"<style[^>]*>.*?</style>", "", text, flags=re.DOTALL | re.IGNORECASE)
-
-            # Remove HTML tags
-            text = re.sub(r"<[^>]+>", " ", text)
-
-            # Decode HTML entities
-            import html
-            text = html.unescape(text)
-
-            # Clean up whitespace
-            text = re.sub(r"\s+", " ", text).strip()
-
-            # Convert multiple spaces to newlines for readability
-            text = re.sub(r"  +", "\n", text)
-
-            return text
-
+            return html_to_text(html_content)
         except Exception as e:
             logger.warning(f"Failed to extract text from HTML: {e}")
             return ""
@@ -0,0 +1,157 @@
+"""
+Query Embedder
+
+Embeds search queries on a dedicated inference thread so the event loop
+is never blocked by the model. Queries that arrive while the thread is
+busy, or within a short window of each other, are coalesced into one
+batched encode and each caller's future is resolved with its own vector.
+
+The model releases the GIL during inference (PyTorch and ONNX Runtime
+both do), so the API keeps serving other requests meanwhile.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import numpy as np
+from loguru import logger
+
+from app.config import settings
+
+
+@dataclass
+class _PendingQuery:
+    """A query waiting for the inference thread."""
+
+    text: str
+    future: asyncio.Future
+    loop: asyncio.AbstractEventLoop
+
+
+def _resolve(future: asyncio.Future, vector: np.ndarray | None, error: Exception | None) -> None:
+    """Set a caller's result on its event loop, unless it has given up."""
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(vector)
+
+
+class QueryEmbedder:
+    """
+    Micro-batching query encoder on a dedicated thread.
+
+    The thread starts lazily on the first query. It takes every query
+    already waiting, then waits up to ``max_wait_ms`` for more, up to
+    ``max_batch_size`` per encode. Under load the queue fills while a
+    batch is encoding, so later batches need no wait at all.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[list[str]], np.ndarray],
+        max_batch_size: int | None = None,
+        max_wait_ms: float | None = None,
+    ):
+        """
+        Initialize the query embedder.
+
+        Args:
+            encode: Encodes a list of texts to a 2-D array of vectors
+            max_batch_size: Most queries per encode (default from config)
+            max_wait_ms: How long to wait for more queries to join a batch
+                (default from config)
+        """
+        self._encode = encode
+        self.max_batch_size = max(1, max_batch_size or settings.query_embedding_max_batch_size)
+        self.max_wait = (
+            settings.query_embedding_max_wait_ms if max_wait_ms is None else max_wait_ms
+        ) / 1000
+
+        self._queue: queue.Queue[_PendingQuery | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Embed one query without blocking the event loop.
+
+        Args:
+            text: Query text
+
+        Returns:
+            Query embedding vector
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._ensure_started()
+        self._queue.put(_PendingQuery(text, future, loop))
+        return await future
+
+    def _ensure_started(self) -> None:
+        """Start the inference thread if it isn't running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="query-embedder", daemon=True
+                )
+                self._thread.start()
+
+    def _next_batch(self) -> list[_PendingQuery] | None:
+        """Block for the next batch of queries; None when shutting down."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Take what is already queued, then wait out the window for more
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        """Inference thread: encode batches until shut down."""
+        while (batch := self._next_batch()) is not None:
+            # Identical queries in a batch (e.g. a popular search) are encoded once
+            texts = list(dict.fromkeys(pending.text for pending in batch))
+            vectors = error = None
+            try:
+                vectors = dict(zip(texts, self._encode(texts)))
+            except Exception as e:
+                logger.error(f"Query embedding failed for a batch of {len(texts)}: {e}")
+                error = e
+
+            for pending in batch:
+                vector = vectors[pending.text] if vectors is not None else None
+                try:
+                    pending.loop.call_soon_threadsafe(_resolve, pending.future, vector, error)
+                except RuntimeError:
+                    pass  # The caller's event loop has closed
+
+    def shutdown(self) -> None:
+        """Stop the inference thread after the queries already queued."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._queue.put(None)
+                self._thread.join()
+            self._thread = None
@@ -0,0 +1,189 @@
+"""
+Query Embedding Cache
+
+Caches the embeddings of search queries and HyDE documents, keyed by
+model name and normalized text, so pagination, refreshed dashboards and
+other repeated queries skip model inference.
+
+An in-process LRU holds the most recent ``query_embedding_cache_size``
+vectors. With ``query_embedding_cache_redis`` it is backed by Redis, so
+API replicas share what any of them has encoded; Redis entries expire
+after ``cache_ttl_query_embeddings``.
+"""
+
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+from loguru import logger
+
+from app.config import settings
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalize query text for cache lookups.
+
+    Only differences the tokenizer ignores are removed (Unicode
+    composition and runs of whitespace), so texts sharing a key always
+    embed identically; case is kept for cased models.
+    """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class QueryEmbeddingCache:
+    """
+    LRU cache of query embeddings with hit/miss counters.
+
+    Redis errors switch the Redis tier off for the rest of the process;
+    the in-process LRU keeps working.
+    """
+
+    KEY_PREFIX = "query_embedding"
+
+    def __init__(
+        self,
+        max_entries: int | None = None,
+        redis_url: str | None = None,
+        ttl_seconds: int | None = None,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Vectors kept in process (default from config)
+            redis_url: Redis connection URL for the shared tier (None = local only)
+            ttl_seconds: Expiry of Redis entries (default from config)
+        """
+        self.max_entries = max(
+            1, max_entries if max_entries is not None else settings.query_embedding_cache_size
+        )
+        self.redis_url = redis_url
+        self.ttl_seconds = (
+            settings.cache_ttl_query_embeddings if ttl_seconds is None else ttl_seconds
+        )
+
+        self._entries: OrderedDict[tuple[str, str], np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._client = None
+
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @property
+    def client(self):
+        """Get or create the async Redis client, or None without Redis."""
+        if self._client is None and self.redis_url:
+            import redis.asyncio as redis
+
+            self._client = redis.Redis.from_url(self.redis_url)
+        return self._client
+
+    def _key(self, model: str, text: str) -> tuple[str, str]:
+        digest = hashlib.sha256(normalize_query(text).encode("utf-8")).hexdigest()
+        return model, digest
+
+    def _redis_key(self, key: tuple[str, str]) -> str:
+        return f"{self.KEY_PREFIX}:{key[0]}:{key[1]}"
+
+    def _remember(self, key: tuple[str, str], vector: np.ndarray) -> None:
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get(self, model: str, text: str) -> np.ndarray | None:
+        """
+        Look up a query's embedding.
+
+        Args:
+            model: Embedding model key
+            text: Query or HyDE document text
+
+        Returns:
+            The cached vector, or None on a miss
+        """
+        key = self._key(model, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+
+        if self.client is not None:
+            try:
+                blob = await self.client.get(self._redis_key(key))
+            except Exception as e:
+                self._disable_redis(e)
+                blob = None
+            if blob is not None:
+                vector = np.frombuffer(blob, dtype=np.float32)
+                self._remember(key, vector)
+                self.redis_hits += 1
+                return vector
+
+        self.misses += 1
+        return None
+
+    async def put(self, model: str, text: str, vector: np.ndarray) -> None:
+        """
+        Store a query's embedding.
+
+        Args:
+            model: Embedding model key
+            text: Query or HyDE document text
+            vector: Its embedding
+        """
+        key = self._key(model, text)
+        vector = np.asarray(vector, dtype=np.float32)
+        self._remember(key, vector)
+
+        if self.client is not None:
+            try:
+                await self.client.set(
+                    self._redis_key(key), vector.tobytes(), ex=self.ttl_seconds or None
+                )
+            except Exception as e:
+                self._disable_redis(e)
+
+    def stats(self) -> dict[str, int | float]:
+        """Hit/miss counters and size, for health and monitoring."""
+        lookups = self.hits + self.redis_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.redis_hits) / lookups if lookups else 0.0,
+        }
+
+    def _disable_redis(self, error: Exception) -> None:
+        logger.warning(f"Query embedding cache: Redis unavailable, using local only: {error}")
+        self.redis_url = None
+        self._client = None
+
+
+def _create_query_embedding_cache() -> QueryEmbeddingCache | None:
+    """Build the cache configured by ``query_embedding_cache_*``."""
+    if settings.query_embedding_cache_size <= 0:
+        return None
+    redis_url = settings.redis_connection_url if settings.query_embedding_cache_redis else None
+    return QueryEmbeddingCache(redis_url=redis_url)
+
+
+# Global instance (None when disabled)
+query_embedding_cache = _create_query_embedding_cache()
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache | None:
+    """Get the query embedding cache instance, if enabled."""
+    return query_embedding_cache
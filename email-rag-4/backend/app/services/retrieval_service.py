@@ -9,7 +9,9 @@ from typing import Any
 
 from loguru import logger
 
+from app.db.session import get_db_context
 from app.services.embedding_service import embedding_service
+from app.services.near_duplicate import canonical_pst_ids, load_stand_ins
 from app.services.query_processor import ProcessedQuery, QueryType
 from app.services.vector_store import vector_store
 
@@ -97,6 +99,14 @@ class RetrievalService:
             query_for_embedding = processed_query.hyde_document
             logger.debug("Using HyDE document for retrieval")
 
+        # Near-duplicates aren't embedded: also search the PSTs holding their canonicals
+        search_filters = filters
+        if pst_file_ids:
+            async with get_db_context() as db:
+                other_pst_ids = await canonical_pst_ids(db, pst_file_ids)
+            if other_pst_ids:
+                search_filters = {**filters, "pst_file_id": pst_file_ids + other_pst_ids}
+
         # Generate query embedding
         query_embedding = await embedding_service.embed_query(query_for_embedding)
 
@@ -104,7 +114,7 @@ class RetrievalService:
         email_results = await self._search_emails(
             query_embedding=query_embedding,
             top_k=top_k,
-            filters=filters,
+            filters=search_filters,
         )
 
         # Optionally search attachments
@@ -113,9 +123,13 @@ class RetrievalService:
             attachment_results = await self._search_attachments(
                 query_embedding=query_embedding,
                 top_k=top_k // 2,  # Half the quota for attachments
-                filters=filters,
+                filters=search_filters,
             )
 
+        if search_filters is not filters:
+            email_results = await self._map_to_stand_ins(email_results, pst_file_ids)
+            attachment_results = await self._map_to_stand_ins(attachment_results, pst_file_ids)
+
         # Combine and deduplicate results
         all_results = self._merge_results(
             email_results=email_results,
@@ -307,6 +321,53 @@ class RetrievalService:
 
         return documents
 
+    async def _map_to_stand_ins(
+        self,
+        documents: list[RetrievedDocument],
+        pst_file_ids: list[str],
+    ) -> list[RetrievedDocument]:
+        """
+        Replace canonicals from outside the filtered PSTs with their duplicates inside.
+
+        The result takes the duplicate's email ID and its own PST, folder and
+        date metadata; a canonical with no duplicate in the PSTs is dropped.
+        Attachment results keep the canonical's attachment ID.
+        """
+        allowed = set(pst_file_ids)
+        outside = {
+            doc.metadata.get("email_id")
+            for doc in documents
+            if doc.metadata.get("pst_file_id") not in allowed
+        }
+        if not outside:
+            return documents
+
+        async with get_db_context() as db:
+            stand_ins = await load_stand_ins(db, sorted(outside), pst_file_ids)
+
+        mapped = []
+        for doc in documents:
+            canonical_id = doc.metadata.get("email_id")
+            if doc.metadata.get("pst_file_id") in allowed:
+                mapped.append(doc)
+            elif canonical_id in stand_ins:
+                stand_in = stand_ins[canonical_id]
+                ids = {"email_id": stand_in.email_id, "pst_file_id": stand_in.pst_file_id}
+                if doc.source_type == "email":
+                    sent_date = stand_in.sent_date
+                    doc.id = doc.id.replace(canonical_id, stand_in.email_id, 1)
+                    doc.metadata = {
+                        **doc.metadata,
+                        **ids,
+                        "folder_path": stand_in.folder_path,
+                        "date": sent_date.timestamp() if sent_date else None,
+                        "sent_date": sent_date.isoformat() if sent_date else None,
+                    }
+                else:
+                    doc.metadata = {**doc.metadata, **ids}
+                mapped.append(doc)
+        return mapped
+
     async def _retrieve_relational(
         self,
         processed_query: ProcessedQuery,
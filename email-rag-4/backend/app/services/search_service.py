@@ -4,7 +4,7 @@ Search Service
 Provides natural language and advanced search capabilities for emails.
 """
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 from typing import Any
 
@@ -16,6 +16,7 @@ from app.db.models.attachment import Attachment
 from app.db.models.email import Email
 from app.db.session import get_db_context
 from app.services.embedding_service import get_embedding_service
+from app.services.near_duplicate import canonical_pst_ids, load_stand_ins
 from app.services.query_processor import ProcessedQuery, get_query_processor
 from app.services.vector_store import get_vector_store
 
@@ -37,6 +38,7 @@ class SearchResult:
     attachment_count: int = 0
     folder_path: str | None = None
     pst_file_id: str | None = None
+    duplicate_count: int = 0  # Near-duplicates collapsed into this result
 
 
 @dataclass
@@ -116,8 +118,18 @@ class SearchService:
         processed_query = await self._query_processor.process(query)
         logger.debug(f"Processed query: {processed_query}")
 
-        # Build ChromaDB where clause from filters
-        chroma_where = self._build_chroma_filters(filters)
+        # Build ChromaDB where clause from filters. Near-duplicates are only
+        # embedded once, so also search the PSTs holding their canonicals.
+        chroma_filters = filters
+        if filters and filters.pst_file_ids and search_type in ("semantic", "hybrid"):
+            async with get_db_context() as db:
+                other_pst_ids = await canonical_pst_ids(db, filters.pst_file_ids)
+            if other_pst_ids:
+                chroma_filters = replace(
+                    filters,
+                    pst_file_ids=list(dict.fromkeys([*filters.pst_file_ids, *other_pst_ids])),
+                )
+        chroma_where = self._build_chroma_filters(chroma_filters)
 
         results: list[SearchResult] = []
 
@@ -154,6 +166,9 @@ class SearchService:
                     unique_results.append(result)
             results = unique_results
 
+        # One result per near-duplicate group
+        results = await self._collapse_duplicates(results, filters)
+
         # Sort by score
         results.sort(key=lambda r: r.score, reverse=True)
 
@@ -408,7 +423,7 @@ class SearchService:
         if processed_query.hyde_document:
             query_text = processed_query.hyde_document
 
-        query_embedding = self._embedding_service.generate_embedding(query_text)
+        query_embedding = await self._embedding_service.embed_query(query_text)
 
         # Search emails
         email_results = self._vector_store.search_emails(
@@ -575,6 +590,60 @@ class SearchService:
 
         return merged
 
+    async def _collapse_duplicates(
+        self,
+        results: list[SearchResult],
+        filters: SearchFilters | None,
+    ) -> list[SearchResult]:
+        """
+        Keep the best-scoring result per near-duplicate group.
+
+        A canonical email from outside the filtered PSTs is replaced by its
+        duplicate inside them, with that duplicate's PST, folder and date
+        (or dropped if it has none).
+        """
+        if not results:
+            return results
+
+        async with get_db_context() as db:
+            result = await db.execute(
+                select(Email.id, Email.duplicate_of)
+                .where(Email.id.in_({r.email_id for r in results}))
+            )
+            group_of = {
+                str(email_id): str(duplicate_of or email_id)
+                for email_id, duplicate_of in result.all()
+            }
+
+            best: dict[str, SearchResult] = {}
+            for search_result in sorted(results, key=lambda r: r.score, reverse=True):
+                key = group_of.get(search_result.email_id, search_result.email_id)
+                best.setdefault(key, search_result)
+
+            result = await db.execute(
+                select(Email.duplicate_of, func.count())
+                .where(Email.duplicate_of.in_(list(best)))
+                .group_by(Email.duplicate_of)
+            )
+            for canonical_id, count in result.all():
+                best[str(canonical_id)].duplicate_count = count
+
+            if filters and filters.pst_file_ids:
+                allowed = set(filters.pst_file_ids)
+                outside = [key for key, r in best.items() if r.pst_file_id not in allowed]
+                stand_ins = await load_stand_ins(db, outside, filters.pst_file_ids)
+                for key in outside:
+                    stand_in = stand_ins.get(key)
+                    if stand_in is None:
+                        del best[key]
+                        continue
+                    best[key].email_id = stand_in.email_id
+                    best[key].pst_file_id = stand_in.pst_file_id
+                    best[key].folder_path = stand_in.folder_path
+                    best[key].sent_date = stand_in.sent_date
+
+        return list(best.values())
+
     async def _enrich_results(self, results: list[SearchResult]) -> list[SearchResult]:
         """Enrich search results with additional email details."""
         if not results:
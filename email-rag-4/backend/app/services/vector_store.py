@@ -121,7 +121,8 @@ class VectorStoreService:
         if not ids:
             return
 
-        self.email_collection.add(
+        # Upsert so re-embedding an email (retries, overlapping jobs) replaces its chunks
+        self.email_collection.upsert(
             ids=ids,
             embeddings=embeddings,
             documents=documents,
@@ -140,7 +141,7 @@ class VectorStoreService:
         if not ids:
             return
 
-        self.attachment_collection.add(
+        self.attachment_collection.upsert(
             ids=ids,
             embeddings=embeddings,
             documents=documents,
@@ -0,0 +1,194 @@
+"""
+Content Compression
+
+Compresses large text blobs (HTML bodies, transport headers, extracted
+attachment text) for the content side tables. Blobs are compressed with
+zstd against a shared dictionary of common email markup and header
+fields, which pays off on the short-to-medium documents typical of mail
+where a plain compressor has little history to work with.
+
+Each blob starts with a two-byte header (codec, dictionary version) so
+stored data stays readable when the dictionary changes or when zstd is
+unavailable and zlib (with the same preset dictionary) is used instead.
+"""
+
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Codec identifiers (first header byte)
+CODEC_RAW = 0
+CODEC_ZSTD = 1
+CODEC_ZLIB = 2
+
+# Blobs shorter than this aren't worth compressing
+_MIN_COMPRESS_BYTES = 64
+
+_ZSTD_LEVEL = 3
+_ZLIB_LEVEL = 6
+
+# Raw-content dictionary: fragments that recur across Outlook/Exchange
+# HTML bodies and transport headers. Later fragments are cheapest to
+# reference, so the most common ones come last. Never edit a released
+# version; add a new one and bump DICTIONARY_VERSION.
+_DICTIONARY_V1 = "".join(
+    (
+        # Transport headers (stored as JSON)
+        '"arc-seal": "i=1; a=rsa-sha256; s=arcselector; d=microsoft.com; cv=none; b=',
+        '"arc-message-signature": "i=1; a=rsa-sha256; c=relaxed/relaxed; d=microsoft.com; '
+        's=arcselector; h=From:Date:Subject:Message-ID:Content-Type:MIME-Version; bh=',
+        '"arc-authentication-results": "i=1; mx.microsoft.com 1; spf=pass smtp.mailfrom=',
+        '"authentication-results": "spf=pass (sender IP is ) smtp.mailfrom=; dkim=pass '
+        "(signature was verified) header.d=; dmarc=pass action=none header.from=;",
+        '"dkim-signature": "v=1; a=rsa-sha256; c=relaxed/relaxed; d=; s=selector1; '
+        'h=From:Date:Subject:Message-ID:Content-Type:MIME-Version:X-MS-Exchange-SenderADCheck; bh=',
+        '"x-ms-exchange-organization-authas": "Internal", "x-ms-exchange-organization-authsource": "',
+        '"x-ms-exchange-organization-scl": "-1", "x-ms-exchange-transport-crosstenantheadersstamped": "',
+        '"x-ms-has-attach": "", "x-ms-tnef-correlator": "", "x-ms-publictraffictype": "Email", ',
+        '"x-originating-ip": "[", "x-mailer": "Microsoft Outlook 16.0", "accept-language": "en-US", ',
+        '"content-language": "en-US", "return-path": "<", "thread-topic": "", "thread-index": "',
+        '"content-type": "multipart/alternative; boundary=\\"_000_", "mime-version": "1.0", ',
+        '"received": "from .outlook.com (2603:10b6::) by .outlook.com (2603:10b6::) with '
+        'Microsoft SMTP Server (version=TLS1_2, cipher=TLS_ECDHE_RSA_WITH_AES_256_GCM_SHA384) id 15.20.',
+        '"message-id": "<", "in-reply-to": "<", "references": "<", "date": "", ',
+        '"from": "", "to": "", "cc": "", "subject": "RE: ", ',
+        # HTML bodies
+        '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" '
+        '"http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">',
+        '<html xmlns:v="urn:schemas-microsoft-com:vml" xmlns:o="urn:schemas-microsoft-com:office:office" '
+        'xmlns:w="urn:schemas-microsoft-com:office:word" '
+        'xmlns:m="http://schemas.microsoft.com/office/2004/12/omml" xmlns="http://www.w3.org/TR/REC-html40">',
+        '<head><meta http-equiv="Content-Type" content="text/html; charset=utf-8">'
+        '<meta name="Generator" content="Microsoft Word 15 (filtered medium)">',
+        "<style><!-- /* Font Definitions */ @font-face {font-family:\"Cambria Math\"; "
+        "panose-1:2 4 5 3 5 4 6 3 2 4;} @font-face {font-family:Calibri; panose-1:2 15 5 2 2 2 4 3 2 4;} "
+        "/* Style Definitions */ p.MsoNormal, li.MsoNormal, div.MsoNormal {margin:0cm; "
+        'font-size:11.0pt; font-family:"Calibri",sans-serif;} a:link, span.MsoHyperlink '
+        "{mso-style-priority:99; color:#0563C1; text-decoration:underline;} "
+        "span.EmailStyle17 {mso-style-type:personal-compose; font-family:\"Calibri\",sans-serif; "
+        "color:windowtext;} .MsoChpDefault {mso-style-type:export-only;} @page WordSection1 "
+        "{size:612.0pt 792.0pt; margin:72.0pt 72.0pt 72.0pt 72.0pt;} div.WordSection1 "
+        "{page:WordSection1;} --></style>",
+        '<!--[if gte mso 9]><xml><o:shapedefaults v:ext="edit" spidmax="1026" /></xml><![endif]-->',
+        '<table border="0" cellspacing="0" cellpadding="0" width="100%" style="width:100.0%">',
+        '<td style="padding:0cm 0cm 0cm 0cm">',
+        '<div style="border:none;border-top:solid #E1E1E1 1.0pt;padding:3.0pt 0cm 0cm 0cm">',
+        '<p class="MsoNormal"><b>From:</b> ',
+        "<br><b>Sent:</b> ",
+        "<br><b>To:</b> ",
+        "<br><b>Cc:</b> ",
+        "<br><b>Subject:</b> RE: ",
+        '<span style="font-size:11.0pt;font-family:&quot;Calibri&quot;,sans-serif;color:#1F497D">',
+        '<a href="mailto:',
+        '<a href="https://',
+        "</span></p></div></body></html>",
+        '</head><body lang="EN-US" link="#0563C1" vlink="#954F72" style="word-wrap:break-word">'
+        '<div class="WordSection1">',
+        '<p class="MsoNormal"><o:p>&nbsp;</o:p></p>',
+        '<p class="MsoNormal">',
+        "<o:p></o:p></p>",
+    )
+).encode("utf-8")
+
+DICTIONARY_VERSION = 1
+_DICTIONARIES = {1: _DICTIONARY_V1}
+
+_local = threading.local()
+
+
+def _zstd_compressor():
+    """Per-thread compressor (zstd contexts aren't thread-safe)."""
+    compressor = getattr(_local, "compressor", None)
+    if compressor is None:
+        dictionary = zstandard.ZstdCompressionDict(
+            _DICTIONARIES[DICTIONARY_VERSION],
+            dict_type=zstandard.DICT_TYPE_RAWCONTENT,
+        )
+        compressor = _local.compressor = zstandard.ZstdCompressor(
+            level=_ZSTD_LEVEL,
+            dict_data=dictionary,
+        )
+    return compressor
+
+
+def _zstd_decompressor(version: int):
+    """Per-thread decompressor for a dictionary version."""
+    decompressors = getattr(_local, "decompressors", None)
+    if decompressors is None:
+        decompressors = _local.decompressors = {}
+    if version not in decompressors:
+        dictionary = zstandard.ZstdCompressionDict(
+            _DICTIONARIES[version],
+            dict_type=zstandard.DICT_TYPE_RAWCONTENT,
+        )
+        decompressors[version] = zstandard.ZstdDecompressor(dict_data=dictionary)
+    return decompressors[version]
+
+
+def compress_text(text: str | None) -> bytes | None:
+    """
+    Compress text for storage.
+
+    Args:
+        text: Text to compress
+
+    Returns:
+        Header-prefixed blob, or None for None
+    """
+    if text is None:
+        return None
+
+    data = text.encode("utf-8")
+    if len(data) < _MIN_COMPRESS_BYTES:
+        return bytes((CODEC_RAW, 0)) + data
+
+    if zstandard is not None:
+        codec, payload = CODEC_ZSTD, _zstd_compressor().compress(data)
+    else:
+        compressor = zlib.compressobj(_ZLIB_LEVEL, zdict=_DICTIONARIES[DICTIONARY_VERSION])
+        codec, payload = CODEC_ZLIB, compressor.compress(data) + compressor.flush()
+
+    return bytes((codec, DICTIONARY_VERSION)) + payload
+
+
+def decompress_text(blob: bytes | None) -> str | None:
+    """
+    Decompress a blob written by compress_text.
+
+    Args:
+        blob: Stored blob
+
+    Returns:
+        Original text, or None for None
+
+    Raises:
+        ValueError: If the blob header is not recognised
+        RuntimeError: If the blob needs zstd and zstandard is not installed
+    """
+    if blob is None:
+        return None
+
+    blob = bytes(blob)
+    if len(blob) < 2:
+        raise ValueError("Truncated content blob")
+    codec, version, payload = blob[0], blob[1], blob[2:]
+
+    if codec == CODEC_RAW:
+        return payload.decode("utf-8")
+    if version not in _DICTIONARIES:
+        raise ValueError(f"Unknown content dictionary version {version}")
+
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed content")
+        return _zstd_decompressor(version).decompress(payload).decode("utf-8")
+    if codec == CODEC_ZLIB:
+        decompressor = zlib.decompressobj(zdict=_DICTIONARIES[version])
+        return (decompressor.decompress(payload) + decompressor.flush()).decode("utf-8")
+
+    raise ValueError(f"Unknown content codec {codec}")
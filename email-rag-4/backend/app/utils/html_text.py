@@ -0,0 +1,206 @@
+"""
+HTML to Text Conversion
+
+Streaming HTML-to-text converter for email bodies and HTML attachments.
+Text is produced from parser events as they arrive instead of building a
+document tree: script, style and head content is dropped, whitespace is
+collapsed, and block elements become line or paragraph breaks.
+
+Uses lxml's event (target) parser when available and the standard
+library ``html.parser`` otherwise.
+"""
+
+import re
+from collections import Counter
+from html.parser import HTMLParser
+
+from loguru import logger
+
+try:
+    from lxml import etree
+except ImportError:  # pragma: no cover - lxml is a declared dependency
+    etree = None
+
+
+# Elements whose content is never text
+_SKIP_TAGS = frozenset({"script", "style", "head", "title", "template", "noscript"})
+
+# Elements that separate paragraphs
+_PARAGRAPH_TAGS = frozenset(
+    {"p", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "ul", "ol", "dl", "hr"}
+)
+
+# Elements that start a new line
+_LINE_TAGS = frozenset(
+    {
+        "address", "article", "aside", "body", "center", "dd", "div", "dt",
+        "fieldset", "figcaption", "figure", "footer", "form", "header", "li",
+        "main", "nav", "section", "table", "tr",
+    }
+)
+
+# Table cells sit side by side on one line
+_CELL_TAGS = frozenset({"td", "th"})
+
+# Whitespace, plus the invisible fillers newsletters pad preheaders with
+_WHITESPACE = re.compile(r"[\s\u034f\u200b\u200c\u2060\ufeff]+")
+
+
+class HTMLTextConverter:
+    """
+    Builds plain text from HTML parser events.
+
+    Implements the lxml parser target interface (``start``/``end``/
+    ``data``/``close``); the standard-library fallback forwards its
+    handlers to the same methods. Breaks and spaces are held as pending
+    state and only written before the next piece of text, so output has
+    no leading/trailing blank lines and at most one blank line in a row.
+    """
+
+    def __init__(self):
+        self._parts: list[str] = []
+        self._pending_break = 0
+        self._pending_space = False
+        self._skipping: Counter[str] = Counter()
+        self._pre_depth = 0
+
+    # ===========================================
+    # Parser Target Interface
+    # ===========================================
+
+    def start(self, tag: str, attrib=None) -> None:
+        """Handle an opening tag."""
+        tag = tag.lower()
+        if tag in _SKIP_TAGS:
+            self._skipping[tag] += 1
+            return
+        if tag == "body":
+            # An unclosed <head> ends where the body starts
+            self._skipping.pop("head", None)
+            self._skipping.pop("title", None)
+
+        if tag == "br":
+            self._pending_break = min(self._pending_break + 1, 2)
+        elif tag in _PARAGRAPH_TAGS:
+            self._add_break(2)
+        elif tag in _LINE_TAGS:
+            self._add_break(1)
+        elif tag in _CELL_TAGS:
+            self._pending_space = True
+
+        if tag == "pre":
+            self._pre_depth += 1
+
+    def end(self, tag: str) -> None:
+        """Handle a closing tag."""
+        tag = tag.lower()
+        if tag in _SKIP_TAGS:
+            if self._skipping[tag] > 0:
+                self._skipping[tag] -= 1
+            return
+
+        if tag in _PARAGRAPH_TAGS:
+            self._add_break(2)
+        elif tag in _LINE_TAGS:
+            self._add_break(1)
+        elif tag in _CELL_TAGS:
+            self._pending_space = True
+
+        if tag == "pre" and self._pre_depth:
+            self._pre_depth -= 1
+
+    def data(self, text: str) -> None:
+        """Handle character data."""
+        if not text or any(self._skipping.values()):
+            return
+
+        if self._pre_depth:
+            self._emit(text.strip("\n"), leading_space=False)
+            return
+
+        collapsed = _WHITESPACE.sub(" ", text)
+        stripped = collapsed.strip()
+        if not stripped:
+            self._pending_space = True
+            return
+
+        self._emit(stripped, leading_space=collapsed[0] == " ")
+        self._pending_space = collapsed[-1] == " "
+
+    def comment(self, text: str) -> None:
+        """Ignore comments."""
+
+    def close(self) -> str:
+        """Get the converted text."""
+        return "".join(self._parts)
+
+    # ===========================================
+    # Output
+    # ===========================================
+
+    def _add_break(self, newlines: int) -> None:
+        self._pending_break = max(self._pending_break, newlines)
+
+    def _emit(self, text: str, leading_space: bool) -> None:
+        if self._parts:
+            if self._pending_break:
+                self._parts.append("\n" * self._pending_break)
+            elif self._pending_space or leading_space:
+                self._parts.append(" ")
+        self._parts.append(text)
+        self._pending_break = 0
+        self._pending_space = False
+
+
+class _StdlibParser(HTMLParser):
+    """Standard-library parser that forwards events to a converter."""
+
+    def __init__(self, target: HTMLTextConverter):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag)
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+
+def _convert_lxml(html_content: str) -> str:
+    parser = etree.HTMLParser(target=HTMLTextConverter(), remove_comments=True, no_network=True)
+    parser.feed(html_content)
+    return parser.close()
+
+
+def _convert_stdlib(html_content: str) -> str:
+    target = HTMLTextConverter()
+    parser = _StdlibParser(target)
+    parser.feed(html_content)
+    parser.close()
+    return target.close()
+
+
+def html_to_text(html_content: str | None) -> str:
+    """
+    Convert HTML to plain text.
+
+    Args:
+        html_content: HTML document or fragment
+
+    Returns:
+        Text with collapsed whitespace, one line per block element and a
+        blank line between paragraphs
+    """
+    if not html_content or not html_content.strip():
+        return ""
+
+    if etree is not None:
+        try:
+            return _convert_lxml(html_content)
+        except (etree.LxmlError, ValueError) as e:
+            logger.debug(f"lxml could not parse HTML, using html.parser: {e}")
+
+    return _convert_stdlib(html_content)
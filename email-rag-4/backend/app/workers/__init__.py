@@ -5,7 +5,12 @@ Celery workers for background task processing.
 """
 
 from app.workers.celery_app import celery_app, get_celery_app
-from app.workers.email_tasks import cancel_processing, process_pst_file
+from app.workers.email_tasks import (
+    cancel_processing,
+    finalize_pst_shards,
+    process_pst_file,
+    process_pst_shard,
+)
 from app.workers.indexing_tasks import (
     delete_embeddings_for_task,
     embed_emails_for_task,
@@ -16,6 +21,8 @@ __all__ = [
     "celery_app",
     "get_celery_app",
     "process_pst_file",
+    "process_pst_shard",
+    "finalize_pst_shards",
     "cancel_processing",
     "embed_emails_for_task",
     "reindex_email",
@@ -36,7 +36,7 @@ celery_app.conf.update(
 
     # Worker settings
     worker_prefetch_multiplier=1,  # One task at a time per worker
-    worker_concurrency=4,  # Number of concurrent workers
+    worker_concurrency=settings.celery_worker_concurrency,  # Number of concurrent workers
 
     # Result backend settings
     result_expires=86400,  # Results expire after 24 hours
@@ -44,19 +44,28 @@ celery_app.conf.update(
 
     # Task routing
     task_routes={
+        # Scheduling and housekeeping must not wait behind long PST jobs
+        "app.workers.email_tasks.schedule_ingestion": {"queue": "celery"},
+        "app.workers.email_tasks.cleanup_upload_sessions": {"queue": "celery"},
         "app.workers.email_tasks.*": {"queue": "email_processing"},
         "app.workers.indexing_tasks.*": {"queue": "indexing"},
     },
 
-    # Task rate limits
-    task_annotations={
-        "app.workers.email_tasks.process_pst_file": {
-            "rate_limit": "2/m",  # Max 2 PST files per minute
-        },
-    },
+    # PST concurrency is governed by the ingest scheduler
+    # (app.services.ingest_scheduler), not a rate limit
 
     # Beat schedule for periodic tasks (if needed)
     beat_schedule={
+        # Catch-up round in case a scheduling trigger was lost
+        "schedule-ingestion": {
+            "task": "app.workers.email_tasks.schedule_ingestion",
+            "schedule": 60.0,
+        },
+        # Delete chunked uploads abandoned past upload_session_ttl_hours
+        "cleanup-upload-sessions": {
+            "task": "app.workers.email_tasks.cleanup_upload_sessions",
+            "schedule": 3600.0,
+        },
         # Example: cleanup old tasks every hour
         # "cleanup-old-tasks": {
         #     "task": "app.workers.maintenance_tasks.cleanup_old_tasks",
@@ -11,39 +11,27 @@ from pathlib import Path
 from uuid import UUID
 
 import redis.asyncio as aioredis
-from celery import current_task
+from celery import chord, current_task
 from loguru import logger
-from sqlalchemy import select
+from sqlalchemy import func, literal, select, update
+from sqlalchemy.dialects.postgresql import JSONB
 
 from app.config import settings
-from app.db.models.attachment import Attachment
-from app.db.models.email import Email
 from app.db.models.processing_task import ProcessingTask, TaskStatus
 from app.db.session import get_worker_db_context
-from app.services.attachment_processor import (
-    AttachmentProcessor,
-    UnsupportedFormatError,
-)
-
-
-def sanitize_text_for_db(text: str | None) -> str | None:
-    """
-    Sanitize text for PostgreSQL storage.
-    Removes null bytes and other invalid characters.
-    """
-    if not text:
-        return text
-
-    import re
-    # Remove null bytes (PostgreSQL doesn't accept \x00)
-    text = text.replace('\x00', '')
-    # Remove other control characters except newlines, tabs, carriage returns
-    text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f]', '', text)
-    return text
-
-
+from app.services.attachment_processor import AttachmentProcessor
+from app.services.chunked_upload import ChunkedUploadError, chunked_upload_service
 from app.services.embedding_service import embedding_service
-from app.services.pst_processor import PSTProcessor, PSTProcessorError
+from app.services.extraction_executor import extraction_executor
+from app.services.ingest_pipeline import IngestPipeline
+from app.services.ingest_scheduler import ingest_scheduler
+from app.services.ingest_writer import EmailBulkWriter
+from app.services.pst_processor import (
+    FolderManifestEntry,
+    FolderShard,
+    PSTProcessor,
+    PSTProcessorError,
+)
 from app.workers.celery_app import celery_app
 
 
@@ -80,6 +68,7 @@ class WorkerCacheService:
         emails_processed: int | None = None,
         emails_total: int | None = None,
         emails_failed: int | None = None,
+        emails_searchable: int | None = None,
         current_phase: str | None = None,
     ) -> None:
         """Publish a task progress update via ws:broadcast channel."""
@@ -104,6 +93,8 @@ class WorkerCacheService:
                 data["emails_total"] = emails_total
             if emails_failed is not None:
                 data["emails_failed"] = emails_failed
+            if emails_searchable is not None:
+                data["emails_searchable"] = emails_searchable
             if current_phase is not None:
                 data["current_phase"] = current_phase
 
@@ -176,17 +167,15 @@ def run_async(coro):
 @celery_app.task(
     bind=True,
     name="app.workers.email_tasks.process_pst_file",
-    max_retries=3,
-    default_retry_delay=60,
-    autoretry_for=(Exception,),
-    retry_backoff=True,
-    retry_jitter=True,
 )
 def process_pst_file(self, task_id: str) -> dict:
     """
     Process a PST file and extract all emails.
 
-    This is the main entry point for PST processing.
+    This is the main entry point for PST processing. Failed runs are not
+    retried by Celery: the task goes back in the ingest scheduler's queue
+    (IngestScheduler.requeue) and resumes from its checkpoint when it gets
+    a slot again.
 
     Args:
         task_id: UUID of the ProcessingTask
@@ -199,12 +188,9 @@ def process_pst_file(self, task_id: str) -> dict:
     try:
         result = run_async(_process_pst_file_async(self, task_id))
 
-        # Check if async function returned a retry request
-        if isinstance(result, dict) and result.get("should_retry"):
-            exc = result.get("exception")
-            if exc and self.request.retries < self.max_retries:
-                logger.info(f"Retrying task {task_id} due to error: {exc}")
-                raise self.retry(exc=exc, countdown=60 * (self.request.retries + 1))
+        if isinstance(result, dict) and result.get("error"):
+            # Failed or queued for a retry; its slot goes to the next queued task
+            schedule_ingestion.delay()
 
         return result
     except Exception as e:
@@ -231,6 +217,7 @@ async def _process_pst_file_async(task, task_id: str) -> dict:
                 processing_task.status = TaskStatus.PARSING
                 processing_task.celery_task_id = task.request.id
                 processing_task.started_at = datetime.now(timezone.utc)
+                processing_task.error_message = None
                 await db.commit()
 
                 # Publish status update
@@ -253,11 +240,21 @@ async def _process_pst_file_async(task, task_id: str) -> dict:
                 processor.open()
 
                 try:
-                    # Count emails for progress tracking
+                    # One folder walk gives progress totals and shard plans;
+                    # a retried task reuses the stored manifest
                     processing_task.current_phase = "counting"
                     await db.commit()
 
-                    total_emails = processor.count_emails()
+                    if processing_task.folder_manifest:
+                        manifest = [
+                            FolderManifestEntry.from_dict(entry)
+                            for entry in processing_task.folder_manifest
+                        ]
+                    else:
+                        manifest = processor.build_folder_manifest()
+                        processing_task.folder_manifest = [entry.to_dict() for entry in manifest]
+
+                    total_emails = sum(entry.message_count for entry in manifest)
                     processing_task.emails_total = total_emails
 
                     await worker_cache.publish_task_update(
@@ -278,127 +275,96 @@ async def _process_pst_file_async(task, task_id: str) -> dict:
                     emails_processed = 0
                     emails_failed = 0
 
-                    for extracted_email in processor.extract_emails():
-                        try:
-                            # Convert references list to string (space-separated)
-                            references_str = " ".join(extracted_email.references) if extracted_email.references else None
-
-                            # Serialize headers dict to JSON string
-                            import json
-                            headers_str = json.dumps(extracted_email.headers) if extracted_email.headers else None
-
-                            # Sanitize text fields for PostgreSQL (remove null bytes)
-                            sanitized_subject = sanitize_text_for_db(extracted_email.subject)
-                            sanitized_body_text = sanitize_text_for_db(extracted_email.body_text)
-                            sanitized_body_html = sanitize_text_for_db(extracted_email.body_html)
-                            sanitized_sender_name = sanitize_text_for_db(extracted_email.sender_name)
-                            sanitized_folder = sanitize_text_for_db(extracted_email.folder_path)
-
-                            # Create email record
-                            email = Email(
-                                pst_file_id=processing_task.id,
-                                message_id=extracted_email.message_id,
-                                internet_message_id=extracted_email.internet_message_id,
-                                thread_id=extracted_email.thread_id,
-                                in_reply_to=extracted_email.in_reply_to,
-                                references=references_str,
-                                sender_email=extracted_email.sender_email,
-                                sender_name=sanitized_sender_name,
-                                to_recipients=extracted_email.to_recipients,
-                                cc_recipients=extracted_email.cc_recipients,
-                                bcc_recipients=extracted_email.bcc_recipients,
-                                subject=sanitized_subject,
-                                body_text=sanitized_body_text,
-                                body_html=sanitized_body_html,
-                                sent_date=extracted_email.sent_date,
-                                received_date=extracted_email.received_date,
-                                importance=extracted_email.importance,
-                                is_read=extracted_email.is_read,
-                                has_attachments=extracted_email.has_attachments,
-                                folder_path=sanitized_folder,
-                                headers=headers_str,
-                                sha256_hash=extracted_email.sha256_hash,
+                    # A retried task picks up after its last committed batch
+                    cursor = _get_checkpoint(processing_task, MAIN_CHECKPOINT)
+                    resume_from = None
+                    resumed_processed = resumed_failed = 0
+                    if cursor:
+                        resume_from = (cursor["folder"], cursor["message"])
+                        resumed_processed = cursor.get("emails_processed", 0)
+                        resumed_failed = cursor.get("emails_failed", 0)
+                        logger.info(
+                            f"Resuming task {task_id} after message {cursor['message']} "
+                            f"in {cursor.get('folder_path')}"
+                        )
+
+                    # Large PSTs fan out across workers by folder shard
+                    if (
+                        not cursor
+                        and settings.pst_sharding_enabled
+                        and total_emails >= settings.pst_shard_min_emails
+                    ):
+                        shards = processor.plan_folder_shards(settings.pst_max_shards, manifest)
+                        if len(shards) > 1:
+                            return await _dispatch_shards(
+                                db, worker_cache, processing_task, shards
                             )
 
-                            db.add(email)
-                            await db.flush()  # Get the email ID
-
-                            # Process attachments
-                            for ext_attachment in extracted_email.attachments:
-                                # Try to extract text
-                                extracted_text = None
-                                is_extracted = False
-
-                                # Pass content for magic byte detection since filenames may be generic
-                                if attachment_processor.can_process(
-                                    ext_attachment.filename,
-                                    ext_attachment.content_type,
-                                    ext_attachment.content,  # Pass content for magic byte detection
-                                ):
-                                    try:
-                                        extracted_text = attachment_processor.extract_text_from_attachment(
-                                            ext_attachment.content,
-                                            ext_attachment.filename,
-                                            ext_attachment.content_type,
-                                        )
-                                        is_extracted = True
-                                    except UnsupportedFormatError:
-                                        pass
-                                    except Exception as e:
-                                        logger.warning(
-                                            f"Failed to extract text from {ext_attachment.filename}: {e}"
-                                        )
-
-                                # Save attachment to storage
-                                storage_path = await _save_attachment(
-                                    processing_task.id,
-                                    str(email.id),
-                                    ext_attachment.filename,
-                                    ext_attachment.content,
-                                )
-
-                                # Create attachment record
-                                attachment = Attachment(
-                                    email_id=email.id,
-                                    filename=ext_attachment.filename,
-                                    content_type=ext_attachment.content_type,
-                                    size_bytes=ext_attachment.size_bytes,
-                                    md5_hash=ext_attachment.md5_hash,
-                                    sha256_hash=ext_attachment.sha256_hash,
-                                    storage_path=storage_path,
-                                    extracted_text=extracted_text,
-                                    is_extracted=is_extracted,
-                                )
-                                db.add(attachment)
-
-                            emails_processed += 1
-
-                            # Update progress periodically
-                            if emails_processed % 100 == 0:
-                                processing_task.emails_processed = emails_processed
-                                await db.commit()
-
-                                progress = 10 + (emails_processed / total_emails * 50)
-                                await worker_cache.publish_task_update(
-                                    task_id=task_id,
-                                    status="extracting",
-                                    progress=progress,
-                                    message=f"Processed {emails_processed}/{total_emails} emails",
-                                    emails_processed=emails_processed,
-                                    emails_total=total_emails,
-                                    emails_failed=emails_failed,
-                                    current_phase="extracting",
-                                )
-
-                        except Exception as e:
-                            logger.error(f"Error processing email: {e}")
-                            emails_failed += 1
-                            # Just continue to next email - will commit at intervals
-                            continue
-
-                    # Commit all emails
-                    await db.commit()
+                    async def record_progress(written: int) -> None:
+                        processing_task.emails_processed = resumed_processed + writer.emails_written
+                        await _save_checkpoint(
+                            db,
+                            task_id,
+                            MAIN_CHECKPOINT,
+                            writer,
+                            processing_task.emails_processed,
+                            resumed_failed + pipeline.emails_failed + writer.emails_failed,
+                        )
+
+                    writer = EmailBulkWriter(
+                        db,
+                        processing_task.id,
+                        attachment_processor,
+                        retain=[processing_task],
+                        before_commit=record_progress,
+                        executor=_get_extraction_executor(),
+                    )
+
+                    resumed_searchable = processing_task.emails_searchable or 0
+                    queue_embedding = _batch_embedding_enqueuer(task_id)
+
+                    # Queue the batch's embedding (unless embedded inline) and publish progress
+                    async def after_batch_written(items: list) -> None:
+                        if queue_embedding is not None:
+                            await queue_embedding(items)
+
+                        emails_processed = resumed_processed + writer.emails_written
+                        progress = 10 + (emails_processed / total_emails * 50)
+                        await worker_cache.publish_task_update(
+                            task_id=task_id,
+                            status="extracting",
+                            progress=progress,
+                            message=f"Processed {emails_processed}/{total_emails} emails",
+                            emails_processed=emails_processed,
+                            emails_total=total_emails,
+                            emails_failed=resumed_failed + pipeline.emails_failed + writer.emails_failed,
+                            current_phase="extracting",
+                        )
+
+                    async def after_batch_embedded(embedded: int) -> None:
+                        await worker_cache.publish_task_update(
+                            task_id=task_id,
+                            status="extracting",
+                            progress=10 + (writer.emails_written + resumed_processed) / total_emails * 50,
+                            message=f"{resumed_searchable + pipeline.emails_embedded} emails searchable",
+                            emails_searchable=resumed_searchable + pipeline.emails_embedded,
+                            current_phase="extracting",
+                        )
+
+                    # Parsing, extraction, writes and embedding overlap; each
+                    # batch becomes searchable as soon as it is embedded
+                    pipeline = IngestPipeline(
+                        writer,
+                        get_worker_db_context,
+                        embed=settings.ingest_inline_embedding,
+                        on_batch_written=after_batch_written,
+                        on_batch_embedded=after_batch_embedded,
+                    )
+                    await pipeline.run(processor.extract_emails(resume_from=resume_from))
+                    emails_failed += pipeline.emails_failed
 
+                    emails_processed = resumed_processed + writer.emails_written
+                    emails_failed += resumed_failed + writer.emails_failed
                     processing_task.emails_processed = emails_processed
                     processing_task.emails_failed = emails_failed
 
@@ -411,32 +377,14 @@ async def _process_pst_file_async(task, task_id: str) -> dict:
                     processor.close()
 
                 # Start embedding phase
-                processing_task.status = TaskStatus.EMBEDDING
-                processing_task.current_phase = "embedding"
-                await db.commit()
-
-                await worker_cache.publish_task_update(
-                    task_id=task_id,
-                    status="embedding",
-                    progress=60.0,
-                    message="Generating embeddings...",
-                    emails_processed=emails_processed,
-                    emails_total=total_emails,
-                    emails_failed=emails_failed,
-                    current_phase="embedding",
+                return await _start_embedding_phase(
+                    db,
+                    worker_cache,
+                    processing_task,
+                    emails_processed,
+                    emails_failed,
                 )
 
-                # Trigger embedding task
-                from app.workers.indexing_tasks import embed_emails_for_task
-
-                embed_emails_for_task.delay(task_id)
-
-                return {
-                    "status": "embedding_started",
-                    "emails_processed": emails_processed,
-                    "emails_failed": emails_failed,
-                }
-
             except PSTProcessorError as e:
                 logger.error(f"PST processing error: {e}")
                 processing_task.status = TaskStatus.FAILED
@@ -454,6 +402,24 @@ async def _process_pst_file_async(task, task_id: str) -> dict:
 
             except Exception as e:
                 logger.exception(f"Unexpected error processing PST: {e}")
+
+                # Retried through the scheduler queue, so the per-user caps still apply
+                if ingest_scheduler.requeue(processing_task):
+                    processing_task.error_message = f"Retrying after error: {e}"
+                    await db.commit()
+
+                    try:
+                        await worker_cache.publish_task_update(
+                            task_id=task_id,
+                            status="pending",
+                            progress=0,
+                            message=f"Queued for retry after error: {e}",
+                        )
+                    except Exception as cache_error:
+                        logger.warning(f"Failed to publish cache update: {cache_error}")
+
+                    return {"error": str(e), "retrying": True}
+
                 processing_task.status = TaskStatus.FAILED
                 processing_task.error_message = f"Unexpected error: {e}"
                 await db.commit()
@@ -468,40 +434,508 @@ async def _process_pst_file_async(task, task_id: str) -> dict:
                 except Exception as cache_error:
                     logger.warning(f"Failed to publish cache update: {cache_error}")
 
-                return {"error": str(e), "should_retry": True, "exception": e}
+                return {"error": str(e)}
+
+
+MAIN_CHECKPOINT = "main"
+
+
+class ShardCancelled(Exception):
+    """Raised after a shard commits a batch and finds its task cancelled."""
+
+    pass
+
+
+def _get_checkpoint(processing_task: ProcessingTask, scope: str) -> dict | None:
+    """Get the resume cursor recorded for an extraction scope."""
+    return (processing_task.checkpoint or {}).get(scope)
 
 
-async def _save_attachment(
+async def _save_checkpoint(
+    db,
     task_id: str,
-    email_id: str,
-    filename: str,
-    content: bytes,
-) -> str:
-    """Save attachment to storage and return path."""
-    # Create directory structure
-    storage_dir = Path(settings.upload_dir) / "attachments" / task_id / email_id
-    storage_dir.mkdir(parents=True, exist_ok=True)
+    scope: str,
+    writer: EmailBulkWriter,
+    emails_processed: int,
+    emails_failed: int,
+) -> None:
+    """
+    Record the resume cursor for a scope in the current batch's transaction.
+
+    Merged with ``||`` so concurrent shards don't overwrite each other.
+    """
+    if writer.position is None:
+        return
+
+    folder_index, folder_path, message_index = writer.position
+    cursor = {
+        "folder": folder_index,
+        "folder_path": folder_path,
+        "message": message_index,
+        "emails_processed": emails_processed,
+        "emails_failed": emails_failed,
+    }
+
+    await db.execute(
+        update(ProcessingTask)
+        .where(ProcessingTask.id == task_id)
+        .values(
+            checkpoint=func.coalesce(
+                ProcessingTask.checkpoint, literal({}, JSONB)
+            ).op("||")(literal({scope: cursor}, JSONB))
+        )
+    )
 
-    # Sanitize filename
-    safe_filename = "".join(
-        c for c in filename if c.isalnum() or c in "._-"
-    )[:255]
 
-    if not safe_filename:
-        safe_filename = "attachment"
+def _get_extraction_executor():
+    """Get the attachment extraction pool, or None to parse inline."""
+    if settings.attachment_extraction_pool_enabled:
+        return extraction_executor
+    return None
 
-    # Handle duplicate filenames
-    file_path = storage_dir / safe_filename
-    counter = 1
-    while file_path.exists():
-        name, ext = safe_filename.rsplit(".", 1) if "." in safe_filename else (safe_filename, "")
-        file_path = storage_dir / f"{name}_{counter}.{ext}" if ext else storage_dir / f"{name}_{counter}"
-        counter += 1
 
-    # Write file
-    file_path.write_bytes(content)
+def _batch_embedding_enqueuer(task_id: str):
+    """
+    Get a callback that queues an embedding job per committed batch.
 
-    return str(file_path)
+    Returns None when the ingest pipeline embeds batches itself.
+    """
+    if settings.ingest_inline_embedding:
+        return None
+
+    from app.workers.indexing_tasks import embed_email_batch
+
+    async def enqueue(items: list) -> None:
+        if items:
+            embed_email_batch.delay(task_id, [email_row["id"] for email_row, _ in items])
+
+    return enqueue
+
+
+async def _start_embedding_phase(
+    db,
+    worker_cache: WorkerCacheService,
+    processing_task: ProcessingTask,
+    emails_processed: int,
+    emails_failed: int,
+) -> dict:
+    """Move a task from extraction to embedding and enqueue the embedding job."""
+    task_id = str(processing_task.id)
+
+    processing_task.status = TaskStatus.EMBEDDING
+    processing_task.current_phase = "embedding"
+    await db.commit()
+
+    await worker_cache.publish_task_update(
+        task_id=task_id,
+        status="embedding",
+        progress=60.0,
+        message="Generating embeddings...",
+        emails_processed=emails_processed,
+        emails_total=processing_task.emails_total,
+        emails_failed=emails_failed,
+        current_phase="embedding",
+    )
+
+    # Trigger embedding task
+    from app.workers.indexing_tasks import embed_emails_for_task
+
+    embed_emails_for_task.delay(task_id)
+
+    return {
+        "status": "embedding_started",
+        "emails_processed": emails_processed,
+        "emails_failed": emails_failed,
+    }
+
+
+async def _dispatch_shards(
+    db,
+    worker_cache: WorkerCacheService,
+    processing_task: ProcessingTask,
+    shards: list[FolderShard],
+) -> dict:
+    """Fan folder shards out as a Celery chord that aggregates on completion."""
+    task_id = str(processing_task.id)
+
+    processing_task.current_phase = "extracting_shards"
+    await db.commit()
+
+    chord(
+        process_pst_shard.s(task_id, shard.index, shard.folders)
+        for shard in shards
+    )(finalize_pst_shards.s(task_id))
+
+    logger.info(
+        f"Dispatched {len(shards)} shards for task {task_id}: "
+        f"{[shard.message_count for shard in shards]} emails per shard"
+    )
+
+    await worker_cache.publish_task_update(
+        task_id=task_id,
+        status="extracting",
+        progress=10.0,
+        message=f"Extracting in {len(shards)} parallel shards",
+        emails_total=processing_task.emails_total,
+        current_phase="extracting_shards",
+    )
+
+    return {"status": "sharded", "shards": len(shards)}
+
+
+@celery_app.task(
+    bind=True,
+    name="app.workers.email_tasks.process_pst_shard",
+    max_retries=3,
+    default_retry_delay=60,
+)
+def process_pst_shard(self, task_id: str, shard_index: int, folders: list[list[int]]) -> dict:
+    """
+    Extract the emails of one folder shard of a PST file.
+
+    Failures are reported in the result instead of raised once retries are
+    exhausted, so the aggregation step of the chord always runs.
+
+    Args:
+        task_id: UUID of the ProcessingTask
+        shard_index: Index of the shard within the plan
+        folders: Sub-folder index paths belonging to this shard
+
+    Returns:
+        Shard result summary
+    """
+    logger.info(f"Starting shard {shard_index} ({len(folders)} folders) for task {task_id}")
+
+    try:
+        result = run_async(_process_pst_shard_async(task_id, shard_index, folders))
+    except Exception as e:
+        # Setup failed (database, cache, task lookup): still give the chord a result
+        logger.exception(f"Shard {shard_index} of task {task_id} failed to start: {e}")
+        result = {"shard": shard_index, "error": str(e), "should_retry": True}
+
+    if result.pop("should_retry", False) and self.request.retries < self.max_retries:
+        logger.info(f"Retrying shard {shard_index} of task {task_id}: {result.get('error')}")
+        raise self.retry(countdown=60 * (self.request.retries + 1))
+
+    return result
+
+
+async def _process_pst_shard_async(
+    task_id: str,
+    shard_index: int,
+    folders: list[list[int]],
+) -> dict:
+    """Async implementation of shard extraction."""
+    async with get_worker_cache() as worker_cache:
+        async with get_worker_db_context() as db:
+            result = await db.execute(
+                select(ProcessingTask).where(ProcessingTask.id == task_id)
+            )
+            processing_task = result.scalar_one_or_none()
+
+            if not processing_task:
+                logger.error(f"Processing task not found: {task_id}")
+                return {"shard": shard_index, "error": "Task not found"}
+
+            total_emails = processing_task.emails_total or 0
+
+            # A retried shard picks up after its last committed batch
+            scope = f"shard:{shard_index}"
+            cursor = _get_checkpoint(processing_task, scope)
+            resume_from = (cursor["folder"], cursor["message"]) if cursor else None
+            resumed_processed = cursor.get("emails_processed", 0) if cursor else 0
+            resumed_failed = cursor.get("emails_failed", 0) if cursor else 0
+
+            cancelled = False
+
+            async def record_progress(written: int) -> None:
+                """Bump the shared counter in the batch's transaction and check for cancellation."""
+                nonlocal cancelled
+                new_total = await db.scalar(
+                    update(ProcessingTask)
+                    .where(ProcessingTask.id == task_id)
+                    .values(emails_processed=ProcessingTask.emails_processed + written)
+                    .returning(ProcessingTask.emails_processed)
+                )
+                status = await db.scalar(
+                    select(ProcessingTask.status).where(ProcessingTask.id == task_id)
+                )
+                cancelled = status == TaskStatus.CANCELLED.value
+
+                await _save_checkpoint(
+                    db,
+                    task_id,
+                    scope,
+                    writer,
+                    resumed_processed + writer.emails_written,
+                    resumed_failed + pipeline.emails_failed + writer.emails_failed,
+                )
+
+                if new_total is not None and total_emails:
+                    await worker_cache.publish_task_update(
+                        task_id=task_id,
+                        status="extracting",
+                        progress=10 + (min(new_total, total_emails) / total_emails * 50),
+                        message=f"Processed {new_total}/{total_emails} emails",
+                        emails_processed=new_total,
+                        emails_total=total_emails,
+                        current_phase="extracting_shards",
+                    )
+
+            writer = EmailBulkWriter(
+                db,
+                processing_task.id,
+                AttachmentProcessor(),
+                before_commit=record_progress,
+                executor=_get_extraction_executor(),
+            )
+
+            queue_embedding = _batch_embedding_enqueuer(task_id)
+
+            async def after_batch_written(items: list) -> None:
+                if queue_embedding is not None:
+                    await queue_embedding(items)
+                if cancelled:
+                    raise ShardCancelled()
+
+            pipeline = IngestPipeline(
+                writer,
+                get_worker_db_context,
+                embed=settings.ingest_inline_embedding,
+                on_batch_written=after_batch_written,
+            )
+
+            try:
+                processor = PSTProcessor(processing_task.file_path)
+                processor.open()
+
+                try:
+                    await pipeline.run(
+                        processor.extract_emails_from_folders(folders, resume_from=resume_from)
+                    )
+                except ShardCancelled:
+                    logger.info(f"Task {task_id} cancelled, stopping shard {shard_index}")
+                finally:
+                    processor.close()
+
+            except Exception as e:
+                logger.exception(f"Shard {shard_index} of task {task_id} failed: {e}")
+                await db.rollback()
+                return {
+                    "shard": shard_index,
+                    "error": str(e),
+                    "should_retry": True,
+                    "emails_processed": resumed_processed + writer.emails_written,
+                    "emails_failed": resumed_failed + pipeline.emails_failed + writer.emails_failed,
+                }
+
+    emails_processed = resumed_processed + writer.emails_written
+    emails_failed = resumed_failed + pipeline.emails_failed + writer.emails_failed
+
+    logger.info(
+        f"Shard {shard_index} of task {task_id} extracted {emails_processed} emails "
+        f"({emails_failed} failed)"
+    )
+
+    return {
+        "shard": shard_index,
+        "emails_processed": emails_processed,
+        "emails_failed": emails_failed,
+    }
+
+
+@celery_app.task(
+    bind=True,
+    name="app.workers.email_tasks.finalize_pst_shards",
+)
+def finalize_pst_shards(self, shard_results: list[dict], task_id: str) -> dict:
+    """Aggregate shard results and start the embedding phase."""
+    result = run_async(_finalize_pst_shards_async(shard_results, task_id))
+    if result.get("error") or result.get("status") == "cancelled":
+        schedule_ingestion.delay()
+    return result
+
+
+async def _finalize_pst_shards_async(shard_results: list[dict], task_id: str) -> dict:
+    """Async implementation of shard aggregation."""
+    emails_processed = sum(r.get("emails_processed", 0) for r in shard_results)
+    emails_failed = sum(r.get("emails_failed", 0) for r in shard_results)
+    errors = [f"shard {r['shard']}: {r['error']}" for r in shard_results if r.get("error")]
+
+    async with get_worker_cache() as worker_cache:
+        async with get_worker_db_context() as db:
+            result = await db.execute(
+                select(ProcessingTask).where(ProcessingTask.id == task_id)
+            )
+            processing_task = result.scalar_one_or_none()
+
+            if not processing_task:
+                logger.error(f"Processing task not found: {task_id}")
+                return {"error": "Task not found"}
+
+            if processing_task.status == TaskStatus.CANCELLED.value:
+                return {"status": "cancelled"}
+
+            processing_task.emails_processed = emails_processed
+            processing_task.emails_failed = emails_failed
+
+            if errors:
+                processing_task.error_details = "\n".join(errors)
+
+            logger.info(
+                f"Extracted {emails_processed} emails ({emails_failed} failed) "
+                f"from {len(shard_results)} shards for task {task_id}"
+            )
+
+            if errors and len(errors) == len(shard_results):
+                processing_task.status = TaskStatus.FAILED
+                processing_task.error_message = "All extraction shards failed"
+                await db.commit()
+
+                await worker_cache.publish_task_update(
+                    task_id=task_id,
+                    status="failed",
+                    progress=0,
+                    message="All extraction shards failed",
+                )
+                return {"error": "All extraction shards failed"}
+
+            return await _start_embedding_phase(
+                db,
+                worker_cache,
+                processing_task,
+                emails_processed,
+                emails_failed,
+            )
+
+
+@celery_app.task(
+    bind=True,
+    name="app.workers.email_tasks.assemble_chunked_upload",
+    max_retries=3,
+    default_retry_delay=30,
+)
+def assemble_chunked_upload(self, task_id: str, upload_id: str) -> dict:
+    """
+    Finish a chunked upload and start processing it.
+
+    Moves the received file into place, computes its hashes, rejects
+    duplicates of an already-processed PST and queues the task for the
+    ingest scheduler.
+    """
+    try:
+        return run_async(_assemble_chunked_upload_async(task_id, upload_id))
+    except OSError as e:
+        raise self.retry(exc=e)
+
+
+async def _assemble_chunked_upload_async(task_id: str, upload_id: str) -> dict:
+    """Async implementation of chunked upload assembly."""
+    async with get_worker_cache() as worker_cache:
+        async with get_worker_db_context() as db:
+            result = await db.execute(
+                select(ProcessingTask).where(ProcessingTask.id == task_id)
+            )
+            processing_task = result.scalar_one_or_none()
+
+            if not processing_task:
+                logger.error(f"Processing task not found: {task_id}")
+                return {"error": "Task not found"}
+
+            session = chunked_upload_service.load(upload_id)
+
+            async def fail(message: str) -> dict:
+                processing_task.status = TaskStatus.FAILED
+                processing_task.current_phase = None
+                processing_task.error_message = message
+                await db.commit()
+                await worker_cache.publish_task_update(
+                    task_id=task_id,
+                    status="failed",
+                    progress=0,
+                    message=message,
+                )
+                return {"error": message}
+
+            if processing_task.status == TaskStatus.CANCELLED.value:
+                if session is not None:
+                    chunked_upload_service.discard(session)
+                return {"status": "cancelled"}
+
+            if session is None:
+                return await fail("Upload session not found")
+
+            try:
+                assembled = await asyncio.to_thread(
+                    chunked_upload_service.finalize,
+                    session,
+                    processing_task.file_path,
+                )
+            except ChunkedUploadError as e:
+                return await fail(str(e))
+
+            result = await db.execute(
+                select(ProcessingTask.id).where(
+                    ProcessingTask.sha256_hash == assembled.sha256_hash,
+                    ProcessingTask.status != TaskStatus.FAILED,
+                    ProcessingTask.id != processing_task.id,
+                )
+            )
+            existing_id = result.scalars().first()
+            if existing_id:
+                Path(processing_task.file_path).unlink(missing_ok=True)
+                chunked_upload_service.discard(session)
+                return await fail(f"This file has already been processed (task: {existing_id})")
+
+            processing_task.file_size_bytes = assembled.file_size
+            processing_task.sha256_hash = assembled.sha256_hash
+            processing_task.md5_hash = assembled.md5_hash
+            processing_task.chunk_size_bytes = assembled.chunk_size
+            processing_task.chunk_hashes = assembled.chunk_hashes
+            processing_task.merkle_root = assembled.merkle_root
+            processing_task.sample_fingerprint = assembled.sample_fingerprint
+            processing_task.status = TaskStatus.PENDING
+            processing_task.current_phase = None
+            await db.commit()
+
+            chunked_upload_service.discard(session)
+
+    logger.info(f"Chunked upload {upload_id} assembled for task {task_id}")
+    schedule_ingestion.delay()
+    return {"status": "queued", "task_id": task_id}
+
+
+@celery_app.task(
+    name="app.workers.email_tasks.cleanup_upload_sessions",
+)
+def cleanup_upload_sessions() -> dict:
+    """Delete chunked upload sessions abandoned for longer than the session TTL."""
+    expired = chunked_upload_service.expire(settings.upload_session_ttl_hours * 3600)
+    return {"expired": expired}
+
+
+@celery_app.task(
+    name="app.workers.email_tasks.schedule_ingestion",
+)
+def schedule_ingestion() -> dict:
+    """
+    Start the queued PST tasks the ingest scheduler gives a slot to.
+
+    Queued whenever a task is uploaded or gives up its slot, and run
+    periodically by beat in case a trigger was lost.
+    """
+    return run_async(_schedule_ingestion_async())
+
+
+async def _schedule_ingestion_async() -> dict:
+    """Async implementation of ingest scheduling."""
+    async with get_worker_db_context() as db:
+        task_ids = await ingest_scheduler.dispatch(db)
+
+    for task_id in task_ids:
+        process_pst_file.delay(task_id)
+
+    return {"dispatched": task_ids}
 
 
 @celery_app.task(
@@ -536,11 +970,14 @@ async def _cancel_processing_async(task_id: str) -> dict:
         processing_task.status = TaskStatus.CANCELLED
         await db.commit()
 
-        await worker_cache.publish_task_update(
-            task_id=task_id,
-            status="cancelled",
-            progress=processing_task.progress_percent,
-            message="Task cancelled by user",
-        )
+        schedule_ingestion.delay()
+
+        async with get_worker_cache() as worker_cache:
+            await worker_cache.publish_task_update(
+                task_id=task_id,
+                status="cancelled",
+                progress=processing_task.progress_percent,
+                message="Task cancelled by user",
+            )
 
         return {"status": "cancelled"}
@@ -11,14 +11,20 @@ from datetime import datetime, timezone
 import redis.asyncio as aioredis
 from celery import current_task
 from loguru import logger
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.orm import contains_eager
 
 from app.config import settings
 from app.db.models.attachment import Attachment
 from app.db.models.email import Email
 from app.db.models.processing_task import ProcessingTask, TaskStatus
 from app.db.session import get_worker_db_context
-from app.services.embedding_service import embedding_service
+from app.services.embedding_service import (
+    AttachmentEmbeddingInput,
+    EmailEmbeddingInput,
+    embedding_service,
+)
+from app.services.ingest_pipeline import mark_emails_embedded
 from app.workers.celery_app import celery_app
 
 
@@ -144,6 +150,41 @@ def run_async(coro):
             loop.close()
 
 
+def _email_embedding_input(email: Email) -> EmailEmbeddingInput:
+    """Build the batch embedding input for an email."""
+    return EmailEmbeddingInput(
+        email_id=str(email.id),
+        subject=email.subject or "",
+        body=email.indexed_body,
+        sender=email.sender_email or "",
+        recipients=email.to_recipients or [],
+        metadata={
+            "pst_file_id": str(email.pst_file_id),
+            # Unix timestamp for ChromaDB numeric filtering, plus a readable date
+            "date": email.sent_date.timestamp() if email.sent_date else None,
+            "sent_date": email.sent_date.isoformat() if email.sent_date else None,
+            "folder_path": email.folder_path,
+        },
+    )
+
+
+def _attachment_embedding_input(
+    attachment: Attachment,
+    pst_file_id: str,
+) -> AttachmentEmbeddingInput:
+    """Build the batch embedding input for an attachment (content must be loaded)."""
+    return AttachmentEmbeddingInput(
+        attachment_id=str(attachment.id),
+        email_id=str(attachment.email_id),
+        filename=attachment.filename,
+        content=attachment.extracted_text,
+        metadata={
+            "pst_file_id": pst_file_id,
+            "content_type": attachment.content_type,
+        },
+    )
+
+
 @celery_app.task(
     bind=True,
     name="app.workers.indexing_tasks.embed_emails_for_task",
@@ -162,7 +203,14 @@ def embed_emails_for_task(self, task_id: str) -> dict:
     """
     logger.info(f"Starting embedding generation for task {task_id}")
 
-    return run_async(_embed_emails_async(self, task_id))
+    result = run_async(_embed_emails_async(self, task_id))
+
+    # The task has finished (or failed) and gives up its ingest slot
+    from app.workers.email_tasks import schedule_ingestion
+
+    schedule_ingestion.delay()
+
+    return result
 
 
 async def _embed_emails_async(task, task_id: str) -> dict:
@@ -202,43 +250,31 @@ async def _embed_emails_async(task, task_id: str) -> dict:
 
                 logger.info(f"Embedding {total_emails} emails for task {task_id}")
 
-                # Process emails in batches
-                batch_size = 50
+                # Chunks from a whole group of emails are encoded together
+                batch_size = settings.embedding_batch_size
 
                 for i in range(0, total_emails, batch_size):
                     batch = emails[i : i + batch_size]
 
-                    for email in batch:
-                        try:
-                            # Embed email content
-                            # Store date as Unix timestamp for ChromaDB numeric filtering
-                            date_timestamp = email.sent_date.timestamp() if email.sent_date else None
-
-                            chunks_created = await embedding_service.embed_and_store_email(
-                                email_id=str(email.id),
-                                subject=email.subject or "",
-                                body=email.body_text or "",
-                                sender=email.sender_email or "",
-                                recipients=email.to_recipients or [],
-                                metadata={
-                                    "pst_file_id": str(processing_task.id),
-                                    "date": date_timestamp,  # Unix timestamp for ChromaDB filtering
-                                    "sent_date": email.sent_date.isoformat() if email.sent_date else None,  # Human-readable
-                                    "folder_path": email.folder_path,
-                                },
-                            )
-
-                            # Mark email as embedded
-                            email.is_embedded = True
-                            email.embedding_id = str(email.id)
-                            total_chunks += chunks_created
-                            emails_embedded += 1
-
-                        except Exception as e:
-                            logger.error(f"Error embedding email {email.id}: {e}")
-                            continue
-
-                    # Commit batch and update progress
+                    # Near-duplicates share their canonical's embedding
+                    duplicate_ids = [str(email.id) for email in batch if email.duplicate_of]
+                    inputs = [
+                        _email_embedding_input(email)
+                        for email in batch
+                        if not email.duplicate_of
+                    ]
+
+                    batch_result = await asyncio.to_thread(
+                        embedding_service.store_embeddings_batch, inputs
+                    )
+                    embedded_ids = duplicate_ids + batch_result.email_ids
+                    total_chunks += batch_result.chunks_stored
+                    emails_embedded += len(batch_result.email_ids)
+
+                    # Mark embedded (skipping any a batch job got to first), then commit;
+                    # touching the task renews its ingest scheduler slot lease
+                    await mark_emails_embedded(db, processing_task.id, embedded_ids)
+                    processing_task.updated_at = datetime.now(timezone.utc)
                     await db.commit()
 
                     progress = 60 + (emails_embedded / total_emails * 30) if total_emails > 0 else 90
@@ -268,11 +304,13 @@ async def _embed_emails_async(task, task_id: str) -> dict:
                 result = await db.execute(
                     select(Attachment)
                     .join(Email)
+                    .join(Attachment.content)
+                    .options(contains_eager(Attachment.content))
                     .where(
                         Email.pst_file_id == processing_task.id,
+                        Email.duplicate_of.is_(None),
                         Attachment.is_extracted.is_(True),
                         Attachment.is_embedded.is_(False),
-                        Attachment.extracted_text.isnot(None),
                     )
                 )
                 attachments = list(result.scalars().all())
@@ -280,28 +318,24 @@ async def _embed_emails_async(task, task_id: str) -> dict:
                 total_attachments = len(attachments)
                 attachments_embedded = 0
 
-                for attachment in attachments:
-                    try:
-                        chunks_created = await embedding_service.embed_and_store_attachment(
-                            attachment_id=str(attachment.id),
-                            email_id=str(attachment.email_id),
-                            filename=attachment.filename,
-                            content=attachment.extracted_text,
-                            metadata={
-                                "pst_file_id": str(processing_task.id),
-                                "content_type": attachment.content_type,
-                            },
-                        )
-
-                        attachment.is_embedded = True
-                        total_chunks += chunks_created
-                        attachments_embedded += 1
-
-                    except Exception as e:
-                        logger.error(f"Error embedding attachment {attachment.id}: {e}")
-                        continue
+                for i in range(0, total_attachments, batch_size):
+                    batch = attachments[i : i + batch_size]
+                    batch_result = await asyncio.to_thread(
+                        embedding_service.store_embeddings_batch,
+                        attachments=[
+                            _attachment_embedding_input(a, str(processing_task.id)) for a in batch
+                        ],
+                    )
 
-                await db.commit()
+                    embedded = set(batch_result.attachment_ids)
+                    for attachment in batch:
+                        if str(attachment.id) in embedded:
+                            attachment.is_embedded = True
+                    total_chunks += batch_result.chunks_stored
+                    attachments_embedded += len(embedded)
+
+                    processing_task.updated_at = datetime.now(timezone.utc)
+                    await db.commit()
 
                 # Start indexing phase
                 processing_task.status = TaskStatus.INDEXING
@@ -362,6 +396,85 @@ async def _embed_emails_async(task, task_id: str) -> dict:
                 raise task.retry(exc=e)
 
 
+@celery_app.task(
+    bind=True,
+    name="app.workers.indexing_tasks.embed_email_batch",
+    max_retries=3,
+    default_retry_delay=30,
+)
+def embed_email_batch(self, task_id: str, email_ids: list[str]) -> dict:
+    """
+    Embed one committed ingest batch so it is searchable before the PST finishes.
+
+    Idempotent: emails already embedded are skipped and vector writes are
+    upserts, so retries and the end-of-task sweep can overlap safely.
+
+    Args:
+        task_id: UUID of the ProcessingTask
+        email_ids: IDs of the emails in the batch
+
+    Returns:
+        Embedding result summary
+    """
+    try:
+        return run_async(_embed_email_batch_async(task_id, email_ids))
+    except Exception as e:
+        raise self.retry(exc=e)
+
+
+async def _embed_email_batch_async(task_id: str, email_ids: list[str]) -> dict:
+    """Async implementation of batch embedding."""
+    async with get_worker_db_context() as db:
+        result = await db.execute(
+            select(Email).where(
+                Email.id.in_(email_ids),
+                Email.is_embedded.is_(False),
+            )
+        )
+        emails = list(result.scalars().all())
+
+        # Near-duplicates share their canonical's embedding
+        duplicate_ids = [str(email.id) for email in emails if email.duplicate_of]
+        batch_result = await asyncio.to_thread(
+            embedding_service.store_embeddings_batch,
+            [_email_embedding_input(email) for email in emails if not email.duplicate_of],
+        )
+        embedded_ids = batch_result.email_ids
+
+        result = await db.execute(
+            select(Attachment)
+            .join(Attachment.content)
+            .options(contains_eager(Attachment.content))
+            .where(
+                Attachment.email_id.in_(embedded_ids),
+                Attachment.is_extracted.is_(True),
+                Attachment.is_embedded.is_(False),
+            )
+        )
+        attachments = list(result.scalars().all())
+
+        batch_result = await asyncio.to_thread(
+            embedding_service.store_embeddings_batch,
+            attachments=[_attachment_embedding_input(a, task_id) for a in attachments],
+        )
+        attachment_ids = batch_result.attachment_ids
+
+        emails_embedded = await mark_emails_embedded(db, task_id, embedded_ids + duplicate_ids)
+        if attachment_ids:
+            await db.execute(
+                update(Attachment)
+                .where(Attachment.id.in_(attachment_ids))
+                .values(is_embedded=True)
+            )
+        await db.commit()
+
+    return {
+        "status": "completed",
+        "emails_embedded": emails_embedded,
+        "attachments_embedded": len(attachment_ids),
+    }
+
+
 @celery_app.task(
     name="app.workers.indexing_tasks.reindex_email",
 )
@@ -391,7 +504,7 @@ async def _reindex_email_async(email_id: str) -> dict:
             chunks_created = await embedding_service.embed_and_store_email(
                 email_id=str(email.id),
                 subject=email.subject or "",
-                body=email.body_text or "",
+                body=email.indexed_body,
                 sender=email.sender_email or "",
                 recipients=email.to_recipients or [],
                 metadata={
@@ -0,0 +1,85 @@
+"""
+Embedding Backend Benchmark
+
+Compares CPU throughput (chunks per second) of the PyTorch
+sentence-transformers backend against the int8-quantized ONNX Runtime
+backend, and reports their parity as the cosine similarity between the
+two backends' vectors for each chunk.
+
+Chunks come from the generated mail corpus of bench_batched_embedding.py,
+cut by EmbeddingService's chunker, and batched as configured
+(EMBEDDING_ENCODE_BATCH_SIZE, EMBEDDING_BATCH_TOKEN_BUDGET).
+
+Run from the backend directory:
+    python benchmarks/bench_embedding_backends.py [model name or path] [emails]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+from bench_batched_embedding import build_corpus  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.services.embedding_backends import OnnxBackend, TorchBackend  # noqa: E402
+from app.services.embedding_service import EmbeddingService  # noqa: E402
+
+
+def main() -> None:
+    model_name = sys.argv[1] if len(sys.argv) > 1 else EmbeddingService.MODEL_NAME
+    emails = build_corpus(int(sys.argv[2]) if len(sys.argv) > 2 else 300)
+
+    service = EmbeddingService()
+    chunks = [
+        chunk.text
+        for email in emails
+        for chunk in service.prepare_email_for_embedding(
+            email.email_id,
+            email.subject,
+            email.body,
+            email.sender,
+            email.recipients,
+            email.metadata,
+        )
+    ]
+    batch_size = settings.embedding_encode_batch_size
+    token_budget = settings.embedding_batch_token_budget
+    print(
+        f"Corpus: {len(emails)} emails, {len(chunks)} chunks, "
+        f"batch size {batch_size}, token budget {token_budget}"
+    )
+
+    with tempfile.TemporaryDirectory() as export_dir:
+        backends = {
+            "torch": TorchBackend(model_name),
+            "onnx-int8": OnnxBackend(model_name, export_dir=export_dir),
+        }
+
+        vectors = {}
+        baseline = None
+        for name, backend in backends.items():
+            backend.encode(chunks[:batch_size], batch_size=batch_size)  # warm up
+            start = time.perf_counter()
+            vectors[name] = backend.encode(
+                chunks, batch_size=batch_size, token_budget=token_budget
+            )
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{name:<10} {len(chunks) / elapsed:8.1f} chunks/s  {baseline / elapsed:5.2f}x")
+
+    reference, quantized = vectors["torch"], vectors["onnx-int8"]
+    similarity = (reference * quantized).sum(axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(quantized, axis=1)
+    )
+    print(
+        f"Cosine similarity to torch: mean {similarity.mean():.4f}, "
+        f"min {similarity.min():.4f}, p1 {np.percentile(similarity, 1):.4f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Embedding Pool Benchmark
+
+Compares chunks per second of in-process encoding (one process using all
+cores through intra-op threads) against EmbeddingPool with increasing
+numbers of model replicas, each pinned to its own core subset.
+
+Chunks come from the generated mail corpus of bench_batched_embedding.py.
+Run on the target node, from the backend directory:
+    python benchmarks/bench_embedding_pool.py [model name or path] [emails] [backend]
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_batched_embedding import build_corpus  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.services.embedding_backends import load_embedding_backend  # noqa: E402
+from app.services.embedding_pool import EmbeddingPool  # noqa: E402
+from app.services.embedding_service import EmbeddingService  # noqa: E402
+
+
+def main() -> None:
+    model_name = sys.argv[1] if len(sys.argv) > 1 else EmbeddingService.MODEL_NAME
+    emails = build_corpus(int(sys.argv[2]) if len(sys.argv) > 2 else 600)
+    backend = sys.argv[3] if len(sys.argv) > 3 else None
+
+    service = EmbeddingService()
+    chunks = [
+        chunk.text
+        for email in emails
+        for chunk in service.prepare_email_for_embedding(
+            email.email_id,
+            email.subject,
+            email.body,
+            email.sender,
+            email.recipients,
+            email.metadata,
+        )
+    ]
+    batch_size = settings.embedding_encode_batch_size
+    token_budget = settings.embedding_batch_token_budget
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    print(
+        f"Corpus: {len(chunks)} chunks, {cores} cores, "
+        f"batch size {batch_size}, token budget {token_budget}"
+    )
+
+    in_process = load_embedding_backend(model_name, backend)
+    in_process.encode(chunks[:batch_size], batch_size=batch_size)  # warm up
+    start = time.perf_counter()
+    in_process.encode(chunks, batch_size=batch_size, token_budget=token_budget)
+    baseline = time.perf_counter() - start
+    print(f"{'in-process':<12} {len(chunks) / baseline:8.1f} chunks/s   1.00x")
+
+    workers = 1
+    while workers <= cores:
+        pool = EmbeddingPool(model_name, workers=workers, cores_per_worker=0, backend=backend)
+        try:
+            pool.encode(chunks[: batch_size * workers], batch_size=batch_size)  # start replicas
+            start = time.perf_counter()
+            pool.encode(chunks, batch_size=batch_size, token_budget=token_budget)
+            elapsed = time.perf_counter() - start
+        finally:
+            pool.shutdown()
+        label = f"pool x{workers}"
+        print(f"{label:<12} {len(chunks) / elapsed:8.1f} chunks/s  {baseline / elapsed:5.2f}x")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
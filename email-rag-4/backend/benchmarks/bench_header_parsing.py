@@ -0,0 +1,111 @@
+"""
+Header Parsing Micro-benchmark
+
+Compares per-message CPU time of the previous header handling in
+PSTProcessor._extract_message (transport headers re-decoded and re-split
+for the direct lookup, the sender fallback and the to/cc/bcc fallbacks)
+against a single MessageHeaders parse.
+
+Run from the backend directory:
+    python benchmarks/bench_header_parsing.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.pst_processor import MessageHeaders, _parse_message_id_list  # noqa: E402
+
+
+def build_header_heavy_message() -> bytes:
+    """Build a transport header block typical of relayed corporate mail."""
+    lines = []
+    for hop in range(12):
+        lines.append(
+            f"Received: from relay{hop}.mail.example.com (relay{hop}.mail.example.com "
+            f"[10.0.{hop}.1])\r\n\tby mx{hop}.example.net with ESMTPS id abc{hop}def;\r\n"
+            f"\tTue, 14 Mar 2023 09:{hop:02d}:11 +0000"
+        )
+    lines.append(
+        "DKIM-Signature: v=1; a=rsa-sha256; c=relaxed/relaxed; d=example.com; s=sel1;\r\n"
+        "\th=from:to:cc:subject:date:message-id:references;\r\n"
+        "\tbh=" + "A" * 44 + ";\r\n\tb=" + "B" * 340
+    )
+    lines.append('From: "Doe, Jane" <jane.doe@example.com>')
+    lines.append(
+        "To: " + ",\r\n ".join(f"User {i} <user{i}@example.com>" for i in range(25))
+    )
+    lines.append(
+        "Cc: " + ",\r\n ".join(f"cc{i}@example.org" for i in range(15))
+    )
+    lines.append("Subject: Re: Q3 forecast review")
+    lines.append("Message-ID: <CAF123456789@mail.example.com>")
+    lines.append("In-Reply-To: <CAF123456700@mail.example.com>")
+    lines.append(
+        "References: " + "\r\n ".join(f"<CAF1234567{i:02d}@mail.example.com>" for i in range(20))
+    )
+    lines.append("X-MS-Exchange-Organization-AuthAs: Internal")
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+
+def legacy_extract_headers(raw: bytes) -> dict[str, str]:
+    """The header parse PSTProcessor performed before MessageHeaders."""
+    headers = {}
+    transport_headers = raw.decode("utf-8", errors="replace")
+    for line in transport_headers.split("\n"):
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+    return headers
+
+
+def legacy_addresses(header_value: str) -> list[str]:
+    """The comma-split address parse used by the previous recipient fallback."""
+    recipients = []
+    for addr in header_value.split(","):
+        addr = addr.strip()
+        if "<" in addr and ">" in addr:
+            recipients.append(addr[addr.index("<") + 1 : addr.index(">")])
+        elif "@" in addr:
+            recipients.append(addr)
+    return recipients
+
+
+def legacy_per_message(raw: bytes) -> None:
+    """Five parses: direct lookup, sender fallback, to/cc/bcc fallbacks."""
+    headers = legacy_extract_headers(raw)
+    headers.get("message-id")
+    _parse_message_id_list(headers.get("references", ""))
+    legacy_addresses(legacy_extract_headers(raw).get("from", ""))
+    for key in ("to", "cc", "bcc"):
+        legacy_addresses(legacy_extract_headers(raw).get(key, ""))
+
+
+def parsed_per_message(raw: bytes) -> None:
+    """One parse with cached structured access."""
+    headers = MessageHeaders(raw)
+    headers.as_dict()
+    headers.message_id
+    headers.references
+    headers.from_address
+    for key in ("to", "cc", "bcc"):
+        headers.recipients(key)
+
+
+def main() -> None:
+    raw = build_header_heavy_message()
+    number = 2000
+
+    legacy = min(timeit.repeat(lambda: legacy_per_message(raw), number=number, repeat=5))
+    parsed = min(timeit.repeat(lambda: parsed_per_message(raw), number=number, repeat=5))
+
+    print(f"Header block: {len(raw)} bytes")
+    print(f"legacy (5 parses):   {legacy / number * 1e6:8.1f} us/message")
+    print(f"MessageHeaders (1):  {parsed / number * 1e6:8.1f} us/message")
+    print(f"speedup:             {legacy / parsed:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
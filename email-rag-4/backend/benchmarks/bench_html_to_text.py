@@ -0,0 +1,104 @@
+"""
+HTML-to-Text Micro-benchmark
+
+Compares per-document CPU time of the previous BeautifulSoup path in
+PSTProcessor._extract_text_from_html (full html.parser tree, decompose,
+get_text) against the streaming html_to_text converter on both of its
+parser backends.
+
+The default corpus is generated newsletter-style HTML: nested layout
+tables, inline styles, a <style> block, preheader padding and tracking
+pixels. Pass a directory to benchmark real messages instead (every
+*.html / *.htm file in it is loaded):
+    python benchmarks/bench_html_to_text.py [path/to/html/dir]
+
+Run from the backend directory.
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from app.utils.html_text import _convert_lxml, _convert_stdlib, etree  # noqa: E402
+
+
+def build_newsletter(index: int, articles: int = 12) -> str:
+    """Build one table-layout marketing newsletter."""
+    style = "font-family:Helvetica,Arial,sans-serif;font-size:14px;line-height:20px;color:#333333;"
+    rows = []
+    for n in range(articles):
+        rows.append(
+            f'<tr><td align="left" valign="top" style="{style}padding:0 24px 16px 24px;">'
+            f'<table role="presentation" cellpadding="0" cellspacing="0" width="100%"><tr>'
+            f'<td width="120" style="{style}"><a href="https://click.example.com/t/{index}/{n}">'
+            f'<img src="https://img.example.com/{index}/{n}.jpg" width="120" alt="Story {n}"></a></td>'
+            f'<td style="{style}padding-left:12px;"><h2 style="{style}font-size:18px;">'
+            f"Story {n}: Quarterly update &amp; outlook for region {n % 5}</h2>"
+            f'<p style="{style}">Revenue in the region grew&nbsp;{n + 3}% year over year as '
+            f"the new distribution agreements came into effect. Management expects the "
+            f"trend to continue into the <strong>next fiscal year</strong>, subject to "
+            f'supply constraints. <a href="https://click.example.com/r/{index}/{n}" '
+            f'style="color:#0066cc;">Read more&nbsp;&rsaquo;</a></p></td></tr></table></td></tr>'
+        )
+    preheader = "&zwnj;&nbsp;" * 80
+    return (
+        "<!DOCTYPE html><html><head>"
+        '<meta http-equiv="Content-Type" content="text/html; charset=utf-8">'
+        f"<title>Newsletter {index}</title>"
+        "<style>" + "".join(f".c{i}{{margin:0;padding:{i}px;}}" for i in range(150)) + "</style>"
+        "</head><body>"
+        f'<div style="display:none;max-height:0;overflow:hidden;">This week\'s highlights{preheader}</div>'
+        '<center><table role="presentation" width="600" cellpadding="0" cellspacing="0">'
+        + "".join(rows)
+        + f'<tr><td style="{style}font-size:11px;">You are receiving this email because you '
+        f'subscribed. <a href="https://click.example.com/u/{index}">Unsubscribe</a></td></tr>'
+        "</table></center>"
+        f'<img src="https://open.example.com/o/{index}.gif" width="1" height="1">'
+        "</body></html>"
+    )
+
+
+def load_corpus(directory: str | None) -> list[str]:
+    """Load HTML files from a directory, or generate the default corpus."""
+    if directory:
+        files = sorted(Path(directory).glob("*.htm*"))
+        return [f.read_text(encoding="utf-8", errors="replace") for f in files]
+    return [build_newsletter(i) for i in range(50)]
+
+
+def legacy_html_to_text(html_content: str) -> str:
+    """The BeautifulSoup path PSTProcessor used before html_to_text."""
+    soup = BeautifulSoup(html_content, "html.parser")
+    for element in soup(["script", "style", "head", "meta", "link"]):
+        element.decompose()
+    text = soup.get_text(separator="\n")
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return "\n".join(chunk for chunk in chunks if chunk)
+
+
+def main() -> None:
+    corpus = load_corpus(sys.argv[1] if len(sys.argv) > 1 else None)
+    if not corpus:
+        raise SystemExit("No HTML files found")
+
+    total_kb = sum(len(doc) for doc in corpus) / 1024
+    candidates = {"BeautifulSoup (legacy)": legacy_html_to_text, "html.parser stream": _convert_stdlib}
+    if etree is not None:
+        candidates["lxml stream"] = _convert_lxml
+
+    print(f"Corpus: {len(corpus)} documents, {total_kb:.0f} KiB")
+    baseline = None
+    for name, convert in candidates.items():
+        elapsed = min(timeit.repeat(lambda: [convert(doc) for doc in corpus], number=1, repeat=5))
+        per_doc = elapsed / len(corpus) * 1e3
+        baseline = baseline or elapsed
+        print(f"{name:<24} {per_doc:8.2f} ms/doc  {total_kb / elapsed / 1024:7.1f} MiB/s  {baseline / elapsed:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Query Embedding Latency Benchmark
+
+Measures search-query embedding latency (p50 / p99), counted from each
+query's arrival, under increasing arrival rates (open loop, Poisson
+arrivals on one event loop), for two strategies:
+
+- inline: ``model.encode`` called directly in the coroutine, which
+  blocks the event loop (the behaviour before QueryEmbedder).
+- batched: QueryEmbedder, which encodes on its own thread and coalesces
+  concurrent queries into one batch.
+
+Also reports event-loop lag: how late a 5 ms ticker wakes up, i.e. how
+long every other request on the API would stall.
+
+Run from the backend directory:
+    python benchmarks/bench_query_embedding.py [model name or path] [torch|onnx]
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.services.embedding_backends import OnnxBackend, TorchBackend  # noqa: E402
+from app.services.embedding_service import EmbeddingService  # noqa: E402
+from app.services.query_embedder import QueryEmbedder  # noqa: E402
+
+# Queries per second; each rate runs for DURATION seconds
+RATES = [25, 50, 100, 200, 400]
+DURATION = 4.0
+
+TERMS = (
+    "invoice contract budget forecast meeting legal counsel signed agreement "
+    "quarterly report merger shipment delay approval payroll audit vendor"
+).split()
+
+
+def make_query(rng: random.Random) -> str:
+    return "emails about " + " ".join(rng.sample(TERMS, rng.randint(2, 6)))
+
+
+async def run_load(embed, rate: float) -> tuple[list[float], float]:
+    """Send queries at ``rate`` per second; return latencies and worst loop lag."""
+    rng = random.Random(int(rate))
+    latencies: list[float] = []
+    lag = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal lag
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lag = max(lag, time.perf_counter() - start - 0.005)
+
+    async def request(query: str, arrival: float):
+        await embed(query)
+        latencies.append(time.perf_counter() - arrival)
+
+    ticker_task = asyncio.create_task(ticker())
+    requests = []
+    begin = time.perf_counter()
+    arrival = begin
+    while arrival < begin + DURATION:
+        arrival += rng.expovariate(rate)
+        # When the loop was blocked the query still counts from its arrival time
+        await asyncio.sleep(max(0.0, arrival - time.perf_counter()))
+        requests.append(asyncio.create_task(request(make_query(rng), arrival)))
+    await asyncio.gather(*requests)
+    done = True
+    await ticker_task
+    return latencies, lag
+
+
+async def main() -> None:
+    model_name = sys.argv[1] if len(sys.argv) > 1 else EmbeddingService.MODEL_NAME
+    backend_name = sys.argv[2] if len(sys.argv) > 2 else "torch"
+
+    with tempfile.TemporaryDirectory() as export_dir:
+        if backend_name == "onnx":
+            model = OnnxBackend(model_name, export_dir=export_dir)
+        else:
+            model = TorchBackend(model_name)
+
+        def encode(texts: list[str]) -> np.ndarray:
+            return model.encode(
+                texts,
+                batch_size=settings.embedding_encode_batch_size,
+                token_budget=settings.embedding_batch_token_budget,
+            )
+
+        async def inline(query: str) -> np.ndarray:
+            return encode([query])[0]
+
+        embedder = QueryEmbedder(encode)
+        encode([make_query(random.Random(0))])  # warm up
+        print(
+            f"Backend {model.name}; batched: up to {embedder.max_batch_size} queries, "
+            f"{embedder.max_wait * 1000:.1f} ms wait"
+        )
+        print(f"{'':<9} {'q/s':>5} {'p50 ms':>8} {'p99 ms':>8} {'loop lag ms':>12}")
+
+        try:
+            for rate in RATES:
+                for label, embed in (("inline", inline), ("batched", embedder.embed)):
+                    latencies, lag = await run_load(embed, rate)
+                    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+                    print(f"{label:<9} {rate:>5} {p50:8.1f} {p99:8.1f} {lag * 1000:12.1f}")
+        finally:
+            embedder.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+"""
+Token-Budget Batching Benchmark
+
+Compares embedding throughput (chunks per second) and padding efficiency
+(real tokens / padded tokens) of fixed-count batches against
+token-budget batches (see embedding_backends.plan_batches) for a range
+of budgets and batch-size caps. Configurations run interleaved for
+several rounds and the best time of each is reported.
+
+The default corpus is the generated mail of bench_batched_embedding.py.
+Pass a directory to benchmark real messages instead (every *.txt / *.eml
+file in it is one email body, cut by EmbeddingService's chunker):
+    python benchmarks/bench_token_batching.py [model name or path] [torch|onnx] [dir]
+
+Run from the backend directory.
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_batched_embedding import build_corpus  # noqa: E402
+
+from app.services.embedding_backends import (  # noqa: E402
+    OnnxBackend,
+    TorchBackend,
+    plan_batches,
+)
+from app.services.embedding_service import EmbeddingService  # noqa: E402
+
+# (max batch size, token budget); budget 0 is fixed-count batches
+CONFIGS = [
+    (32, 0),
+    (256, 0),
+    (256, 2048),
+    (128, 2048),
+    (64, 2048),
+    (256, 4096),
+    (128, 4096),
+    (256, 8192),
+]
+
+ROUNDS = 3
+
+
+def load_chunks(directory: str | None) -> list[str]:
+    """Chunk real message bodies from a directory, or the generated corpus."""
+    service = EmbeddingService()
+    if directory:
+        files = sorted(Path(directory).glob("*.txt")) + sorted(Path(directory).glob("*.eml"))
+        bodies = [(f.stem, f.read_text(encoding="utf-8", errors="replace")) for f in files]
+        emails = [(name, "", body) for name, body in bodies]
+    else:
+        emails = [(e.email_id, e.subject, e.body) for e in build_corpus(300)]
+
+    return [
+        chunk.text
+        for email_id, subject, body in emails
+        for chunk in service.prepare_email_for_embedding(email_id, subject, body, "", [], {})
+    ]
+
+
+def padding_efficiency(lengths: list[int], batch_size: int, token_budget: int) -> float:
+    padded = sum(
+        len(batch) * max(lengths[i] for i in batch)
+        for batch in plan_batches(lengths, batch_size, token_budget)
+    )
+    return sum(lengths) / padded
+
+
+def main() -> None:
+    model_name = sys.argv[1] if len(sys.argv) > 1 else EmbeddingService.MODEL_NAME
+    backend_name = sys.argv[2] if len(sys.argv) > 2 else "torch"
+    chunks = load_chunks(sys.argv[3] if len(sys.argv) > 3 else None)
+
+    with tempfile.TemporaryDirectory() as export_dir:
+        if backend_name == "onnx":
+            backend = OnnxBackend(model_name, export_dir=export_dir)
+            lengths = [len(e.ids) for e in backend.tokenizer.encode_batch(chunks)]
+        else:
+            backend = TorchBackend(model_name)
+            tokenized = backend.model.tokenizer(
+                chunks, truncation=True, max_length=backend.model.max_seq_length
+            )
+            lengths = [len(ids) for ids in tokenized["input_ids"]]
+
+        print(
+            f"Corpus: {len(chunks)} chunks, tokens mean {sum(lengths) / len(lengths):.0f}, "
+            f"max {max(lengths)}; backend {backend.name}"
+        )
+        backend.encode(chunks[:32], batch_size=32)  # warm up
+
+        best = [float("inf")] * len(CONFIGS)
+        for _ in range(ROUNDS):
+            for index, (batch_size, token_budget) in enumerate(CONFIGS):
+                start = time.perf_counter()
+                backend.encode(chunks, batch_size=batch_size, token_budget=token_budget)
+                best[index] = min(best[index], time.perf_counter() - start)
+
+        baseline = best[0]
+        for (batch_size, token_budget), elapsed in zip(CONFIGS, best):
+            label = f"max {batch_size}, budget {token_budget or '-'}"
+            print(
+                f"{label:<24} {len(chunks) / elapsed:8.1f} chunks/s  {baseline / elapsed:5.2f}x"
+                f"  padding efficiency {padding_efficiency(lengths, batch_size, token_budget):.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
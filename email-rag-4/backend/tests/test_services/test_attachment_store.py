@@ -0,0 +1,97 @@
+"""
+Tests for Attachment Store
+
+Tests for content-addressed blob writes and reference-counted release.
+"""
+
+import hashlib
+import os
+import time
+
+import pytest
+
+from app.services.attachment_store import AttachmentStore
+
+
+class FakeResult:
+    """Result stand-in returning fixed scalars."""
+
+    def __init__(self, values: list[str]):
+        self._values = values
+
+    def scalars(self):
+        return self
+
+    def all(self) -> list[str]:
+        return self._values
+
+
+class FakeSession:
+    """Session stand-in reporting which hashes are still referenced."""
+
+    def __init__(self, referenced: list[str]):
+        self.referenced = referenced
+
+    async def execute(self, statement):
+        return FakeResult(self.referenced)
+
+
+def sha256(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def age(path: str, seconds: int) -> None:
+    """Backdate a blob's mtime."""
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+@pytest.fixture
+def store(tmp_path) -> AttachmentStore:
+    return AttachmentStore(tmp_path / "blobs")
+
+
+class TestAttachmentStore:
+    """Tests for AttachmentStore."""
+
+    def test_fan_out_layout(self, store: AttachmentStore):
+        """Test blobs are nested under two hash-prefix directories."""
+        digest = sha256(b"logo")
+
+        path = store.blob_path(digest)
+
+        assert path == store.root / digest[:2] / digest[2:4] / digest
+
+    def test_identical_content_written_once(self, store: AttachmentStore):
+        """Test a repeated attachment reuses the existing blob."""
+        digest = sha256(b"disclaimer")
+
+        first_path, first_written = store.put(digest, b"disclaimer")
+        second_path, second_written = store.put(digest, b"disclaimer")
+
+        assert first_path == second_path
+        assert (first_written, second_written) == (True, False)
+        assert list(store.blob_path(digest).parent.iterdir()) == [store.blob_path(digest)]
+
+    async def test_release_keeps_referenced_blobs(self, store: AttachmentStore):
+        """Test only blobs without remaining references are removed."""
+        shared, orphan = sha256(b"shared"), sha256(b"orphan")
+        for digest, content in ((shared, b"shared"), (orphan, b"orphan")):
+            path, _ = store.put(digest, content)
+            age(path, store.RELEASE_GRACE_SECONDS * 2)
+
+        removed = await store.release(FakeSession([shared]), {shared, orphan})
+
+        assert removed == 1
+        assert store.blob_path(shared).exists()
+        assert not store.blob_path(orphan).exists()
+
+    async def test_release_skips_recently_reused_blobs(self, store: AttachmentStore):
+        """Test a blob just reused by an in-flight ingest survives release."""
+        digest = sha256(b"fresh")
+        store.put(digest, b"fresh")
+
+        removed = await store.release(FakeSession([]), {digest})
+
+        assert removed == 0
+        assert store.blob_path(digest).exists()
@@ -0,0 +1,114 @@
+"""
+Tests for Body Segmenter
+
+Tests for splitting email bodies into new content, quoted history,
+signatures and boilerplate.
+"""
+
+import pytest
+
+from app.services.body_segmenter import BodySegmenter
+
+
+@pytest.fixture
+def segmenter() -> BodySegmenter:
+    """Body segmenter instance."""
+    return BodySegmenter()
+
+
+class TestBodySegmenter:
+    """Tests for BodySegmenter.segment."""
+
+    def test_gmail_style_reply(self, segmenter):
+        """Test "On ... wrote:" starts the quoted history, even when wrapped."""
+        body = (
+            "Works for me, see you then.\n"
+            "\n"
+            "On Tue, Mar 5, 2024 at 9:14 AM Jane Doe <jane@example.com>\n"
+            "wrote:\n"
+            "> Can we move the call to 3pm?\n"
+        )
+
+        result = segmenter.segment(body)
+
+        assert result.new_content == "Works for me, see you then."
+        assert "Can we move the call" in result.quoted
+
+    def test_outlook_reply_header_block(self, segmenter):
+        """Test an Outlook From:/Sent: block and its separator are quoted."""
+        body = (
+            "Approved.\n"
+            "\n"
+            "________________________________\n"
+            "From: Bob Smith <bob@example.com>\n"
+            "Sent: Monday, March 4, 2024 5:02 PM\n"
+            "To: Jane Doe <jane@example.com>\n"
+            "Subject: Invoice 4471\n"
+            "\n"
+            "Please approve the attached invoice.\n"
+        )
+
+        result = segmenter.segment(body, subject="RE: Invoice 4471")
+
+        assert result.new_content == "Approved."
+        assert result.quoted.startswith("________")
+
+    def test_original_message_marker(self, segmenter):
+        """Test -----Original Message----- starts the quoted history."""
+        body = "Thanks!\n-----Original Message-----\nFrom: bob@example.com\nOld text"
+
+        assert segmenter.segment(body).new_content == "Thanks!"
+
+    def test_forwarded_content_is_kept(self, segmenter):
+        """Test forwarded messages stay in the new content."""
+        body = (
+            "FYI, see the customer's complaint below.\n"
+            "\n"
+            "From: Customer <c@example.org>\n"
+            "Sent: Friday, March 1, 2024 8:00 AM\n"
+            "To: Support <support@example.com>\n"
+            "Subject: Broken delivery\n"
+            "\n"
+            "The pallet arrived damaged.\n"
+        )
+
+        result = segmenter.segment(body, subject="FW: Broken delivery")
+
+        assert "The pallet arrived damaged." in result.new_content
+        assert result.quoted == ""
+
+    def test_signature_and_disclaimer(self, segmenter):
+        """Test the signature and trailing disclaimer are split off."""
+        body = (
+            "The contract is signed, filing it today.\n"
+            "\n"
+            "-- \n"
+            "Jane Doe | Senior Counsel\n"
+            "\n"
+            "CONFIDENTIALITY NOTICE: This e-mail is intended solely for the "
+            "addressee and may contain privileged information.\n"
+        )
+
+        result = segmenter.segment(body)
+
+        assert result.new_content == "The contract is signed, filing it today."
+        assert result.signature.startswith("--")
+        assert "CONFIDENTIALITY NOTICE" in result.boilerplate
+
+    def test_bare_dashes_divider_is_not_a_signature(self, segmenter):
+        """Test a bare "--" line is kept as a divider, not treated as "-- "."""
+        body = "Hi team,\n\nNumbers below.\n--\nQ3 revenue up 10%\nQ4 forecast flat\n"
+
+        result = segmenter.segment(body)
+
+        assert result.new_content == body.rstrip()
+        assert result.signature == ""
+
+    def test_plain_body_unchanged(self, segmenter):
+        """Test a body with nothing to strip is kept whole."""
+        body = "Please keep this confidential information between us.\n\nSee you Friday."
+
+        result = segmenter.segment(body)
+
+        assert result.new_content == body
+        assert result.quoted == result.signature == result.boilerplate == ""
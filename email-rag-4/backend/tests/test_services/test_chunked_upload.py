@@ -0,0 +1,153 @@
+"""
+Tests for Chunked Upload Service
+
+Tests for out-of-order part writes, validation, resume, completion and
+expiry of abandoned sessions.
+"""
+
+import hashlib
+import os
+import time
+
+import pytest
+
+from app.services.chunked_upload import (
+    ChunkedUploadError,
+    ChunkedUploadService,
+    ChunkValidationError,
+)
+from app.services.integrity import ChunkHasher, file_fingerprint, merkle_root
+
+INTEGRITY_CHUNK_SIZE = 1024
+
+
+async def body(data: bytes, piece: int = 700):
+    """Stream data in pieces that don't line up with leaf boundaries."""
+    for start in range(0, len(data), piece):
+        yield data[start : start + piece]
+
+
+@pytest.fixture
+def service(tmp_path):
+    # Parts don't line up with integrity leaves
+    return ChunkedUploadService(
+        root=tmp_path / "sessions",
+        chunk_size=3000,
+        integrity_chunk_size=INTEGRITY_CHUNK_SIZE,
+    )
+
+
+@pytest.fixture
+def data():
+    return os.urandom(3000 * 3 + 500)
+
+
+def part(session, data, index):
+    start = index * session.chunk_size
+    return data[start : start + session.chunk_size]
+
+
+class TestChunkedUpload:
+    """Tests for ChunkedUploadService."""
+
+    def test_create_splits_file_into_parts(self, service, data):
+        session = service.create("user", "mailbox.pst", len(data))
+
+        assert session.chunk_size == 3000
+        assert session.total_chunks == 4
+        assert session.chunk_length(3) == 500
+        assert service.load(session.upload_id) == session
+        assert service.load("not-a-uuid") is None
+
+    async def test_out_of_order_parts_assemble(self, service, data, tmp_path):
+        session = service.create("user", "mailbox.pst", len(data))
+
+        for index in (2, 0, 3, 1):
+            await service.write_chunk(session, index, body(part(session, data, index)))
+
+        final_path = tmp_path / "mailbox.pst"
+        assembled = service.finalize(session, final_path)
+
+        assert final_path.read_bytes() == data
+        assert assembled.sha256_hash == hashlib.sha256(data).hexdigest()
+        assert assembled.md5_hash == hashlib.md5(data).hexdigest()
+        assert assembled.sample_fingerprint == file_fingerprint(final_path)
+
+        # Leaves match hashing the whole file
+        hasher = ChunkHasher(INTEGRITY_CHUNK_SIZE)
+        hasher.update(data)
+        assert assembled.chunk_hashes == hasher.packed()
+        assert assembled.merkle_root == merkle_root(hasher.leaves)
+
+    async def test_missing_parts_are_reported_for_resume(self, service, data, tmp_path):
+        session = service.create("user", "mailbox.pst", len(data))
+        await service.write_chunk(session, 1, body(part(session, data, 1)))
+
+        assert service.missing(session) == [0, 2, 3]
+        with pytest.raises(ChunkedUploadError):
+            service.finalize(session, tmp_path / "mailbox.pst")
+
+    async def test_wrong_size_rejected(self, service, data):
+        session = service.create("user", "mailbox.pst", len(data))
+
+        with pytest.raises(ChunkValidationError):
+            await service.write_chunk(session, 0, body(part(session, data, 0)[:-1]))
+        with pytest.raises(ChunkValidationError):
+            await service.write_chunk(session, 3, body(part(session, data, 3) + b"x"))
+        with pytest.raises(ChunkValidationError):
+            await service.write_chunk(session, 4, body(b""))
+
+        assert service.missing(session) == [0, 1, 2, 3]
+
+    async def test_checksum_mismatch_rejected(self, service, data):
+        session = service.create("user", "mailbox.pst", len(data))
+        chunk = part(session, data, 0)
+
+        with pytest.raises(ChunkValidationError):
+            await service.write_chunk(session, 0, body(chunk), expected_sha256="0" * 64)
+
+        receipt = await service.write_chunk(
+            session, 0, body(chunk), expected_sha256=hashlib.sha256(chunk).hexdigest()
+        )
+        assert receipt.size == len(chunk)
+        assert service.missing(session) == [1, 2, 3]
+
+    async def test_rejected_resend_drops_old_receipt(self, service, data, tmp_path):
+        """Test a part overwritten by a bad re-send is missing again, and leaves track the file."""
+        session = service.create("user", "mailbox.pst", len(data))
+        for index in range(session.total_chunks):
+            await service.write_chunk(session, index, body(part(session, data, index)))
+
+        corrupt = os.urandom(len(part(session, data, 1)))
+        with pytest.raises(ChunkValidationError):
+            await service.write_chunk(session, 1, body(corrupt), expected_sha256="0" * 64)
+
+        assert service.missing(session) == [1]
+
+        await service.write_chunk(session, 1, body(part(session, data, 1)))
+        final_path = tmp_path / "mailbox.pst"
+        assembled = service.finalize(session, final_path)
+
+        hasher = ChunkHasher(INTEGRITY_CHUNK_SIZE)
+        hasher.update(final_path.read_bytes())
+        assert final_path.read_bytes() == data
+        assert assembled.chunk_hashes == hasher.packed()
+
+    async def test_idle_sessions_expire(self, service, data):
+        """Test only sessions idle past the TTL are deleted; touching keeps one alive."""
+        abandoned = service.create("user", "old.pst", len(data))
+        await service.write_chunk(abandoned, 0, body(part(abandoned, data, 0)))
+        queued = service.create("user", "queued.pst", len(data))
+        active = service.create("user", "mailbox.pst", len(data))
+
+        an_hour_ago = time.time() - 3600
+        for session in (abandoned, queued):
+            directory = service.root / session.upload_id
+            for path in (directory / "session.json", directory / "chunks"):
+                os.utime(path, (an_hour_ago, an_hour_ago))
+        service.touch(queued)
+
+        assert service.expire(max_idle_seconds=600) == 1
+        assert service.load(abandoned.upload_id) is None
+        assert service.load(queued.upload_id) == queued
+        assert service.load(active.upload_id) == active
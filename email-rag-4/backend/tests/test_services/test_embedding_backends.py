@@ -0,0 +1,194 @@
+"""
+Tests for Embedding Backends
+
+Token-budget batch planning, and on a small randomly initialized
+sentence-transformers model: parity of the int8 ONNX backend with
+PyTorch, the PyTorch fallback and the multi-process embedding pool,
+including from inside a prefork (daemonic) worker.
+"""
+
+import billiard
+import numpy as np
+import pytest
+
+from app.services import embedding_backends
+from app.services.embedding_backends import (
+    OnnxBackend,
+    TorchBackend,
+    load_embedding_backend,
+    plan_batches,
+)
+from app.services.embedding_pool import EmbeddingPool, partition_cores
+
+WORDS = (
+    "please review the attached invoice before friday meeting notes budget contract legal "
+    "counsel signed agreement quarterly report forecast thanks regards"
+).split()
+
+TEXTS = [
+    "Please review the attached invoice before Friday.",
+    "Meeting notes",
+    "The signed agreement is attached; legal counsel has reviewed the contract. " * 6,
+    "Quarterly report and budget forecast, thanks!",
+]
+
+
+def _encode_in_prefork_child(model_name: str) -> list[list[float]] | str:
+    """Use an embedding pool from a daemonic pool process, as in a prefork Celery worker."""
+    pool = EmbeddingPool(model_name, workers=1, cores_per_worker=0, backend="torch")
+    try:
+        return pool.encode(TEXTS, batch_size=8).tolist()
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    finally:
+        pool.shutdown()
+
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory):
+    """A MiniLM-shaped sentence-transformers model with a tiny vocabulary."""
+    pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    sentence_transformers = pytest.importorskip("sentence_transformers")
+    st_models = pytest.importorskip("sentence_transformers.models")
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+
+    root = tmp_path_factory.mktemp("model")
+    transformer_dir = root / "transformer"
+    transformer_dir.mkdir()
+
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", *WORDS, ".", ",", ";", "!"]
+    (root / "vocab.txt").write_text("\n".join(vocab))
+    transformers.BertTokenizerFast(vocab_file=str(root / "vocab.txt")).save_pretrained(
+        transformer_dir
+    )
+
+    torch.manual_seed(0)
+    config = transformers.BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        intermediate_size=128,
+        max_position_embeddings=128,
+    )
+    transformers.BertModel(config).save_pretrained(transformer_dir)
+
+    transformer = st_models.Transformer(str(transformer_dir), max_seq_length=64)
+    pooling = st_models.Pooling(transformer.get_word_embedding_dimension(), "mean")
+    model = sentence_transformers.SentenceTransformer(
+        modules=[transformer, pooling, st_models.Normalize()]
+    )
+    model.save(str(root / "st"))
+    return root / "st"
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+class TestPlanBatches:
+    """Tests for plan_batches."""
+
+    def test_token_budget_sizes_batches_by_longest_text(self):
+        lengths = [10, 200, 12, 100, 11, 50, 9]
+
+        batches = plan_batches(lengths, max_batch_size=3, token_budget=200)
+
+        # Longest first; 200 tokens fit one 200-token or two 100-token texts
+        assert [list(batch) for batch in batches] == [[1], [3, 5], [2, 4, 0], [6]]
+
+    def test_fixed_size_without_budget(self):
+        batches = plan_batches([5, 1, 3, 2, 4], max_batch_size=2)
+
+        assert [list(batch) for batch in batches] == [[0, 4], [2, 3], [1]]
+        assert sorted(np.concatenate(batches)) == [0, 1, 2, 3, 4]
+
+
+class TestTorchBackend:
+    """Tests for TorchBackend."""
+
+    def test_token_budget_keeps_input_order(self, model_dir):
+        backend = TorchBackend(str(model_dir))
+
+        fixed = backend.encode(TEXTS, batch_size=4)
+        budgeted = backend.encode(TEXTS, batch_size=4, token_budget=32)
+
+        assert np.allclose(budgeted, fixed, atol=1e-5)
+
+
+class TestOnnxBackend:
+    """Tests for OnnxBackend."""
+
+    def test_parity_with_torch(self, model_dir, tmp_path):
+        """Test int8 ONNX vectors match PyTorch by cosine similarity, in input order."""
+        onnx = OnnxBackend(str(model_dir), export_dir=tmp_path, threads=1)
+        reference = TorchBackend(str(model_dir)).encode(TEXTS, batch_size=2)
+
+        vectors = onnx.encode(TEXTS, batch_size=4, token_budget=64)
+
+        assert vectors.dtype == np.float32
+        assert vectors.shape == reference.shape
+        assert cosine(vectors, reference).min() > 0.99
+        assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+        # Only the quantized export is kept
+        assert [path.name for path in tmp_path.rglob("*.onnx")] == ["model_qint8.onnx"]
+
+
+class TestLoadEmbeddingBackend:
+    """Tests for load_embedding_backend."""
+
+    def test_falls_back_to_torch(self, model_dir, monkeypatch):
+        """Test a failing ONNX load falls back to PyTorch."""
+
+        def unavailable(*args, **kwargs):
+            raise ImportError("onnxruntime not installed")
+
+        monkeypatch.setattr(embedding_backends, "OnnxBackend", unavailable)
+
+        backend = load_embedding_backend(str(model_dir), backend="onnx")
+
+        assert isinstance(backend, TorchBackend)
+
+
+class TestEmbeddingPool:
+    """Tests for EmbeddingPool and core partitioning."""
+
+    def test_partition_cores(self):
+        assert partition_cores([3, 0, 1, 2, 4, 5, 6], 3) == [[0, 1, 2], [3, 4], [5, 6]]
+        assert partition_cores(list(range(8)), 2, cores_per_worker=2) == [[0, 1], [2, 3]]
+        # More workers than cores share them round-robin
+        assert partition_cores([0, 1], 3) == [[0], [1], [0]]
+
+    def test_sharded_encoding_matches_in_process(self, model_dir):
+        """Test shards from two replicas are reassembled in input order."""
+        texts = [f"{text} {n}" for n in range(5) for text in TEXTS]
+        reference = TorchBackend(str(model_dir)).encode(texts, batch_size=4)
+
+        pool = EmbeddingPool(str(model_dir), workers=2, cores_per_worker=0, backend="torch")
+        try:
+            vectors = pool.encode(texts, batch_size=8, token_budget=128)
+            name = pool.name
+        finally:
+            pool.shutdown()
+
+        assert name == "torch"
+        assert np.allclose(vectors, reference, atol=1e-5)
+
+    def test_runs_inside_prefork_worker(self, model_dir):
+        """Test the pool starts its replicas from a daemonic Celery-style worker."""
+        reference = TorchBackend(str(model_dir)).encode(TEXTS, batch_size=8)
+
+        with billiard.Pool(1) as prefork:
+            vectors = prefork.apply(_encode_in_prefork_child, (str(model_dir),))
+
+        assert np.allclose(np.array(vectors, dtype=np.float32), reference, atol=1e-5)
+
+    def test_replica_load_failure_is_raised(self, tmp_path):
+        """Test a model that can't load fails the batch instead of respawning workers forever."""
+        with billiard.Pool(1) as prefork:
+            outcome = prefork.apply(_encode_in_prefork_child, (str(tmp_path / "missing"),))
+
+        assert isinstance(outcome, str)
+        assert "Embedding model replica failed to load" in outcome
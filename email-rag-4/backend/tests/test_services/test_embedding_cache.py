@@ -0,0 +1,90 @@
+"""
+Tests for Embedding Cache
+
+Tests for the local SQLite store, LRU eviction and failure handling.
+"""
+
+import importlib
+
+import numpy as np
+
+from app.services.embedding_cache import (
+    EmbeddingCache,
+    EmbeddingStore,
+    LocalEmbeddingStore,
+    chunk_key,
+)
+
+# The package re-exports an ``embedding_cache`` instance over the module name
+cache_module = importlib.import_module("app.services.embedding_cache")
+
+MODEL = "all-MiniLM-L6-v2"
+
+
+def vector(seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal(384).astype(np.float32)
+
+
+class BrokenStore(EmbeddingStore):
+    """Store whose backend is down."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_many(self, model, keys):
+        self.calls += 1
+        raise ConnectionError("store unavailable")
+
+    def put_many(self, model, vectors):
+        self.calls += 1
+        raise ConnectionError("store unavailable")
+
+
+class TestEmbeddingCache:
+    """Tests for EmbeddingCache with LocalEmbeddingStore."""
+
+    def test_round_trip_is_exact_and_per_model(self, tmp_path):
+        cache = EmbeddingCache(LocalEmbeddingStore(tmp_path / "cache.db", max_entries=10))
+        key = chunk_key("Please see the attached invoice.")
+        original = vector(1)
+
+        cache.put_many(MODEL, {key: original})
+
+        # A fresh store on the same file sees the entry (persistent)
+        reopened = EmbeddingCache(LocalEmbeddingStore(tmp_path / "cache.db", max_entries=10))
+        found = reopened.get_many(MODEL, [key, chunk_key("other")])
+        assert list(found) == [key]
+        assert np.array_equal(found[key], original)
+        assert reopened.get_many("another-model", [key]) == {}
+
+    def test_least_recently_used_evicted(self, tmp_path, monkeypatch):
+        store = LocalEmbeddingStore(tmp_path / "cache.db", max_entries=4)
+        cache = EmbeddingCache(store)
+        clock = iter(range(1000))
+        monkeypatch.setattr(cache_module.time, "time", lambda: next(clock))
+
+        keys = [chunk_key(f"chunk {i}") for i in range(5)]
+        for i in range(4):
+            cache.put_many(MODEL, {keys[i]: vector(i)})
+        cache.get_many(MODEL, [keys[0]])  # keys[1] is now least recently used
+        cache.put_many(MODEL, {keys[4]: vector(4)})
+
+        # Over the limit: evicted down to 90% of it
+        assert set(cache.get_many(MODEL, keys)) == {keys[0], keys[3], keys[4]}
+
+    def test_wrong_dimension_is_a_miss(self, tmp_path):
+        cache = EmbeddingCache(LocalEmbeddingStore(tmp_path / "cache.db", max_entries=10))
+        key = chunk_key("text")
+        cache.put_many(MODEL, {key: vector(1)[:100]})
+
+        assert cache.get_many(MODEL, [key]) == {}
+
+    def test_failing_store_disables_cache(self):
+        store = BrokenStore()
+        cache = EmbeddingCache(store)
+
+        assert cache.get_many(MODEL, [chunk_key("text")]) == {}
+        cache.put_many(MODEL, {chunk_key("text"): vector(1)})
+
+        assert not cache.enabled
+        assert store.calls == 1
@@ -0,0 +1,205 @@
+"""
+Tests for Embedding Service
+
+Tests for batched embedding across emails and attachments, with a
+stand-in model and vector store.
+"""
+
+import asyncio
+import importlib
+
+import numpy as np
+import pytest
+
+from app.services.embedding_cache import EmbeddingCache, LocalEmbeddingStore
+from app.services.embedding_service import (
+    AttachmentEmbeddingInput,
+    EmailEmbeddingInput,
+    EmbeddingService,
+)
+from app.services.query_embedding_cache import QueryEmbeddingCache
+
+# The package re-exports an ``embedding_service`` instance over the module name
+embedding_module = importlib.import_module("app.services.embedding_service")
+
+# ===========================================
+# Fakes
+# ===========================================
+
+class FakeModel:
+    """Records encode batch sizes; fails on the listed calls."""
+
+    name = "torch"
+
+    def __init__(self, fail_calls: tuple[int, ...] = ()):
+        self.batches: list[int] = []
+        self.fail_calls = fail_calls
+
+    def encode(self, texts, **kwargs):
+        self.batches.append(len(texts))
+        if len(self.batches) in self.fail_calls:
+            raise RuntimeError("model crashed")
+        vectors = np.ones((len(texts), EmbeddingService.EMBEDDING_DIMENSION), dtype=np.float32)
+        vectors[:, 0] = [len(text) for text in texts]
+        return vectors
+
+
+class FakeVectorStore:
+    """Records upserts per collection."""
+
+    def __init__(self):
+        self.upserts: list[tuple[str, list[str]]] = []
+
+    def add_email_embeddings(self, ids, embeddings, documents, metadatas) -> None:
+        self.upserts.append(("email", ids))
+
+    def add_attachment_embeddings(self, ids, embeddings, documents, metadatas) -> None:
+        self.upserts.append(("attachment", ids))
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setattr(embedding_module, "embedding_cache", None)
+    monkeypatch.setattr(embedding_module, "query_embedding_cache", None)
+
+
+@pytest.fixture
+def store(monkeypatch) -> FakeVectorStore:
+    fake = FakeVectorStore()
+    monkeypatch.setattr(embedding_module, "vector_store", fake)
+    return fake
+
+
+def make_email(index: int, sentences: int = 1) -> EmailEmbeddingInput:
+    body = " ".join(f"Sentence {n} of email {index} about the report." for n in range(sentences))
+    return EmailEmbeddingInput(
+        email_id=f"email-{index}",
+        subject=f"Subject {index}",
+        body=body,
+        sender="alice@example.com",
+        recipients=["bob@example.com"],
+        metadata={"pst_file_id": "task-1"},
+    )
+
+
+def make_attachment(index: int) -> AttachmentEmbeddingInput:
+    return AttachmentEmbeddingInput(
+        attachment_id=f"attachment-{index}",
+        email_id=f"email-{index}",
+        filename="notes.txt",
+        content=f"Attachment {index} text.",
+        metadata={"pst_file_id": "task-1"},
+    )
+
+
+# ===========================================
+# Batch Embedding Tests
+# ===========================================
+
+class TestStoreEmbeddingsBatch:
+    """Tests for EmbeddingService.store_embeddings_batch."""
+
+    def test_chunks_pooled_across_items(self, store):
+        """Test chunks from many items share encode calls and upserts."""
+        service = EmbeddingService()
+        service._model = FakeModel()
+        emails = [make_email(i) for i in range(6)]
+        attachments = [make_attachment(i) for i in range(3)]
+
+        result = service.store_embeddings_batch(emails, attachments, batch_size=4)
+
+        assert service._model.batches == [4, 4, 1]
+        assert result.chunks_stored == 9
+        assert result.email_ids == [e.email_id for e in emails]
+        assert result.attachment_ids == [a.attachment_id for a in attachments]
+        # One upsert per collection per batch; the middle batch spans both
+        assert [collection for collection, _ in store.upserts] == [
+            "email", "email", "attachment", "attachment",
+        ]
+        assert store.upserts[2][1] == ["attachment-0_chunk_0", "attachment-1_chunk_0"]
+
+    def test_failed_batch_leaves_its_items_out(self, store):
+        """Test items with a chunk in a failed batch are omitted for a later retry."""
+        service = EmbeddingService()
+        service._model = FakeModel(fail_calls=(2,))
+        emails = [make_email(i) for i in range(5)]
+
+        result = service.store_embeddings_batch(emails, batch_size=2)
+
+        assert result.email_ids == ["email-0", "email-1", "email-4"]
+        assert result.chunks_stored == 3
+
+    def test_single_item_helpers_raise(self, store):
+        """Test the single-email path still raises so callers can log the email."""
+        service = EmbeddingService()
+        service._model = FakeModel(fail_calls=(1,))
+
+        with pytest.raises(RuntimeError):
+            service.store_email_embeddings(
+                email_id="email-1",
+                subject="Hi",
+                body="Body.",
+                sender="alice@example.com",
+                recipients=[],
+                metadata={},
+            )
+
+
+# ===========================================
+# Embedding Cache Tests
+# ===========================================
+
+class TestGenerateEmbeddingsCache:
+    """Tests for the embedding cache in EmbeddingService.generate_embeddings."""
+
+    def test_cached_and_repeated_texts_not_re_encoded(self, monkeypatch, tmp_path):
+        """Test only unseen texts reach the model and results keep input order."""
+        cache = EmbeddingCache(LocalEmbeddingStore(tmp_path / "cache.db", max_entries=100))
+        monkeypatch.setattr(embedding_module, "embedding_cache", cache)
+        service = EmbeddingService()
+        service._model = FakeModel()
+
+        first = service.generate_embeddings(["Regards, Bob", "Quarterly figures", "Regards, Bob"])
+        second = service.generate_embeddings(["", "Regards, Bob", "New text"])
+
+        assert service._model.batches == [2, 1]
+        assert first[0] == first[2] == second[1]
+        assert first[1][0] == len("Quarterly figures")
+        assert second[0] == [0.0] * EmbeddingService.EMBEDDING_DIMENSION
+
+
+# ===========================================
+# Query Embedding Tests
+# ===========================================
+
+class TestEmbedQuery:
+    """Tests for EmbeddingService.embed_query."""
+
+    async def test_concurrent_queries_batched(self):
+        service = EmbeddingService()
+        service._model = FakeModel()
+        try:
+            vectors = await asyncio.gather(
+                *(service.embed_query(query) for query in ["invoice", "budget", "  "])
+            )
+        finally:
+            service.shutdown()
+
+        assert service._model.batches == [2]
+        assert [vector[0] for vector in vectors] == [len("invoice"), len("budget"), 0.0]
+
+    async def test_repeated_query_skips_model(self, monkeypatch):
+        """Test a repeat (up to whitespace) comes from the query embedding cache."""
+        cache = QueryEmbeddingCache(max_entries=10)
+        monkeypatch.setattr(embedding_module, "query_embedding_cache", cache)
+        service = EmbeddingService()
+        service._model = FakeModel()
+        try:
+            first = await service.embed_query("invoices from  acme")
+            second = await service.embed_query(" invoices from acme\n")
+        finally:
+            service.shutdown()
+
+        assert service._model.batches == [1]
+        assert first == second
+        assert cache.stats()["hits"] == 1
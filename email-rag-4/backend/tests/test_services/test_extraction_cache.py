@@ -0,0 +1,61 @@
+"""
+Tests for Extraction Cache
+
+Tests for compressed storage of cached extraction results, with the
+database session replaced by an in-memory table.
+"""
+
+from app.services.extraction_cache import ExtractionCache, ExtractionResult
+from app.utils.content_codec import decompress_text
+
+REPORT = "Quarterly report. " * 200
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class FakeSession:
+    """Stores inserted rows and returns them for any select."""
+
+    def __init__(self):
+        self.rows = []
+
+    async def execute(self, statement, params=None):
+        if params is not None:
+            self.rows.extend(params)
+            return FakeResult([])
+        return FakeResult(
+            [(row["sha256_hash"], row["extracted_text_data"], row["error"]) for row in self.rows]
+        )
+
+
+class TestExtractionCache:
+    """Tests for ExtractionCache.put_many/get_many."""
+
+    async def test_text_stored_compressed(self):
+        """Test cached texts are written compressed and read back as text."""
+        db = FakeSession()
+        cache = ExtractionCache(extractor_version=1)
+
+        await cache.put_many(
+            db,
+            {
+                "a" * 64: ExtractionResult(text=REPORT),
+                "b" * 64: ExtractionResult(text=None, error="bad xref table"),
+            },
+        )
+
+        stored = db.rows[0]["extracted_text_data"]
+        assert len(stored) < len(REPORT) / 10
+        assert decompress_text(stored) == REPORT
+        assert db.rows[1]["extracted_text_data"] is None
+
+        results = await cache.get_many(db, {"a" * 64, "b" * 64})
+        assert results["a" * 64].text == REPORT
+        assert results["b" * 64].text is None
+        assert results["b" * 64].error == "bad xref table"
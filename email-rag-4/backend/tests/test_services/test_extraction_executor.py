@@ -0,0 +1,84 @@
+"""
+Tests for Extraction Executor
+
+Runs real worker processes to check results, failures and timeouts
+come back as ExtractionResult values.
+"""
+
+import asyncio
+import importlib
+import time
+
+import billiard
+import pytest
+
+from app.services.extraction_executor import ExtractionExecutor
+
+# The package re-exports an ``extraction_executor`` instance over the module name
+executor_module = importlib.import_module("app.services.extraction_executor")
+
+
+def _hang(content, filename, content_type):
+    """A job that never finishes on its own (runs in the pool's workers)."""
+    time.sleep(600)
+
+
+def _extract_in_prefork_child() -> list[str | None]:
+    """Use the executor from a daemonic pool process, as in a prefork Celery worker."""
+    executor = ExtractionExecutor(max_workers=1, timeout_seconds=30)
+    try:
+        results = asyncio.run(executor.extract_many([(b"from celery", "a.txt", "text/plain")]))
+    finally:
+        executor.shutdown()
+    return [result.text for result in results]
+
+
+@pytest.fixture
+def executor():
+    executor = ExtractionExecutor(max_workers=2, timeout_seconds=30, cpu_seconds=10, memory_mb=512)
+    yield executor
+    executor.shutdown()
+
+
+class TestExtractionExecutor:
+    """Tests for ExtractionExecutor."""
+
+    async def test_extract_many_preserves_order(self, executor: ExtractionExecutor):
+        """Test results line up with the submitted jobs."""
+        results = await executor.extract_many([
+            (b"first note", "a.txt", "text/plain"),
+            (b"second note", "b.txt", "text/plain"),
+            (b"third note", "c.txt", "text/plain"),
+        ])
+
+        assert [r.text for r in results] == ["first note", "second note", "third note"]
+        assert all(r.is_extracted for r in results)
+
+    async def test_failures_are_results(self, executor: ExtractionExecutor):
+        """Test unsupported formats come back as errors instead of raising."""
+        result = await executor.extract(b"\x00\x01", "blob.bin", "application/x-unknown")
+
+        assert not result.is_extracted
+        assert "Unsupported" in result.error
+        assert not result.transient
+
+    async def test_timeout_kills_worker(self, executor: ExtractionExecutor, monkeypatch):
+        """Test an overrun job is reported and its worker replaced."""
+        executor.timeout_seconds = 0.5
+        with monkeypatch.context() as patch:
+            patch.setattr(executor_module, "_extract_in_worker", _hang)
+            timed_out = await executor.extract(b"slow", "slow.txt", "text/plain")
+
+        executor.timeout_seconds = 30
+        result = await executor.extract(b"after", "after.txt", "text/plain")
+
+        assert "timed out" in timed_out.error
+        assert timed_out.transient
+        assert result.text == "after"
+
+    def test_runs_inside_prefork_worker(self):
+        """Test the pool starts from a daemonic process (Celery's prefork pool)."""
+        with billiard.Pool(1) as prefork:
+            texts = prefork.apply(_extract_in_prefork_child)
+
+        assert texts == ["from celery"]
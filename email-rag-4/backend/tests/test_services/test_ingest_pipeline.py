@@ -0,0 +1,226 @@
+"""
+Tests for Ingest Pipeline
+
+Runs the staged pipeline against the recording session and fakes from
+the writer tests, with a stand-in embedding service.
+"""
+
+import threading
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.services.embedding_service import BatchEmbeddingResult
+from app.services.ingest_pipeline import IngestPipeline, mark_emails_embedded
+from app.services.ingest_writer import EmailBulkWriter
+from tests.test_services.test_ingest_writer import (
+    FakeAttachmentProcessor,
+    FakeExtractionCache,
+    FakeSession,
+    make_email,
+)
+
+
+# ===========================================
+# Fakes
+# ===========================================
+
+class FakeResult:
+    """Result of an UPDATE ... RETURNING."""
+
+    def __init__(self, rows: list):
+        self.rows = rows
+
+    def all(self) -> list:
+        return self.rows
+
+
+class FakeStageSession(FakeSession):
+    """Session for the extraction/embed stages; applies UPDATEs to a set of embedded IDs."""
+
+    def __init__(self, embedded: set[str] | None = None):
+        super().__init__()
+        self.embedded = embedded if embedded is not None else set()
+        self.searchable = 0
+
+    async def execute(self, statement, rows=None):
+        if rows is not None:
+            return await super().execute(statement, rows)
+
+        params = statement.compile().params
+        if statement.table.name == "processing_tasks":
+            self.searchable += next(v for v in params.values() if isinstance(v, int))
+            return FakeResult([])
+        if statement.table.name == "emails":
+            ids = next(v for v in params.values() if isinstance(v, list))
+            marked = [(i,) for i in ids if i not in self.embedded]
+            self.embedded.update(ids)
+            return FakeResult(marked)
+        return FakeResult([])
+
+
+class FakeEmbeddingService:
+    """Records embedded email and attachment IDs."""
+
+    def __init__(self, fail_first: int = 0):
+        self.fail_first = fail_first
+        self.emails: list[str] = []
+        self.attachments: list[str] = []
+
+    def store_embeddings_batch(self, emails=None, attachments=None) -> BatchEmbeddingResult:
+        result = BatchEmbeddingResult()
+        for email in emails or []:
+            if self.fail_first:
+                # Left out of the result, as for a failed encode batch
+                self.fail_first -= 1
+                continue
+            result.email_ids.append(email.email_id)
+        result.attachment_ids = [a.attachment_id for a in attachments or []]
+        self.emails += result.email_ids
+        self.attachments += result.attachment_ids
+        return result
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    """Store attachment blobs under a temporary directory."""
+    monkeypatch.setattr("app.services.ingest_writer.attachment_store._root", tmp_path)
+
+
+@pytest.fixture
+def embedder(monkeypatch) -> FakeEmbeddingService:
+    """Replace the embedding service used by the embed stage."""
+    fake = FakeEmbeddingService()
+    monkeypatch.setattr("app.services.ingest_pipeline.embedding_service", fake)
+    return fake
+
+
+def session_factory(sessions: list[FakeStageSession]):
+    """Build a session factory that records the sessions it opens."""
+
+    @asynccontextmanager
+    async def open_session():
+        session = FakeStageSession()
+        sessions.append(session)
+        yield session
+
+    return open_session
+
+
+# ===========================================
+# Pipeline Tests
+# ===========================================
+
+class TestIngestPipeline:
+    """Tests for IngestPipeline stages."""
+
+    async def test_writes_and_embeds_every_batch(self, embedder):
+        """Test all emails are written in batches and embedded with their attachments."""
+        db = FakeSession()
+        writer = EmailBulkWriter(
+            db, "task-1", FakeAttachmentProcessor(extracts=True),
+            batch_size=3, cache=FakeExtractionCache(),
+        )
+        sessions: list[FakeStageSession] = []
+        written, embedded = [], []
+
+        async def on_written(items: list) -> None:
+            written.append(len(items))
+
+        async def on_embedded(count: int) -> None:
+            embedded.append(count)
+
+        pipeline = IngestPipeline(
+            writer, session_factory(sessions),
+            queue_size=1, on_batch_written=on_written, on_batch_embedded=on_embedded,
+        )
+        await pipeline.run(make_email(i, attachments=1, content=b"notes") for i in range(7))
+
+        assert written == [3, 3, 1]
+        assert embedded == [3, 3, 1]
+        assert db.commits == 3
+        assert embedder.emails == [row["id"] for row in db.inserted["emails"]]
+        assert embedder.attachments == [row["id"] for row in db.inserted["attachments"]]
+        assert pipeline.emails_embedded == 7
+        assert sum(session.searchable for session in sessions) == 7
+
+    async def test_rows_built_off_the_event_loop(self, embedder):
+        """Test email rows (MinHash, segmentation) are built on a worker thread."""
+        threads = set()
+
+        class RecordingWriter(EmailBulkWriter):
+            def add_to_batch(self, batch, extracted_email):
+                threads.add(threading.current_thread())
+                super().add_to_batch(batch, extracted_email)
+
+        writer = RecordingWriter(FakeSession(), "task-1", FakeAttachmentProcessor(), batch_size=2)
+        pipeline = IngestPipeline(writer, session_factory([]))
+        await pipeline.run(make_email(i) for i in range(3))
+
+        assert threads
+        assert threading.current_thread() not in threads
+        assert writer.emails_written == 3
+
+    async def test_failed_embeddings_left_for_sweep(self, embedder):
+        """Test an email whose embedding fails is written but not marked embedded."""
+        embedder.fail_first = 1
+        db = FakeSession()
+        writer = EmailBulkWriter(db, "task-1", FakeAttachmentProcessor(), batch_size=10)
+
+        pipeline = IngestPipeline(writer, session_factory([]))
+        await pipeline.run(make_email(i) for i in range(3))
+
+        assert len(db.inserted["emails"]) == 3
+        assert embedder.emails == [row["id"] for row in db.inserted["emails"][1:]]
+        assert pipeline.emails_embedded == 2
+
+    async def test_parser_error_propagates(self, embedder):
+        """Test a PST parsing failure stops the pipeline and is raised."""
+
+        def emails():
+            yield make_email(1)
+            raise OSError("corrupt PST block")
+
+        writer = EmailBulkWriter(FakeSession(), "task-1", FakeAttachmentProcessor(), batch_size=10)
+        pipeline = IngestPipeline(writer, session_factory([]))
+
+        with pytest.raises(OSError, match="corrupt PST block"):
+            await pipeline.run(emails())
+
+    async def test_parse_stops_when_downstream_fails(self, embedder):
+        """Test the parse thread stops pulling emails once a stage fails."""
+        pulled = 0
+
+        def emails():
+            nonlocal pulled
+            for i in range(10000):
+                pulled += 1
+                yield make_email(i)
+
+        class FailingWriter(EmailBulkWriter):
+            async def write(self, batch):
+                raise RuntimeError("database went away")
+
+        writer = FailingWriter(FakeSession(), "task-1", FakeAttachmentProcessor(), batch_size=5)
+        pipeline = IngestPipeline(writer, session_factory([]), queue_size=1)
+
+        with pytest.raises(RuntimeError, match="database went away"):
+            await pipeline.run(emails())
+
+        # Bounded queues keep the parser within a few batches of the failure
+        assert pulled < 100
+
+
+class TestMarkEmailsEmbedded:
+    """Tests for mark_emails_embedded."""
+
+    async def test_counts_only_newly_embedded(self):
+        """Test overlapping batch jobs don't double count searchable emails."""
+        db = FakeStageSession(embedded={"a"})
+
+        marked = await mark_emails_embedded(db, "task-1", ["a", "b", "c"])
+
+        assert marked == 2
+        assert db.searchable == 2
+        assert await mark_emails_embedded(db, "task-1", ["b"]) == 0
+        assert db.searchable == 2
@@ -0,0 +1,167 @@
+"""
+Tests for Ingest Scheduler
+
+Tests for fair sharing between users, shortest-job-first ordering,
+per-user caps, aging, queue estimates and slot leases.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.db.models.processing_task import ProcessingTask, TaskStatus
+from app.services.ingest_scheduler import IngestJob, IngestScheduler
+
+MB = 1024 * 1024
+NOW = datetime(2024, 1, 22, 12, 0, tzinfo=timezone.utc)
+# 1 MB/s keeps durations easy to read: a 60 MB file takes a minute
+THROUGHPUT = 1.0 * MB
+
+
+def job(task_id, user_id, size_mb, queued_minutes_ago=0, weight=1.0):
+    return IngestJob(
+        task_id=task_id,
+        user_id=user_id,
+        size=size_mb * MB,
+        weight=weight,
+        queued_at=NOW - timedelta(minutes=queued_minutes_ago),
+    )
+
+
+@pytest.fixture
+def scheduler():
+    return IngestScheduler(max_concurrent=2, max_per_user=2, aging_minutes=30, role_weights={})
+
+
+def task(task_id, dispatched_minutes_ago=None, updated_minutes_ago=0, started=True):
+    dispatched_at = (
+        None if dispatched_minutes_ago is None else NOW - timedelta(minutes=dispatched_minutes_ago)
+    )
+    return ProcessingTask(
+        id=task_id,
+        user_id="alice",
+        original_filename=f"{task_id}.pst",
+        file_size_bytes=MB,
+        status=TaskStatus.PARSING if dispatched_at and started else TaskStatus.PENDING,
+        emails_processed=0,
+        retry_count=0,
+        created_at=NOW - timedelta(hours=3),
+        updated_at=NOW - timedelta(minutes=updated_minutes_ago),
+        dispatched_at=dispatched_at,
+    )
+
+
+def order(schedule):
+    return [scheduled.job.task_id for scheduled in schedule]
+
+
+class TestIngestScheduler:
+    """Tests for IngestScheduler.plan."""
+
+    def test_one_users_backlog_does_not_starve_others(self, scheduler):
+        """Test a later upload from another user is interleaved, not queued behind."""
+        queued = [job(f"a{i}", "alice", 100, queued_minutes_ago=10) for i in range(6)]
+        queued.append(job("b0", "bob", 100))
+
+        schedule = scheduler.plan(queued, [], NOW, THROUGHPUT)
+
+        assert order(schedule).index("b0") == 1
+        assert [s.start_at for s in schedule[:2]] == [NOW, NOW]
+
+    def test_small_files_first_within_user(self, scheduler):
+        """Test shortest job first among one user's uploads."""
+        queued = [job("big", "alice", 5000), job("mid", "alice", 500), job("small", "alice", 5)]
+
+        assert order(scheduler.plan(queued, [], NOW, THROUGHPUT)) == ["small", "mid", "big"]
+
+    def test_per_user_cap(self):
+        """Test one user can't take every slot."""
+        scheduler = IngestScheduler(
+            max_concurrent=4, max_per_user=2, aging_minutes=30, role_weights={}
+        )
+        queued = [job(f"a{i}", "alice", 60) for i in range(4)]
+
+        schedule = scheduler.plan(queued, [], NOW, THROUGHPUT)
+
+        started_now = [s for s in schedule if s.start_at == NOW]
+        assert len(started_now) == 2
+        assert schedule[2].start_at == NOW + timedelta(minutes=1)
+
+    def test_waiting_ages_large_files_forward(self, scheduler):
+        """Test a large file that has waited long enough beats a fresh small one."""
+        queued = [
+            job("old_big", "alice", 1000, queued_minutes_ago=24 * 60),
+            job("new_small", "alice", 100),
+        ]
+
+        assert order(scheduler.plan(queued, [], NOW, THROUGHPUT))[0] == "old_big"
+
+    def test_weights_share_bytes_unevenly(self, scheduler):
+        """Test a double-weight user gets about twice the share."""
+        queued = [job(f"a{i}", "alice", 100, weight=2.0) for i in range(4)]
+        queued += [job(f"b{i}", "bob", 100) for i in range(4)]
+
+        first_six = order(scheduler.plan(queued, [], NOW, THROUGHPUT))[:6]
+
+        assert sum(task_id.startswith("a") for task_id in first_six) == 4
+
+    def test_running_tasks_hold_slots_and_shape_eta(self, scheduler):
+        """Test queued tasks start when running ones are estimated to finish."""
+        running = [
+            IngestJob("r0", "alice", 60 * MB, 1.0, NOW, started_at=NOW, remaining_seconds=30),
+            IngestJob("r1", "bob", 600 * MB, 1.0, NOW, started_at=NOW - timedelta(minutes=5)),
+        ]
+        queued = [job("q0", "carol", 120)]
+
+        (scheduled,) = scheduler.plan(queued, running, NOW, THROUGHPUT)
+
+        assert scheduled.position == 1
+        assert scheduled.start_at == NOW + timedelta(seconds=30)
+        assert scheduled.finish_at == scheduled.start_at + timedelta(minutes=2)
+
+    def test_stalled_dispatched_task_releases_its_slot(self):
+        """Test a dispatched task with no progress for the lease period stops holding a slot."""
+        scheduler = IngestScheduler(
+            max_concurrent=2, max_per_user=2, role_weights={}, lease_minutes=30
+        )
+
+        rows = [
+            (task("live", dispatched_minutes_ago=120, updated_minutes_ago=5), None),
+            (task("stuck", dispatched_minutes_ago=120, updated_minutes_ago=90), None),
+            (task("queued"), None),
+        ]
+
+        queued, running, expired = scheduler.classify(rows, NOW)
+
+        assert [job.task_id for job in running] == ["live"]
+        assert [job.task_id for job in queued] == ["queued"]
+
+        # Stalled mid-run: failed rather than silently dropped
+        scheduler.release(expired)
+        (stuck,) = expired
+        assert stuck.id == "stuck"
+        assert stuck.status == TaskStatus.FAILED
+        assert stuck.error_message.startswith("Processing stalled")
+
+    def test_lost_task_requeued_until_retries_run_out(self):
+        """Test a dispatched task that never started is queued again, up to max_retries."""
+        scheduler = IngestScheduler(
+            max_concurrent=2, max_per_user=2, role_weights={}, lease_minutes=30, max_retries=3
+        )
+        lost = task("lost", dispatched_minutes_ago=60, updated_minutes_ago=60, started=False)
+        exhausted = task(
+            "exhausted", dispatched_minutes_ago=60, updated_minutes_ago=60, started=False
+        )
+        exhausted.retry_count = 3
+
+        queued, running, expired = scheduler.classify([(lost, None), (exhausted, None)], NOW)
+
+        assert [job.task_id for job in queued] == ["lost"]
+        assert running == []
+        assert expired == [lost, exhausted]
+
+        scheduler.release(expired)
+        assert lost.status == TaskStatus.PENDING
+        assert lost.dispatched_at is None
+        assert lost.retry_count == 1
+        assert exhausted.status == TaskStatus.FAILED
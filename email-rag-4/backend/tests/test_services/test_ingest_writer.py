@@ -0,0 +1,325 @@
+"""
+Tests for Ingest Writer
+
+Tests for batched email writes, using a recording stand-in for the
+async session so no database is required.
+"""
+
+import hashlib
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.services.attachment_store import attachment_store
+from app.services.extraction_cache import ExtractionResult
+from app.services.ingest_writer import EmailBatch, EmailBulkWriter
+from app.services.near_duplicate import NearDuplicateDetector
+from app.services.pst_processor import ExtractedAttachment, ExtractedEmail
+from app.utils.content_codec import decompress_text
+
+
+# ===========================================
+# Fakes
+# ===========================================
+
+class FakeSession:
+    """Records executed statements; optionally fails multi-row email batches."""
+
+    def __init__(self, fail_batches_over: int | None = None, bad_message_id: str | None = None):
+        self.fail_batches_over = fail_batches_over
+        self.bad_message_id = bad_message_id
+        self.inserted: dict[str, list[dict]] = {"emails": [], "attachments": []}
+        self.commits = 0
+        self.fail_commit = False
+        self.identity_map = {}
+
+    @asynccontextmanager
+    async def begin_nested(self):
+        yield
+
+    async def execute(self, statement, rows):
+        table = statement.table.name
+        if table == "emails":
+            if self.fail_batches_over is not None and len(rows) > self.fail_batches_over:
+                raise IntegrityError("INSERT", {}, Exception("batch rejected"))
+            if any(row["message_id"] == self.bad_message_id for row in rows):
+                raise IntegrityError("INSERT", {}, Exception("bad row"))
+        self.inserted.setdefault(table, []).extend(rows)
+
+    async def commit(self):
+        if self.fail_commit:
+            raise OperationalError("COMMIT", {}, Exception("connection lost"))
+        self.commits += 1
+
+    def expunge(self, obj):
+        self.identity_map = {k: v for k, v in self.identity_map.items() if v is not obj}
+
+
+class FakeAttachmentProcessor:
+    """Attachment processor that extracts only when enabled, counting parses."""
+
+    def __init__(self, extracts: bool = False):
+        self.extracts = extracts
+        self.parsed: list[bytes] = []
+
+    def can_process(self, filename, content_type, content) -> bool:
+        return self.extracts
+
+    def extract_text_from_attachment(self, content, filename, content_type) -> str:
+        self.parsed.append(content)
+        if content == b"corrupt":
+            raise ValueError("bad xref table")
+        return content.decode()
+
+
+class FakeExtractionCache:
+    """In-memory extraction cache."""
+
+    def __init__(self, results: dict[str, ExtractionResult] | None = None):
+        self.results = dict(results or {})
+
+    async def get_many(self, db, sha256_hashes):
+        return {h: self.results[h] for h in sha256_hashes if h in self.results}
+
+    async def put_many(self, db, results):
+        self.results.update(results)
+
+
+def make_email(index: int, attachments: int = 0, content: bytes = b"abc") -> ExtractedEmail:
+    """Build a minimal extracted email."""
+    return ExtractedEmail(
+        message_id=f"<{index}@example.com>",
+        internet_message_id=None,
+        subject=f"Subject {index}",
+        sender_email="jane@example.com",
+        sender_name="Jane",
+        to_recipients=["bob@example.com"],
+        cc_recipients=[],
+        bcc_recipients=[],
+        body_text="Hello",
+        body_html=None,
+        sent_date=None,
+        received_date=None,
+        importance="normal",
+        is_read=True,
+        has_attachments=attachments > 0,
+        folder_path="Root/Inbox",
+        headers={},
+        sha256_hash="0" * 64,
+        attachments=[
+            ExtractedAttachment(
+                filename=f"file{n}.bin",
+                content_type="application/octet-stream",
+                size_bytes=len(content),
+                content=content,
+                md5_hash="0" * 32,
+                sha256_hash=hashlib.sha256(content).hexdigest(),
+            )
+            for n in range(attachments)
+        ],
+    )
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    """Store attachment blobs under a temporary directory."""
+    monkeypatch.setattr("app.services.ingest_writer.attachment_store._root", tmp_path)
+
+
+# ===========================================
+# Writer Tests
+# ===========================================
+
+class TestEmailBulkWriter:
+    """Tests for EmailBulkWriter batching."""
+
+    async def test_flushes_when_batch_is_full(self):
+        """Test a full batch is written and committed in one go."""
+        db = FakeSession()
+        writer = EmailBulkWriter(db, "task-1", FakeAttachmentProcessor(), batch_size=3)
+
+        results = [await writer.add(make_email(i)) for i in range(4)]
+
+        assert results == [0, 0, 3, 0]
+        assert db.commits == 1
+        assert writer.pending_count == 1
+
+        await writer.flush()
+        assert len(db.inserted["emails"]) == 4
+        assert writer.emails_written == 4
+
+    async def test_attachments_reference_client_side_email_ids(self):
+        """Test attachment rows point at the ID assigned to their email."""
+        db = FakeSession()
+        writer = EmailBulkWriter(db, "task-1", FakeAttachmentProcessor(), batch_size=10)
+
+        await writer.add(make_email(1, attachments=2))
+        await writer.flush()
+
+        email_id = db.inserted["emails"][0]["id"]
+        assert [row["email_id"] for row in db.inserted["attachments"]] == [email_id, email_id]
+
+    async def test_html_and_headers_go_to_content_table(self):
+        """Test large blobs are written compressed to email_contents only."""
+        db = FakeSession()
+        writer = EmailBulkWriter(db, "task-1", FakeAttachmentProcessor(), batch_size=10)
+        html = "<p>" + "Quarterly numbers attached. " * 20 + "</p>"
+
+        await writer.add(make_email(1))
+        email = make_email(2)
+        email.body_html, email.headers = html, {"subject": "Subject 2"}
+        await writer.add(email)
+        await writer.flush()
+
+        assert all("body_html" not in row and "headers" not in row for row in db.inserted["emails"])
+        [content] = db.inserted["email_contents"]
+        assert content["email_id"] == db.inserted["emails"][1]["id"]
+        assert decompress_text(content["body_html_data"]) == html
+        assert decompress_text(content["headers_data"]) == '{"subject": "Subject 2"}'
+        assert len(content["body_html_data"]) < len(html)
+
+    async def test_failed_batch_falls_back_to_single_rows(self):
+        """Test one bad email doesn't drop the rest of its batch."""
+        db = FakeSession(fail_batches_over=1, bad_message_id="<2@example.com>")
+        writer = EmailBulkWriter(db, "task-1", FakeAttachmentProcessor(), batch_size=10)
+
+        for i in range(4):
+            await writer.add(make_email(i))
+        written = await writer.flush()
+
+        assert written == 3
+        assert writer.emails_failed == 1
+        assert "<2@example.com>" not in {row["message_id"] for row in db.inserted["emails"]}
+
+    async def test_blobs_stored_only_for_committed_rows(self):
+        """Test rejected rows and failed commits leave no unreferenced blobs behind."""
+        db = FakeSession(fail_batches_over=1, bad_message_id="<2@example.com>")
+        writer = EmailBulkWriter(db, "task-1", FakeAttachmentProcessor(), batch_size=10)
+
+        await writer.add(make_email(1, attachments=1, content=b"kept"))
+        await writer.add(make_email(2, attachments=1, content=b"rejected"))
+        await writer.flush()
+
+        kept = attachment_store.blob_path(hashlib.sha256(b"kept").hexdigest())
+        assert db.inserted["attachments"][0]["storage_path"] == str(kept)
+        assert kept.read_bytes() == b"kept"
+        assert not attachment_store.blob_path(hashlib.sha256(b"rejected").hexdigest()).exists()
+
+        db.fail_commit = True
+        await writer.add(make_email(3, attachments=1, content=b"kept"))
+        await writer.add(make_email(4, attachments=1, content=b"fresh"))
+        with pytest.raises(OperationalError):
+            await writer.flush()
+
+        # Blobs committed by earlier batches stay
+        assert kept.exists()
+        assert not attachment_store.blob_path(hashlib.sha256(b"fresh").hexdigest()).exists()
+
+    async def test_near_duplicate_sketch_skips_quoted_history(self):
+        """Test the MinHash sketch covers the new content, not the quoted original."""
+        detector = NearDuplicateDetector(threshold=0.8, min_words=5)
+        writer = EmailBulkWriter(
+            FakeSession(), "task-1", FakeAttachmentProcessor(), detector=detector
+        )
+        email = make_email(1)
+        email.body_text = (
+            "Signed contract attached, originals are in the safe.\n\n"
+            "On Monday, Maria Lopez wrote:\n"
+            "Please sign the Henderson settlement and return it before the board meets."
+        )
+
+        batch = EmailBatch()
+        writer.add_to_batch(batch, email)
+
+        row, _ = batch.items[0]
+        assert row["body_new_text"] == "Signed contract attached, originals are in the safe."
+        assert row["minhash_signature"] == detector.sketch(row["body_new_text"])[0]
+
+    async def test_before_commit_and_retained_objects(self):
+        """Test the progress hook sees each batch and retained objects stay attached."""
+        db = FakeSession()
+        task, stale = object(), object()
+        db.identity_map = {"task": task, "stale": stale}
+        seen = []
+
+        async def record(written: int) -> None:
+            seen.append(written)
+
+        writer = EmailBulkWriter(
+            db, "task-1", FakeAttachmentProcessor(),
+            batch_size=2, retain=[task], before_commit=record,
+        )
+        for i in range(3):
+            await writer.add(make_email(i))
+        await writer.flush()
+
+        assert seen == [2, 1]
+        assert list(db.identity_map.values()) == [task]
+
+    async def test_duplicate_attachments_parsed_once(self):
+        """Test one parse per distinct hash, reused across the batch and cache."""
+        db = FakeSession()
+        processor = FakeAttachmentProcessor(extracts=True)
+        cache = FakeExtractionCache()
+        writer = EmailBulkWriter(db, "task-1", processor, batch_size=2, cache=cache)
+
+        for i in range(4):
+            await writer.add(make_email(i, attachments=1, content=b"disclaimer"))
+        await writer.flush()
+
+        assert processor.parsed == [b"disclaimer"]
+        assert {
+            decompress_text(row["extracted_text_data"]) for row in db.inserted["attachment_contents"]
+        } == {"disclaimer"}
+
+    async def test_cached_failures_are_reused(self):
+        """Test a cached failed extraction is applied without re-parsing."""
+        digest = hashlib.sha256(b"corrupt").hexdigest()
+        processor = FakeAttachmentProcessor(extracts=True)
+        cache = FakeExtractionCache({digest: ExtractionResult(text=None, error="bad xref table")})
+        db = FakeSession()
+        writer = EmailBulkWriter(db, "task-1", processor, cache=cache)
+
+        await writer.add(make_email(1, attachments=1, content=b"corrupt"))
+        await writer.flush()
+
+        row = db.inserted["attachments"][0]
+        assert processor.parsed == []
+        assert row["is_extracted"] is False
+        assert row["text_extraction_error"] == "bad xref table"
+
+    async def test_timed_out_extraction_retried_on_next_ingest(self):
+        """Test a timeout is recorded on the row but not cached, so it is parsed again."""
+
+        class FlakyExecutor:
+            """Times out the first run, extracts on later ones."""
+
+            def __init__(self):
+                self.runs = 0
+
+            async def extract_many(self, jobs):
+                self.runs += 1
+                if self.runs == 1:
+                    return [
+                        ExtractionResult(
+                            text=None, error="Extraction timed out after 60s", transient=True
+                        )
+                        for _ in jobs
+                    ]
+                return [ExtractionResult(text=content.decode()) for content, _, _ in jobs]
+
+        executor = FlakyExecutor()
+        cache = FakeExtractionCache()
+        processor = FakeAttachmentProcessor(extracts=True)
+
+        first, second = FakeSession(), FakeSession()
+        for db in (first, second):
+            writer = EmailBulkWriter(db, "task-1", processor, cache=cache, executor=executor)
+            await writer.add(make_email(1, attachments=1, content=b"slow report"))
+            await writer.flush()
+
+        assert first.inserted["attachments"][0]["is_extracted"] is False
+        assert executor.runs == 2
+        assert second.inserted["attachments"][0]["is_extracted"] is True
+        assert cache.results[hashlib.sha256(b"slow report").hexdigest()].text == "slow report"
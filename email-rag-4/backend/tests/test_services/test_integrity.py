@@ -0,0 +1,159 @@
+"""
+Tests for Evidence Integrity
+
+Tests for per-chunk hashing, Merkle roots and chunk-level verification.
+"""
+
+import hashlib
+import os
+
+import pytest
+
+from app.services.integrity import (
+    FINGERPRINT_BLOCK_SIZE,
+    ChunkHasher,
+    IntegrityVerifier,
+    file_fingerprint,
+    fingerprint_ranges,
+    merkle_root,
+)
+
+CHUNK_SIZE = 4096
+
+
+@pytest.fixture
+def evidence_file(tmp_path):
+    """A 10.5-chunk file and the hashes recorded for it at upload."""
+    data = os.urandom(CHUNK_SIZE * 10 + CHUNK_SIZE // 2)
+    path = tmp_path / "mailbox.pst"
+    path.write_bytes(data)
+
+    hasher = ChunkHasher(CHUNK_SIZE)
+    # Upload reads don't line up with chunk boundaries
+    for start in range(0, len(data), 1000):
+        hasher.update(data[start : start + 1000])
+
+    return path, data, hasher
+
+
+def verify(path, hasher, size, sample=None):
+    return IntegrityVerifier(workers=2).verify(
+        path,
+        CHUNK_SIZE,
+        hasher.packed(),
+        merkle_root(hasher.leaves),
+        size,
+        sample=sample,
+    )
+
+
+class TestChunkHasher:
+    """Tests for streaming chunk hashes."""
+
+    def test_leaves_match_direct_chunk_hashes(self, evidence_file):
+        """Test streamed leaves equal hashing each chunk directly."""
+        _, data, hasher = evidence_file
+
+        expected = [
+            hashlib.sha256(data[i : i + CHUNK_SIZE]).digest()
+            for i in range(0, len(data), CHUNK_SIZE)
+        ]
+
+        assert hasher.leaves == expected
+        assert len(hasher.packed()) == 11 * 32
+
+    def test_root_changes_with_any_leaf(self, evidence_file):
+        """Test the Merkle root commits to every leaf and their order."""
+        _, _, hasher = evidence_file
+        leaves = hasher.leaves
+
+        assert merkle_root(leaves) != merkle_root(leaves[:-1])
+        assert merkle_root(leaves) != merkle_root([leaves[1], leaves[0], *leaves[2:]])
+
+
+class TestIntegrityVerifier:
+    """Tests for verifying files against recorded chunk hashes."""
+
+    def test_unchanged_file_is_valid(self, evidence_file):
+        """Test an untouched file verifies with every chunk checked."""
+        path, data, hasher = evidence_file
+
+        report = verify(path, hasher, len(data))
+
+        assert report.is_valid
+        assert report.chunks_checked == report.chunks_total == 11
+        assert report.changed_ranges == []
+
+    def test_reports_changed_byte_ranges(self, evidence_file):
+        """Test modified chunks are reported as merged byte ranges."""
+        path, data, hasher = evidence_file
+        tampered = bytearray(data)
+        tampered[CHUNK_SIZE * 3 + 10] ^= 0xFF
+        tampered[CHUNK_SIZE * 4 + 99] ^= 0xFF
+        tampered[CHUNK_SIZE * 8] ^= 0xFF
+        path.write_bytes(tampered)
+
+        report = verify(path, hasher, len(data))
+
+        assert not report.is_valid
+        assert report.changed_ranges == [
+            (CHUNK_SIZE * 3, CHUNK_SIZE * 5),
+            (CHUNK_SIZE * 8, CHUNK_SIZE * 9),
+        ]
+
+    def test_truncated_file(self, evidence_file):
+        """Test truncation is reported from the last intact chunk onwards."""
+        path, data, hasher = evidence_file
+        path.write_bytes(data[: CHUNK_SIZE * 6])
+
+        report = verify(path, hasher, len(data))
+
+        assert not report.is_valid
+        assert not report.size_matches
+        assert report.changed_ranges == [(CHUNK_SIZE * 6, len(data))]
+
+    def test_spot_check_samples_chunks(self, evidence_file):
+        """Test sampling checks only the requested number of chunks."""
+        path, data, hasher = evidence_file
+
+        report = verify(path, hasher, len(data), sample=3)
+
+        assert report.is_valid
+        assert report.sampled
+        assert report.chunks_checked == 3
+
+
+class TestFileFingerprint:
+    """Tests for the sampled pre-upload fingerprint."""
+
+    def test_small_file_is_hashed_whole(self, evidence_file):
+        """Test files below the sample size are fingerprinted in full."""
+        path, data, _ = evidence_file
+
+        assert fingerprint_ranges(len(data)) == [(0, len(data))]
+        expected = hashlib.sha256(f"{len(data)}\n".encode() + data).hexdigest()
+        assert file_fingerprint(path) == expected
+
+    def test_large_file_samples_head_tail_and_strides(self, tmp_path):
+        """Test large files are sampled and any sampled byte changes the result."""
+        size = FINGERPRINT_BLOCK_SIZE * 40
+        data = bytearray(os.urandom(size))
+        path = tmp_path / "mailbox.pst"
+        path.write_bytes(data)
+
+        ranges = fingerprint_ranges(size)
+        assert len(ranges) == 18
+        assert ranges[0] == (0, FINGERPRINT_BLOCK_SIZE)
+        assert ranges[-1] == (size - FINGERPRINT_BLOCK_SIZE, size)
+        original = file_fingerprint(path)
+
+        # Inside the fifth sampled block
+        data[ranges[4][0] + 7] ^= 0xFF
+        path.write_bytes(data)
+        assert file_fingerprint(path) != original
+
+        # Unsampled bytes aren't covered; the full hash after upload is
+        data[ranges[4][0] + 7] ^= 0xFF
+        data[FINGERPRINT_BLOCK_SIZE + 1] ^= 0xFF
+        path.write_bytes(data)
+        assert file_fingerprint(path) == original
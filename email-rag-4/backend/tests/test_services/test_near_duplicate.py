@@ -0,0 +1,168 @@
+"""
+Tests for Near-Duplicate Detection
+
+Tests for MinHash signatures, LSH bands and batch grouping.
+"""
+
+import pytest
+
+from app.services.body_segmenter import body_segmenter
+from app.services.near_duplicate import NearDuplicateDetector
+
+BODY = (
+    "Hi team, attached is the revised settlement proposal for the Henderson "
+    "matter. Please review the indemnification clause in section four and the "
+    "payment schedule in appendix B before our call on Thursday. Legal has "
+    "asked that nobody forwards this outside the deal team until the board "
+    "has signed off on the final numbers. Thanks, Maria"
+)
+
+UNRELATED = (
+    "Reminder that the parking garage on Fifth Street will be closed for "
+    "resurfacing next week. Staff should use the overflow lot behind the "
+    "warehouse and allow extra time in the mornings. Shuttle buses will run "
+    "every fifteen minutes from seven until ten. Facilities"
+)
+
+# An Outlook-style reply: new text above the quoted original, no ">" markers
+REPLY = (
+    "Hi team, I attached the signed contract; the originals are in the safe.\n\n"
+    "From: Maria Lopez\n"
+    "Sent: Monday, March 4, 2024 9:12 AM\n"
+    "To: Deal Team\n"
+    "Subject: Henderson settlement\n\n" + BODY
+)
+
+
+class FakeResult:
+    """Query result with fixed rows."""
+
+    def __init__(self, rows: list | None = None):
+        self.rows = rows or []
+
+    def all(self) -> list:
+        return self.rows
+
+
+class FakeSession:
+    """Session whose candidate lookup finds nothing stored yet."""
+
+    async def execute(self, statement):
+        return FakeResult()
+
+
+class StoredSession:
+    """Session answering the candidate, content and attachment lookups in turn."""
+
+    def __init__(self, *results: list):
+        self.results = [FakeResult(rows) for rows in results]
+
+    async def execute(self, statement):
+        return self.results.pop(0)
+
+
+@pytest.fixture
+def detector() -> NearDuplicateDetector:
+    """Detector with explicit settings."""
+    return NearDuplicateDetector(threshold=0.8, min_words=20)
+
+
+def email_row(detector: NearDuplicateDetector, email_id: str, body: str) -> dict:
+    """Build an email row the way the ingest writer does (sketching new content)."""
+    new_content = body_segmenter.segment(body).new_content
+    signature, bands = detector.sketch(new_content)
+    return {
+        "id": email_id,
+        "body_text": body,
+        "body_new_text": new_content,
+        "minhash_signature": signature,
+        "lsh_bands": bands,
+        "duplicate_of": None,
+    }
+
+
+# ===========================================
+# Signature Tests
+# ===========================================
+
+class TestSignatures:
+    """Tests for MinHash signatures."""
+
+    def test_signature_is_deterministic(self, detector):
+        """Test the same body always gives the same signature and bands."""
+        assert detector.sketch(BODY) == NearDuplicateDetector(threshold=0.8, min_words=20).sketch(BODY)
+
+    def test_near_duplicates_are_similar(self, detector):
+        """Test a forwarded copy with a short note scores above the threshold."""
+        forwarded = "FYI see below.\n\n" + BODY + "\n\n> On Monday Maria wrote:\n> earlier thread"
+
+        similarity = detector.similarity(detector.signature(BODY), detector.signature(forwarded))
+
+        assert similarity >= 0.8
+
+    def test_unrelated_emails_are_not_similar(self, detector):
+        """Test unrelated bodies score well below the threshold."""
+        similarity = detector.similarity(detector.signature(BODY), detector.signature(UNRELATED))
+
+        assert similarity < 0.2
+
+    def test_short_bodies_are_not_sketched(self, detector):
+        """Test short bodies (\"Thanks!\") are never grouped."""
+        assert detector.sketch("Thanks, sounds good!") == (None, None)
+        assert detector.sketch(None) == (None, None)
+
+
+# ===========================================
+# Grouping Tests
+# ===========================================
+
+class TestAssignCanonicals:
+    """Tests for grouping a batch under canonical emails."""
+
+    async def test_groups_copies_within_batch(self, detector):
+        """Test later copies in a batch point at the first copy."""
+        rows = [
+            email_row(detector, "a", BODY),
+            email_row(detector, "b", UNRELATED),
+            email_row(detector, "c", BODY.replace("Thanks, Maria", "Thanks,\nMaria")),
+            email_row(detector, "d", "Short reply"),
+        ]
+
+        grouped = await detector.assign_canonicals(FakeSession(), "task-1", rows)
+
+        assert grouped == 1
+        assert [row["duplicate_of"] for row in rows] == [None, None, "a", None]
+
+    async def test_reply_above_quoted_original_not_grouped(self, detector):
+        """Test a reply quoting the original keeps its own identity (and embedding)."""
+        rows = [email_row(detector, "original", BODY), email_row(detector, "reply", REPLY)]
+        grouped = await detector.assign_canonicals(FakeSession(), "task-1", rows)
+
+        assert grouped == 0
+        assert rows[1]["duplicate_of"] is None
+
+    async def test_copy_with_extra_text_not_grouped(self, detector):
+        """Test a similar email with words the canonical lacks is not collapsed."""
+        extended = BODY + " PS the venue moved"
+        assert detector.similarity(detector.signature(BODY), detector.signature(extended)) >= 0.8
+
+        rows = [email_row(detector, "a", BODY), email_row(detector, "b", extended)]
+        grouped = await detector.assign_canonicals(FakeSession(), "task-1", rows)
+
+        assert grouped == 0
+
+    async def test_own_attachments_block_grouping(self, detector):
+        """Test a copy is grouped under a stored canonical only if it holds its attachments."""
+        stored = email_row(detector, "stored", BODY)
+        candidates = [("stored", None, stored["minhash_signature"], stored["lsh_bands"])]
+        rows = [email_row(detector, "copy", BODY), email_row(detector, "with-file", BODY)]
+
+        grouped = await detector.assign_canonicals(
+            StoredSession(candidates, [("stored", BODY)], [("stored", "hash-pdf")]),
+            "task-1",
+            rows,
+            {"copy": {"hash-pdf"}, "with-file": {"hash-pdf", "hash-xlsx"}},
+        )
+
+        assert grouped == 1
+        assert [row["duplicate_of"] for row in rows] == ["stored", None]
@@ -0,0 +1,288 @@
+"""
+Tests for PST Processor
+
+Tests for transport header parsing, folder shard planning and
+folder-scoped extraction, using in-memory stand-ins for pypff objects.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.pst_processor import FolderManifestEntry, MessageHeaders, PSTProcessor
+
+
+# ===========================================
+# Fake pypff objects
+# ===========================================
+
+class FakeFolder:
+    """Minimal stand-in for a pypff folder."""
+
+    def __init__(self, name: str, message_count: int = 0, sub_folders: list | None = None):
+        self.name = name
+        self.message_count = message_count
+        self.sub_folders = sub_folders or []
+
+    def get_name(self) -> str:
+        return self.name
+
+    def get_number_of_sub_messages(self) -> int:
+        return self.message_count
+
+    def get_sub_message(self, index: int) -> str:
+        return f"{self.name}#{index}"
+
+    def get_number_of_sub_folders(self) -> int:
+        return len(self.sub_folders)
+
+    def get_sub_folder(self, index: int) -> "FakeFolder":
+        return self.sub_folders[index]
+
+
+class FakePSTFile:
+    """Minimal stand-in for a pypff file."""
+
+    def __init__(self, root: FakeFolder):
+        self.root = root
+
+    def get_root_folder(self) -> FakeFolder:
+        return self.root
+
+
+@pytest.fixture
+def processor(tmp_path) -> PSTProcessor:
+    """PST processor over a fake mailbox tree."""
+    pst_path = tmp_path / "mailbox.pst"
+    pst_path.write_bytes(b"!BDN")
+
+    root = FakeFolder("", 0, [
+        FakeFolder("Inbox", 900, [
+            FakeFolder("Projects", 300),
+            FakeFolder("Empty", 0),
+        ]),
+        FakeFolder("Sent Items", 500),
+        FakeFolder("Archive", 200, [FakeFolder("2019", 100)]),
+    ])
+
+    processor = PSTProcessor(pst_path)
+    processor._pst_file = FakePSTFile(root)
+    return processor
+
+
+# ===========================================
+# Folder Manifest Tests
+# ===========================================
+
+class TestFolderManifest:
+    """Tests for the single-pass folder manifest."""
+
+    def test_manifest_lists_folders_depth_first(self, processor: PSTProcessor):
+        """Test entries carry path, counts and index handle in walk order."""
+        manifest = processor.build_folder_manifest()
+
+        assert [(e.path, e.message_count, e.sub_folder_count) for e in manifest] == [
+            ("Root", 0, 3),
+            ("Root/Inbox", 900, 2),
+            ("Root/Inbox/Projects", 300, 0),
+            ("Root/Inbox/Empty", 0, 0),
+            ("Root/Sent Items", 500, 0),
+            ("Root/Archive", 200, 1),
+            ("Root/Archive/2019", 100, 0),
+        ]
+        assert manifest[2].index_path == [0, 0]
+
+    def test_stored_manifest_plans_same_shards(self, processor: PSTProcessor):
+        """Test a JSON round-tripped manifest plans without touching the PST."""
+        stored = [e.to_dict() for e in processor.build_folder_manifest()]
+        expected = processor.plan_folder_shards(3)
+
+        processor._pst_file = None
+        manifest = [FolderManifestEntry.from_dict(entry) for entry in stored]
+
+        assert processor.plan_folder_shards(3, manifest) == expected
+
+
+# ===========================================
+# Shard Planning Tests
+# ===========================================
+
+class TestPlanFolderShards:
+    """Tests for balanced folder shard planning."""
+
+    def test_shards_cover_every_non_empty_folder_once(self, processor: PSTProcessor):
+        """Test every folder with messages lands in exactly one shard."""
+        shards = processor.plan_folder_shards(3)
+
+        folders = [tuple(f) for shard in shards for f in shard.folders]
+        assert sorted(folders) == sorted([(0,), (0, 0), (1,), (2,), (2, 0)])
+        assert sum(shard.message_count for shard in shards) == processor.count_emails()
+
+    def test_shards_are_balanced(self, processor: PSTProcessor):
+        """Test greedy assignment keeps shard loads close together."""
+        shards = processor.plan_folder_shards(2)
+
+        loads = sorted(shard.message_count for shard in shards)
+        assert loads == [1000, 1000]
+
+    def test_shard_count_capped_by_folder_count(self, processor: PSTProcessor):
+        """Test no empty shards are created when folders run out."""
+        shards = processor.plan_folder_shards(50)
+
+        assert len(shards) == 5
+        assert all(shard.message_count > 0 for shard in shards)
+
+    def test_folders_keep_depth_first_order(self, processor: PSTProcessor):
+        """Test folders inside a shard are ordered as a full walk would visit them."""
+        shards = processor.plan_folder_shards(1)
+
+        assert shards[0].folders == [[0], [0, 0], [1], [2], [2, 0]]
+
+    def test_unopened_file_has_no_shards(self, processor: PSTProcessor):
+        """Test planning without an open PST returns nothing."""
+        processor._pst_file = None
+
+        assert processor.plan_folder_shards(4) == []
+
+
+class TestResolveFolder:
+    """Tests for resolving folder index paths."""
+
+    def test_resolve_builds_same_path_as_full_walk(self, processor: PSTProcessor):
+        """Test resolved folder paths match the recursive extraction naming."""
+        folder, path = processor._resolve_folder([0, 0])
+
+        assert folder.get_name() == "Projects"
+        assert path == "Root/Inbox/Projects"
+
+
+# ===========================================
+# Resume Tests
+# ===========================================
+
+@pytest.fixture
+def small_processor(tmp_path, monkeypatch) -> PSTProcessor:
+    """PST processor over a small tree whose messages extract to their IDs."""
+    pst_path = tmp_path / "small.pst"
+    pst_path.write_bytes(b"!BDN")
+
+    root = FakeFolder("", 1, [
+        FakeFolder("Inbox", 3, [FakeFolder("Projects", 2)]),
+        FakeFolder("Sent Items", 2),
+    ])
+
+    processor = PSTProcessor(pst_path)
+    processor._pst_file = FakePSTFile(root)
+    monkeypatch.setattr(
+        processor,
+        "_extract_message",
+        lambda message, *args: SimpleNamespace(message_id=message),
+    )
+    return processor
+
+
+def message_ids(emails) -> list[str]:
+    return [email.message_id for email in emails]
+
+
+class TestResumeExtraction:
+    """Tests for seeking to a checkpoint cursor."""
+
+    def test_emails_carry_their_cursor(self, small_processor: PSTProcessor):
+        """Test each email records the folder index path and message index."""
+        emails = list(small_processor.extract_emails())
+
+        assert [(e.folder_index, e.message_index) for e in emails][:3] == [
+            ([], 0), ([0], 0), ([0], 1),
+        ]
+
+    def test_resume_continues_after_cursor(self, small_processor: PSTProcessor):
+        """Test resuming yields exactly the messages after the cursor."""
+        full = message_ids(small_processor.extract_emails())
+
+        for position, email in enumerate(small_processor.extract_emails()):
+            resumed = message_ids(
+                small_processor.extract_emails(
+                    resume_from=(email.folder_index, email.message_index)
+                )
+            )
+            assert resumed == full[position + 1:]
+
+    def test_resume_within_shard_folders(self, small_processor: PSTProcessor):
+        """Test folder-scoped extraction skips folders before the cursor."""
+        folders = [[0], [0, 0], [1]]
+
+        resumed = message_ids(
+            small_processor.extract_emails_from_folders(folders, resume_from=([0, 0], 0))
+        )
+
+        assert resumed == ["Projects#1", "Sent Items#0", "Sent Items#1"]
+
+
+# ===========================================
+# Header Parsing Tests
+# ===========================================
+
+RAW_HEADERS = (
+    b"Received: from relay.example.com\r\n"
+    b"\tby mx.example.net with ESMTPS id abc;\r\n"
+    b"\tTue, 14 Mar 2023 09:00:11 +0000\r\n"
+    b"Received: from client.example.com by relay.example.com\r\n"
+    b'From: "Doe, Jane" <jane.doe@example.com>\r\n'
+    b"To: Bob <bob@example.com>,\r\n"
+    b" carol@example.com\r\n"
+    b"Message-ID: <abc123@example.com>\r\n"
+    b"References: <r1@example.com>\r\n"
+    b" r2@example.com\r\n"
+    b"\r\n"
+    b"Body-Looking: line after the header block\r\n"
+)
+
+
+class TestMessageHeaders:
+    """Tests for the parsed transport header view."""
+
+    def test_folded_lines_are_unfolded(self):
+        """Test continuation lines belong to their header, not new headers."""
+        headers = MessageHeaders(RAW_HEADERS)
+
+        received = headers.get_all("received")
+        assert len(received) == 2
+        assert "by mx.example.net" in received[0]
+        assert "Tue, 14 Mar 2023 09:00:11" in received[0]
+        assert headers.get("\tby mx.example.net with ESMTPS id abc;") is None
+
+    def test_quoted_display_name_with_comma(self):
+        """Test commas inside quoted names don't split the address."""
+        headers = MessageHeaders(RAW_HEADERS)
+
+        assert headers.from_address == "jane.doe@example.com"
+
+    def test_folded_recipient_list(self):
+        """Test address lists spanning folded lines are fully parsed."""
+        headers = MessageHeaders(RAW_HEADERS)
+
+        assert headers.recipients("to") == ["bob@example.com", "carol@example.com"]
+        assert headers.recipients("cc") == []
+
+    def test_message_ids(self):
+        """Test Message-ID and References accessors."""
+        headers = MessageHeaders(RAW_HEADERS)
+
+        assert headers.message_id == "<abc123@example.com>"
+        assert headers.references == ["<r1@example.com>", "<r2@example.com>"]
+        assert headers.in_reply_to is None
+
+    def test_blank_line_ends_header_block(self):
+        """Test lines after the blank separator are not parsed as headers."""
+        headers = MessageHeaders(RAW_HEADERS)
+
+        assert "body-looking" not in headers.as_dict()
+
+    def test_empty_headers(self):
+        """Test missing transport headers produce an empty view."""
+        headers = MessageHeaders(None)
+
+        assert not headers
+        assert headers.from_address == ""
+        assert headers.as_dict() == {}
@@ -0,0 +1,109 @@
+"""
+Tests for Query Embedder
+
+Micro-batching of concurrent queries on the inference thread, with a
+stand-in encoder.
+"""
+
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.services.query_embedder import QueryEmbedder
+
+
+class FakeEncoder:
+    """Records batches; each vector is the text's length."""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.batches: list[list[str]] = []
+        self.threads: set[str] = set()
+        self.delay = delay
+        self.fail = fail
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        self.batches.append(list(texts))
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def embedder_factory():
+    embedders = []
+
+    def make(encoder, **kwargs) -> QueryEmbedder:
+        embedder = QueryEmbedder(encoder, **kwargs)
+        embedders.append(embedder)
+        return embedder
+
+    yield make
+    for embedder in embedders:
+        embedder.shutdown()
+
+
+class TestQueryEmbedder:
+    """Tests for QueryEmbedder."""
+
+    async def test_concurrent_queries_share_a_batch(self, embedder_factory):
+        """Test queries within the wait window are encoded together, off the event loop."""
+        encoder = FakeEncoder()
+        embedder = embedder_factory(encoder, max_batch_size=8, max_wait_ms=200)
+        queries = ["invoice", "budget forecast", "invoice", "contract"]
+
+        vectors = await asyncio.gather(*(embedder.embed(query) for query in queries))
+
+        # Repeated queries are encoded once but each caller gets a result
+        assert encoder.batches == [["invoice", "budget forecast", "contract"]]
+        assert [vector[0] for vector in vectors] == [len(query) for query in queries]
+        assert encoder.threads == {"query-embedder"}
+
+    async def test_batches_capped_at_max_size(self, embedder_factory):
+        encoder = FakeEncoder()
+        embedder = embedder_factory(encoder, max_batch_size=2, max_wait_ms=50)
+
+        await asyncio.gather(*(embedder.embed(f"query {n}") for n in range(5)))
+
+        assert [len(batch) for batch in encoder.batches] == [2, 2, 1]
+
+    async def test_event_loop_not_blocked(self, embedder_factory):
+        """Test other coroutines keep running while a query is encoding."""
+        embedder = embedder_factory(FakeEncoder(delay=0.2), max_wait_ms=0)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        await embedder.embed("quarterly report")
+        task.cancel()
+
+        assert ticks >= 5
+
+    async def test_encode_error_reaches_every_caller(self, embedder_factory):
+        embedder = embedder_factory(FakeEncoder(fail=True), max_wait_ms=50)
+
+        results = await asyncio.gather(
+            embedder.embed("a"), embedder.embed("b"), return_exceptions=True
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        # The thread survives a failed batch
+        embedder._encode = FakeEncoder()
+        assert (await embedder.embed("abc"))[0] == 3
+
+    async def test_restarts_after_shutdown(self, embedder_factory):
+        embedder = embedder_factory(FakeEncoder(), max_wait_ms=0)
+
+        await embedder.embed("first")
+        embedder.shutdown()
+
+        assert (await embedder.embed("second"))[0] == len("second")
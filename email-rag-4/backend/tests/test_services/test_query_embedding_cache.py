@@ -0,0 +1,89 @@
+"""
+Tests for Query Embedding Cache
+
+LRU eviction, text normalization and the optional Redis tier, with a
+stand-in async Redis client.
+"""
+
+import numpy as np
+
+from app.services.query_embedding_cache import QueryEmbeddingCache, normalize_query
+
+
+class FakeRedis:
+    """Async get/set over a dict; fails every call when ``down``."""
+
+    def __init__(self, down: bool = False):
+        self.data: dict[str, bytes] = {}
+        self.down = down
+
+    async def get(self, key):
+        if self.down:
+            raise ConnectionError("redis down")
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        if self.down:
+            raise ConnectionError("redis down")
+        self.data[key] = value
+
+
+def vector(value: float) -> np.ndarray:
+    return np.full(4, value, dtype=np.float32)
+
+
+class TestNormalizeQuery:
+    """Tests for normalize_query."""
+
+    def test_whitespace_and_unicode_composition(self):
+        assert normalize_query("  café \t menu\n") == "café menu"
+        # Case is kept for cased models
+        assert normalize_query("Acme") != normalize_query("acme")
+
+
+class TestQueryEmbeddingCache:
+    """Tests for QueryEmbeddingCache."""
+
+    async def test_lru_eviction_and_stats(self):
+        cache = QueryEmbeddingCache(max_entries=2)
+        await cache.put("model", "a", vector(1))
+        await cache.put("model", "b", vector(2))
+        assert await cache.get("model", "a") is not None  # a is now most recent
+        await cache.put("model", "c", vector(3))
+
+        assert await cache.get("model", "b") is None
+        assert (await cache.get("model", "c"))[0] == 3
+        # Keys include the model
+        assert await cache.get("other-model", "a") is None
+        assert cache.stats() == {
+            "entries": 2,
+            "max_entries": 2,
+            "hits": 2,
+            "redis_hits": 0,
+            "misses": 2,
+            "hit_rate": 0.5,
+        }
+
+    async def test_redis_shared_between_replicas(self):
+        redis = FakeRedis()
+        replicas = [QueryEmbeddingCache(max_entries=10, redis_url="redis://test") for _ in "ab"]
+        for replica in replicas:
+            replica._client = redis
+
+        await replicas[0].put("model", "budget report", vector(5))
+        found = await replicas[1].get("model", "budget  report")
+
+        assert found is not None and found[0] == 5
+        assert replicas[1].redis_hits == 1
+        # Now held locally too
+        assert (await replicas[1].get("model", "budget report"))[0] == 5
+        assert replicas[1].hits == 1
+
+    async def test_redis_failure_falls_back_to_local(self):
+        cache = QueryEmbeddingCache(max_entries=10, redis_url="redis://test")
+        cache._client = FakeRedis(down=True)
+
+        await cache.put("model", "q", vector(1))
+
+        assert cache.client is None
+        assert (await cache.get("model", "q"))[0] == 1
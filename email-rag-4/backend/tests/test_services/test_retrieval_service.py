@@ -0,0 +1,91 @@
+"""
+Tests for Retrieval Service
+
+Tests for PST-scoped retrieval of near-duplicate emails, with a stand-in
+vector store and the database lookups replaced.
+"""
+
+import importlib
+from contextlib import asynccontextmanager
+
+from app.services.near_duplicate import StandIn
+from app.services.retrieval_service import RetrievalService
+
+# The package re-exports a ``retrieval_service`` instance over the module name
+retrieval_module = importlib.import_module("app.services.retrieval_service")
+
+CUSTODIAN_PST = "pst-bob"
+CANONICAL_PST = "pst-alice"
+
+
+class FakeVectorStore:
+    """Returns one canonical email chunk from another PST; records the filter."""
+
+    def __init__(self):
+        self.where = None
+
+    def search_emails(self, query_embedding, n_results, where=None):
+        self.where = where
+        return {
+            "ids": ["canonical-1_chunk_0", "orphan-1_chunk_0", "own-1_chunk_0"],
+            "documents": ["Board pack attached", "Lunch?", "Q3 numbers"],
+            "distances": [0.1, 0.2, 0.3],
+            "metadatas": [
+                {
+                    "email_id": "canonical-1",
+                    "pst_file_id": CANONICAL_PST,
+                    "folder_path": "Alice/Inbox",
+                    "subject": "Board pack",
+                },
+                {"email_id": "orphan-1", "pst_file_id": CANONICAL_PST, "subject": "Lunch"},
+                {"email_id": "own-1", "pst_file_id": CUSTODIAN_PST, "subject": "Q3"},
+            ],
+        }
+
+
+@asynccontextmanager
+async def no_database():
+    yield None
+
+
+class TestRetrievePstScope:
+    """Tests for RetrievalService.retrieve with a PST filter."""
+
+    async def test_near_duplicates_found_via_canonical_pst(self, monkeypatch):
+        """Test a custodian's duplicate is found via its canonical and gets its own metadata."""
+        store = FakeVectorStore()
+        monkeypatch.setattr(retrieval_module, "vector_store", store)
+
+        async def embed_query(text):
+            return [0.0] * 4
+
+        monkeypatch.setattr(retrieval_module.embedding_service, "embed_query", embed_query)
+        service = RetrievalService()
+
+        async def canonical_pst_ids(db, pst_file_ids):
+            return [CANONICAL_PST]
+
+        async def load_stand_ins(db, canonical_ids, pst_file_ids):
+            assert canonical_ids == ["canonical-1", "orphan-1"]
+            return {"canonical-1": StandIn("duplicate-1", CUSTODIAN_PST, "Bob/Forwarded", None)}
+
+        monkeypatch.setattr(retrieval_module, "get_db_context", no_database)
+        monkeypatch.setattr(retrieval_module, "canonical_pst_ids", canonical_pst_ids)
+        monkeypatch.setattr(retrieval_module, "load_stand_ins", load_stand_ins)
+
+        result = await service.retrieve(
+            "board pack",
+            pst_file_ids=[CUSTODIAN_PST],
+            include_attachments=False,
+            rerank=False,
+        )
+
+        assert store.where == {"pst_file_id": {"$in": [CUSTODIAN_PST, CANONICAL_PST]}}
+        # The canonical's other-PST copy without a duplicate here is dropped
+        assert [doc.id for doc in result.documents] == ["duplicate-1_chunk_0", "own-1_chunk_0"]
+        metadata = result.documents[0].metadata
+        assert metadata["email_id"] == "duplicate-1"
+        assert metadata["pst_file_id"] == CUSTODIAN_PST
+        assert metadata["folder_path"] == "Bob/Forwarded"
+        assert metadata["subject"] == "Board pack"
+        assert result.metadata_filters_applied == {"pst_file_id": [CUSTODIAN_PST]}
@@ -0,0 +1,93 @@
+"""
+Tests for Search Service
+
+Tests for collapsing near-duplicate results under a PST filter, with the
+database lookups replaced.
+"""
+
+import importlib
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+from app.services.near_duplicate import StandIn
+from app.services.search_service import SearchFilters, SearchResult, SearchService
+
+# The package re-exports a ``search_service`` instance over the module name
+search_module = importlib.import_module("app.services.search_service")
+
+CUSTODIAN_PST = "pst-bob"
+CANONICAL_PST = "pst-alice"
+
+
+class FakeResult:
+    """Query result with fixed rows."""
+
+    def __init__(self, rows: list):
+        self.rows = rows
+
+    def all(self) -> list:
+        return self.rows
+
+
+class FakeSession:
+    """Answers the group lookup, then the duplicate count."""
+
+    def __init__(self, *results: list):
+        self.results = [FakeResult(rows) for rows in results]
+
+    async def execute(self, statement):
+        return self.results.pop(0)
+
+
+def result(email_id: str, pst_file_id: str, score: float) -> SearchResult:
+    return SearchResult(
+        email_id=email_id,
+        subject=None,
+        sender_email=None,
+        sender_name=None,
+        sent_date=None,
+        snippet=None,
+        score=score,
+        folder_path="Alice/Inbox" if pst_file_id == CANONICAL_PST else "Bob/Inbox",
+        pst_file_id=pst_file_id,
+    )
+
+
+class TestCollapseDuplicates:
+    """Tests for SearchService._collapse_duplicates."""
+
+    async def test_canonical_outside_filter_takes_stand_in_metadata(self, monkeypatch):
+        """Test a canonical from another PST is shown as its duplicate, with its metadata."""
+        sent = datetime(2024, 3, 4, tzinfo=timezone.utc)
+        session = FakeSession(
+            [("canonical-1", None), ("orphan-1", None), ("own-1", None)],
+            [("canonical-1", 2)],
+        )
+
+        @asynccontextmanager
+        async def database():
+            yield session
+
+        async def load_stand_ins(db, canonical_ids, pst_file_ids):
+            assert sorted(canonical_ids) == ["canonical-1", "orphan-1"]
+            return {"canonical-1": StandIn("duplicate-1", CUSTODIAN_PST, "Bob/Forwarded", sent)}
+
+        monkeypatch.setattr(search_module, "get_db_context", database)
+        monkeypatch.setattr(search_module, "load_stand_ins", load_stand_ins)
+
+        collapsed = await SearchService()._collapse_duplicates(
+            [
+                result("canonical-1", CANONICAL_PST, 0.9),
+                result("orphan-1", CANONICAL_PST, 0.8),
+                result("own-1", CUSTODIAN_PST, 0.7),
+            ],
+            SearchFilters(pst_file_ids=[CUSTODIAN_PST]),
+        )
+
+        # The canonical's other-PST copy without a duplicate here is dropped
+        assert [r.email_id for r in collapsed] == ["duplicate-1", "own-1"]
+        stand_in = collapsed[0]
+        assert stand_in.pst_file_id == CUSTODIAN_PST
+        assert stand_in.folder_path == "Bob/Forwarded"
+        assert stand_in.sent_date == sent
+        assert stand_in.duplicate_count == 2
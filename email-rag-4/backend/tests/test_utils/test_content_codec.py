@@ -0,0 +1,52 @@
+"""
+Tests for Content Compression
+
+Tests for the compressed blob format used by the content side tables.
+"""
+
+import pytest
+
+from app.utils import content_codec
+from app.utils.content_codec import compress_text, decompress_text
+
+HTML = (
+    '<html><head><meta http-equiv="Content-Type" content="text/html; charset=utf-8"></head>'
+    '<body lang="EN-US"><div class="WordSection1"><p class="MsoNormal">Hi Bob, the Q3 '
+    "numbers look fine to me.<o:p></o:p></p></div></body></html>"
+)
+
+
+class TestContentCodec:
+    """Tests for compress_text/decompress_text."""
+
+    @pytest.mark.skipif(content_codec.zstandard is None, reason="zstandard not installed")
+    def test_round_trip_with_shared_dictionary(self):
+        """Test HTML round-trips and compresses well below its size."""
+        blob = compress_text(HTML)
+
+        assert blob[0] == content_codec.CODEC_ZSTD
+        assert decompress_text(blob) == HTML
+        assert len(blob) < len(HTML) / 3
+
+    def test_zlib_fallback_round_trip(self, monkeypatch):
+        """Test blobs are written and read with zlib when zstandard is missing."""
+        monkeypatch.setattr(content_codec, "zstandard", None)
+
+        blob = compress_text(HTML)
+
+        assert blob[0] == content_codec.CODEC_ZLIB
+        assert decompress_text(blob) == HTML
+
+    def test_short_and_missing_values(self):
+        """Test short text is stored raw and None passes through."""
+        assert compress_text("ok")[0] == content_codec.CODEC_RAW
+        assert decompress_text(compress_text("ok")) == "ok"
+        assert compress_text(None) is None
+        assert decompress_text(None) is None
+
+    def test_unknown_dictionary_version_rejected(self):
+        """Test a blob from an unknown dictionary version is not misread."""
+        blob = compress_text(HTML)
+
+        with pytest.raises(ValueError):
+            decompress_text(blob[:1] + bytes([99]) + blob[2:])
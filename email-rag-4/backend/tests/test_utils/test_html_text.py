@@ -0,0 +1,70 @@
+"""
+Tests for HTML to Text Conversion
+
+Tests for the streaming converter on both the lxml and html.parser backends.
+"""
+
+import pytest
+
+from app.utils.html_text import _convert_lxml, _convert_stdlib, html_to_text
+
+NEWSLETTER = """<!DOCTYPE html>
+<html>
+<head>
+  <title>Weekly Digest</title>
+  <style>td { font-family: Arial; }</style>
+</head>
+<body>
+  <script>trackOpen();</script>
+  <table width="600">
+    <tr><td><h1>Weekly   Digest</h1></td></tr>
+    <tr>
+      <td>Sales&nbsp;up <b>12%</b></td>
+      <td>Churn down</td>
+    </tr>
+  </table>
+  <p>First paragraph
+     wraps in the source.</p>
+  <p>Fish &amp; chips<br>on Friday</p>
+  <!-- tracking comment -->
+</body>
+</html>"""
+
+EXPECTED = (
+    "Weekly Digest\n"
+    "\n"
+    "Sales up 12% Churn down\n"
+    "\n"
+    "First paragraph wraps in the source.\n"
+    "\n"
+    "Fish & chips\n"
+    "on Friday"
+)
+
+
+@pytest.fixture(params=[_convert_lxml, _convert_stdlib], ids=["lxml", "stdlib"])
+def convert(request):
+    """Each parser backend."""
+    return request.param
+
+
+class TestHtmlToText:
+    """Tests for html_to_text."""
+
+    def test_newsletter_layout(self, convert):
+        """Test head/script are dropped, cells share a line and paragraphs are kept."""
+        assert convert(NEWSLETTER) == EXPECTED
+
+    def test_preformatted_whitespace_kept(self, convert):
+        """Test whitespace inside <pre> is not collapsed."""
+        assert convert("<p>Output:</p><pre>a  b\n  c</pre>") == "Output:\n\na  b\n  c"
+
+    def test_invisible_preheader_fillers_collapsed(self, convert):
+        """Test zero-width padding characters don't survive as text."""
+        assert convert("<div>Preview&zwnj;&nbsp;&#847;&zwnj;&nbsp;</div><div>Body</div>") == "Preview\nBody"
+
+    def test_fragment_and_empty_input(self):
+        """Test fragments convert and empty input gives an empty string."""
+        assert html_to_text("plain <i>text</i> only") == "plain text only"
+        assert html_to_text("") == ""
+        assert html_to_text(None) == ""
@@ -45,9 +45,14 @@ import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import toast from 'react-hot-toast';
 import { uploadApi } from '@/services/api';
 import { useTaskProgress } from '@/hooks';
-import { formatFileSize, formatRelativeTime } from '@/utils';
+import { computeFileFingerprint, formatFileSize, formatRelativeTime } from '@/utils';
 import type { PSTFile } from '@/types';
 
+// Files above this size use the resumable chunked upload
+const CHUNKED_UPLOAD_THRESHOLD = 95 * 1024 * 1024; // 95MB
+// Parts uploaded at once
+const PARALLEL_CHUNK_UPLOADS = 4;
+
 interface UploadingFile {
   file: File;
   progress: number;
@@ -529,10 +534,23 @@ export function Upload() {
 
   const uploadMutation = useMutation({
     mutationFn: async (file: File) => {
-      const CHUNK_SIZE = 95 * 1024 * 1024; // 95MB
+      // Ask first so re-submitted evidence isn't transferred again. This is
+      // best effort: crypto.subtle is missing outside secure contexts (plain
+      // HTTP by LAN IP) and the precheck may fail; the server's full SHA-256
+      // check still catches duplicates after the upload
+      let precheck: { duplicate: boolean; message: string } | null = null;
+      try {
+        const fingerprint = await computeFileFingerprint(file);
+        precheck = await uploadApi.precheckUpload(file.name, file.size, fingerprint);
+      } catch (error) {
+        console.warn('Upload precheck unavailable, uploading anyway:', error);
+      }
+      if (precheck?.duplicate) {
+        throw new Error(precheck.message);
+      }
 
       // Use standard upload for small files
-      if (file.size <= CHUNK_SIZE) {
+      if (file.size <= CHUNKED_UPLOAD_THRESHOLD) {
         return uploadApi.uploadPSTFile(file, (progress) => {
           setUploads((prev) =>
             prev.map((u) =>
@@ -542,38 +560,66 @@ export function Upload() {
         });
       }
 
-      // Chunked upload for large files
-      const totalChunks = Math.ceil(file.size / CHUNK_SIZE);
-      const { upload_id } = await uploadApi.initChunkUpload(
-        file.name,
-        file.size,
-        totalChunks
-      );
-
-      let uploadedBytes = 0;
-
-      for (let i = 0; i < totalChunks; i++) {
-        const start = i * CHUNK_SIZE;
-        const end = Math.min(start + CHUNK_SIZE, file.size);
-        const chunk = file.slice(start, end);
-
-        await uploadApi.uploadChunk(upload_id, i, chunk, (chunkProgress) => {
-          // Calculate total progress
-          // chunkProgress is 0-100 for current chunk
-          const chunkLoaded = (chunkProgress / 100) * chunk.size;
-          const totalLoaded = uploadedBytes + chunkLoaded;
-          const totalProgress = Math.min(Math.round((totalLoaded / file.size) * 100), 100);
-
-          setUploads((prev) =>
-            prev.map((u) =>
-              u.file === file ? { ...u, progress: totalProgress } : u
-            )
-          );
-        });
-
-        uploadedBytes += chunk.size;
+      // Chunked upload for large files; parts go up in parallel and an
+      // interrupted upload resumes from the parts the server already has
+      const resumeKey = `chunk-upload:${file.name}:${file.size}:${file.lastModified}`;
+      let session: { upload_id: string; chunk_size: number; total_chunks: number } | null = null;
+      let received: number[] = [];
+
+      const savedId = localStorage.getItem(resumeKey);
+      if (savedId) {
+        try {
+          const status = await uploadApi.getChunkUploadStatus(savedId);
+          session = status;
+          received = status.received_chunks;
+        } catch {
+          localStorage.removeItem(resumeKey);
+        }
+      }
+      if (!session) {
+        session = await uploadApi.initChunkUpload(file.name, file.size);
+        localStorage.setItem(resumeKey, session.upload_id);
       }
 
+      const { upload_id, chunk_size, total_chunks } = session;
+      const pending = [...Array(total_chunks).keys()].filter((i) => !received.includes(i));
+      const partBytes = (i: number) => Math.min(chunk_size, file.size - i * chunk_size);
+      const inFlight = new Map<number, number>();
+      let uploadedBytes = received.reduce((sum, i) => sum + partBytes(i), 0);
+
+      const reportProgress = () => {
+        let loaded = uploadedBytes;
+        inFlight.forEach((bytes) => (loaded += bytes));
+        const totalProgress = Math.min(Math.round((loaded / file.size) * 100), 100);
+        setUploads((prev) =>
+          prev.map((u) =>
+            u.file === file ? { ...u, progress: totalProgress } : u
+          )
+        );
+      };
+      reportProgress();
+
+      const uploadWorker = async () => {
+        for (let i = pending.shift(); i !== undefined; i = pending.shift()) {
+          const start = i * chunk_size;
+          const chunk = file.slice(start, start + partBytes(i));
+          const index = i;
+          inFlight.set(index, 0);
+          await uploadApi.uploadChunk(upload_id, index, chunk, (loaded) => {
+            inFlight.set(index, loaded);
+            reportProgress();
+          });
+          inFlight.delete(index);
+          uploadedBytes += chunk.size;
+          reportProgress();
+        }
+      };
+
+      await Promise.all(
+        Array.from({ length: Math.min(PARALLEL_CHUNK_UPLOADS, pending.length) }, uploadWorker)
+      );
+
+      localStorage.removeItem(resumeKey);
       return uploadApi.completeChunkUpload(upload_id, file.name);
     },
     onSuccess: (_data, file) => {
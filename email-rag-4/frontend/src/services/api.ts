@@ -354,38 +354,58 @@ export const uploadApi = {
     await api.post(`/upload/tasks/${taskId}/cancel`);
   },
 
+  precheckUpload: async (
+    filename: string,
+    fileSize: number,
+    fingerprint: string
+  ): Promise<{ duplicate: boolean; task_id: string | null; message: string }> => {
+    const response = await api.post('/upload/precheck', {
+      filename,
+      file_size: fileSize,
+      fingerprint,
+    });
+    return response.data;
+  },
+
   initChunkUpload: async (
     filename: string,
-    totalSize: number,
-    totalChunks: number
-  ): Promise<{ upload_id: string; chunk_size: number }> => {
+    totalSize: number
+  ): Promise<{ upload_id: string; chunk_size: number; total_chunks: number }> => {
     const response = await api.post('/upload/chunk/init', {
       filename,
       total_size: totalSize,
-      total_chunks: totalChunks,
     });
     return response.data;
   },
 
+  getChunkUploadStatus: async (
+    uploadId: string
+  ): Promise<{
+    upload_id: string;
+    chunk_size: number;
+    total_chunks: number;
+    received_chunks: number[];
+    missing_chunks: number[];
+    bytes_received: number;
+  }> => {
+    const response = await api.get(`/upload/chunk/${uploadId}`);
+    return response.data;
+  },
+
   uploadChunk: async (
     uploadId: string,
     chunkIndex: number,
     chunk: Blob,
-    onProgress?: (progress: number) => void
+    onProgress?: (loaded: number) => void
   ): Promise<void> => {
-    const formData = new FormData();
-    formData.append('file', chunk);
-
-    await api.post(`/upload/chunk/${uploadId}`, formData, {
+    // Raw body: the server writes it straight to the part's offset
+    await api.post(`/upload/chunk/${uploadId}`, chunk, {
       params: { chunk_index: chunkIndex },
-      headers: { 'Content-Type': 'multipart/form-data' },
+      headers: { 'Content-Type': 'application/octet-stream' },
       onUploadProgress: (progressEvent) => {
-        if (onProgress && progressEvent.total) {
-          // This is progress for the single chunk, not total
-          const progress = Math.round(
-            (progressEvent.loaded * 100) / progressEvent.total
-          );
-          onProgress(progress);
+        if (onProgress) {
+          // Bytes sent for this part, not the whole file
+          onProgress(progressEvent.loaded);
         }
       },
     });
@@ -154,6 +154,38 @@ export function downloadBlob(blob: Blob, filename: string): void {
   URL.revokeObjectURL(url);
 }
 
+// Must match FINGERPRINT_BLOCK_SIZE / FINGERPRINT_STRIDE_BLOCKS in
+// backend app/services/integrity.py
+const FINGERPRINT_BLOCK_SIZE = 64 * 1024;
+const FINGERPRINT_STRIDE_BLOCKS = 16;
+
+/**
+ * Compute the sampled fingerprint of a file: SHA-256 of its size and its
+ * head, tail and evenly spaced blocks. Reads about 1 MiB of any file.
+ */
+export async function computeFileFingerprint(file: File): Promise<string> {
+  const size = file.size;
+  const block = FINGERPRINT_BLOCK_SIZE;
+  const stride = FINGERPRINT_STRIDE_BLOCKS + 1;
+
+  let ranges: Array<[number, number]>;
+  if (size <= block * (FINGERPRINT_STRIDE_BLOCKS + 2)) {
+    ranges = [[0, size]];
+  } else {
+    ranges = [[0, block]];
+    for (let i = 1; i < stride; i++) {
+      const start = Math.floor((size * i) / stride);
+      ranges.push([start, start + block]);
+    }
+    ranges.push([size - block, size]);
+  }
+
+  const parts: BlobPart[] = [`${size}\n`, ...ranges.map(([start, end]) => file.slice(start, end))];
+  const buffer = await new Blob(parts).arrayBuffer();
+  const digest = await crypto.subtle.digest('SHA-256', buffer);
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+}
+
 /**
  * Copy text to clipboard.
  */